@@ -0,0 +1,263 @@
+"""Set-based propagation of EAV attribute values for assets, stock items and consumables.
+
+Each item family has the same three levels: ``*_type_attribute`` (definitions
+and defaults per type), ``*_model_attribute_value`` (one row per model and
+definition) and ``*_attribute_value`` (one row per item and definition).
+``propagate_type_attributes`` makes the model level match the type level and
+``propagate_model_attributes`` makes the item level match the model level, each
+with one DELETE for rows whose definition is gone and one INSERT ... SELECT for
+missing rows, however many models or items are affected.
+"""
+
+import datetime
+from decimal import Decimal
+
+from django.db import connection
+
+FAMILIES = {
+    "asset": {
+        "type_attribute": "asset_type_attribute",
+        "type_id": "asset_type_id",
+        "definition": "asset_attribute_definition",
+        "definition_id": "asset_attribute_definition_id",
+        "model": "asset_model",
+        "model_id": "asset_model_id",
+        "model_value": "asset_model_attribute_value",
+        "item": "asset",
+        "item_id": "asset_id",
+        "item_value": "asset_attribute_value",
+    },
+    "stock_item": {
+        "type_attribute": "stock_item_type_attribute",
+        "type_id": "stock_item_type_id",
+        "definition": "stock_item_attribute_definition",
+        "definition_id": "stock_item_attribute_definition_id",
+        "model": "stock_item_model",
+        "model_id": "stock_item_model_id",
+        "model_value": "stock_item_model_attribute_value",
+        "item": "stock_item",
+        "item_id": "stock_item_id",
+        "item_value": "stock_item_attribute_value",
+    },
+    "consumable": {
+        "type_attribute": "consumable_type_attribute",
+        "type_id": "consumable_type_id",
+        "definition": "consumable_attribute_definition",
+        "definition_id": "consumable_attribute_definition_id",
+        "model": "consumable_model",
+        "model_id": "consumable_model_id",
+        "model_value": "consumable_model_attribute_value",
+        "item": "consumable",
+        "item_id": "consumable_id",
+        "item_value": "consumable_attribute_value",
+    },
+}
+
+
+def _family(family: str) -> dict:
+    try:
+        return FAMILIES[family]
+    except KeyError:
+        raise ValueError(f"Unknown item family: {family}")
+
+
+def parse_default_value(data_type: str | None, default_value: str | None):
+    if default_value is None:
+        return {"value_bool": None, "value_string": None, "value_number": None, "value_date": None}
+
+    dt = (data_type or "").strip().lower()
+    raw = default_value.strip()
+
+    if dt in {"bool", "boolean"}:
+        if raw.lower() in {"true", "1", "yes", "y", "t"}:
+            return {"value_bool": True, "value_string": None, "value_number": None, "value_date": None}
+        if raw.lower() in {"false", "0", "no", "n", "f"}:
+            return {"value_bool": False, "value_string": None, "value_number": None, "value_date": None}
+        return {"value_bool": None, "value_string": raw, "value_number": None, "value_date": None}
+
+    if dt in {"number", "numeric", "decimal", "int", "integer", "float", "double"}:
+        try:
+            return {"value_bool": None, "value_string": None, "value_number": Decimal(raw), "value_date": None}
+        except Exception:
+            return {"value_bool": None, "value_string": raw, "value_number": None, "value_date": None}
+
+    if dt in {"date"}:
+        try:
+            return {
+                "value_bool": None,
+                "value_string": None,
+                "value_number": None,
+                "value_date": datetime.date.fromisoformat(raw),
+            }
+        except Exception:
+            return {"value_bool": None, "value_string": raw, "value_number": None, "value_date": None}
+
+    return {"value_bool": None, "value_string": raw, "value_number": None, "value_date": None}
+
+
+def _scope(column: str, ids) -> tuple[str, list]:
+    """``AND column = ANY(%s)`` restriction, or nothing when ``ids`` is None."""
+
+    if ids is None:
+        return "", []
+    return f" AND {column} = ANY(%s)", [list(ids)]
+
+
+def propagate_type_attributes(
+    family: str,
+    *,
+    type_ids=None,
+    model_ids=None,
+    cascade_to_items: bool = False,
+) -> dict[str, int]:
+    """Make model attribute values match their type's attribute definitions.
+
+    Restrict the work to models of ``type_ids`` and/or to ``model_ids``; with
+    neither, every model of the family is synchronised. Defaults are parsed once
+    per (type, definition). With ``cascade_to_items`` the item rows of the
+    affected models are synchronised as well. Returns row counts per operation.
+    """
+
+    f = _family(family)
+    if (type_ids is not None and not type_ids) or (model_ids is not None and not model_ids):
+        return {"model_values_deleted": 0, "model_values_inserted": 0}
+
+    type_scope, type_params = _scope(f"m.{f['type_id']}", type_ids)
+    model_scope, model_params = _scope(f"m.{f['model_id']}", model_ids)
+    counts = {}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            DELETE FROM public.{f['model_value']} v
+            USING public.{f['model']} m
+            WHERE v.{f['model_id']} = m.{f['model_id']}{type_scope}{model_scope}
+              AND NOT EXISTS (
+                  SELECT 1 FROM public.{f['type_attribute']} t
+                  WHERE t.{f['type_id']} = m.{f['type_id']}
+                    AND t.{f['definition_id']} = v.{f['definition_id']}
+              )
+            """,
+            type_params + model_params,
+        )
+        counts["model_values_deleted"] = cursor.rowcount
+
+        if model_ids is not None and type_ids is None:
+            cursor.execute(
+                f"SELECT DISTINCT {f['type_id']} FROM public.{f['model']} WHERE {f['model_id']} = ANY(%s)",
+                [list(model_ids)],
+            )
+            defaults_type_ids = [row[0] for row in cursor.fetchall()]
+        else:
+            defaults_type_ids = type_ids
+        defaults_scope, defaults_params = _scope(f"t.{f['type_id']}", defaults_type_ids)
+        cursor.execute(
+            f"""
+            SELECT t.{f['type_id']}, t.{f['definition_id']}, d.data_type, t.default_value
+            FROM public.{f['type_attribute']} t
+            JOIN public.{f['definition']} d ON d.{f['definition_id']} = t.{f['definition_id']}
+            WHERE TRUE{defaults_scope}
+            """,
+            defaults_params,
+        )
+        defaults = []
+        for type_id, definition_id, data_type, default_value in cursor.fetchall():
+            parsed = parse_default_value(data_type, default_value)
+            defaults.append(
+                (
+                    type_id,
+                    definition_id,
+                    parsed["value_bool"],
+                    parsed["value_string"],
+                    parsed["value_number"],
+                    parsed["value_date"],
+                )
+            )
+
+        counts["model_values_inserted"] = 0
+        if defaults:
+            values_sql = ", ".join(["(%s, %s, %s::boolean, %s::varchar, %s::numeric, %s::date)"] * len(defaults))
+            cursor.execute(
+                f"""
+                INSERT INTO public.{f['model_value']}
+                    ({f['model_id']}, {f['definition_id']}, value_bool, value_string, value_number, value_date)
+                SELECT m.{f['model_id']}, d.definition_id, d.value_bool, d.value_string, d.value_number, d.value_date
+                FROM (VALUES {values_sql})
+                    AS d(type_id, definition_id, value_bool, value_string, value_number, value_date)
+                JOIN public.{f['model']} m ON m.{f['type_id']} = d.type_id
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM public.{f['model_value']} v
+                    WHERE v.{f['model_id']} = m.{f['model_id']}
+                      AND v.{f['definition_id']} = d.definition_id
+                ){type_scope}{model_scope}
+                """,
+                [value for row in defaults for value in row] + type_params + model_params,
+            )
+            counts["model_values_inserted"] = cursor.rowcount
+
+    if cascade_to_items:
+        if model_ids is None:
+            model_scope_ids = None if type_ids is None else _model_ids_for_types(f, type_ids)
+        else:
+            model_scope_ids = model_ids
+        counts.update(propagate_model_attributes(family, model_ids=model_scope_ids))
+    return counts
+
+
+def _model_ids_for_types(f: dict, type_ids) -> list[int]:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT {f['model_id']} FROM public.{f['model']} WHERE {f['type_id']} = ANY(%s)",
+            [list(type_ids)],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def propagate_model_attributes(family: str, *, model_ids=None, item_ids=None) -> dict[str, int]:
+    """Make item attribute values match their model's attribute values.
+
+    Restrict the work to items of ``model_ids`` and/or to ``item_ids``; with
+    neither, every item of the family is synchronised. Existing item values are
+    left untouched; only rows for removed definitions are deleted and rows for
+    new definitions inserted with the model's value.
+    """
+
+    f = _family(family)
+    if (model_ids is not None and not model_ids) or (item_ids is not None and not item_ids):
+        return {"item_values_deleted": 0, "item_values_inserted": 0}
+
+    model_scope, model_params = _scope(f"i.{f['model_id']}", model_ids)
+    item_scope, item_params = _scope(f"i.{f['item_id']}", item_ids)
+    counts = {}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            DELETE FROM public.{f['item_value']} v
+            USING public.{f['item']} i
+            WHERE v.{f['item_id']} = i.{f['item_id']}{model_scope}{item_scope}
+              AND NOT EXISTS (
+                  SELECT 1 FROM public.{f['model_value']} mv
+                  WHERE mv.{f['model_id']} = i.{f['model_id']}
+                    AND mv.{f['definition_id']} = v.{f['definition_id']}
+              )
+            """,
+            model_params + item_params,
+        )
+        counts["item_values_deleted"] = cursor.rowcount
+
+        cursor.execute(
+            f"""
+            INSERT INTO public.{f['item_value']}
+                ({f['item_id']}, {f['definition_id']}, value_bool, value_string, value_number, value_date)
+            SELECT i.{f['item_id']}, mv.{f['definition_id']}, mv.value_bool, mv.value_string, mv.value_number, mv.value_date
+            FROM public.{f['item']} i
+            JOIN public.{f['model_value']} mv ON mv.{f['model_id']} = i.{f['model_id']}
+            WHERE NOT EXISTS (
+                SELECT 1 FROM public.{f['item_value']} v
+                WHERE v.{f['item_id']} = i.{f['item_id']}
+                  AND v.{f['definition_id']} = mv.{f['definition_id']}
+            ){model_scope}{item_scope}
+            """,
+            model_params + item_params,
+        )
+        counts["item_values_inserted"] = cursor.rowcount
+    return counts
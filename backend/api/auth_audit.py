@@ -0,0 +1,291 @@
+"""Login audit trail and throttling kept off the request path.
+
+``record_login`` only appends to in-process buffers: one row per event for
+``authentication_log`` and, per user account, the number of failed attempts
+since the last flush (or a reset plus ``last_login`` after a success). A
+daemon thread writes both every ``AUTH_LOG_FLUSH_INTERVAL`` seconds, with one
+multi-row INSERT and one ``UPDATE ... FROM (VALUES ...)``, so a burst of bad
+passwords costs one write per interval instead of one per attempt.
+
+``throttle_delay`` counts recent failures per username and per client address
+in a sliding window of ``LOGIN_THROTTLE_WINDOW`` seconds and answers without a
+query. Keys are kept in order of their latest failure; the writer thread drops
+those whose window has passed, and at most ``LOGIN_THROTTLE_MAX_KEYS`` are
+tracked (the least recently failing ones are evicted first), so a burst over
+many usernames cannot grow the table without bound. Windows and buffers are
+per process; with several workers each one enforces its own limit.
+
+Events and account counters are written in separate transactions, so a row
+that one of them rejects does not hold back the other. When a write fails,
+its rows go back into the buffers and are retried by the next flush; after
+``AUTH_LOG_MAX_ATTEMPTS`` consecutive failures the batch is logged at ERROR
+level and discarded instead. Each buffer holds at most
+``AUTH_LOG_BUFFER_SIZE`` entries: beyond it the oldest are dropped and
+counted in ``dropped``, the way the request log's ring buffer does.
+"""
+
+import atexit
+import collections
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .ids import sequence_name
+
+logger = logging.getLogger(__name__)
+
+LOGIN_SUCCESS = "LOGIN_SUCCESS"
+LOGIN_FAILURE = "LOGIN_FAILURE"
+THROTTLED = "Throttled"
+
+_lock = threading.Lock()
+_events = collections.deque()
+# user_id -> [failed attempts to add, reset to zero first, last_login], oldest entry first
+_accounts = {}
+# "events" / "accounts" -> consecutive failed writes of that buffer
+_attempts = {}
+# Events and account entries discarded because a buffer was full.
+dropped = 0
+# (kind, value) -> monotonic times of recent failures, least recently failing key first
+_failures = collections.OrderedDict()
+_writer = None
+
+
+def client_address(request) -> str | None:
+    return request.META.get("REMOTE_ADDR")
+
+
+def _window_keys(username: str, ip_address: str | None):
+    keys = [(("username", username.lower()), getattr(settings, "LOGIN_THROTTLE_USERNAME_FAILURES", 5))]
+    if ip_address:
+        keys.append((("ip", ip_address), getattr(settings, "LOGIN_THROTTLE_IP_FAILURES", 50)))
+    return keys
+
+
+def throttle_delay(username: str, ip_address: str | None) -> int:
+    """Seconds until ``username`` may try again from ``ip_address``; 0 when not throttled."""
+
+    window = getattr(settings, "LOGIN_THROTTLE_WINDOW", 300)
+    now = time.monotonic()
+    delay = 0.0
+    with _lock:
+        for key, limit in _window_keys(username, ip_address):
+            attempts = _failures.get(key)
+            if not attempts:
+                continue
+            while attempts and attempts[0] <= now - window:
+                attempts.popleft()
+            if not attempts:
+                del _failures[key]
+            elif len(attempts) >= limit:
+                delay = max(delay, attempts[-limit] + window - now)
+    return int(delay) + 1 if delay else 0
+
+
+def record_login(
+    event_type: str,
+    username: str,
+    ip_address: str | None,
+    *,
+    user_id: int | None = None,
+    failure_reason: str | None = None,
+) -> None:
+    """Buffer one login event; failures also count towards the throttle and the account's counter."""
+
+    now = timezone.now()
+    with _lock:
+        _events.append((user_id, username[:50], event_type, ip_address, now, failure_reason))
+        if event_type == LOGIN_FAILURE and failure_reason != THROTTLED:
+            for key, _ in _window_keys(username, ip_address):
+                _failures.setdefault(key, collections.deque()).append(time.monotonic())
+                _failures.move_to_end(key)
+            max_keys = getattr(settings, "LOGIN_THROTTLE_MAX_KEYS", 100000)
+            while len(_failures) > max_keys:
+                _failures.popitem(last=False)
+        if user_id is not None:
+            account = _accounts.setdefault(user_id, [0, False, None])
+            if event_type == LOGIN_SUCCESS:
+                account[:] = [0, True, now]
+                _failures.pop(("username", username.lower()), None)
+            elif event_type == LOGIN_FAILURE:
+                account[0] += 1
+        _trim()
+    _ensure_writer()
+
+
+def _trim() -> None:
+    """Drop the oldest buffered events and account entries beyond ``AUTH_LOG_BUFFER_SIZE``; call with ``_lock`` held."""
+
+    global dropped
+    limit = getattr(settings, "AUTH_LOG_BUFFER_SIZE", 10000)
+    while len(_events) > limit:
+        _events.popleft()
+        dropped += 1
+    while len(_accounts) > limit:
+        del _accounts[next(iter(_accounts))]
+        dropped += 1
+
+
+def prune_failures(now: float | None = None) -> int:
+    """Forget throttle keys whose latest failure left the window; return how many were dropped."""
+
+    cutoff = (time.monotonic() if now is None else now) - getattr(settings, "LOGIN_THROTTLE_WINDOW", 300)
+    dropped = 0
+    with _lock:
+        while _failures:
+            key, attempts = next(iter(_failures.items()))
+            if attempts and attempts[-1] > cutoff:
+                break
+            del _failures[key]
+            dropped += 1
+    return dropped
+
+
+def _restore_events(events: list) -> None:
+    """Put events that could not be written back in front of what was buffered since."""
+
+    with _lock:
+        _events.extendleft(reversed(events))
+        _trim()
+
+
+def _restore_accounts(accounts: dict) -> None:
+    """Merge counters that could not be written into what was buffered since, keeping them oldest."""
+
+    with _lock:
+        newer_accounts = dict(_accounts)
+        _accounts.clear()
+        _accounts.update(accounts)
+        for user_id, newer in newer_accounts.items():
+            account = _accounts.get(user_id)
+            if account is None or newer[1]:
+                # A later success resets the counter; otherwise both batches add up.
+                _accounts[user_id] = newer
+            else:
+                _accounts[user_id] = [account[0] + newer[0], account[1], newer[2] or account[2]]
+        _trim()
+
+
+def _retry_or_discard(kind: str, rows, restore) -> None:
+    """Give a failed batch back to its buffer, or log and drop it after ``AUTH_LOG_MAX_ATTEMPTS`` failures."""
+
+    max_attempts = getattr(settings, "AUTH_LOG_MAX_ATTEMPTS", 5)
+    with _lock:
+        attempts = _attempts[kind] = _attempts.get(kind, 0) + 1
+        if attempts >= max_attempts:
+            _attempts[kind] = 0
+    if attempts < max_attempts:
+        restore(rows)
+        return
+    logger.error(
+        "Discarding %d authentication %s after %d failed writes: %r",
+        len(rows),
+        "log rows" if kind == "events" else "account counters",
+        attempts,
+        list(rows.items()) if isinstance(rows, dict) else rows,
+    )
+
+
+def flush() -> int:
+    """Write buffered events and account counters; return the number of events written.
+
+    On a database error the failed batch is put back for the next flush (or
+    discarded, see ``AUTH_LOG_MAX_ATTEMPTS``) and the first error re-raised.
+    """
+
+    with _lock:
+        events = list(_events)
+        _events.clear()
+        accounts = {user_id: list(account) for user_id, account in _accounts.items()}
+        _accounts.clear()
+
+    error = None
+    written = 0
+    for kind, rows, write, restore in (
+        ("events", events, _write_events, _restore_events),
+        ("accounts", accounts, _write_accounts, _restore_accounts),
+    ):
+        if not rows:
+            continue
+        try:
+            write(rows)
+        except Exception as exc:
+            error = error or exc
+            _retry_or_discard(kind, rows, restore)
+            continue
+        with _lock:
+            _attempts[kind] = 0
+        if kind == "events":
+            written = len(rows)
+    if error is not None:
+        raise error
+    return written
+
+
+def _write_events(events: list) -> None:
+    sequence = f"public.{sequence_name('authentication_log', 'log_id')}"
+    batch_size = getattr(settings, "AUTH_LOG_BATCH_SIZE", 500)
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, len(events), batch_size):
+            batch = events[start:start + batch_size]
+            cursor.execute(
+                f"""
+                INSERT INTO public.authentication_log
+                    (log_id, user_id, attempted_username, event_type, ip_address, event_timestamp, failure_reason)
+                VALUES {", ".join([f"(nextval('{sequence}'), %s, %s, %s, %s, %s, %s)"] * len(batch))}
+                """,
+                [value for event in batch for value in event],
+            )
+
+
+def _write_accounts(accounts: dict) -> None:
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE public.user_account u
+            SET failed_login_attempts = CASE WHEN d.reset THEN 0 ELSE u.failed_login_attempts END + d.failed,
+                last_login = COALESCE(d.last_login, u.last_login)
+            FROM (VALUES {", ".join(["(%s, %s, %s, %s::timestamptz)"] * len(accounts))})
+                AS d(user_id, failed, reset, last_login)
+            WHERE u.user_id = d.user_id
+            """,
+            [value for user_id, (failed, reset, last_login) in accounts.items() for value in (user_id, failed, reset, last_login)],
+        )
+
+
+def _run(stop: threading.Event) -> None:
+    interval = getattr(settings, "AUTH_LOG_FLUSH_INTERVAL", 2.0)
+    while not stop.wait(interval):
+        prune_failures()
+        try:
+            flush()
+        except Exception:
+            logger.exception("Authentication log flush failed")
+        finally:
+            connection.close_if_unusable_or_obsolete()
+
+
+def _ensure_writer() -> None:
+    global _writer
+    if _writer is not None:
+        return
+    with _lock:
+        if _writer is not None:
+            return
+        stop = threading.Event()
+        thread = threading.Thread(target=_run, args=(stop,), name="auth-audit-writer", daemon=True)
+        thread.start()
+        _writer = stop
+    atexit.register(_shutdown, stop)
+
+
+def _shutdown(stop: threading.Event) -> None:
+    stop.set()
+    try:
+        flush()
+    except Exception:
+        logger.exception("Authentication log flush failed at exit")
@@ -1,8 +1,17 @@
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework import exceptions
-from .models import UserAccount
+from .principal import cached_principal
+from .tokens import principal_from_claims
 
 class UserAccountJWTAuthentication(JWTAuthentication):
+    def authenticate(self, request):
+        self._principal = None
+        result = super().authenticate(request)
+        if result is not None:
+            # Person and roles were resolved with the user; views read them from request.principal.
+            request.principal = self._principal
+        return result
+
     def get_user(self, validated_token):
         """
         Custom get_user to look up the user in our custom UserAccount table.
@@ -14,16 +23,22 @@ class UserAccountJWTAuthentication(JWTAuthentication):
             user_id = validated_token.get('user_id')
             if not user_id:
                 return None
-                
-            user = UserAccount.objects.get(user_id=user_id)
-            
+
+            # Tokens minted with role claims need no lookup while their roles epoch
+            # is current; older tokens go through the principal cache (see api.principal).
+            principal = principal_from_claims(validated_token) or cached_principal(user_id)
+            if principal is None:
+                raise exceptions.AuthenticationFailed('User not found', code='user_not_found')
+            user = principal.user
+
             # SimpleJWT expects an object that has is_authenticated = True
             # We add it dynamically if it doesn't exist to satisfy internal checks
             if not hasattr(user, 'is_authenticated'):
                 user.is_authenticated = True
-                
+
+            self._principal = principal
             return user
-        except UserAccount.DoesNotExist:
-            raise exceptions.AuthenticationFailed('User not found', code='user_not_found')
+        except exceptions.AuthenticationFailed:
+            raise
         except Exception as e:
             raise exceptions.AuthenticationFailed(str(e))
@@ -0,0 +1,193 @@
+"""Spare stock items and consumables available for maintenance requests.
+
+The ``*_availability`` tables hold one row per item that sits in a location
+and is neither destroyed, assigned to a person nor part of an asset (or, for
+consumables, of a stock item). They are written by triggers on the item,
+current-location, composition and assignment tables (migrations 0033 and
+0038), so finding candidates of a model is a single index range scan.
+
+``reserve_random_item`` hands a spare to one maintenance item request at a
+time: it draws a random id within the model's id range and takes the first
+unreserved spare from there (wrapping around to the start of the range once),
+walking the ``(model, item)`` index instead of counting and skipping rows. The
+row is locked with ``FOR UPDATE SKIP LOCKED`` while the ``spare_reservation``
+row is written, and the reservation lasts until the request is fulfilled or
+rejected, or ``SPARE_RESERVATION_TTL`` seconds have passed.
+"""
+
+import datetime
+import random
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Exists, F, OuterRef
+from django.utils import timezone
+
+from .models import ConsumableAvailability, SpareReservation, StockItemAvailability
+
+SPARE_KINDS = ("stock_item", "consumable")
+
+_INDEXES = {
+    "stock_item": StockItemAvailability,
+    "consumable": ConsumableAvailability,
+}
+
+
+def _index(kind: str):
+    try:
+        return _INDEXES[kind]
+    except KeyError:
+        raise ValueError(f"Unknown spare kind: {kind}")
+
+
+def _live_reservations(kind: str, request_id: int | None = None):
+    queryset = SpareReservation.objects.filter(item_type=kind, expires_at__gt=timezone.now())
+    if request_id is not None:
+        queryset = queryset.exclude(request_id=request_id)
+    return queryset
+
+
+def available_items(kind: str, model_id: int, location_id: int | None = None, *, request_id: int | None = None):
+    """Queryset of ``{<kind>_id, <kind>_inventory_number, current_location_id}`` for spares of a model.
+
+    Spares reserved for another request than ``request_id`` are left out.
+    """
+
+    queryset = _index(kind).objects.filter(**{f"{kind}_model_id": model_id}).exclude(
+        Exists(_live_reservations(kind, request_id).filter(item_id=OuterRef(f"{kind}_id")))
+    )
+    if location_id is not None:
+        queryset = queryset.filter(location_id=location_id)
+    return queryset.annotate(
+        **{f"{kind}_inventory_number": F(f"{kind}__{kind}_inventory_number")},
+        current_location_id=F("location_id"),
+    ).values(f"{kind}_id", f"{kind}_inventory_number", "current_location_id").order_by(f"{kind}_id")
+
+
+def reserve_random_item(
+    kind: str,
+    model_id: int,
+    *,
+    request_id: int,
+    person_id: int | None = None,
+    attempts: int = 3,
+) -> dict | None:
+    """Reserve a spare of ``model_id`` picked at random for ``request_id``.
+
+    The request row is locked and any earlier reservation of the request is
+    released first. Returns ``{<kind>_id, <kind>_inventory_number,
+    current_location_id, reserved_until}`` or None when no unreserved spare
+    is left.
+
+    Spares that follow a gap in the ids are proportionally more likely to be
+    picked; the choice only has to spread concurrent pickers over the spares.
+    """
+
+    _index(kind)
+    item_id = f"{kind}_id"
+    unreserved_sql = f"""
+        FROM public.{kind}_availability a
+        WHERE a.{kind}_model_id = %(model_id)s
+          AND NOT EXISTS (
+              SELECT 1 FROM public.spare_reservation r
+              WHERE r.item_type = %(kind)s AND r.item_id = a.{item_id} AND r.expires_at > now()
+          )
+    """
+    params = {"model_id": model_id, "kind": kind, "request_id": request_id, "person_id": person_id}
+    ttl = getattr(settings, "SPARE_RESERVATION_TTL", 900)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Concurrent picks for the same request (a double click) queue here
+        # instead of both inserting a reservation for it.
+        cursor.execute(
+            """
+            SELECT 1 FROM public.maintenance_step_item_request
+            WHERE maintenance_step_item_request_id = %s
+            FOR UPDATE
+            """,
+            [request_id],
+        )
+        if cursor.fetchone() is None:
+            return None
+        release_reservation(request_id)
+        cursor.execute(
+            f"SELECT min({item_id}), max({item_id}) FROM public.{kind}_availability WHERE {kind}_model_id = %s",
+            [model_id],
+        )
+        low, high = cursor.fetchone()
+        if low is None:
+            return None
+        for _ in range(attempts):
+            params["start"] = random.randint(low, high)
+            # From the random id to the end of the range, then once from its start.
+            for bound in (f"a.{item_id} >= %(start)s", f"a.{item_id} < %(start)s"):
+                cursor.execute(
+                    f"""
+                    SELECT a.{item_id}, a.location_id,
+                           (SELECT i.{kind}_inventory_number FROM public.{kind} i WHERE i.{item_id} = a.{item_id})
+                    {unreserved_sql}
+                      AND {bound}
+                    ORDER BY a.{item_id}
+                    LIMIT 1
+                    FOR UPDATE OF a SKIP LOCKED
+                    """,
+                    params,
+                )
+                row = cursor.fetchone()
+                if row is not None:
+                    break
+            else:
+                # Every spare left is reserved or being picked by someone else.
+                return None
+            params.update(item_id=row[0], expires_at=timezone.now() + datetime.timedelta(seconds=ttl))
+            cursor.execute(
+                """
+                INSERT INTO public.spare_reservation AS r
+                    (item_type, item_id, maintenance_step_item_request_id, reserved_by_person_id, reserved_at, expires_at)
+                VALUES (%(kind)s, %(item_id)s, %(request_id)s, %(person_id)s, now(), %(expires_at)s)
+                ON CONFLICT (item_type, item_id) DO UPDATE
+                    SET maintenance_step_item_request_id = EXCLUDED.maintenance_step_item_request_id,
+                        reserved_by_person_id = EXCLUDED.reserved_by_person_id,
+                        reserved_at = EXCLUDED.reserved_at,
+                        expires_at = EXCLUDED.expires_at
+                    WHERE r.expires_at <= now()
+                RETURNING r.expires_at
+                """,
+                params,
+            )
+            reserved = cursor.fetchone()
+            if reserved is None:
+                continue
+            return {
+                item_id: row[0],
+                f"{kind}_inventory_number": row[2],
+                "current_location_id": row[1],
+                "reserved_until": reserved[0],
+            }
+    return None
+
+
+def reservation_conflict(kind: str, item_id: int, request_id: int) -> bool:
+    """True when the spare is currently reserved for another request."""
+
+    return _live_reservations(kind, request_id).filter(item_id=item_id).exists()
+
+
+def release_reservation(request_id: int) -> None:
+    SpareReservation.objects.filter(request_id=request_id).delete()
+
+
+def availability_counts(kind: str, model_ids=None, location_id: int | None = None) -> list[dict]:
+    """Number of available spares per model (and location when ``location_id`` is given)."""
+
+    model_column = f"{kind}_model_id"
+    queryset = _index(kind).objects.all()
+    if model_ids is not None:
+        queryset = queryset.filter(**{f"{model_column}__in": list(model_ids)})
+    if location_id is not None:
+        queryset = queryset.filter(location_id=location_id)
+    return list(
+        queryset.values(model_column)
+        .annotate(available_count=Count("pk"))
+        .order_by(model_column)
+    )
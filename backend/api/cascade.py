@@ -0,0 +1,227 @@
+"""Set-based cascade of parent movements onto their composed items.
+
+When an asset (or a stock item) moves, every stock item / consumable that is
+currently mounted on it follows. Components are resolved together with their
+current location in one query per component kind, ids are reserved in one
+round trip and the child movements are written with a single ``bulk_create``,
+so the cost of a cascade no longer grows with the number of components.
+``bulk_move_assets`` applies the same approach to a whole selection of assets;
+it is shared by the bulk-move endpoint and the background job of the same name.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+
+from .ids import allocate_ids
+from .locations import current_location_ids, current_location_subquery
+from .models import (
+    Asset,
+    AssetCurrentLocation,
+    AssetIsComposedOfConsumableHistory,
+    AssetIsComposedOfStockItemHistory,
+    ConsumableIsUsedInStockItemHistory,
+    AssetMovement,
+    ConsumableMovement,
+    StockItemMovement,
+)
+
+
+def _open_components(history_model, parent_field: str, kind: str, parent_ids):
+    """Yield ``(parent_id, component_id, current_location_id)`` for components still mounted."""
+
+    return (
+        history_model.objects.filter(**{f"{parent_field}__in": parent_ids, "end_datetime__isnull": True})
+        .annotate(current_location_id=current_location_subquery(kind, f"{kind}_id"))
+        .values_list(parent_field, f"{kind}_id", "current_location_id")
+    )
+
+
+def _bulk_move(model, kind: str, components, source_location_ids, destination_location_id, fields) -> list[int]:
+    rows = []
+    seen = set()
+    for parent_id, component_id, current_location_id in components:
+        if component_id in seen:
+            continue
+        seen.add(component_id)
+        source_location_id = current_location_id or source_location_ids[parent_id]
+        if source_location_id == destination_location_id:
+            continue
+        rows.append((component_id, source_location_id))
+
+    if not rows:
+        return []
+
+    ids = allocate_ids(model, len(rows))
+    pk_field = model._meta.pk.attname
+    model.objects.bulk_create(
+        [
+            model(
+                **{pk_field: movement_id, f"{kind}_id": component_id},
+                source_location_id=source_location_id,
+                destination_location_id=destination_location_id,
+                **fields,
+            )
+            for movement_id, (component_id, source_location_id) in zip(ids, rows)
+        ]
+    )
+    return ids
+
+
+def cascade_asset_moves(
+    source_location_ids: dict[int, int],
+    *,
+    destination_location_id: int,
+    movement_reason: str,
+    movement_datetime,
+    maintenance_step_id=None,
+    external_maintenance_step_id=None,
+) -> dict[str, list[int]]:
+    """Move the components of several assets to ``destination_location_id``.
+
+    ``source_location_ids`` maps each moved asset to the location it left; it is
+    used for components that have no movement history of their own. Components
+    already at the destination are skipped. Returns the created movement ids per
+    component kind.
+    """
+
+    asset_ids = list(source_location_ids)
+    if not asset_ids:
+        return {"stock_item_movement_ids": [], "consumable_movement_ids": []}
+
+    fields = {
+        "maintenance_step_id": maintenance_step_id,
+        "external_maintenance_step_id": external_maintenance_step_id,
+        "movement_reason": movement_reason,
+        "movement_datetime": movement_datetime,
+    }
+    stock_items = _open_components(AssetIsComposedOfStockItemHistory, "asset_id", "stock_item", asset_ids)
+    consumables = _open_components(AssetIsComposedOfConsumableHistory, "asset_id", "consumable", asset_ids)
+    return {
+        "stock_item_movement_ids": _bulk_move(
+            StockItemMovement, "stock_item", stock_items, source_location_ids, destination_location_id, fields
+        ),
+        "consumable_movement_ids": _bulk_move(
+            ConsumableMovement, "consumable", consumables, source_location_ids, destination_location_id, fields
+        ),
+    }
+
+
+def cascade_stock_item_moves(
+    source_location_ids: dict[int, int],
+    *,
+    destination_location_id: int,
+    movement_reason: str,
+    movement_datetime,
+    maintenance_step_id=None,
+    external_maintenance_step_id=None,
+) -> dict[str, list[int]]:
+    """Move the consumables used in several stock items; see :func:`cascade_asset_moves`."""
+
+    stock_item_ids = list(source_location_ids)
+    if not stock_item_ids:
+        return {"consumable_movement_ids": []}
+
+    fields = {
+        "maintenance_step_id": maintenance_step_id,
+        "external_maintenance_step_id": external_maintenance_step_id,
+        "movement_reason": movement_reason,
+        "movement_datetime": movement_datetime,
+    }
+    consumables = _open_components(ConsumableIsUsedInStockItemHistory, "stock_item_id", "consumable", stock_item_ids)
+    return {
+        "consumable_movement_ids": _bulk_move(
+            ConsumableMovement, "consumable", consumables, source_location_ids, destination_location_id, fields
+        ),
+    }
+
+
+def bulk_move_assets(
+    *,
+    destination_location_id: int,
+    movement_reason: str,
+    asset_ids=None,
+    attribution_order_id=None,
+    source_location_id=None,
+) -> dict:
+    """Move every asset matching the given filters (and their components) to ``destination_location_id``.
+
+    Filters combine: explicit ``asset_ids``, assets of ``attribution_order_id``
+    and assets currently at ``source_location_id``. Returns the per-asset
+    results together with the cascaded movement ids.
+    """
+
+    assets = Asset.objects.all()
+    requested_ids = None
+    if asset_ids is not None:
+        requested_ids = list(dict.fromkeys(asset_ids))
+        assets = assets.filter(asset_id__in=requested_ids)
+    if attribution_order_id is not None:
+        assets = assets.filter(attribution_order_id=attribution_order_id)
+    if source_location_id is not None:
+        assets = assets.filter(
+            asset_id__in=AssetCurrentLocation.objects.filter(location_id=source_location_id).values("asset_id")
+        )
+
+    results = []
+    with transaction.atomic():
+        # Lock the selected assets so concurrent moves of the same assets serialize.
+        selected_ids = list(assets.select_for_update().order_by("asset_id").values_list("asset_id", flat=True))
+        found = set(selected_ids)
+        if requested_ids is not None:
+            for asset_id in requested_ids:
+                if asset_id not in found:
+                    results.append({"asset_id": asset_id, "status": "not_found"})
+
+        current = current_location_ids("asset", selected_ids)
+        to_move = []
+        for asset_id in selected_ids:
+            location_id = current.get(asset_id)
+            if location_id == destination_location_id:
+                results.append({"asset_id": asset_id, "status": "already_in_location"})
+                continue
+            # Assets without movement history are placed at the destination, as in a single move.
+            to_move.append((asset_id, location_id or destination_location_id))
+
+        now_dt = timezone.now()
+        movement_ids = allocate_ids(AssetMovement, len(to_move))
+        AssetMovement.objects.bulk_create(
+            [
+                AssetMovement(
+                    asset_movement_id=movement_id,
+                    asset_id=asset_id,
+                    source_location_id=source_id,
+                    destination_location_id=destination_location_id,
+                    maintenance_step=None,
+                    external_maintenance_step_id=None,
+                    movement_reason=movement_reason,
+                    movement_datetime=now_dt,
+                )
+                for movement_id, (asset_id, source_id) in zip(movement_ids, to_move)
+            ]
+        )
+
+        cascaded = cascade_asset_moves(
+            {asset_id: source_id for asset_id, source_id in to_move if source_id != destination_location_id},
+            destination_location_id=destination_location_id,
+            movement_reason=movement_reason,
+            movement_datetime=now_dt,
+        )
+
+    for movement_id, (asset_id, source_id) in zip(movement_ids, to_move):
+        results.append(
+            {
+                "asset_id": asset_id,
+                "status": "moved",
+                "asset_movement_id": movement_id,
+                "source_location_id": source_id,
+            }
+        )
+    results.sort(key=lambda r: r["asset_id"])
+
+    return {
+        "destination_location_id": destination_location_id,
+        "moved_count": len(to_move),
+        "skipped_count": len(results) - len(to_move),
+        "results": results,
+        **cascaded,
+    }
@@ -0,0 +1,191 @@
+"""Content-addressed storage for uploaded PDF digital copies.
+
+``store_pdf`` streams an upload chunk by chunk into a temporary file under
+``MEDIA_ROOT``, hashing it with SHA-256 and checking the ``%PDF`` header on
+the way, then renames it to ``<DOCUMENT_STORAGE_DIR>/ab/cd/<sha256>.pdf``.
+The rename is atomic, so readers never see a partial file; when a document
+with the same hash is already stored the upload is discarded and the
+existing path is returned. The returned path is relative to ``MEDIA_ROOT``,
+like every ``digital_copy`` column, so download views are unchanged.
+
+Stored files can be shared by several rows and are never overwritten or
+deleted by an upload.
+
+``serve_document`` answers PDF downloads with an ETag (the content hash for
+content-addressed files) and Last-Modified, returns 304 to matching
+conditional requests, serves single byte ranges with 206, and with
+``DOCUMENT_SENDFILE`` set leaves the transfer to the front web server
+through ``X-Accel-Redirect`` (nginx) or ``X-Sendfile`` (Apache, lighttpd).
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+PDF_MAGIC = b"%PDF"
+
+_DIGEST_NAME = re.compile(r"^([0-9a-f]{64})\.pdf$")
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class InvalidDocument(ValueError):
+    pass
+
+
+def _storage_root() -> str:
+    return os.path.join(str(settings.MEDIA_ROOT), getattr(settings, "DOCUMENT_STORAGE_DIR", "documents"))
+
+
+def document_path(digest: str) -> str:
+    """Path relative to ``MEDIA_ROOT`` of the document with SHA-256 ``digest``."""
+
+    return os.path.join(getattr(settings, "DOCUMENT_STORAGE_DIR", "documents"), digest[:2], digest[2:4], f"{digest}.pdf")
+
+
+def store_pdf(upload) -> str:
+    """Store an uploaded PDF and return its path relative to ``MEDIA_ROOT``.
+
+    Raises :class:`InvalidDocument` when the content does not start with ``%PDF``.
+    """
+
+    tmp_dir = os.path.join(_storage_root(), "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    chunk_size = getattr(settings, "DOCUMENT_UPLOAD_CHUNK_SIZE", 64 * 1024)
+
+    digest = hashlib.sha256()
+    header = b""
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for chunk in upload.chunks(chunk_size):
+                if len(header) < len(PDF_MAGIC):
+                    header += chunk[:len(PDF_MAGIC) - len(header)]
+                    if not PDF_MAGIC.startswith(header):
+                        raise InvalidDocument("digital_copy must be a valid PDF")
+                digest.update(chunk)
+                out.write(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+        if header != PDF_MAGIC:
+            raise InvalidDocument("digital_copy must be a valid PDF")
+        # mkstemp creates the file owner-only; stored documents are served like the rest of MEDIA_ROOT.
+        os.chmod(tmp_path, 0o644)
+
+        rel_path = document_path(digest.hexdigest())
+        abs_path = os.path.join(str(settings.MEDIA_ROOT), rel_path)
+        if os.path.isfile(abs_path):
+            os.unlink(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(abs_path), exist_ok=True)
+            os.replace(tmp_path, abs_path)
+        return rel_path
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _etag(abs_path: str, stat) -> str:
+    match = _DIGEST_NAME.match(os.path.basename(abs_path))
+    if match:
+        return f'"{match.group(1)}"'
+    # Files stored before content addressing: identified by size and modification time.
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def _byte_range(request, size: int, etag: str, last_modified: int):
+    """``(start, end)`` of the requested single byte range, None for the whole file, False if unsatisfiable."""
+
+    header = request.META.get("HTTP_RANGE", "")
+    match = _RANGE.match(header.replace(" ", ""))
+    if not match or match.groups() == ("", ""):
+        # Multiple ranges and malformed headers are answered with the whole file.
+        return None
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if if_range and if_range != etag and parse_http_date_safe(if_range) != last_modified:
+        return None
+
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _file_range(abs_path: str, start: int, length: int, chunk_size: int):
+    with open(abs_path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_document(request, rel_path: str, filename: str, *, as_attachment: bool = False):
+    """Response for the PDF stored at ``rel_path`` (relative to ``MEDIA_ROOT``)."""
+
+    abs_path = os.path.join(str(settings.MEDIA_ROOT), rel_path)
+    stat = os.stat(abs_path)
+    etag = _etag(abs_path, stat)
+    last_modified = int(stat.st_mtime)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(last_modified),
+        # Downloads require authentication: browsers may keep a copy but must revalidate it.
+        "Cache-Control": "private, no-cache",
+    }
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        for name, value in headers.items():
+            not_modified[name] = value
+        return not_modified
+
+    disposition = "attachment" if as_attachment else "inline"
+    headers["Content-Disposition"] = f'{disposition}; filename="{filename}"'
+
+    sendfile = getattr(settings, "DOCUMENT_SENDFILE", None)
+    if sendfile:
+        response = HttpResponse(content_type="application/pdf", headers=headers)
+        if sendfile == "x-accel-redirect":
+            prefix = getattr(settings, "DOCUMENT_ACCEL_REDIRECT_PREFIX", "/protected-media/")
+            response["X-Accel-Redirect"] = prefix.rstrip("/") + "/" + rel_path.replace(os.sep, "/")
+        else:
+            response["X-Sendfile"] = abs_path
+        return response
+
+    headers["Accept-Ranges"] = "bytes"
+    byte_range = _byte_range(request, stat.st_size, etag, last_modified)
+    if byte_range is False:
+        headers["Content-Range"] = f"bytes */{stat.st_size}"
+        return HttpResponse(status=416, headers=headers)
+    if byte_range is None:
+        response = FileResponse(open(abs_path, "rb"), content_type="application/pdf")
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    start, end = byte_range
+    length = end - start + 1
+    chunk_size = getattr(settings, "DOCUMENT_UPLOAD_CHUNK_SIZE", 64 * 1024)
+    response = StreamingHttpResponse(
+        _file_range(abs_path, start, length, chunk_size),
+        status=206,
+        content_type="application/pdf",
+        headers=headers,
+    )
+    response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+    response["Content-Length"] = str(length)
+    return response
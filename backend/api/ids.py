@@ -0,0 +1,165 @@
+"""Primary key allocation backed by PostgreSQL sequences.
+
+Most tables in this schema have plain integer primary keys without a default,
+so ids used to be computed as ``MAX(id) + 1`` right before each insert. That
+costs an extra index scan per insert and lets two concurrent writers pick the
+same id. Every create path now asks this module for ids instead; each target
+table gets a ``<table>_<pk>_seq`` sequence (created and aligned to the current
+maximum by migration 0027, re-alignable with ``manage.py align_id_sequences``).
+
+Inventory numbers of stock items and consumables generated by the API come
+from sequences of the same kind (migration 0030), formatted as six digits.
+"""
+
+from django.db import connection
+
+# (table, primary key column) pairs whose ids are allocated here.
+SEQUENCE_TARGETS = (
+    ("acceptance_report", "acceptance_report_id"),
+    ("administrative_certificate", "administrative_certificate_id"),
+    ("asset", "asset_id"),
+    ("asset_attribute_definition", "asset_attribute_definition_id"),
+    ("asset_brand", "asset_brand_id"),
+    ("asset_condition_history", "asset_condition_history_id"),
+    ("asset_destruction_certificate", "asset_destruction_certificate_id"),
+    ("asset_is_assigned_to_person", "assignment_id"),
+    ("asset_model", "asset_model_id"),
+    ("asset_movement", "asset_movement_id"),
+    ("asset_type", "asset_type_id"),
+    ("attribution_order", "attribution_order_id"),
+    ("authentication_log", "log_id"),
+    ("backorder_report", "backorder_report_id"),
+    ("company_asset_request", "company_asset_request_id"),
+    ("consumable", "consumable_id"),
+    ("consumable_attribute_definition", "consumable_attribute_definition_id"),
+    ("consumable_brand", "consumable_brand_id"),
+    ("consumable_is_assigned_to_person", "assignment_id"),
+    ("consumable_model", "consumable_model_id"),
+    ("consumable_movement", "consumable_movement_id"),
+    ("consumable_type", "consumable_type_id"),
+    ("delivery_note", "delivery_note_id"),
+    ("external_maintenance", "external_maintenance_id"),
+    ("external_maintenance_step", "external_maintenance_step_id"),
+    ("invoice", "invoice_id"),
+    ("location", "location_id"),
+    ("maintenance", "maintenance_id"),
+    ("maintenance_step", "maintenance_step_id"),
+    ("maintenance_step_item_request", "maintenance_step_item_request_id"),
+    ("organizational_structure", "organizational_structure_id"),
+    ("person", "person_id"),
+    ("person_reports_problem_on_asset", "report_id"),
+    ("person_reports_problem_on_consumable", "report_id"),
+    ("person_reports_problem_on_stock_item", "report_id"),
+    ("position", "position_id"),
+    ("purchase_order", "purchase_order_id"),
+    ("receipt_report", "receipt_report_id"),
+    ("stock_item", "stock_item_id"),
+    ("stock_item_attribute_definition", "stock_item_attribute_definition_id"),
+    ("stock_item_brand", "stock_item_brand_id"),
+    ("stock_item_consumable_destruction_certificate", "destruction_certificate_id"),
+    ("stock_item_is_assigned_to_person", "assignment_id"),
+    ("stock_item_model", "stock_item_model_id"),
+    ("stock_item_movement", "stock_item_movement_id"),
+    ("stock_item_type", "stock_item_type_id"),
+    ("warehouse", "warehouse_id"),
+)
+
+# (table, inventory number column) pairs whose numbers can be generated here.
+INVENTORY_NUMBER_TARGETS = (
+    ("consumable", "consumable_inventory_number"),
+    ("stock_item", "stock_item_inventory_number"),
+)
+INVENTORY_NUMBER_WIDTH = 6
+
+
+def sequence_name(table: str, column: str) -> str:
+    return f"{table}_{column}_seq"
+
+
+def _resolve(target) -> tuple[str, str]:
+    if isinstance(target, tuple):
+        return target
+    meta = target._meta
+    return meta.db_table, meta.pk.column
+
+
+def allocate_id(target) -> int:
+    """Return a fresh primary key for ``target`` (a model class or a ``(table, column)`` pair)."""
+
+    return allocate_ids(target, 1)[0]
+
+
+def allocate_ids(target, count: int) -> list[int]:
+    """Reserve ``count`` primary keys for ``target`` in a single round trip.
+
+    The ids are unique but not guaranteed to be contiguous when other writers
+    allocate concurrently; ids that end up unused simply leave a gap.
+    """
+
+    if count <= 0:
+        return []
+    table, column = _resolve(target)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(%s::regclass) FROM generate_series(1, %s)",
+            [f"public.{sequence_name(table, column)}", count],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def align_sequence_sql(table: str, column: str) -> str:
+    seq = f"public.{sequence_name(table, column)}"
+    return f"""
+    CREATE SEQUENCE IF NOT EXISTS {seq};
+    WITH cur AS (
+        SELECT GREATEST(
+            (SELECT COALESCE(MAX({column}), 0) FROM public.{table}),
+            (SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM {seq})
+        ) AS v
+    )
+    SELECT setval('{seq}', GREATEST(v, 1), v > 0) FROM cur;
+    """
+
+
+def align_sequences(targets=SEQUENCE_TARGETS) -> None:
+    """Create missing sequences and move each one past the current maximum id.
+
+    Needed after rows are inserted outside the API (CSV imports, scripts).
+    Sequences never move backwards.
+    """
+
+    with connection.cursor() as cursor:
+        for table, column in targets:
+            cursor.execute(align_sequence_sql(table, column))
+
+
+def allocate_inventory_numbers(table: str, count: int) -> list[str]:
+    """Reserve ``count`` inventory numbers for ``table`` (``stock_item`` or ``consumable``)."""
+
+    column = f"{table}_inventory_number"
+    if (table, column) not in INVENTORY_NUMBER_TARGETS:
+        raise ValueError(f"No inventory number sequence for {table}")
+    return [str(n).zfill(INVENTORY_NUMBER_WIDTH) for n in allocate_ids((table, column), count)]
+
+
+def align_inventory_number_sql(table: str, column: str) -> str:
+    seq = f"public.{sequence_name(table, column)}"
+    maximum = 10**INVENTORY_NUMBER_WIDTH - 1
+    return f"""
+    CREATE SEQUENCE IF NOT EXISTS {seq} MAXVALUE {maximum};
+    WITH cur AS (
+        SELECT GREATEST(
+            (SELECT COALESCE(MAX({column}::integer), 0) FROM public.{table} WHERE {column} ~ '^[0-9]{{1,{INVENTORY_NUMBER_WIDTH}}}$'),
+            (SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM {seq})
+        ) AS v
+    )
+    SELECT setval('{seq}', GREATEST(v, 1), v > 0) FROM cur;
+    """
+
+
+def align_inventory_number_sequences(targets=INVENTORY_NUMBER_TARGETS) -> None:
+    """Move inventory number sequences past the highest numeric inventory number in use."""
+
+    with connection.cursor() as cursor:
+        for table, column in targets:
+            cursor.execute(align_inventory_number_sql(table, column))
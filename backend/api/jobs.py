@@ -0,0 +1,257 @@
+"""PostgreSQL-backed background jobs.
+
+When a client passes ``async=true``, request handlers call :func:`enqueue` for
+fan-out work (attribute propagation, bulk moves, backorder generation) and
+answer right away with the job id; without it the work runs inline. Workers started with ``manage.py run_jobs`` claim queued rows of
+``background_job`` with ``SELECT ... FOR UPDATE SKIP LOCKED``, so any number
+of them can poll the same table without handing out a job twice. A failed job
+is retried with a growing delay until ``max_attempts`` is reached; a job whose
+worker died is put back in the queue once it has been running for longer than
+``BACKGROUND_JOB_STALE_AFTER`` seconds. Workers drop broken or expired
+database connections between jobs and, while the database is unreachable,
+poll again with a growing delay (up to ``BACKGROUND_JOB_MAX_BACKOFF`` seconds).
+
+With ``BACKGROUND_JOBS_EAGER = True`` (handy without a worker in development)
+jobs are still recorded but run inside :func:`enqueue`.
+"""
+
+import json
+import logging
+import os
+import socket
+import time
+import traceback
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import OperationalError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .attributes import propagate_model_attributes, propagate_type_attributes
+from .cascade import bulk_move_assets
+from .models import BackgroundJob
+from .purchasing import create_backorder_report, lock_purchase_order
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+HANDLERS = {}
+
+
+def job_handler(kind: str):
+    """Register ``func(payload) -> dict`` as the handler of jobs of ``kind``."""
+
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+
+    return register
+
+
+def enqueue(kind: str, payload: dict | None = None, *, user=None, max_attempts: int | None = None) -> BackgroundJob:
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    now = timezone.now()
+    job = BackgroundJob.objects.create(
+        kind=kind,
+        payload=payload or {},
+        status=QUEUED,
+        attempts=0,
+        max_attempts=max_attempts or getattr(settings, "BACKGROUND_JOB_MAX_ATTEMPTS", 3),
+        created_by_id=getattr(user, "user_id", None),
+        created_at=now,
+        run_after=now,
+    )
+    if getattr(settings, "BACKGROUND_JOBS_EAGER", False):
+        claimed = _claim(job_id=job.job_id, worker_id="eager")
+        if claimed is not None:
+            execute(*claimed)
+        job.refresh_from_db()
+    return job
+
+
+def _claim(*, worker_id: str, job_id: int | None = None):
+    """Mark the next due job (or ``job_id``) as running; return ``(job_id, kind, payload, attempts, max_attempts)``."""
+
+    where = "job_id = %s" if job_id is not None else "run_after <= now()"
+    params = [job_id] if job_id is not None else []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE public.background_job j
+            SET status = 'running', attempts = j.attempts + 1, started_at = now(),
+                finished_at = NULL, locked_by = %s
+            WHERE j.job_id = (
+                SELECT job_id FROM public.background_job
+                WHERE status = 'queued' AND {where}
+                ORDER BY run_after, job_id
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING j.job_id, j.kind, j.payload, j.attempts, j.max_attempts
+            """,
+            [worker_id] + params,
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    job_id, kind, payload, attempts, max_attempts = row
+    if isinstance(payload, str):
+        payload = json.loads(payload)
+    return job_id, kind, payload, attempts, max_attempts
+
+
+def _retry_delay(attempts: int) -> int:
+    return min(30 * 2 ** (attempts - 1), 3600)
+
+
+def execute(job_id: int, kind: str, payload: dict, attempts: int, max_attempts: int) -> bool:
+    """Run a claimed job and record its outcome. Returns True on success."""
+
+    try:
+        handler = HANDLERS.get(kind)
+        if handler is None:
+            raise LookupError(f"No handler registered for job kind {kind!r}")
+        with transaction.atomic():
+            result = handler(payload)
+    except Exception:
+        logger.exception("Background job %s (%s) failed on attempt %s", job_id, kind, attempts)
+        retry = attempts < max_attempts
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                UPDATE public.background_job
+                SET status = %s, error = %s, locked_by = NULL,
+                    finished_at = CASE WHEN %s THEN NULL ELSE now() END,
+                    run_after = now() + make_interval(secs => %s)
+                WHERE job_id = %s
+                """,
+                [QUEUED if retry else FAILED, traceback.format_exc(), retry, _retry_delay(attempts), job_id],
+            )
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            UPDATE public.background_job
+            SET status = 'succeeded', result = %s::jsonb, error = NULL, locked_by = NULL, finished_at = now()
+            WHERE job_id = %s
+            """,
+            [json.dumps(result or {}, cls=DjangoJSONEncoder), job_id],
+        )
+    return True
+
+
+def requeue_stale(stale_after: int) -> int:
+    """Give jobs whose worker stopped reporting back to the queue (or fail them when out of attempts)."""
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            UPDATE public.background_job
+            SET status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+                finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE now() END,
+                error = 'Worker stopped before finishing the job',
+                locked_by = NULL
+            WHERE status = 'running' AND started_at < now() - make_interval(secs => %s)
+            """,
+            [stale_after],
+        )
+        return cursor.rowcount
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def run_worker(
+    *,
+    worker_id: str | None = None,
+    poll_interval: float = 1.0,
+    max_jobs: int | None = None,
+    once: bool = False,
+) -> int:
+    """Process jobs until ``max_jobs`` were run (or, with ``once``, the queue is empty). Returns the count."""
+
+    worker_id = worker_id or default_worker_id()
+    stale_after = getattr(settings, "BACKGROUND_JOB_STALE_AFTER", 600)
+    max_backoff = getattr(settings, "BACKGROUND_JOB_MAX_BACKOFF", 60)
+    processed = 0
+    failures = 0
+    last_stale_check = 0.0
+    while max_jobs is None or processed < max_jobs:
+        # A long-running worker outlives CONN_MAX_AGE and database restarts.
+        close_old_connections()
+        try:
+            if time.monotonic() - last_stale_check >= stale_after / 2:
+                requeue_stale(stale_after)
+                last_stale_check = time.monotonic()
+            claimed = _claim(worker_id=worker_id)
+        except OperationalError:
+            if once:
+                raise
+            failures += 1
+            delay = min(poll_interval * 2 ** failures, max_backoff)
+            logger.exception("Worker %s could not poll the job queue, retrying in %.0fs", worker_id, delay)
+            connection.close()
+            time.sleep(delay)
+            continue
+        failures = 0
+
+        if claimed is None:
+            if once:
+                break
+            time.sleep(poll_interval)
+            continue
+        execute(*claimed)
+        processed += 1
+    return processed
+
+
+@job_handler("attributes.propagate_type")
+def _propagate_type_job(payload: dict) -> dict:
+    return propagate_type_attributes(
+        payload["family"],
+        type_ids=payload.get("type_ids"),
+        model_ids=payload.get("model_ids"),
+        cascade_to_items=bool(payload.get("cascade_to_items")),
+    )
+
+
+@job_handler("attributes.propagate_model")
+def _propagate_model_job(payload: dict) -> dict:
+    return propagate_model_attributes(
+        payload["family"],
+        model_ids=payload.get("model_ids"),
+        item_ids=payload.get("item_ids"),
+    )
+
+
+@job_handler("assets.bulk_move")
+def _bulk_move_job(payload: dict) -> dict:
+    return bulk_move_assets(
+        destination_location_id=payload["destination_location_id"],
+        movement_reason=payload["movement_reason"],
+        asset_ids=payload.get("asset_ids"),
+        attribution_order_id=payload.get("attribution_order_id"),
+        source_location_id=payload.get("source_location_id"),
+    )
+
+
+@job_handler("purchase_orders.backorder")
+def _backorder_job(payload: dict) -> dict:
+    purchase_order_id = payload["purchase_order_id"]
+    # Handlers run inside a transaction; hold the order like a synchronous receipt does.
+    if not lock_purchase_order(purchase_order_id):
+        raise LookupError(f"Purchase order {purchase_order_id} not found")
+    backorder_report_id = create_backorder_report(purchase_order_id)
+    return {
+        "purchase_order_id": purchase_order_id,
+        "has_remaining": backorder_report_id is not None,
+        "backorder_report_id": backorder_report_id,
+    }
@@ -0,0 +1,95 @@
+"""Current-location lookups for assets, stock items and consumables.
+
+The ``*_current_location`` tables hold one row per item pointing at the
+destination of its latest movement. They are written by triggers on the
+movement tables (migration 0026), so a row is always updated in the same
+transaction as the movement insert that produced it.
+"""
+
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+
+from .models import AssetCurrentLocation, ConsumableCurrentLocation, Location, StockItemCurrentLocation
+
+ITEM_KINDS = ("asset", "stock_item", "consumable")
+
+_PROJECTIONS = {
+    "asset": AssetCurrentLocation,
+    "stock_item": StockItemCurrentLocation,
+    "consumable": ConsumableCurrentLocation,
+}
+
+
+def _projection(kind: str):
+    try:
+        return _PROJECTIONS[kind]
+    except KeyError:
+        raise ValueError(f"Unknown item kind: {kind}")
+
+
+def current_location_id(kind: str, item_id: int) -> int | None:
+    """Return the location id the item currently sits in, or None."""
+
+    model = _projection(kind)
+    return model.objects.filter(pk=item_id).values_list("location_id", flat=True).first()
+
+
+def current_location(kind: str, item_id: int, *related: str) -> Location | None:
+    """Return the ``Location`` the item currently sits in, or None, in one query.
+
+    ``related`` is passed to ``select_related`` on the location.
+    """
+
+    model = _projection(kind)
+    return (
+        Location.objects.select_related(*related)
+        .filter(pk__in=model.objects.filter(pk=item_id).values("location_id"))
+        .first()
+    )
+
+
+def current_location_ids(kind: str, item_ids) -> dict[int, int | None]:
+    """Return ``{item_id: location_id}`` for every item that has moved at least once."""
+
+    model = _projection(kind)
+    item_ids = list(item_ids)
+    if not item_ids:
+        return {}
+    return dict(model.objects.filter(pk__in=item_ids).values_list("pk", "location_id"))
+
+
+def current_location_subquery(kind: str, outer_ref: str = "pk") -> Subquery:
+    """Subquery usable in ``annotate()`` yielding the current location id of the outer row."""
+
+    model = _projection(kind)
+    return Subquery(model.objects.filter(pk=OuterRef(outer_ref)).values("location_id")[:1])
+
+
+def rebuild_current_locations(kinds=None) -> dict[str, int]:
+    """Recompute the projection tables from the full movement history.
+
+    Returns the number of rows written per item kind.
+    """
+
+    counts = {}
+    for kind in kinds or ITEM_KINDS:
+        _projection(kind)
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(f"LOCK TABLE public.{kind}_movement IN SHARE ROW EXCLUSIVE MODE")
+                cursor.execute(f"DELETE FROM public.{kind}_current_location")
+                cursor.execute(
+                    f"""
+                    INSERT INTO public.{kind}_current_location
+                        ({kind}_id, location_id, {kind}_movement_id, movement_datetime)
+                    SELECT DISTINCT ON (m.{kind}_id)
+                           m.{kind}_id,
+                           m.destination_location_id,
+                           m.{kind}_movement_id,
+                           m.movement_datetime
+                    FROM public.{kind}_movement m
+                    ORDER BY m.{kind}_id, m.{kind}_movement_id DESC
+                    """
+                )
+                counts[kind] = cursor.rowcount
+    return counts
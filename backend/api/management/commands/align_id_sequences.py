@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api.ids import INVENTORY_NUMBER_TARGETS, SEQUENCE_TARGETS, align_inventory_number_sequences, align_sequences
+
+
+class Command(BaseCommand):
+    help = "Create missing id sequences and move them past the current maximum id of each table."
+
+    def handle(self, *args, **options):
+        align_sequences()
+        align_inventory_number_sequences()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Aligned {len(SEQUENCE_TARGETS)} id sequence(s) and "
+                f"{len(INVENTORY_NUMBER_TARGETS)} inventory number sequence(s)"
+            )
+        )
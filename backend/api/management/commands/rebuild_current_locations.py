@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from api.locations import ITEM_KINDS, rebuild_current_locations
+
+
+class Command(BaseCommand):
+    help = "Rebuild the asset/stock item/consumable current-location tables from movement history."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--kind",
+            action="append",
+            choices=ITEM_KINDS,
+            help="Only rebuild the given item kind (may be repeated). Defaults to all kinds.",
+        )
+
+    def handle(self, *args, **options):
+        counts = rebuild_current_locations(options.get("kind"))
+        for kind, count in counts.items():
+            self.stdout.write(self.style.SUCCESS(f"{kind}_current_location: {count} row(s)"))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from api.jobs import default_worker_id, run_worker
+
+
+class Command(BaseCommand):
+    help = "Run background jobs from the background_job table (start several to run jobs in parallel)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Exit when the queue is empty instead of polling.")
+        parser.add_argument("--max-jobs", type=int, default=None, help="Exit after running this many jobs.")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument("--worker-id", default=None, help="Name recorded in background_job.locked_by.")
+
+    def handle(self, *args, **options):
+        worker_id = options["worker_id"] or default_worker_id()
+        self.stdout.write(f"Worker {worker_id} waiting for jobs")
+        try:
+            processed = run_worker(
+                worker_id=worker_id,
+                poll_interval=options["poll_interval"],
+                max_jobs=options["max_jobs"],
+                once=options["once"],
+            )
+        except KeyboardInterrupt:
+            self.stdout.write("Interrupted")
+            return
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} job(s)"))
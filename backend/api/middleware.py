@@ -1,41 +1,77 @@
-import datetime
+import random
+import time
 import traceback
-import os
 
-class DebugMiddleware:
+from django.conf import settings
+from django.db import connection
+
+from .request_log import log_event, start_request_log
+
+RESPONSE_EXCERPT_BYTES = 500
+
+
+class _QueryCounter:
+    __slots__ = ("count",)
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _user_id(request):
+    user = getattr(request, "user", None)
+    if user is None or not getattr(user, "is_authenticated", False):
+        return None
+    return getattr(user, "user_id", None) or getattr(user, "pk", None)
+
+
+class RequestLogMiddleware:
+    """Logs method, path, status, duration, user id and query count of each request.
+
+    Successful requests are sampled at ``REQUEST_LOG_SAMPLE_RATE``; 4xx/5xx
+    responses (with a body excerpt) and crashes (with the traceback) are always logged.
+    """
+
     def __init__(self, get_response):
         self.get_response = get_response
-        self.log_file = os.path.join(os.getcwd(), 'root_debug.log')
+        self.sample_rate = float(getattr(settings, "REQUEST_LOG_SAMPLE_RATE", 1.0))
+        start_request_log()
 
     def __call__(self, request):
-        now = datetime.datetime.now()
-        method = request.method
-        path = request.path
-        
+        started = time.perf_counter()
+        queries = _QueryCounter()
         try:
-            # Log request start
-            with open(self.log_file, 'a') as f:
-                f.write(f"[{now}] START {method} {path}\n")
-                f.flush()
-
-            response = self.get_response(request)
-            
-            # Log request end with status
-            with open(self.log_file, 'a') as f:
-                f.write(f"[{datetime.datetime.now()}] END   {method} {path} -> {response.status_code}\n")
-                if not (200 <= response.status_code < 300):
-                    try:
-                        f.write(f"Response Body: {response.content[:500].decode()}\n")
-                    except:
-                        f.write(f"Response Body: [Binary or undecodable content]\n")
-                f.flush()
-            
-            return response
-        except Exception as e:
-            # Log crash
-            with open(self.log_file, 'a') as f:
-                f.write(f"[{datetime.datetime.now()}] CRASH {method} {path} -> {str(e)}\n")
-                f.write(traceback.format_exc())
-                f.write("-" * 40 + "\n")
-                f.flush()
+            with connection.execute_wrapper(queries):
+                response = self.get_response(request)
+        except Exception as exc:
+            log_event(
+                "request_crash",
+                method=request.method,
+                path=request.path,
+                duration_ms=round((time.perf_counter() - started) * 1000, 3),
+                user_id=_user_id(request),
+                query_count=queries.count,
+                error=str(exc),
+                traceback=traceback.format_exc(),
+            )
             raise
+
+        status_code = response.status_code
+        if status_code < 400 and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return response
+
+        fields = {
+            "method": request.method,
+            "path": request.path,
+            "status": status_code,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+            "user_id": _user_id(request),
+            "query_count": queries.count,
+        }
+        if status_code >= 400 and not getattr(response, "streaming", False):
+            fields["response_excerpt"] = response.content[:RESPONSE_EXCERPT_BYTES].decode("utf-8", "replace")
+        log_event("request", **fields)
+        return response
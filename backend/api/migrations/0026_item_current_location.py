@@ -0,0 +1,140 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def _current_location_sql(item: str) -> str:
+    table = f"{item}_current_location"
+    movement_table = f"{item}_movement"
+    movement_id = f"{item}_movement_id"
+    item_id = f"{item}_id"
+    return f"""
+    CREATE TABLE IF NOT EXISTS public.{table} (
+        {item_id} INTEGER PRIMARY KEY REFERENCES public.{item}({item_id}) ON DELETE CASCADE,
+        location_id INTEGER NULL REFERENCES public.location(location_id) ON DELETE SET NULL,
+        {movement_id} INTEGER NOT NULL,
+        movement_datetime TIMESTAMP WITH TIME ZONE NULL
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_{table}_location_id
+        ON public.{table} (location_id);
+
+    CREATE INDEX IF NOT EXISTS idx_{movement_table}_{item_id}_{movement_id}
+        ON public.{movement_table} ({item_id}, {movement_id} DESC);
+
+    CREATE OR REPLACE FUNCTION public.{table}_sync() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            DELETE FROM public.{table}
+            WHERE {item_id} = OLD.{item_id}
+              AND {movement_id} = OLD.{movement_id};
+
+            INSERT INTO public.{table} ({item_id}, location_id, {movement_id}, movement_datetime)
+            SELECT m.{item_id}, m.destination_location_id, m.{movement_id}, m.movement_datetime
+            FROM public.{movement_table} m
+            WHERE m.{item_id} = OLD.{item_id}
+            ORDER BY m.{movement_id} DESC
+            LIMIT 1
+            ON CONFLICT ({item_id}) DO NOTHING;
+
+            RETURN NULL;
+        END IF;
+
+        INSERT INTO public.{table} ({item_id}, location_id, {movement_id}, movement_datetime)
+        VALUES (NEW.{item_id}, NEW.destination_location_id, NEW.{movement_id}, NEW.movement_datetime)
+        ON CONFLICT ({item_id}) DO UPDATE
+            SET location_id = EXCLUDED.location_id,
+                {movement_id} = EXCLUDED.{movement_id},
+                movement_datetime = EXCLUDED.movement_datetime
+            WHERE public.{table}.{movement_id} <= EXCLUDED.{movement_id};
+
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS trg_{table}_sync ON public.{movement_table};
+    CREATE TRIGGER trg_{table}_sync
+        AFTER INSERT OR DELETE OR UPDATE OF destination_location_id ON public.{movement_table}
+        FOR EACH ROW EXECUTE PROCEDURE public.{table}_sync();
+
+    INSERT INTO public.{table} ({item_id}, location_id, {movement_id}, movement_datetime)
+    SELECT DISTINCT ON (m.{item_id}) m.{item_id}, m.destination_location_id, m.{movement_id}, m.movement_datetime
+    FROM public.{movement_table} m
+    ORDER BY m.{item_id}, m.{movement_id} DESC
+    ON CONFLICT ({item_id}) DO NOTHING;
+    """
+
+
+def _drop_current_location_sql(item: str) -> str:
+    table = f"{item}_current_location"
+    movement_table = f"{item}_movement"
+    return f"""
+    DROP TRIGGER IF EXISTS trg_{table}_sync ON public.{movement_table};
+    DROP FUNCTION IF EXISTS public.{table}_sync();
+    DROP TABLE IF EXISTS public.{table};
+    """
+
+
+def _current_location_state(name: str, item: str, item_model: str) -> migrations.CreateModel:
+    return migrations.CreateModel(
+        name=name,
+        fields=[
+            (
+                item,
+                models.OneToOneField(
+                    db_column=f"{item}_id",
+                    on_delete=django.db.models.deletion.CASCADE,
+                    primary_key=True,
+                    related_name="+",
+                    serialize=False,
+                    to=f"api.{item_model}",
+                ),
+            ),
+            (
+                "location",
+                models.ForeignKey(
+                    blank=True,
+                    db_column="location_id",
+                    null=True,
+                    on_delete=django.db.models.deletion.SET_NULL,
+                    related_name="+",
+                    to="api.location",
+                ),
+            ),
+            (f"{item}_movement_id", models.IntegerField(db_column=f"{item}_movement_id")),
+            ("movement_datetime", models.DateTimeField(blank=True, db_column="movement_datetime", null=True)),
+        ],
+        options={
+            "db_table": f"{item}_current_location",
+            "managed": False,
+        },
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0025_remove_brand_photos"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                _current_location_sql("asset"),
+                _current_location_sql("stock_item"),
+                _current_location_sql("consumable"),
+            ],
+            reverse_sql=[
+                _drop_current_location_sql("consumable"),
+                _drop_current_location_sql("stock_item"),
+                _drop_current_location_sql("asset"),
+            ],
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[],
+            state_operations=[
+                _current_location_state("AssetCurrentLocation", "asset", "asset"),
+                _current_location_state("StockItemCurrentLocation", "stock_item", "stockitem"),
+                _current_location_state("ConsumableCurrentLocation", "consumable", "consumable"),
+            ],
+        ),
+    ]
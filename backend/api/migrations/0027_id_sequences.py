@@ -0,0 +1,81 @@
+from django.db import migrations
+
+# Frozen copy of api.ids.SEQUENCE_TARGETS as of this migration; tables added
+# later get their sequence from their own migration.
+SEQUENCE_TARGETS = (
+    ("acceptance_report", "acceptance_report_id"),
+    ("administrative_certificate", "administrative_certificate_id"),
+    ("asset", "asset_id"),
+    ("asset_attribute_definition", "asset_attribute_definition_id"),
+    ("asset_brand", "asset_brand_id"),
+    ("asset_condition_history", "asset_condition_history_id"),
+    ("asset_destruction_certificate", "asset_destruction_certificate_id"),
+    ("asset_is_assigned_to_person", "assignment_id"),
+    ("asset_model", "asset_model_id"),
+    ("asset_movement", "asset_movement_id"),
+    ("asset_type", "asset_type_id"),
+    ("attribution_order", "attribution_order_id"),
+    ("backorder_report", "backorder_report_id"),
+    ("company_asset_request", "company_asset_request_id"),
+    ("consumable", "consumable_id"),
+    ("consumable_attribute_definition", "consumable_attribute_definition_id"),
+    ("consumable_brand", "consumable_brand_id"),
+    ("consumable_is_assigned_to_person", "assignment_id"),
+    ("consumable_model", "consumable_model_id"),
+    ("consumable_movement", "consumable_movement_id"),
+    ("consumable_type", "consumable_type_id"),
+    ("delivery_note", "delivery_note_id"),
+    ("external_maintenance", "external_maintenance_id"),
+    ("external_maintenance_step", "external_maintenance_step_id"),
+    ("invoice", "invoice_id"),
+    ("location", "location_id"),
+    ("maintenance", "maintenance_id"),
+    ("maintenance_step", "maintenance_step_id"),
+    ("maintenance_step_item_request", "maintenance_step_item_request_id"),
+    ("organizational_structure", "organizational_structure_id"),
+    ("person", "person_id"),
+    ("person_reports_problem_on_asset", "report_id"),
+    ("person_reports_problem_on_consumable", "report_id"),
+    ("person_reports_problem_on_stock_item", "report_id"),
+    ("position", "position_id"),
+    ("purchase_order", "purchase_order_id"),
+    ("receipt_report", "receipt_report_id"),
+    ("stock_item", "stock_item_id"),
+    ("stock_item_attribute_definition", "stock_item_attribute_definition_id"),
+    ("stock_item_brand", "stock_item_brand_id"),
+    ("stock_item_consumable_destruction_certificate", "destruction_certificate_id"),
+    ("stock_item_is_assigned_to_person", "assignment_id"),
+    ("stock_item_model", "stock_item_model_id"),
+    ("stock_item_movement", "stock_item_movement_id"),
+    ("stock_item_type", "stock_item_type_id"),
+    ("warehouse", "warehouse_id"),
+)
+
+
+def _align_sequence_sql(table: str, column: str) -> str:
+    seq = f"public.{table}_{column}_seq"
+    return f"""
+    CREATE SEQUENCE IF NOT EXISTS {seq};
+    WITH cur AS (
+        SELECT GREATEST(
+            (SELECT COALESCE(MAX({column}), 0) FROM public.{table}),
+            (SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM {seq})
+        ) AS v
+    )
+    SELECT setval('{seq}', GREATEST(v, 1), v > 0) FROM cur;
+    """
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0026_item_current_location"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[_align_sequence_sql(table, column) for table, column in SEQUENCE_TARGETS],
+            # Sequences may already be owned by serial columns; leave them in place.
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
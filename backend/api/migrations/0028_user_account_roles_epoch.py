@@ -0,0 +1,70 @@
+from django.db import migrations, models
+
+
+ROLES_EPOCH_SQL = """
+ALTER TABLE public.user_account ADD COLUMN IF NOT EXISTS roles_epoch INTEGER NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION public.person_role_mapping_bump_roles_epoch() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE public.user_account SET roles_epoch = roles_epoch + 1 WHERE person_id = OLD.person_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE public.user_account SET roles_epoch = roles_epoch + 1 WHERE person_id = NEW.person_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_person_role_mapping_roles_epoch ON public.person_role_mapping;
+CREATE TRIGGER trg_person_role_mapping_roles_epoch
+    AFTER INSERT OR UPDATE OR DELETE ON public.person_role_mapping
+    FOR EACH ROW EXECUTE PROCEDURE public.person_role_mapping_bump_roles_epoch();
+
+-- The epoch never moves backwards (an ORM save of a stale instance must not
+-- undo a bump) and moves forward when the account status or password changes.
+CREATE OR REPLACE FUNCTION public.user_account_roles_epoch_guard() RETURNS trigger AS $$
+BEGIN
+    NEW.roles_epoch := GREATEST(COALESCE(NEW.roles_epoch, 0), OLD.roles_epoch);
+    IF NEW.account_status IS DISTINCT FROM OLD.account_status
+       OR NEW.password_hash IS DISTINCT FROM OLD.password_hash THEN
+        NEW.roles_epoch := GREATEST(NEW.roles_epoch, OLD.roles_epoch + 1);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_user_account_roles_epoch_guard ON public.user_account;
+CREATE TRIGGER trg_user_account_roles_epoch_guard
+    BEFORE UPDATE ON public.user_account
+    FOR EACH ROW EXECUTE PROCEDURE public.user_account_roles_epoch_guard();
+"""
+
+DROP_ROLES_EPOCH_SQL = """
+DROP TRIGGER IF EXISTS trg_user_account_roles_epoch_guard ON public.user_account;
+DROP FUNCTION IF EXISTS public.user_account_roles_epoch_guard();
+DROP TRIGGER IF EXISTS trg_person_role_mapping_roles_epoch ON public.person_role_mapping;
+DROP FUNCTION IF EXISTS public.person_role_mapping_bump_roles_epoch();
+ALTER TABLE public.user_account DROP COLUMN IF EXISTS roles_epoch;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0027_id_sequences"),
+    ]
+
+    operations = [
+        migrations.RunSQL(sql=ROLES_EPOCH_SQL, reverse_sql=DROP_ROLES_EPOCH_SQL),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[],
+            state_operations=[
+                migrations.AddField(
+                    model_name="useraccount",
+                    name="roles_epoch",
+                    field=models.IntegerField(db_column="roles_epoch", default=0),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,89 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+BACKGROUND_JOB_SQL = """
+CREATE TABLE IF NOT EXISTS public.background_job (
+    job_id BIGSERIAL PRIMARY KEY,
+    kind VARCHAR(64) NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+    status VARCHAR(16) NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    result JSONB,
+    error TEXT,
+    created_by_user_id INTEGER REFERENCES public.user_account (user_id) ON DELETE SET NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    run_after TIMESTAMPTZ NOT NULL DEFAULT now(),
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ,
+    locked_by VARCHAR(128),
+    CONSTRAINT background_job_status_check
+        CHECK (status IN ('queued', 'running', 'succeeded', 'failed'))
+);
+
+-- Workers only ever scan the queued head of the table.
+CREATE INDEX IF NOT EXISTS background_job_queued_idx
+    ON public.background_job (run_after, job_id)
+    WHERE status = 'queued';
+
+CREATE INDEX IF NOT EXISTS background_job_running_idx
+    ON public.background_job (started_at)
+    WHERE status = 'running';
+
+CREATE INDEX IF NOT EXISTS background_job_created_by_idx
+    ON public.background_job (created_by_user_id, job_id);
+"""
+
+DROP_BACKGROUND_JOB_SQL = """
+DROP TABLE IF EXISTS public.background_job;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0028_user_account_roles_epoch"),
+    ]
+
+    operations = [
+        migrations.RunSQL(sql=BACKGROUND_JOB_SQL, reverse_sql=DROP_BACKGROUND_JOB_SQL),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[],
+            state_operations=[
+                migrations.CreateModel(
+                    name="BackgroundJob",
+                    fields=[
+                        ("job_id", models.BigAutoField(db_column="job_id", primary_key=True, serialize=False)),
+                        ("kind", models.CharField(db_column="kind", max_length=64)),
+                        ("payload", models.JSONField(db_column="payload", default=dict)),
+                        ("status", models.CharField(db_column="status", default="queued", max_length=16)),
+                        ("attempts", models.IntegerField(db_column="attempts", default=0)),
+                        ("max_attempts", models.IntegerField(db_column="max_attempts", default=3)),
+                        ("result", models.JSONField(blank=True, db_column="result", null=True)),
+                        ("error", models.TextField(blank=True, db_column="error", null=True)),
+                        (
+                            "created_by",
+                            models.ForeignKey(
+                                blank=True,
+                                db_column="created_by_user_id",
+                                null=True,
+                                on_delete=django.db.models.deletion.SET_NULL,
+                                related_name="+",
+                                to="api.useraccount",
+                            ),
+                        ),
+                        ("created_at", models.DateTimeField(db_column="created_at")),
+                        ("run_after", models.DateTimeField(db_column="run_after")),
+                        ("started_at", models.DateTimeField(blank=True, db_column="started_at", null=True)),
+                        ("finished_at", models.DateTimeField(blank=True, db_column="finished_at", null=True)),
+                        ("locked_by", models.CharField(blank=True, db_column="locked_by", max_length=128, null=True)),
+                    ],
+                    options={
+                        "db_table": "background_job",
+                        "managed": False,
+                    },
+                ),
+            ],
+        ),
+    ]
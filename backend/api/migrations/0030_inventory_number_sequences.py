@@ -0,0 +1,40 @@
+from django.db import migrations
+
+# Frozen copies of api.ids.INVENTORY_NUMBER_TARGETS / INVENTORY_NUMBER_WIDTH.
+INVENTORY_NUMBER_TARGETS = (
+    ("consumable", "consumable_inventory_number"),
+    ("stock_item", "stock_item_inventory_number"),
+)
+INVENTORY_NUMBER_WIDTH = 6
+
+
+def _align_inventory_number_sql(table: str, column: str) -> str:
+    seq = f"public.{table}_{column}_seq"
+    maximum = 10**INVENTORY_NUMBER_WIDTH - 1
+    return f"""
+    CREATE SEQUENCE IF NOT EXISTS {seq} MAXVALUE {maximum};
+    WITH cur AS (
+        SELECT GREATEST(
+            (SELECT COALESCE(MAX({column}::integer), 0) FROM public.{table} WHERE {column} ~ '^[0-9]{{1,{INVENTORY_NUMBER_WIDTH}}}$'),
+            (SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM {seq})
+        ) AS v
+    )
+    SELECT setval('{seq}', GREATEST(v, 1), v > 0) FROM cur;
+    """
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0029_background_job"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[_align_inventory_number_sql(table, column) for table, column in INVENTORY_NUMBER_TARGETS],
+            reverse_sql=[
+                f"DROP SEQUENCE IF EXISTS public.{table}_{column}_seq;"
+                for table, column in INVENTORY_NUMBER_TARGETS
+            ],
+        ),
+    ]
@@ -0,0 +1,248 @@
+from django.db import migrations, models
+
+
+SUMMARY_SQL = """
+CREATE TABLE IF NOT EXISTS public.purchase_order_summary (
+    purchase_order_id INTEGER PRIMARY KEY
+        REFERENCES public.purchase_order (purchase_order_id) ON DELETE CASCADE,
+    supplier_id INTEGER,
+    stock_item_line_count INTEGER NOT NULL DEFAULT 0,
+    consumable_line_count INTEGER NOT NULL DEFAULT 0,
+    quantity_ordered INTEGER NOT NULL DEFAULT 0,
+    quantity_received INTEGER NOT NULL DEFAULT 0,
+    quantity_remaining INTEGER NOT NULL DEFAULT 0,
+    has_remaining BOOLEAN NOT NULL DEFAULT FALSE,
+    latest_delivery_note_id INTEGER,
+    latest_invoice_id INTEGER,
+    latest_acceptance_report_id INTEGER,
+    refreshed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS purchase_order_summary_remaining_idx
+    ON public.purchase_order_summary (has_remaining, purchase_order_id DESC);
+CREATE INDEX IF NOT EXISTS purchase_order_summary_supplier_idx
+    ON public.purchase_order_summary (supplier_id, purchase_order_id DESC);
+
+CREATE OR REPLACE FUNCTION public.refresh_purchase_order_summary(po_ids INTEGER[]) RETURNS void AS $$
+    INSERT INTO public.purchase_order_summary AS ps (
+        purchase_order_id, supplier_id,
+        stock_item_line_count, consumable_line_count,
+        quantity_ordered, quantity_received, quantity_remaining, has_remaining,
+        latest_delivery_note_id, latest_invoice_id, latest_acceptance_report_id,
+        refreshed_at
+    )
+    SELECT po.purchase_order_id,
+           po.supplier_id,
+           COALESCE(si.line_count, 0),
+           COALESCE(co.line_count, 0),
+           COALESCE(si.ordered, 0) + COALESCE(co.ordered, 0),
+           COALESCE(si.received, 0) + COALESCE(co.received, 0),
+           COALESCE(si.remaining, 0) + COALESCE(co.remaining, 0),
+           COALESCE(si.remaining, 0) + COALESCE(co.remaining, 0) > 0,
+           docs.delivery_note_id,
+           docs.invoice_id,
+           docs.acceptance_report_id,
+           now()
+    FROM public.purchase_order po
+    LEFT JOIN LATERAL (
+        SELECT count(*) AS line_count,
+               sum(COALESCE(l.quantity_ordered, 0)) AS ordered,
+               sum(COALESCE(l.quantity_received, 0)) AS received,
+               sum(GREATEST(COALESCE(l.quantity_ordered, 0) - COALESCE(l.quantity_received, 0), 0)) AS remaining
+        FROM public.stock_item_model_is_found_in_purchase_order l
+        WHERE l.purchase_order_id = po.purchase_order_id
+    ) si ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT count(*) AS line_count,
+               sum(COALESCE(l.quantity_ordered, 0)) AS ordered,
+               sum(COALESCE(l.quantity_received, 0)) AS received,
+               sum(GREATEST(COALESCE(l.quantity_ordered, 0) - COALESCE(l.quantity_received, 0), 0)) AS remaining
+        FROM public.consumable_model_is_found_in_purchase_order l
+        WHERE l.purchase_order_id = po.purchase_order_id
+    ) co ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT max(dn.delivery_note_id) AS delivery_note_id,
+               (SELECT max(i.invoice_id) FROM public.invoice i
+                JOIN public.delivery_note d ON d.delivery_note_id = i.delivery_note_id
+                WHERE d.purchase_order_id = po.purchase_order_id) AS invoice_id,
+               (SELECT max(a.acceptance_report_id) FROM public.acceptance_report a
+                JOIN public.delivery_note d ON d.delivery_note_id = a.delivery_note_id
+                WHERE d.purchase_order_id = po.purchase_order_id) AS acceptance_report_id
+        FROM public.delivery_note dn
+        WHERE dn.purchase_order_id = po.purchase_order_id
+    ) docs ON TRUE
+    WHERE po.purchase_order_id = ANY(po_ids)
+    ON CONFLICT (purchase_order_id) DO UPDATE SET
+        supplier_id = EXCLUDED.supplier_id,
+        stock_item_line_count = EXCLUDED.stock_item_line_count,
+        consumable_line_count = EXCLUDED.consumable_line_count,
+        quantity_ordered = EXCLUDED.quantity_ordered,
+        quantity_received = EXCLUDED.quantity_received,
+        quantity_remaining = EXCLUDED.quantity_remaining,
+        has_remaining = EXCLUDED.has_remaining,
+        latest_delivery_note_id = EXCLUDED.latest_delivery_note_id,
+        latest_invoice_id = EXCLUDED.latest_invoice_id,
+        latest_acceptance_report_id = EXCLUDED.latest_acceptance_report_id,
+        refreshed_at = EXCLUDED.refreshed_at;
+$$ LANGUAGE sql;
+
+-- Statement-level triggers: a receipt updating 200 lines refreshes its order once.
+-- For tables carrying purchase_order_id (order lines, delivery notes).
+CREATE OR REPLACE FUNCTION public.purchase_order_summary_by_order() RETURNS trigger AS $$
+DECLARE
+    ids INTEGER[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(DISTINCT purchase_order_id) INTO ids FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(DISTINCT purchase_order_id) INTO ids FROM old_rows;
+    ELSE
+        SELECT array_agg(DISTINCT purchase_order_id) INTO ids
+        FROM (SELECT purchase_order_id FROM new_rows UNION SELECT purchase_order_id FROM old_rows) r;
+    END IF;
+    IF ids IS NOT NULL THEN
+        PERFORM public.refresh_purchase_order_summary(ids);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- For documents attached to a delivery note (invoices, acceptance reports).
+CREATE OR REPLACE FUNCTION public.purchase_order_summary_by_delivery_note() RETURNS trigger AS $$
+DECLARE
+    ids INTEGER[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(DISTINCT dn.purchase_order_id) INTO ids
+        FROM new_rows r JOIN public.delivery_note dn ON dn.delivery_note_id = r.delivery_note_id;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(DISTINCT dn.purchase_order_id) INTO ids
+        FROM old_rows r JOIN public.delivery_note dn ON dn.delivery_note_id = r.delivery_note_id;
+    ELSE
+        SELECT array_agg(DISTINCT dn.purchase_order_id) INTO ids
+        FROM (SELECT delivery_note_id FROM new_rows UNION SELECT delivery_note_id FROM old_rows) r
+        JOIN public.delivery_note dn ON dn.delivery_note_id = r.delivery_note_id;
+    END IF;
+    IF ids IS NOT NULL THEN
+        PERFORM public.refresh_purchase_order_summary(ids);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.purchase_order_summary_on_order() RETURNS trigger AS $$
+BEGIN
+    PERFORM public.refresh_purchase_order_summary(ARRAY[NEW.purchase_order_id]);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_purchase_order_summary ON public.purchase_order;
+CREATE TRIGGER trg_purchase_order_summary
+    AFTER INSERT OR UPDATE OF supplier_id ON public.purchase_order
+    FOR EACH ROW EXECUTE PROCEDURE public.purchase_order_summary_on_order();
+"""
+
+DROP_SUMMARY_SQL = """
+DROP TRIGGER IF EXISTS trg_purchase_order_summary ON public.purchase_order;
+DROP FUNCTION IF EXISTS public.purchase_order_summary_on_order();
+DROP FUNCTION IF EXISTS public.purchase_order_summary_by_delivery_note();
+DROP FUNCTION IF EXISTS public.purchase_order_summary_by_order();
+DROP FUNCTION IF EXISTS public.refresh_purchase_order_summary(INTEGER[]);
+DROP TABLE IF EXISTS public.purchase_order_summary;
+"""
+
+BACKFILL_SQL = """
+SELECT public.refresh_purchase_order_summary(ARRAY(SELECT purchase_order_id FROM public.purchase_order));
+"""
+
+# (table, trigger function) pairs that feed the summary.
+SUMMARY_SOURCES = (
+    ("stock_item_model_is_found_in_purchase_order", "purchase_order_summary_by_order"),
+    ("consumable_model_is_found_in_purchase_order", "purchase_order_summary_by_order"),
+    ("delivery_note", "purchase_order_summary_by_order"),
+    ("invoice", "purchase_order_summary_by_delivery_note"),
+    ("acceptance_report", "purchase_order_summary_by_delivery_note"),
+)
+
+
+def _source_triggers_sql(table: str, function: str) -> str:
+    # Transition tables require one trigger per event.
+    return f"""
+    DROP TRIGGER IF EXISTS trg_{table}_summary_ins ON public.{table};
+    CREATE TRIGGER trg_{table}_summary_ins
+        AFTER INSERT ON public.{table}
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE PROCEDURE public.{function}();
+
+    DROP TRIGGER IF EXISTS trg_{table}_summary_upd ON public.{table};
+    CREATE TRIGGER trg_{table}_summary_upd
+        AFTER UPDATE ON public.{table}
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE PROCEDURE public.{function}();
+
+    DROP TRIGGER IF EXISTS trg_{table}_summary_del ON public.{table};
+    CREATE TRIGGER trg_{table}_summary_del
+        AFTER DELETE ON public.{table}
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE PROCEDURE public.{function}();
+    """
+
+
+def _drop_source_triggers_sql(table: str) -> str:
+    return f"""
+    DROP TRIGGER IF EXISTS trg_{table}_summary_ins ON public.{table};
+    DROP TRIGGER IF EXISTS trg_{table}_summary_upd ON public.{table};
+    DROP TRIGGER IF EXISTS trg_{table}_summary_del ON public.{table};
+    """
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0030_inventory_number_sequences"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[SUMMARY_SQL]
+            + [_source_triggers_sql(table, function) for table, function in SUMMARY_SOURCES]
+            + [BACKFILL_SQL],
+            reverse_sql=[_drop_source_triggers_sql(table) for table, _ in SUMMARY_SOURCES] + [DROP_SUMMARY_SQL],
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[],
+            state_operations=[
+                migrations.CreateModel(
+                    name="PurchaseOrderSummary",
+                    fields=[
+                        (
+                            "purchase_order_id",
+                            models.IntegerField(db_column="purchase_order_id", primary_key=True, serialize=False),
+                        ),
+                        ("supplier_id", models.IntegerField(blank=True, db_column="supplier_id", null=True)),
+                        ("stock_item_line_count", models.IntegerField(db_column="stock_item_line_count", default=0)),
+                        ("consumable_line_count", models.IntegerField(db_column="consumable_line_count", default=0)),
+                        ("quantity_ordered", models.IntegerField(db_column="quantity_ordered", default=0)),
+                        ("quantity_received", models.IntegerField(db_column="quantity_received", default=0)),
+                        ("quantity_remaining", models.IntegerField(db_column="quantity_remaining", default=0)),
+                        ("has_remaining", models.BooleanField(db_column="has_remaining", default=False)),
+                        (
+                            "latest_delivery_note_id",
+                            models.IntegerField(blank=True, db_column="latest_delivery_note_id", null=True),
+                        ),
+                        ("latest_invoice_id", models.IntegerField(blank=True, db_column="latest_invoice_id", null=True)),
+                        (
+                            "latest_acceptance_report_id",
+                            models.IntegerField(blank=True, db_column="latest_acceptance_report_id", null=True),
+                        ),
+                        ("refreshed_at", models.DateTimeField(db_column="refreshed_at")),
+                    ],
+                    options={
+                        "db_table": "purchase_order_summary",
+                        "managed": False,
+                    },
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,50 @@
+from django.db import migrations
+
+
+# Indexes backing the problem report feed (api/problem_reports.py): each UNION
+# ALL branch reads its newest rows, optionally for one person.
+REPORT_TABLES = (
+    "person_reports_problem_on_asset",
+    "person_reports_problem_on_stock_item",
+    "person_reports_problem_on_consumable",
+)
+
+
+def _indexes_sql(table: str) -> str:
+    return f"""
+    CREATE INDEX IF NOT EXISTS {table}_feed_idx
+        ON public.{table} (report_datetime DESC, report_id DESC);
+    CREATE INDEX IF NOT EXISTS {table}_person_feed_idx
+        ON public.{table} (person_id, report_datetime DESC, report_id DESC);
+    """
+
+
+def _drop_indexes_sql(table: str) -> str:
+    return f"""
+    DROP INDEX IF EXISTS public.{table}_feed_idx;
+    DROP INDEX IF EXISTS public.{table}_person_feed_idx;
+    """
+
+
+MAINTENANCE_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS maintenance_asset_id_idx
+    ON public.maintenance (asset_id, end_datetime);
+"""
+
+DROP_MAINTENANCE_INDEX_SQL = """
+DROP INDEX IF EXISTS public.maintenance_asset_id_idx;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0031_purchase_order_summary"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[_indexes_sql(table) for table in REPORT_TABLES] + [MAINTENANCE_INDEX_SQL],
+            reverse_sql=[_drop_indexes_sql(table) for table in REPORT_TABLES] + [DROP_MAINTENANCE_INDEX_SQL],
+        ),
+    ]
@@ -0,0 +1,200 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Tables whose changes can make a spare available or unavailable, per item kind.
+# Every one of them carries the item id column, so one trigger function serves all.
+AVAILABILITY_SOURCES = {
+    "stock_item": (
+        "stock_item",
+        "stock_item_current_location",
+        "asset_is_composed_of_stock_item_history",
+        "stock_item_is_assigned_to_person",
+    ),
+    "consumable": (
+        "consumable",
+        "consumable_current_location",
+        "asset_is_composed_of_consumable_history",
+        "consumable_is_used_in_stock_item_history",
+        "consumable_is_assigned_to_person",
+    ),
+}
+
+
+def _in_use_sql(item: str) -> str:
+    item_id = f"{item}_id"
+    conditions = [
+        f"""EXISTS (SELECT 1 FROM public.asset_is_composed_of_{item}_history h
+                   WHERE h.{item_id} = i.{item_id} AND h.end_datetime IS NULL)""",
+        f"""EXISTS (SELECT 1 FROM public.{item}_is_assigned_to_person a
+                   WHERE a.{item_id} = i.{item_id} AND a.is_active)""",
+    ]
+    if item == "consumable":
+        conditions.append(
+            """EXISTS (SELECT 1 FROM public.consumable_is_used_in_stock_item_history u
+                   WHERE u.consumable_id = i.consumable_id AND u.end_datetime IS NULL)"""
+        )
+    return "\n              OR ".join(conditions)
+
+
+def _availability_sql(item: str) -> str:
+    table = f"{item}_availability"
+    item_id = f"{item}_id"
+    model_id = f"{item}_model_id"
+    return f"""
+    CREATE TABLE IF NOT EXISTS public.{table} (
+        {item_id} INTEGER PRIMARY KEY REFERENCES public.{item}({item_id}) ON DELETE CASCADE,
+        {model_id} INTEGER NOT NULL,
+        location_id INTEGER NOT NULL REFERENCES public.location(location_id) ON DELETE CASCADE
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_{table}_model
+        ON public.{table} ({model_id}, {item_id});
+
+    CREATE INDEX IF NOT EXISTS idx_{table}_location
+        ON public.{table} (location_id, {model_id});
+
+    CREATE OR REPLACE FUNCTION public.refresh_{table}(item_ids INTEGER[]) RETURNS void AS $$
+        DELETE FROM public.{table} WHERE {item_id} = ANY(item_ids);
+
+        INSERT INTO public.{table} ({item_id}, {model_id}, location_id)
+        SELECT i.{item_id}, i.{model_id}, cl.location_id
+        FROM public.{item} i
+        JOIN public.{item}_current_location cl ON cl.{item_id} = i.{item_id}
+        WHERE i.{item_id} = ANY(item_ids)
+          AND cl.location_id IS NOT NULL
+          AND i.stock_item_consumable_destruction_certificate_id IS NULL
+          AND lower(COALESCE(i.{item}_status, '')) <> 'destroyed'
+          AND NOT (
+              {_in_use_sql(item)}
+          );
+    $$ LANGUAGE sql;
+
+    CREATE OR REPLACE FUNCTION public.{table}_sync() RETURNS trigger AS $$
+    DECLARE
+        ids INTEGER[];
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            SELECT array_agg(DISTINCT {item_id}) INTO ids FROM new_rows;
+        ELSIF TG_OP = 'DELETE' THEN
+            SELECT array_agg(DISTINCT {item_id}) INTO ids FROM old_rows;
+        ELSE
+            SELECT array_agg(DISTINCT {item_id}) INTO ids
+            FROM (SELECT {item_id} FROM new_rows UNION SELECT {item_id} FROM old_rows) r;
+        END IF;
+        IF ids IS NOT NULL THEN
+            PERFORM public.refresh_{table}(ids);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """
+
+
+def _source_triggers_sql(item: str, source: str) -> str:
+    function = f"{item}_availability_sync"
+    trigger = f"trg_{source}_{item}_availability"
+    # Transition tables require one trigger per event.
+    return f"""
+    DROP TRIGGER IF EXISTS {trigger}_ins ON public.{source};
+    CREATE TRIGGER {trigger}_ins
+        AFTER INSERT ON public.{source}
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE PROCEDURE public.{function}();
+
+    DROP TRIGGER IF EXISTS {trigger}_upd ON public.{source};
+    CREATE TRIGGER {trigger}_upd
+        AFTER UPDATE ON public.{source}
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE PROCEDURE public.{function}();
+
+    DROP TRIGGER IF EXISTS {trigger}_del ON public.{source};
+    CREATE TRIGGER {trigger}_del
+        AFTER DELETE ON public.{source}
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE PROCEDURE public.{function}();
+    """
+
+
+def _backfill_sql(item: str) -> str:
+    return f"""
+    SELECT public.refresh_{item}_availability(ARRAY(SELECT {item}_id FROM public.{item}));
+    """
+
+
+def _drop_availability_sql(item: str) -> str:
+    table = f"{item}_availability"
+    triggers = "".join(
+        f"""
+    DROP TRIGGER IF EXISTS trg_{source}_{item}_availability_ins ON public.{source};
+    DROP TRIGGER IF EXISTS trg_{source}_{item}_availability_upd ON public.{source};
+    DROP TRIGGER IF EXISTS trg_{source}_{item}_availability_del ON public.{source};
+    """
+        for source in AVAILABILITY_SOURCES[item]
+    )
+    return f"""
+    {triggers}
+    DROP FUNCTION IF EXISTS public.{table}_sync();
+    DROP FUNCTION IF EXISTS public.refresh_{table}(INTEGER[]);
+    DROP TABLE IF EXISTS public.{table};
+    """
+
+
+def _availability_state(name: str, item: str, item_model: str) -> migrations.CreateModel:
+    return migrations.CreateModel(
+        name=name,
+        fields=[
+            (
+                item,
+                models.OneToOneField(
+                    db_column=f"{item}_id",
+                    on_delete=django.db.models.deletion.CASCADE,
+                    primary_key=True,
+                    related_name="+",
+                    serialize=False,
+                    to=f"api.{item_model}",
+                ),
+            ),
+            (f"{item}_model_id", models.IntegerField(db_column=f"{item}_model_id")),
+            (
+                "location",
+                models.ForeignKey(
+                    db_column="location_id",
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name="+",
+                    to="api.location",
+                ),
+            ),
+        ],
+        options={
+            "db_table": f"{item}_availability",
+            "managed": False,
+        },
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0032_problem_report_feed_indexes"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                sql
+                for item, sources in AVAILABILITY_SOURCES.items()
+                for sql in [_availability_sql(item)]
+                + [_source_triggers_sql(item, source) for source in sources]
+                + [_backfill_sql(item)]
+            ],
+            reverse_sql=[_drop_availability_sql("consumable"), _drop_availability_sql("stock_item")],
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[],
+            state_operations=[
+                _availability_state("StockItemAvailability", "stock_item", "stockitem"),
+                _availability_state("ConsumableAvailability", "consumable", "consumable"),
+            ],
+        ),
+    ]
@@ -0,0 +1,77 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+SPARE_RESERVATION_SQL = """
+CREATE TABLE IF NOT EXISTS public.spare_reservation (
+    item_type VARCHAR(24) NOT NULL,
+    item_id INTEGER NOT NULL,
+    maintenance_step_item_request_id INTEGER PRIMARY KEY
+        REFERENCES public.maintenance_step_item_request (maintenance_step_item_request_id) ON DELETE CASCADE,
+    reserved_by_person_id INTEGER REFERENCES public.person (person_id) ON DELETE SET NULL,
+    reserved_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    expires_at TIMESTAMPTZ NOT NULL,
+    -- An item is held by at most one request; expired rows are taken over in place.
+    CONSTRAINT spare_reservation_item_key UNIQUE (item_type, item_id),
+    CONSTRAINT spare_reservation_item_type_check CHECK (item_type IN ('stock_item', 'consumable'))
+);
+
+CREATE INDEX IF NOT EXISTS spare_reservation_expires_at_idx
+    ON public.spare_reservation (expires_at);
+"""
+
+DROP_SPARE_RESERVATION_SQL = """
+DROP TABLE IF EXISTS public.spare_reservation;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0033_spare_availability"),
+    ]
+
+    operations = [
+        migrations.RunSQL(sql=SPARE_RESERVATION_SQL, reverse_sql=DROP_SPARE_RESERVATION_SQL),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[],
+            state_operations=[
+                migrations.CreateModel(
+                    name="SpareReservation",
+                    fields=[
+                        (
+                            "request",
+                            models.OneToOneField(
+                                db_column="maintenance_step_item_request_id",
+                                on_delete=django.db.models.deletion.CASCADE,
+                                primary_key=True,
+                                related_name="+",
+                                serialize=False,
+                                to="api.maintenancestepitemrequest",
+                            ),
+                        ),
+                        ("item_type", models.CharField(db_column="item_type", max_length=24)),
+                        ("item_id", models.IntegerField(db_column="item_id")),
+                        (
+                            "reserved_by_person",
+                            models.ForeignKey(
+                                blank=True,
+                                db_column="reserved_by_person_id",
+                                null=True,
+                                on_delete=django.db.models.deletion.SET_NULL,
+                                related_name="+",
+                                to="api.person",
+                            ),
+                        ),
+                        ("reserved_at", models.DateTimeField(db_column="reserved_at")),
+                        ("expires_at", models.DateTimeField(db_column="expires_at")),
+                    ],
+                    options={
+                        "db_table": "spare_reservation",
+                        "managed": False,
+                        "unique_together": {("item_type", "item_id")},
+                    },
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,123 @@
+from django.db import migrations, models
+
+
+MOVEMENT_TABLES = ("asset_movement", "stock_item_movement", "consumable_movement")
+
+REQUEST_LINK_FUNCTION_SQL = """
+-- Fills request_kind / maintenance_id from the legacy movement_reason strings
+-- ('maintenance_create_<id>', 'problem_report_include_<id>', ...) when a writer
+-- does not set them, so raw SQL imports and older code paths stay linked.
+CREATE OR REPLACE FUNCTION public.movement_request_link() RETURNS trigger AS $$
+DECLARE
+    reason TEXT := COALESCE(NEW.movement_reason, '');
+BEGIN
+    IF NEW.request_kind IS NULL THEN
+        NEW.request_kind := CASE
+            WHEN reason = 'return_to_owner' THEN 'return_to_owner'
+            WHEN reason IN ('maintenance_create', 'Maintenance') OR reason LIKE 'maintenance\\_create\\_%' THEN 'maintenance_create'
+            WHEN reason = 'problem_report_include' OR reason LIKE 'problem\\_report\\_include\\_%' THEN 'problem_report_include'
+        END;
+    END IF;
+    IF NEW.maintenance_id IS NULL AND reason ~ '^(maintenance_create|problem_report_include)_[0-9]+$' THEN
+        NEW.maintenance_id := substring(reason FROM '_([0-9]+)$')::integer;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+DROP_REQUEST_LINK_FUNCTION_SQL = """
+DROP FUNCTION IF EXISTS public.movement_request_link();
+"""
+
+
+def _request_link_sql(table: str) -> str:
+    movement_id = f"{table}_id"
+    return f"""
+    -- Plain integers like external_maintenance_step_id: maintenance creation writes
+    -- its movements before the maintenance row exists.
+    ALTER TABLE public.{table}
+        ADD COLUMN IF NOT EXISTS request_kind VARCHAR(32) NULL,
+        ADD COLUMN IF NOT EXISTS maintenance_id INTEGER NULL,
+        ADD COLUMN IF NOT EXISTS problem_report_id INTEGER NULL;
+
+    UPDATE public.{table} m
+    SET request_kind = CASE
+            WHEN m.movement_reason = 'return_to_owner' THEN 'return_to_owner'
+            WHEN m.movement_reason IN ('maintenance_create', 'Maintenance')
+              OR m.movement_reason LIKE 'maintenance\\_create\\_%' THEN 'maintenance_create'
+            ELSE 'problem_report_include'
+        END,
+        maintenance_id = CASE
+            WHEN m.movement_reason ~ '^(maintenance_create|problem_report_include)_[0-9]+$'
+            THEN substring(m.movement_reason FROM '_([0-9]+)$')::integer
+        END
+    WHERE m.movement_reason IN ('return_to_owner', 'maintenance_create', 'Maintenance', 'problem_report_include')
+       OR m.movement_reason LIKE 'maintenance\\_create\\_%'
+       OR m.movement_reason LIKE 'problem\\_report\\_include\\_%';
+
+    DROP TRIGGER IF EXISTS trg_{table}_request_link ON public.{table};
+    CREATE TRIGGER trg_{table}_request_link
+        BEFORE INSERT ON public.{table}
+        FOR EACH ROW EXECUTE PROCEDURE public.movement_request_link();
+
+    -- Approval queues and maintenance start checks only look at pending requests.
+    CREATE INDEX IF NOT EXISTS idx_{table}_pending_request
+        ON public.{table} (request_kind, movement_datetime DESC, {movement_id} DESC)
+        WHERE status = 'pending';
+    CREATE INDEX IF NOT EXISTS idx_{table}_pending_maintenance
+        ON public.{table} (maintenance_id, request_kind)
+        WHERE status = 'pending';
+    """
+
+
+def _drop_request_link_sql(table: str) -> str:
+    return f"""
+    DROP TRIGGER IF EXISTS trg_{table}_request_link ON public.{table};
+    DROP INDEX IF EXISTS public.idx_{table}_pending_request;
+    DROP INDEX IF EXISTS public.idx_{table}_pending_maintenance;
+    ALTER TABLE public.{table}
+        DROP COLUMN IF EXISTS request_kind,
+        DROP COLUMN IF EXISTS maintenance_id,
+        DROP COLUMN IF EXISTS problem_report_id;
+    """
+
+
+def _request_link_state(model_name: str) -> list:
+    return [
+        migrations.AddField(
+            model_name=model_name,
+            name="request_kind",
+            field=models.CharField(blank=True, db_column="request_kind", max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name=model_name,
+            name="maintenance_id",
+            field=models.IntegerField(blank=True, db_column="maintenance_id", null=True),
+        ),
+        migrations.AddField(
+            model_name=model_name,
+            name="problem_report_id",
+            field=models.IntegerField(blank=True, db_column="problem_report_id", null=True),
+        ),
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0034_spare_reservation"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[REQUEST_LINK_FUNCTION_SQL] + [_request_link_sql(table) for table in MOVEMENT_TABLES],
+            reverse_sql=[_drop_request_link_sql(table) for table in MOVEMENT_TABLES] + [DROP_REQUEST_LINK_FUNCTION_SQL],
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[],
+            state_operations=_request_link_state("assetmovement")
+            + _request_link_state("stockitemmovement")
+            + _request_link_state("consumablemovement"),
+        ),
+    ]
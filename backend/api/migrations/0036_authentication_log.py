@@ -0,0 +1,77 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+AUTHENTICATION_LOG_SQL = """
+-- Failed attempts on unknown usernames have no account to point at.
+ALTER TABLE public.authentication_log ALTER COLUMN user_id DROP NOT NULL;
+
+-- Audit queries look up recent events per username and per address.
+CREATE INDEX IF NOT EXISTS idx_authentication_log_username_time
+    ON public.authentication_log (attempted_username, event_timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_authentication_log_ip_time
+    ON public.authentication_log (ip_address, event_timestamp DESC);
+"""
+
+# Same statement api.ids.align_sequence_sql produces, frozen here.
+AUTHENTICATION_LOG_SEQUENCE_SQL = """
+CREATE SEQUENCE IF NOT EXISTS public.authentication_log_log_id_seq;
+WITH cur AS (
+    SELECT GREATEST(
+        (SELECT COALESCE(MAX(log_id), 0) FROM public.authentication_log),
+        (SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM public.authentication_log_log_id_seq)
+    ) AS v
+)
+SELECT setval('public.authentication_log_log_id_seq', GREATEST(v, 1), v > 0) FROM cur;
+"""
+
+DROP_AUTHENTICATION_LOG_SQL = """
+DROP INDEX IF EXISTS public.idx_authentication_log_username_time;
+DROP INDEX IF EXISTS public.idx_authentication_log_ip_time;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0035_movement_request_link"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[AUTHENTICATION_LOG_SQL, AUTHENTICATION_LOG_SEQUENCE_SQL],
+            # Rows without a user may exist by then; keep user_id nullable.
+            reverse_sql=DROP_AUTHENTICATION_LOG_SQL,
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[],
+            state_operations=[
+                migrations.CreateModel(
+                    name="AuthenticationLog",
+                    fields=[
+                        ("log_id", models.AutoField(db_column="log_id", primary_key=True, serialize=False)),
+                        (
+                            "user",
+                            models.ForeignKey(
+                                blank=True,
+                                db_column="user_id",
+                                null=True,
+                                on_delete=django.db.models.deletion.DO_NOTHING,
+                                related_name="+",
+                                to="api.useraccount",
+                            ),
+                        ),
+                        ("attempted_username", models.CharField(blank=True, db_column="attempted_username", max_length=50, null=True)),
+                        ("event_type", models.CharField(blank=True, db_column="event_type", max_length=24, null=True)),
+                        ("ip_address", models.CharField(blank=True, db_column="ip_address", max_length=45, null=True)),
+                        ("event_timestamp", models.DateTimeField(blank=True, db_column="event_timestamp", null=True)),
+                        ("failure_reason", models.CharField(blank=True, db_column="failure_reason", max_length=60, null=True)),
+                    ],
+                    options={
+                        "db_table": "authentication_log",
+                        "managed": False,
+                    },
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+# Units of each purchase order line already turned into items by
+# purchase-orders/{id}/materialize-items/, so repeated calls cannot create them twice.
+LINE_TABLES = (
+    "stock_item_model_is_found_in_purchase_order",
+    "consumable_model_is_found_in_purchase_order",
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0036_authentication_log"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                f"ALTER TABLE public.{table} ADD COLUMN IF NOT EXISTS quantity_materialized INTEGER NOT NULL DEFAULT 0;"
+                for table in LINE_TABLES
+            ],
+            reverse_sql=[f"ALTER TABLE public.{table} DROP COLUMN IF EXISTS quantity_materialized;" for table in LINE_TABLES],
+        ),
+    ]
@@ -0,0 +1,94 @@
+from django.db import migrations
+
+
+# Migration 0033 named its triggers trg_<source>_<item>_availability_<event>.
+# For the longer source tables that exceeds PostgreSQL's 63 character limit,
+# the three names were truncated to the same identifier and each CREATE
+# replaced the previous trigger, leaving only the DELETE one. The triggers are
+# recreated under short names and the availability tables rebuilt, since
+# inserts and updates on those tables were not reflected in the meantime.
+AVAILABILITY_SOURCES = {
+    "stock_item": (
+        "stock_item",
+        "stock_item_current_location",
+        "asset_is_composed_of_stock_item_history",
+        "stock_item_is_assigned_to_person",
+    ),
+    "consumable": (
+        "consumable",
+        "consumable_current_location",
+        "asset_is_composed_of_consumable_history",
+        "consumable_is_used_in_stock_item_history",
+        "consumable_is_assigned_to_person",
+    ),
+}
+
+EVENTS = {
+    "ins": ("INSERT", "REFERENCING NEW TABLE AS new_rows"),
+    "upd": ("UPDATE", "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+    "del": ("DELETE", "REFERENCING OLD TABLE AS old_rows"),
+}
+
+
+def _drop_legacy_triggers_sql(item: str, source: str) -> str:
+    # Identifiers are truncated the same way when dropping.
+    return "".join(
+        f"DROP TRIGGER IF EXISTS trg_{source}_{item}_availability_{event} ON public.{source};\n" for event in EVENTS
+    )
+
+
+def _triggers_sql(item: str, source: str) -> str:
+    return "".join(
+        f"""
+    DROP TRIGGER IF EXISTS trg_{source}_avail_{event} ON public.{source};
+    CREATE TRIGGER trg_{source}_avail_{event}
+        AFTER {operation} ON public.{source}
+        {referencing}
+        FOR EACH STATEMENT EXECUTE PROCEDURE public.{item}_availability_sync();
+    """
+        for event, (operation, referencing) in EVENTS.items()
+    )
+
+
+def _drop_triggers_sql(item: str, source: str) -> str:
+    return "".join(f"DROP TRIGGER IF EXISTS trg_{source}_avail_{event} ON public.{source};\n" for event in EVENTS)
+
+
+def _legacy_triggers_sql(item: str, source: str) -> str:
+    return "".join(
+        f"""
+    DROP TRIGGER IF EXISTS trg_{source}_{item}_availability_{event} ON public.{source};
+    CREATE TRIGGER trg_{source}_{item}_availability_{event}
+        AFTER {operation} ON public.{source}
+        {referencing}
+        FOR EACH STATEMENT EXECUTE PROCEDURE public.{item}_availability_sync();
+    """
+        for event, (operation, referencing) in EVENTS.items()
+    )
+
+
+def _rebuild_sql(item: str) -> str:
+    return f"SELECT public.refresh_{item}_availability(ARRAY(SELECT {item}_id FROM public.{item}));"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0037_purchase_order_line_materialized"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                sql
+                for item, sources in AVAILABILITY_SOURCES.items()
+                for sql in [_drop_legacy_triggers_sql(item, source) + _triggers_sql(item, source) for source in sources]
+                + [_rebuild_sql(item)]
+            ],
+            reverse_sql=[
+                _drop_triggers_sql(item, source) + _legacy_triggers_sql(item, source)
+                for item, sources in AVAILABILITY_SOURCES.items()
+                for source in sources
+            ],
+        ),
+    ]
@@ -0,0 +1,59 @@
+from django.db import migrations, models
+
+
+# roles_epoch (migration 0028) moves on role mapping changes and only makes
+# clients re-mint their tokens; credentials_epoch moves on password or status
+# changes and revokes refresh tokens. A credentials change bumps both, since
+# access tokens are only checked against roles_epoch.
+CREDENTIALS_EPOCH_SQL = """
+ALTER TABLE public.user_account ADD COLUMN IF NOT EXISTS credentials_epoch INTEGER NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION public.user_account_roles_epoch_guard() RETURNS trigger AS $$
+BEGIN
+    NEW.roles_epoch := GREATEST(COALESCE(NEW.roles_epoch, 0), OLD.roles_epoch);
+    NEW.credentials_epoch := GREATEST(COALESCE(NEW.credentials_epoch, 0), OLD.credentials_epoch);
+    IF NEW.account_status IS DISTINCT FROM OLD.account_status
+       OR NEW.password_hash IS DISTINCT FROM OLD.password_hash THEN
+        NEW.credentials_epoch := GREATEST(NEW.credentials_epoch, OLD.credentials_epoch + 1);
+        NEW.roles_epoch := GREATEST(NEW.roles_epoch, OLD.roles_epoch + 1);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+DROP_CREDENTIALS_EPOCH_SQL = """
+CREATE OR REPLACE FUNCTION public.user_account_roles_epoch_guard() RETURNS trigger AS $$
+BEGIN
+    NEW.roles_epoch := GREATEST(COALESCE(NEW.roles_epoch, 0), OLD.roles_epoch);
+    IF NEW.account_status IS DISTINCT FROM OLD.account_status
+       OR NEW.password_hash IS DISTINCT FROM OLD.password_hash THEN
+        NEW.roles_epoch := GREATEST(NEW.roles_epoch, OLD.roles_epoch + 1);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+ALTER TABLE public.user_account DROP COLUMN IF EXISTS credentials_epoch;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0038_spare_availability_trigger_names"),
+    ]
+
+    operations = [
+        migrations.RunSQL(sql=CREDENTIALS_EPOCH_SQL, reverse_sql=DROP_CREDENTIALS_EPOCH_SQL),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[],
+            state_operations=[
+                migrations.AddField(
+                    model_name="useraccount",
+                    name="credentials_epoch",
+                    field=models.IntegerField(db_column="credentials_epoch", default=0),
+                ),
+            ],
+        ),
+    ]
@@ -61,6 +61,8 @@ class UserAccount(models.Model):
     created_by_user_id = models.IntegerField(blank=True, null=True, db_column='created_by_user_id')
     modified_by_user_id = models.IntegerField(blank=True, null=True, db_column='modified_by_user_id')
     modified_at_datetime = models.DateTimeField(blank=True, null=True, db_column='modified_at_datetime')
+    roles_epoch = models.IntegerField(default=0, db_column='roles_epoch')
+    credentials_epoch = models.IntegerField(default=0, db_column='credentials_epoch')
 
     class Meta:
         managed = False
@@ -85,12 +87,35 @@ class UserAccount(models.Model):
         """Get all roles for this user's person"""
         return PersonRoleMapping.objects.filter(person=self.person).select_related('role')
 
+    def role_codes(self):
+        """Role codes of this user's person, loaded once per instance"""
+        if getattr(self, '_role_codes', None) is None:
+            self._role_codes = frozenset(
+                PersonRoleMapping.objects.filter(person_id=self.person_id).values_list('role__role_code', flat=True)
+            )
+        return self._role_codes
+
     def is_superuser(self):
         """Check if user has superuser role"""
-        return PersonRoleMapping.objects.filter(
-            person=self.person,
-            role__role_code='superuser'
-        ).exists()
+        return 'superuser' in self.role_codes()
+
+
+class AuthenticationLog(models.Model):
+    """Maps to authentication_log table (login audit trail, written in batches by api/auth_audit.py)"""
+    log_id = models.AutoField(primary_key=True, db_column='log_id')
+    user = models.ForeignKey(UserAccount, on_delete=models.DO_NOTHING, db_column='user_id', null=True, blank=True, related_name='+')
+    attempted_username = models.CharField(max_length=50, blank=True, null=True, db_column='attempted_username')
+    event_type = models.CharField(max_length=24, blank=True, null=True, db_column='event_type')
+    ip_address = models.CharField(max_length=45, blank=True, null=True, db_column='ip_address')
+    event_timestamp = models.DateTimeField(blank=True, null=True, db_column='event_timestamp')
+    failure_reason = models.CharField(max_length=60, blank=True, null=True, db_column='failure_reason')
+
+    class Meta:
+        managed = False
+        db_table = 'authentication_log'
+
+    def __str__(self):
+        return f"{self.event_type} {self.attempted_username}"
 
 
 class AssetType(models.Model):
@@ -1059,6 +1084,17 @@ class ConsumableIsUsedInStockItemHistory(models.Model):
         db_table = 'consumable_is_used_in_stock_item_history'
 
 
+class MovementStatusField(models.CharField):
+    """``status`` column of the movement tables, of the ``movement_status`` enum type.
+
+    Declaring the type lets multi-row ``bulk_create`` cast its ``UNNEST`` arrays
+    to it instead of ``varchar[]``, which PostgreSQL refuses to assign.
+    """
+
+    def db_type(self, connection):
+        return 'movement_status'
+
+
 class AssetMovement(models.Model):
     """Maps to asset_movement table"""
     asset_movement_id = models.IntegerField(primary_key=True, db_column='asset_movement_id')
@@ -1076,7 +1112,11 @@ class AssetMovement(models.Model):
     external_maintenance_step_id = models.IntegerField(blank=True, null=True, db_column='external_maintenance_step_id')
     movement_reason = models.CharField(max_length=128, db_column='movement_reason')
     movement_datetime = models.DateTimeField(db_column='movement_datetime')
-    status = models.CharField(max_length=24, db_column='status', default='pending')
+    status = MovementStatusField(max_length=24, db_column='status', default='pending')
+    # Typed request linkage (migration 0035); filled from movement_reason by a trigger when left empty.
+    request_kind = models.CharField(max_length=32, blank=True, null=True, db_column='request_kind')
+    maintenance_id = models.IntegerField(blank=True, null=True, db_column='maintenance_id')
+    problem_report_id = models.IntegerField(blank=True, null=True, db_column='problem_report_id')
 
     class Meta:
         managed = False
@@ -1093,7 +1133,11 @@ class StockItemMovement(models.Model):
     external_maintenance_step_id = models.IntegerField(blank=True, null=True, db_column='external_maintenance_step_id')
     movement_reason = models.CharField(max_length=128, db_column='movement_reason')
     movement_datetime = models.DateTimeField(db_column='movement_datetime')
-    status = models.CharField(max_length=24, db_column='status', default='pending')
+    status = MovementStatusField(max_length=24, db_column='status', default='pending')
+    # Typed request linkage (migration 0035); filled from movement_reason by a trigger when left empty.
+    request_kind = models.CharField(max_length=32, blank=True, null=True, db_column='request_kind')
+    maintenance_id = models.IntegerField(blank=True, null=True, db_column='maintenance_id')
+    problem_report_id = models.IntegerField(blank=True, null=True, db_column='problem_report_id')
 
     class Meta:
         managed = False
@@ -1110,13 +1154,75 @@ class ConsumableMovement(models.Model):
     consumable = models.ForeignKey(Consumable, on_delete=models.CASCADE, db_column='consumable_id', related_name='+')
     movement_reason = models.CharField(max_length=128, db_column='movement_reason')
     movement_datetime = models.DateTimeField(db_column='movement_datetime')
-    status = models.CharField(max_length=24, db_column='status', default='pending')
+    status = MovementStatusField(max_length=24, db_column='status', default='pending')
+    # Typed request linkage (migration 0035); filled from movement_reason by a trigger when left empty.
+    request_kind = models.CharField(max_length=32, blank=True, null=True, db_column='request_kind')
+    maintenance_id = models.IntegerField(blank=True, null=True, db_column='maintenance_id')
+    problem_report_id = models.IntegerField(blank=True, null=True, db_column='problem_report_id')
 
     class Meta:
         managed = False
         db_table = 'consumable_movement'
 
 
+class AssetCurrentLocation(models.Model):
+    """Maps to asset_current_location table (kept in sync by asset_movement triggers)"""
+    asset = models.OneToOneField(Asset, on_delete=models.CASCADE, primary_key=True, db_column='asset_id', related_name='+')
+    location = models.ForeignKey(Location, on_delete=models.SET_NULL, db_column='location_id', null=True, blank=True, related_name='+')
+    asset_movement_id = models.IntegerField(db_column='asset_movement_id')
+    movement_datetime = models.DateTimeField(blank=True, null=True, db_column='movement_datetime')
+
+    class Meta:
+        managed = False
+        db_table = 'asset_current_location'
+
+
+class StockItemCurrentLocation(models.Model):
+    """Maps to stock_item_current_location table (kept in sync by stock_item_movement triggers)"""
+    stock_item = models.OneToOneField(StockItem, on_delete=models.CASCADE, primary_key=True, db_column='stock_item_id', related_name='+')
+    location = models.ForeignKey(Location, on_delete=models.SET_NULL, db_column='location_id', null=True, blank=True, related_name='+')
+    stock_item_movement_id = models.IntegerField(db_column='stock_item_movement_id')
+    movement_datetime = models.DateTimeField(blank=True, null=True, db_column='movement_datetime')
+
+    class Meta:
+        managed = False
+        db_table = 'stock_item_current_location'
+
+
+class ConsumableCurrentLocation(models.Model):
+    """Maps to consumable_current_location table (kept in sync by consumable_movement triggers)"""
+    consumable = models.OneToOneField(Consumable, on_delete=models.CASCADE, primary_key=True, db_column='consumable_id', related_name='+')
+    location = models.ForeignKey(Location, on_delete=models.SET_NULL, db_column='location_id', null=True, blank=True, related_name='+')
+    consumable_movement_id = models.IntegerField(db_column='consumable_movement_id')
+    movement_datetime = models.DateTimeField(blank=True, null=True, db_column='movement_datetime')
+
+    class Meta:
+        managed = False
+        db_table = 'consumable_current_location'
+
+
+class StockItemAvailability(models.Model):
+    """Maps to stock_item_availability table (spare stock items, kept in sync by triggers, see migration 0033)"""
+    stock_item = models.OneToOneField(StockItem, on_delete=models.CASCADE, primary_key=True, db_column='stock_item_id', related_name='+')
+    stock_item_model_id = models.IntegerField(db_column='stock_item_model_id')
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, db_column='location_id', related_name='+')
+
+    class Meta:
+        managed = False
+        db_table = 'stock_item_availability'
+
+
+class ConsumableAvailability(models.Model):
+    """Maps to consumable_availability table (spare consumables, kept in sync by triggers, see migration 0033)"""
+    consumable = models.OneToOneField(Consumable, on_delete=models.CASCADE, primary_key=True, db_column='consumable_id', related_name='+')
+    consumable_model_id = models.IntegerField(db_column='consumable_model_id')
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, db_column='location_id', related_name='+')
+
+    class Meta:
+        managed = False
+        db_table = 'consumable_availability'
+
+
 class PhysicalCondition(models.Model):
     """Maps to physical_condition table"""
     condition_id = models.IntegerField(primary_key=True, db_column='condition_id')
@@ -1434,3 +1540,69 @@ class CompanyAssetRequest(models.Model):
 
     def __str__(self):
         return f"Company Asset Request {self.company_asset_request_id}"
+
+
+class BackgroundJob(models.Model):
+    """Maps to background_job table (queue consumed by the run_jobs command, see api/jobs.py)"""
+    job_id = models.BigAutoField(primary_key=True, db_column='job_id')
+    kind = models.CharField(max_length=64, db_column='kind')
+    payload = models.JSONField(default=dict, db_column='payload')
+    status = models.CharField(max_length=16, default='queued', db_column='status')
+    attempts = models.IntegerField(default=0, db_column='attempts')
+    max_attempts = models.IntegerField(default=3, db_column='max_attempts')
+    result = models.JSONField(blank=True, null=True, db_column='result')
+    error = models.TextField(blank=True, null=True, db_column='error')
+    created_by = models.ForeignKey(UserAccount, on_delete=models.SET_NULL, db_column='created_by_user_id', null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(db_column='created_at')
+    run_after = models.DateTimeField(db_column='run_after')
+    started_at = models.DateTimeField(blank=True, null=True, db_column='started_at')
+    finished_at = models.DateTimeField(blank=True, null=True, db_column='finished_at')
+    locked_by = models.CharField(max_length=128, blank=True, null=True, db_column='locked_by')
+
+    class Meta:
+        managed = False
+        db_table = 'background_job'
+
+    def __str__(self):
+        return f"Job {self.job_id} ({self.kind}, {self.status})"
+
+
+class PurchaseOrderSummary(models.Model):
+    """Maps to purchase_order_summary table (maintained by triggers, see migration 0031)"""
+    purchase_order_id = models.IntegerField(primary_key=True, db_column='purchase_order_id')
+    supplier_id = models.IntegerField(blank=True, null=True, db_column='supplier_id')
+    stock_item_line_count = models.IntegerField(default=0, db_column='stock_item_line_count')
+    consumable_line_count = models.IntegerField(default=0, db_column='consumable_line_count')
+    quantity_ordered = models.IntegerField(default=0, db_column='quantity_ordered')
+    quantity_received = models.IntegerField(default=0, db_column='quantity_received')
+    quantity_remaining = models.IntegerField(default=0, db_column='quantity_remaining')
+    has_remaining = models.BooleanField(default=False, db_column='has_remaining')
+    latest_delivery_note_id = models.IntegerField(blank=True, null=True, db_column='latest_delivery_note_id')
+    latest_invoice_id = models.IntegerField(blank=True, null=True, db_column='latest_invoice_id')
+    latest_acceptance_report_id = models.IntegerField(blank=True, null=True, db_column='latest_acceptance_report_id')
+    refreshed_at = models.DateTimeField(db_column='refreshed_at')
+
+    class Meta:
+        managed = False
+        db_table = 'purchase_order_summary'
+
+    def __str__(self):
+        return f"Purchase Order Summary {self.purchase_order_id}"
+
+
+class SpareReservation(models.Model):
+    """Maps to spare_reservation table (spare held for a maintenance item request, see api/availability.py)"""
+    request = models.OneToOneField(MaintenanceStepItemRequest, on_delete=models.CASCADE, primary_key=True, db_column='maintenance_step_item_request_id', related_name='+')
+    item_type = models.CharField(max_length=24, db_column='item_type')
+    item_id = models.IntegerField(db_column='item_id')
+    reserved_by_person = models.ForeignKey(Person, on_delete=models.SET_NULL, db_column='reserved_by_person_id', null=True, blank=True, related_name='+')
+    reserved_at = models.DateTimeField(db_column='reserved_at')
+    expires_at = models.DateTimeField(db_column='expires_at')
+
+    class Meta:
+        managed = False
+        db_table = 'spare_reservation'
+        unique_together = (('item_type', 'item_id'),)
+
+    def __str__(self):
+        return f"{self.item_type} {self.item_id} reserved for request {self.request_id}"
@@ -0,0 +1,254 @@
+"""Opt-in keyset (cursor) pagination for list endpoints.
+
+Lists stay unpaginated unless the client sends ``page_size`` or ``cursor``, so
+existing callers that expect a plain array keep working. When paginating, the
+page boundary is expressed as a ``WHERE`` on the queryset's own ordering
+columns (plus the primary key as a tie-breaker), which keeps the cost of a
+page independent of how deep into the list it is. Orderings across relations
+(``asset_model__model_name``) are annotated onto the rows; orderings that
+cannot be expressed as a keyset (expressions, ``?``, transforms) answer 400
+instead of being paged in a different order. Views that page raw SQL
+(e.g. the problem report feed) reuse the cursor helpers below.
+
+Query parameters:
+
+* ``page_size`` -- rows per page (default ``DEFAULT_PAGE_SIZE``, capped at ``MAX_PAGE_SIZE``)
+* ``cursor`` -- opaque token taken from the previous response's ``next``
+* ``count`` -- ``exact``, ``estimate`` (planner row estimate, no table scan) or
+  ``auto`` (estimate, falling back to an exact count for small results)
+"""
+
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+EXACT_COUNT_THRESHOLD = 10000
+
+
+def estimated_count(queryset) -> int:
+    """Row count estimated by the PostgreSQL planner for ``queryset``."""
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def encode_cursor(values) -> str:
+    """Opaque cursor token for the ordering values of the last row of a page."""
+
+    raw = json.dumps([None if v is None else str(v) for v in values]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, size: int, message: str = "Invalid cursor") -> list:
+    """Inverse of :func:`encode_cursor`; values come back as strings (or None)."""
+
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if not isinstance(raw, list) or len(raw) != size:
+            raise ValueError
+        return raw
+    except Exception:
+        raise NotFound(message)
+
+
+def page_size_from(request) -> int:
+    try:
+        size = int(request.query_params.get("page_size", DEFAULT_PAGE_SIZE))
+    except (TypeError, ValueError):
+        size = DEFAULT_PAGE_SIZE
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def next_page_link(request, page_size: int, cursor: str | None):
+    if not cursor:
+        return None
+    url = replace_query_param(request.build_absolute_uri(), "page_size", page_size)
+    return replace_query_param(url, "cursor", cursor)
+
+
+class KeysetPagination(BasePagination):
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    invalid_cursor_message = "Invalid cursor"
+
+    def _ordering_field(self, model, name):
+        """Resolve ``name`` (possibly spanning forward relations with ``__``) to the field it orders by."""
+
+        parts = name.split("__")
+        for i, part in enumerate(parts):
+            field = model._meta.get_field(part)
+            last = i == len(parts) - 1
+            if not field.concrete:
+                # Reverse and many-to-many relations would repeat rows.
+                raise FieldDoesNotExist(name)
+            if not field.is_relation:
+                if not last:
+                    # Transforms such as ``created__year`` have no column to compare against.
+                    raise FieldDoesNotExist(name)
+                continue
+            if field.many_to_many or (last and field.related_model._meta.ordering):
+                # Django orders by the related model's Meta.ordering there, not by the column.
+                raise FieldDoesNotExist(name)
+            model = field.related_model
+        return field
+
+    def _ordering(self, queryset):
+        """Return ``[(key, field, descending)]`` for the queryset ordering, ending with the primary key.
+
+        ``key`` is the field's attname for local fields and the lookup path for
+        fields reached through relations. Returns None when the ordering cannot
+        be expressed as a keyset (expressions, random ordering, transforms).
+        """
+
+        model = queryset.model
+        pk = model._meta.pk
+        ordering = []
+        for item in queryset.query.order_by or ("pk",):
+            if not isinstance(item, str) or item.lstrip("-") in ("", "?"):
+                return None
+            descending = item.startswith("-")
+            name = item.lstrip("-")
+            if name == "pk":
+                name = pk.name
+            try:
+                field = self._ordering_field(model, name)
+            except FieldDoesNotExist:
+                return None
+            ordering.append((name if "__" in name else field.attname, field, descending))
+
+        if all(field is not pk for _, field, _ in ordering):
+            ordering.append((pk.attname, pk, ordering[-1][2] if ordering else False))
+        return ordering
+
+    def _apply_ordering(self, queryset, ordering):
+        """Order ``queryset`` by ``ordering``, annotating related values so rows carry them.
+
+        Returns the queryset and the ordering with related keys replaced by their annotation names.
+        """
+
+        annotations = {}
+        keyed = []
+        for key, field, descending in ordering:
+            if "__" in key:
+                alias = f"_keyset_{len(annotations)}"
+                annotations[alias] = F(key)
+                key = alias
+            keyed.append((key, field, descending))
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        return queryset.order_by(*[f"-{key}" if desc else key for key, _, desc in keyed]), keyed
+
+    def _encode_cursor(self, values) -> str:
+        return encode_cursor(values)
+
+    def _decode_cursor(self, token, ordering):
+        raw = decode_cursor(token, len(ordering), self.invalid_cursor_message)
+        try:
+            return [None if v is None else field.to_python(v) for (_, field, _), v in zip(ordering, raw)]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def _after(self, ordering, values) -> Q:
+        """Rows strictly after ``values`` in ``ordering`` (PostgreSQL: NULLS LAST asc, NULLS FIRST desc)."""
+
+        condition = None
+        equal = Q()
+        for (name, _, descending), value in zip(ordering, values):
+            if value is None:
+                # Nothing sorts after NULL ascending; everything non-NULL does descending.
+                step = Q(**{f"{name}__isnull": False}) if descending else None
+                same = Q(**{f"{name}__isnull": True})
+            elif descending:
+                step = Q(**{f"{name}__lt": value})
+                same = Q(**{name: value})
+            else:
+                step = Q(**{f"{name}__gt": value}) | Q(**{f"{name}__isnull": True})
+                same = Q(**{name: value})
+            if step is not None:
+                condition = (equal & step) if condition is None else condition | (equal & step)
+            equal &= same
+        return condition if condition is not None else Q(pk__in=[])
+
+    def get_page_size(self, request):
+        return page_size_from(request)
+
+    def _count(self, queryset, mode):
+        if mode == "exact":
+            return queryset.count(), False
+        if mode in {"estimate", "auto"}:
+            estimate = estimated_count(queryset)
+            if mode == "auto" and estimate < EXACT_COUNT_THRESHOLD:
+                return queryset.count(), False
+            return estimate, True
+        return None, False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.page_size_query_param not in params and self.cursor_query_param not in params:
+            return None
+
+        ordering = self._ordering(queryset)
+        if ordering is None:
+            # Paging on another ordering would silently reorder the list.
+            raise ValidationError({self.page_size_query_param: "This list does not support pagination."})
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.count, self.count_is_estimate = self._count(queryset, params.get(self.count_query_param))
+
+        queryset, ordering = self._apply_ordering(queryset, ordering)
+        token = params.get(self.cursor_query_param)
+        if token:
+            queryset = queryset.filter(self._after(ordering, self._decode_cursor(token, ordering)))
+
+        rows = list(queryset[: self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        self.next_cursor = None
+        if self.has_next and rows:
+            last = rows[-1]
+            self.next_cursor = self._encode_cursor([getattr(last, key) for key, _, _ in ordering])
+        return rows
+
+    def get_next_link(self):
+        return next_page_link(self.request, self.page_size, self.next_cursor)
+
+    def get_first_link(self):
+        return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        payload = OrderedDict([("next", self.get_next_link()), ("first", self.get_first_link())])
+        if self.count is not None:
+            payload["count"] = self.count
+            payload["count_is_estimate"] = self.count_is_estimate
+        payload["results"] = data
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True},
+                "first": {"type": "string"},
+                "count": {"type": "integer"},
+                "count_is_estimate": {"type": "boolean"},
+                "results": schema,
+            },
+        }
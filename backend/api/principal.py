@@ -0,0 +1,186 @@
+"""The authenticated caller, resolved once per request.
+
+``UserAccountJWTAuthentication`` loads the user account together with its
+person and role codes and attaches the result to ``request.principal``;
+permission checks read from it instead of querying ``person_role_mapping``
+again in every action.
+
+Access tokens minted by ``api.tokens`` carry the person id and role codes;
+when their ``roles_epoch`` claim still matches the account, the principal is
+built from the claims alone. Otherwise principals are kept in the
+``principals`` cache alias for ``PRINCIPAL_CACHE_TTL`` seconds. Entries are
+dropped when a user account or role mapping is saved or deleted through the
+ORM (see ``apps.ApiConfig``); changes made with raw SQL outside the API are
+picked up when the entry expires.
+"""
+
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+
+from .models import PersonRoleMapping, UserAccount
+
+CACHE_ALIAS = "principals"
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+class Principal:
+    """User account, person and role codes of the current request."""
+
+    __slots__ = ("user", "role_codes")
+
+    def __init__(self, user: UserAccount, role_codes):
+        self.user = user
+        self.role_codes = frozenset(role_codes)
+        # Let UserAccount.role_codes()/is_superuser() answer from memory too.
+        user._role_codes = self.role_codes
+
+    @property
+    def person(self):
+        # Loaded lazily: principals built from token claims only know the person id.
+        return self.user.person
+
+    @property
+    def person_id(self) -> int | None:
+        return self.user.person_id
+
+    @property
+    def is_superuser(self) -> bool:
+        return "superuser" in self.role_codes
+
+    def has_any_role(self, *role_codes: str) -> bool:
+        return self.is_superuser or not self.role_codes.isdisjoint(role_codes)
+
+
+def _cache():
+    try:
+        return caches[CACHE_ALIAS]
+    except InvalidCacheBackendError:
+        return caches["default"]
+
+
+def _cache_key(user_id: int) -> str:
+    return f"principal:{user_id}"
+
+
+def _epoch_cache_key(user_id: int) -> str:
+    return f"roles_epoch:{user_id}"
+
+
+def _count(name: str, n: int = 1) -> None:
+    with _stats_lock:
+        _stats[name] += n
+
+
+def load_principal(user: UserAccount) -> Principal:
+    role_codes = PersonRoleMapping.objects.filter(person_id=user.person_id).values_list("role__role_code", flat=True)
+    return Principal(user, role_codes)
+
+
+def cached_principal(user_id: int) -> Principal | None:
+    """Return the principal for ``user_id`` from the cache, loading it on a miss.
+
+    Returns None when the user account does not exist.
+    """
+
+    cache = _cache()
+    key = _cache_key(user_id)
+    entry = cache.get(key)
+    if entry is not None:
+        _count("hits")
+        user, role_codes = entry
+        return Principal(user, role_codes)
+
+    _count("misses")
+    try:
+        user = UserAccount.objects.select_related("person").get(user_id=user_id)
+    except UserAccount.DoesNotExist:
+        return None
+    principal = load_principal(user)
+    cache.set(key, (user, principal.role_codes), getattr(settings, "PRINCIPAL_CACHE_TTL", 300))
+    return principal
+
+
+def invalidate_principal(*, user_id: int | None = None, person_id: int | None = None) -> None:
+    """Drop cached principals for a user account, or for every account of a person."""
+
+    user_ids = []
+    if user_id is not None:
+        user_ids.append(user_id)
+    if person_id is not None:
+        user_ids.extend(UserAccount.objects.filter(person_id=person_id).values_list("user_id", flat=True))
+    if not user_ids:
+        return
+    _cache().delete_many([_cache_key(uid) for uid in user_ids] + [_epoch_cache_key(uid) for uid in user_ids])
+    _count("invalidations", len(user_ids))
+
+
+def current_roles_epoch(user_id: int) -> int | None:
+    """Return the account's ``roles_epoch``, cached for ``ROLES_EPOCH_CACHE_TTL`` seconds.
+
+    Returns None when the user account does not exist.
+    """
+
+    cache = _cache()
+    key = _epoch_cache_key(user_id)
+    epoch = cache.get(key)
+    if epoch is None:
+        epoch = UserAccount.objects.filter(user_id=user_id).values_list("roles_epoch", flat=True).first()
+        if epoch is None:
+            return None
+        cache.set(key, epoch, getattr(settings, "ROLES_EPOCH_CACHE_TTL", 60))
+    return epoch
+
+
+def principal_cache_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else None
+    stats["ttl_seconds"] = getattr(settings, "PRINCIPAL_CACHE_TTL", 300)
+    return stats
+
+
+def get_principal(request) -> Principal | None:
+    """Return the principal attached by authentication, building it on first use otherwise."""
+
+    principal = getattr(request, "principal", None)
+    if principal is not None:
+        return principal
+
+    user = getattr(request, "user", None)
+    if not isinstance(user, UserAccount):
+        user = None
+        try:
+            user_id = request.auth.get("user_id") if getattr(request, "auth", None) is not None else None
+            if user_id:
+                user = UserAccount.objects.select_related("person").get(user_id=user_id)
+        except (UserAccount.DoesNotExist, AttributeError, KeyError, TypeError):
+            user = None
+    if user is None:
+        return None
+
+    principal = load_principal(user)
+    request.principal = principal
+    return principal
+
+
+def _user_account_changed(sender, instance, **kwargs):
+    invalidate_principal(user_id=instance.user_id)
+
+
+def _role_mapping_changed(sender, instance, **kwargs):
+    invalidate_principal(person_id=instance.person_id)
+
+
+def connect_signals() -> None:
+    from django.db.models.signals import post_delete, post_save
+
+    post_save.connect(_user_account_changed, sender=UserAccount, dispatch_uid="principal_user_account_saved")
+    post_delete.connect(_user_account_changed, sender=UserAccount, dispatch_uid="principal_user_account_deleted")
+    post_save.connect(_role_mapping_changed, sender=PersonRoleMapping, dispatch_uid="principal_role_mapping_saved")
+    post_delete.connect(_role_mapping_changed, sender=PersonRoleMapping, dispatch_uid="principal_role_mapping_deleted")
@@ -0,0 +1,140 @@
+"""Problem report feed across assets, stock items and consumables.
+
+The three report tables are read with one ``UNION ALL`` query, newest first.
+Each branch applies the filters and the keyset boundary itself and is limited
+to one page, so a page costs three short index scans however long the report
+history gets.
+"""
+
+import datetime
+
+from django.db import connection
+from rest_framework.exceptions import NotFound
+
+from .pagination import decode_cursor, encode_cursor
+
+REPORT_TABLES = {
+    "asset": ("person_reports_problem_on_asset", "asset_id"),
+    "stock_item": ("person_reports_problem_on_stock_item", "stock_item_id"),
+    "consumable": ("person_reports_problem_on_consumable", "consumable_id"),
+}
+
+# Maintenance can only be opened on assets; a report counts as handled when its
+# asset had a maintenance that was still open at (or started after) the report.
+ASSET_MAINTENANCE_SQL = """
+    EXISTS (
+        SELECT 1 FROM public.maintenance m
+        WHERE m.asset_id = r.asset_id
+          AND (m.end_datetime IS NULL OR m.end_datetime >= r.report_datetime)
+    )
+"""
+
+FEED_COLUMNS = (
+    "item_type",
+    "report_id",
+    "item_id",
+    "person_id",
+    "person_name",
+    "report_datetime",
+    "owner_observation",
+    "has_maintenance",
+)
+
+
+def naive_utc(value: datetime.datetime) -> datetime.datetime:
+    """``value`` as a naive UTC datetime, comparable with the ``timestamp`` report columns."""
+
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def encode_feed_cursor(row: dict) -> str:
+    return encode_cursor([row["report_datetime"], row["item_type"], row["report_id"]])
+
+
+def decode_feed_cursor(token: str) -> tuple:
+    """Parse a feed cursor into ``(report_datetime, item_type, report_id)``; raise ``NotFound`` when tampered with."""
+
+    report_datetime, item_type, report_id = decode_cursor(token, 3)
+    try:
+        if item_type not in REPORT_TABLES:
+            raise ValueError(item_type)
+        return naive_utc(datetime.datetime.fromisoformat(report_datetime)), item_type, int(report_id)
+    except (TypeError, ValueError):
+        raise NotFound("Invalid cursor")
+
+
+def problem_report_feed(
+    *,
+    item_types=None,
+    person_id: int | None = None,
+    date_from=None,
+    date_to=None,
+    has_maintenance: bool | None = None,
+    after: tuple | None = None,
+    limit: int | None = None,
+) -> list[dict]:
+    """Reports ordered by ``(report_datetime, item_type, report_id)`` descending.
+
+    ``after`` is the ordering key of the last row of the previous page; rows
+    strictly after it are returned, at most ``limit`` of them.
+    """
+
+    params = {"person_id": person_id, "date_from": date_from, "date_to": date_to, "limit": limit}
+    if after is not None:
+        params.update(after_datetime=after[0], after_type=after[1], after_id=after[2])
+
+    branches = []
+    for item_type, (table, item_column) in REPORT_TABLES.items():
+        if item_types and item_type not in item_types:
+            continue
+        maintenance_sql = ASSET_MAINTENANCE_SQL if item_type == "asset" else "FALSE"
+        if has_maintenance is True and item_type != "asset":
+            continue
+
+        conditions = []
+        if person_id is not None:
+            conditions.append("r.person_id = %(person_id)s")
+        if date_from is not None:
+            conditions.append("r.report_datetime >= %(date_from)s")
+        if date_to is not None:
+            conditions.append("r.report_datetime <= %(date_to)s")
+        if has_maintenance is not None and item_type == "asset":
+            conditions.append(maintenance_sql if has_maintenance else f"NOT {maintenance_sql}")
+        if after is not None:
+            conditions.append(
+                f"(r.report_datetime, '{item_type}'::text, r.report_id)"
+                " < (%(after_datetime)s::timestamp, %(after_type)s::text, %(after_id)s::integer)"
+            )
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        branches.append(
+            f"""
+            (
+                SELECT '{item_type}'::text AS item_type, r.report_id, r.{item_column} AS item_id, r.person_id,
+                       r.report_datetime, r.owner_observation, {maintenance_sql} AS has_maintenance
+                FROM public.{table} r
+                {where}
+                ORDER BY r.report_datetime DESC, r.report_id DESC
+                {"LIMIT %(limit)s" if limit is not None else ""}
+            )
+            """
+        )
+
+    if not branches:
+        return []
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT f.item_type, f.report_id, f.item_id, f.person_id,
+                   p.first_name || ' ' || p.last_name,
+                   f.report_datetime, f.owner_observation, f.has_maintenance
+            FROM ({" UNION ALL ".join(branches)}) f
+            LEFT JOIN public.person p ON p.person_id = f.person_id
+            ORDER BY f.report_datetime DESC, f.item_type DESC, f.report_id DESC
+            {"LIMIT %(limit)s" if limit is not None else ""}
+            """,
+            params,
+        )
+        return [dict(zip(FEED_COLUMNS, row)) for row in cursor.fetchall()]
@@ -0,0 +1,403 @@
+"""Purchase order bookkeeping shared by the purchase order endpoints and background jobs."""
+
+import datetime
+from collections import Counter
+
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .attributes import propagate_model_attributes
+from .ids import allocate_ids, allocate_inventory_numbers, sequence_name
+from .models import Consumable, ConsumableModel, ConsumableMovement, StockItem, StockItemModel, StockItemMovement
+
+MATERIALIZE_MAX_ITEMS = 5000
+ITEM_STATUS_MAX_LENGTH = StockItem._meta.get_field("stock_item_status").max_length
+# Statuses items only reach through maintenance chiefs and destruction certificates.
+UNRECEIVABLE_STATUSES = frozenset({"suggested_for_destruction", "destroyed"})
+
+ITEM_KINDS = {
+    "stock_item": {
+        "item": StockItem,
+        "model": StockItemModel,
+        "movement": StockItemMovement,
+        "line_table": "stock_item_model_is_found_in_purchase_order",
+        "model_id": "stock_item_model_id",
+        "instance_fields": ("stock_item_name", "stock_item_inventory_number"),
+    },
+    "consumable": {
+        "item": Consumable,
+        "model": ConsumableModel,
+        "movement": ConsumableMovement,
+        "line_table": "consumable_model_is_found_in_purchase_order",
+        "model_id": "consumable_model_id",
+        "instance_fields": ("consumable_name", "consumable_inventory_number", "consumable_serial_number"),
+    },
+}
+
+
+def lock_purchase_order(purchase_order_id: int) -> bool:
+    """Lock the purchase order row for the current transaction; False when it does not exist.
+
+    Receipts and materialization take this lock first, so concurrent requests
+    on the same order run one after the other.
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM public.purchase_order WHERE purchase_order_id = %s FOR UPDATE",
+            [purchase_order_id],
+        )
+        return cursor.fetchone() is not None
+
+
+def receive_quantities(purchase_order_id: int, kind_name: str, quantities: dict[int, int]) -> list[dict]:
+    """Add ``quantities`` (model id -> newly received) to the order's lines with one UPDATE.
+
+    Lines that do not exist or would be over-received are left untouched and
+    returned as ``{"model_id", "quantity_ordered", "quantity_received",
+    "newly_received"}`` (``quantity_ordered`` is None for missing lines); the
+    caller rolls the transaction back when anything is returned.
+    """
+
+    if not quantities:
+        return []
+    kind = ITEM_KINDS[kind_name]
+    table, model_id = kind["line_table"], kind["model_id"]
+    values_sql = ", ".join(["(%s::integer, %s::integer)"] * len(quantities))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH input (model_id, newly_received) AS (VALUES {values_sql}),
+            updated AS (
+                UPDATE public.{table} l
+                SET quantity_received = COALESCE(l.quantity_received, 0) + i.newly_received
+                FROM input i
+                WHERE l.purchase_order_id = %s
+                  AND l.{model_id} = i.model_id
+                  AND COALESCE(l.quantity_received, 0) + i.newly_received <= COALESCE(l.quantity_ordered, 0)
+                RETURNING l.{model_id}
+            )
+            SELECT i.model_id, COALESCE(l.quantity_ordered, 0), COALESCE(l.quantity_received, 0),
+                   i.newly_received, l.{model_id} IS NOT NULL
+            FROM input i
+            LEFT JOIN public.{table} l ON l.purchase_order_id = %s AND l.{model_id} = i.model_id
+            WHERE NOT EXISTS (SELECT 1 FROM updated u WHERE u.{model_id} = i.model_id)
+            ORDER BY i.model_id
+            """,
+            [value for item in quantities.items() for value in item] + [purchase_order_id, purchase_order_id],
+        )
+        return [
+            {
+                "model_id": row_model_id,
+                "quantity_ordered": ordered if found else None,
+                "quantity_received": received,
+                "newly_received": newly_received,
+            }
+            for row_model_id, ordered, received, newly_received, found in cursor.fetchall()
+        ]
+
+
+def received_items(purchase_order_id: int, kind_name: str) -> list[dict]:
+    """Newest items of each model on the order, as many per model as the line's received quantity.
+
+    One query per kind: items are numbered per model by descending id with
+    ``ROW_NUMBER()`` and joined to the line quantities.
+    """
+
+    kind = ITEM_KINDS[kind_name]
+    table, model_id = kind["line_table"], kind["model_id"]
+    columns = [f"{kind_name}_id", model_id, f"{kind_name}_name", f"{kind_name}_inventory_number", f"{kind_name}_status"]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT {", ".join(f"i.{column}" for column in columns)}
+            FROM (
+                SELECT {", ".join(f"x.{column}" for column in columns)},
+                       ROW_NUMBER() OVER (PARTITION BY x.{model_id} ORDER BY x.{kind_name}_id DESC) AS rn
+                FROM public.{kind_name} x
+                WHERE x.{model_id} IN (
+                    SELECT {model_id} FROM public.{table}
+                    WHERE purchase_order_id = %s AND COALESCE(quantity_received, 0) > 0
+                )
+            ) i
+            JOIN public.{table} l ON l.purchase_order_id = %s AND l.{model_id} = i.{model_id}
+            WHERE i.rn <= COALESCE(l.quantity_received, 0)
+            ORDER BY i.{model_id}, i.rn
+            """,
+            [purchase_order_id, purchase_order_id],
+        )
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def create_backorder_report(purchase_order_id: int) -> int | None:
+    """Record a backorder report for the lines of ``purchase_order_id`` that are not fully received.
+
+    The report and its line snapshots are written by a single statement.
+    Returns the new backorder report id, or None when nothing is outstanding.
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH stock_item_lines AS (
+                SELECT l.stock_item_model_id,
+                       COALESCE(l.quantity_ordered, 0) AS quantity_ordered,
+                       COALESCE(l.quantity_received, 0) AS quantity_received
+                FROM public.stock_item_model_is_found_in_purchase_order l
+                WHERE l.purchase_order_id = %(po)s
+                  AND COALESCE(l.quantity_ordered, 0) > COALESCE(l.quantity_received, 0)
+            ),
+            consumable_lines AS (
+                SELECT l.consumable_model_id,
+                       COALESCE(l.quantity_ordered, 0) AS quantity_ordered,
+                       COALESCE(l.quantity_received, 0) AS quantity_received
+                FROM public.consumable_model_is_found_in_purchase_order l
+                WHERE l.purchase_order_id = %(po)s
+                  AND COALESCE(l.quantity_ordered, 0) > COALESCE(l.quantity_received, 0)
+            ),
+            report AS (
+                INSERT INTO public.backorder_report
+                    (backorder_report_id, purchase_order_id, backorder_report_date, digital_copy)
+                SELECT nextval('public.{sequence_name("backorder_report", "backorder_report_id")}'), %(po)s, %(today)s, NULL
+                WHERE EXISTS (SELECT 1 FROM stock_item_lines) OR EXISTS (SELECT 1 FROM consumable_lines)
+                RETURNING backorder_report_id
+            ),
+            stock_item_snapshot AS (
+                INSERT INTO public.backorder_report_stock_item_model_line
+                    (backorder_report_id, stock_item_model_id, quantity_ordered, quantity_received, quantity_remaining)
+                SELECT r.backorder_report_id, l.stock_item_model_id, l.quantity_ordered, l.quantity_received,
+                       l.quantity_ordered - l.quantity_received
+                FROM report r CROSS JOIN stock_item_lines l
+            ),
+            consumable_snapshot AS (
+                INSERT INTO public.backorder_report_consumable_model_line
+                    (backorder_report_id, consumable_model_id, quantity_ordered, quantity_received, quantity_remaining)
+                SELECT r.backorder_report_id, l.consumable_model_id, l.quantity_ordered, l.quantity_received,
+                       l.quantity_ordered - l.quantity_received
+                FROM report r CROSS JOIN consumable_lines l
+            )
+            SELECT backorder_report_id FROM report
+            """,
+            {"po": purchase_order_id, "today": datetime.date.today()},
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _unmaterialized_quantities(cursor, kind: dict, purchase_order_id: int, model_ids) -> dict[int, int]:
+    """Received units of each line that have no item yet (``quantity_received - quantity_materialized``)."""
+
+    cursor.execute(
+        f"""
+        SELECT {kind['model_id']}, GREATEST(COALESCE(quantity_received, 0) - quantity_materialized, 0)
+        FROM public.{kind['line_table']}
+        WHERE purchase_order_id = %s AND {kind['model_id']} = ANY(%s)
+        FOR UPDATE
+        """,
+        [purchase_order_id, list(model_ids)],
+    )
+    return {model_id: int(available) for model_id, available in cursor.fetchall()}
+
+
+def _record_materialized(cursor, kind: dict, purchase_order_id: int, quantities: dict[int, int]) -> None:
+    values_sql = ", ".join(["(%s::integer, %s::integer)"] * len(quantities))
+    cursor.execute(
+        f"""
+        UPDATE public.{kind['line_table']} l
+        SET quantity_materialized = l.quantity_materialized + i.quantity
+        FROM (VALUES {values_sql}) AS i (model_id, quantity)
+        WHERE l.purchase_order_id = %s AND l.{kind['model_id']} = i.model_id
+        """,
+        [value for item in quantities.items() for value in item] + [purchase_order_id],
+    )
+
+
+def _validated_instances(kind: dict, model_id: int, instances) -> list[dict]:
+    """Check per-unit overrides: objects whose fields are strings that fit their columns."""
+
+    if not isinstance(instances, list):
+        raise ValidationError({"instances": f"instances of model {model_id} must be a list of objects"})
+    item_model = kind["item"]
+    cleaned = []
+    for index, unit in enumerate(instances):
+        if not isinstance(unit, dict):
+            raise ValidationError({"instances": f"instances[{index}] of model {model_id} must be an object"})
+        fields = {}
+        for field in kind["instance_fields"]:
+            value = unit.get(field)
+            if value is None:
+                continue
+            if not isinstance(value, str):
+                raise ValidationError({field: f"{field} of instances[{index}] of model {model_id} must be a string"})
+            value = value.strip()
+            max_length = item_model._meta.get_field(field).max_length
+            if len(value) > max_length:
+                raise ValidationError({field: f"{field} {value!r} is longer than {max_length} characters"})
+            if value:
+                fields[field] = value
+        cleaned.append(fields)
+    return cleaned
+
+
+def _check_inventory_numbers(kind: dict, units) -> set[str]:
+    """Reject inventory numbers given twice or already in use; return the ones given."""
+
+    number_field = kind["instance_fields"][1]
+    given = [unit[number_field] for _, unit in units if number_field in unit]
+    duplicates = sorted(number for number, count in Counter(given).items() if count > 1)
+    if duplicates:
+        raise ValidationError({number_field: f"Inventory numbers given more than once: {', '.join(duplicates)}"})
+    in_use = sorted(
+        kind["item"].objects.filter(**{f"{number_field}__in": given}).values_list(number_field, flat=True)
+    )
+    if in_use:
+        raise ValidationError({number_field: f"Inventory numbers already in use: {', '.join(in_use)}"})
+    return set(given)
+
+
+def _free_inventory_numbers(name: str, kind: dict, count: int, reserved: set[str]) -> list[str]:
+    """Draw ``count`` numbers from the sequence, skipping ones given in the request or used by other rows."""
+
+    number_field = kind["instance_fields"][1]
+    numbers = []
+    while len(numbers) < count:
+        candidates = [n for n in allocate_inventory_numbers(name, count - len(numbers)) if n not in reserved]
+        in_use = set(
+            kind["item"].objects.filter(**{f"{number_field}__in": candidates}).values_list(number_field, flat=True)
+        )
+        numbers.extend(n for n in candidates if n not in in_use)
+    return numbers
+
+
+def materialize_items(
+    purchase_order_id: int,
+    *,
+    location_id: int,
+    lines: dict[str, list[dict]],
+    movement_reason: str = "received_on_purchase_order",
+    item_status: str = "in_stock",
+) -> dict:
+    """Create the stock items / consumables received on a purchase order in one transaction.
+
+    ``lines`` maps ``stock_item`` / ``consumable`` to entries of the form
+    ``{"model_id", "quantity", "instances"}``; ``quantity`` defaults to the
+    received units of the purchase order line that have no item yet and may
+    not exceed them, and ``instances`` optionally overrides name, inventory
+    number or serial number per unit. Each line's ``quantity_materialized`` is
+    raised by the number of items created, so repeating a call never creates
+    the same units twice. Ids and missing inventory numbers are reserved in
+    blocks, items, attribute values and the initial movements to
+    ``location_id`` are each written with a single statement per kind. Raises
+    ``ValidationError`` when a line does not match the purchase order, an
+    override is malformed or its inventory number is taken, or nothing is
+    left to create.
+    """
+
+    if not isinstance(item_status, str) or not item_status.strip():
+        raise ValidationError({"item_status": "item_status must be a non-empty string"})
+    if item_status.strip().lower() in UNRECEIVABLE_STATUSES:
+        raise ValidationError({"item_status": f"Received items cannot be created as {item_status.strip()}"})
+    if len(item_status) > ITEM_STATUS_MAX_LENGTH:
+        raise ValidationError({"item_status": f"item_status is longer than {ITEM_STATUS_MAX_LENGTH} characters"})
+
+    result = {}
+    now = timezone.now()
+    with transaction.atomic():
+        if not lock_purchase_order(purchase_order_id):
+            raise ValidationError({"purchase_order": "Purchase order not found"})
+
+        with connection.cursor() as cursor:
+            planned = {}
+            for name, entries in lines.items():
+                kind = ITEM_KINDS[name]
+                available = _unmaterialized_quantities(cursor, kind, purchase_order_id, [e["model_id"] for e in entries])
+                for entry in entries:
+                    model_id = entry["model_id"]
+                    if model_id not in available:
+                        raise ValidationError({kind["model_id"]: f"{model_id} is not on purchase order {purchase_order_id}"})
+                    quantity = entry.get("quantity")
+                    if quantity is None:
+                        quantity = available[model_id]
+                    if quantity < 0 or quantity > available[model_id]:
+                        raise ValidationError(
+                            {
+                                kind["model_id"]: (
+                                    f"quantity for {model_id} must be between 0 and the received units "
+                                    f"without items ({available[model_id]})"
+                                )
+                            }
+                        )
+                    # Later entries for the same model draw from what is left.
+                    available[model_id] -= quantity
+                    instances = _validated_instances(kind, model_id, entry.get("instances") or [])
+                    planned.setdefault(name, []).extend(
+                        (model_id, instances[i] if i < len(instances) else {}) for i in range(quantity)
+                    )
+
+            total = sum(len(units) for units in planned.values())
+            if total == 0:
+                raise ValidationError({"quantity": "Every received unit of these lines already has an item"})
+            if total > MATERIALIZE_MAX_ITEMS:
+                raise ValidationError({"quantity": f"At most {MATERIALIZE_MAX_ITEMS} items can be created per request"})
+            given_numbers = {name: _check_inventory_numbers(ITEM_KINDS[name], units) for name, units in planned.items()}
+
+            for name, units in planned.items():
+                if units:
+                    quantities = {}
+                    for model_id, _ in units:
+                        quantities[model_id] = quantities.get(model_id, 0) + 1
+                    _record_materialized(cursor, ITEM_KINDS[name], purchase_order_id, quantities)
+
+        for name, units in planned.items():
+            kind = ITEM_KINDS[name]
+            item_model, movement_model = kind["item"], kind["movement"]
+            name_field, number_field = kind["instance_fields"][:2]
+            model_names = dict(
+                kind["model"].objects.filter(pk__in={model_id for model_id, _ in units}).values_list("pk", "model_name")
+            )
+
+            item_ids = allocate_ids(item_model, len(units))
+            numbers = iter(
+                _free_inventory_numbers(
+                    name, kind, sum(1 for _, unit in units if number_field not in unit), given_numbers[name]
+                )
+            )
+            items = []
+            for item_id, (model_id, unit) in zip(item_ids, units):
+                fields = {field: unit.get(field) for field in kind["instance_fields"]}
+                fields[name_field] = (fields[name_field] or model_names.get(model_id) or "")[:48] or None
+                fields[number_field] = fields[number_field] or next(numbers)
+                items.append(
+                    item_model(
+                        **{item_model._meta.pk.attname: item_id, kind["model_id"]: model_id},
+                        **{f"{name}_status": item_status},
+                        **fields,
+                    )
+                )
+            item_model.objects.bulk_create(items)
+            counts = propagate_model_attributes(name, item_ids=item_ids)
+
+            movement_ids = allocate_ids(movement_model, len(units))
+            movement_model.objects.bulk_create(
+                [
+                    movement_model(
+                        **{movement_model._meta.pk.attname: movement_id, f"{name}_id": item_id},
+                        source_location_id=location_id,
+                        destination_location_id=location_id,
+                        maintenance_step=None,
+                        external_maintenance_step_id=None,
+                        movement_reason=movement_reason,
+                        movement_datetime=now,
+                        status="accepted",
+                    )
+                    for movement_id, item_id in zip(movement_ids, item_ids)
+                ]
+            )
+            result[name] = {
+                "created_count": len(item_ids),
+                f"{name}_ids": item_ids,
+                f"{name}_movement_ids": movement_ids,
+                "attribute_values_created": counts["item_values_inserted"],
+            }
+    return result
@@ -0,0 +1,99 @@
+"""Structured request log written off the request thread.
+
+``RequestLogMiddleware`` (api/middleware.py) and ``log_event`` write one JSON
+line per event on the ``api.requests`` logger. Records go through a bounded
+in-memory buffer: the request thread only appends to it, and a
+``QueueListener`` thread drains it into a size-rotated file. When the buffer
+is full the oldest record is dropped rather than blocking the request.
+
+Settings: ``REQUEST_LOG_FILE``, ``REQUEST_LOG_MAX_BYTES``,
+``REQUEST_LOG_BACKUP_COUNT``, ``REQUEST_LOG_BUFFER_SIZE`` and
+``REQUEST_LOG_SAMPLE_RATE`` (fraction of successful requests to log; errors
+and crashes are always logged).
+"""
+
+import atexit
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger("api.requests")
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+class RingBufferQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler over a bounded queue that discards the oldest record when full."""
+
+    def __init__(self, buffer: queue.Queue):
+        super().__init__(buffer)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # The JSON payload is built by the caller; skip QueueHandler's message formatting.
+        return record
+
+    def enqueue(self, record):
+        while True:
+            try:
+                self.queue.put_nowait(record)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+
+class JsonLineFormatter(logging.Formatter):
+    def format(self, record):
+        payload = {
+            "ts": datetime.datetime.fromtimestamp(record.created, tz=datetime.timezone.utc).isoformat(),
+            "event": record.getMessage(),
+        }
+        payload.update(getattr(record, "fields", {}))
+        return json.dumps(payload, default=str)
+
+
+def start_request_log():
+    """Attach the buffered handler to ``api.requests`` and start the writer thread (idempotent)."""
+
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return _listener
+
+        path = Path(getattr(settings, "REQUEST_LOG_FILE", "requests.log"))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            path,
+            maxBytes=getattr(settings, "REQUEST_LOG_MAX_BYTES", 10 * 1024 * 1024),
+            backupCount=getattr(settings, "REQUEST_LOG_BACKUP_COUNT", 5),
+            encoding="utf-8",
+            delay=True,
+        )
+        file_handler.setFormatter(JsonLineFormatter())
+
+        buffer = queue.Queue(maxsize=getattr(settings, "REQUEST_LOG_BUFFER_SIZE", 10000))
+        logger.addHandler(RingBufferQueueHandler(buffer))
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+        _listener = logging.handlers.QueueListener(buffer, file_handler, respect_handler_level=False)
+        _listener.start()
+        atexit.register(_listener.stop)
+        return _listener
+
+
+def log_event(event: str, **fields):
+    """Queue one structured line on the request log."""
+
+    logger.info(event, extra={"fields": fields})
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Person, UserAccount, Role, PhysicalCondition, AssetType, AssetBrand, AssetModel, AssetModelDefaultStockItem, AssetModelDefaultConsumable, StockItemType, StockItemBrand, StockItemModel, ConsumableType, ConsumableBrand, ConsumableModel, LocationType, Location, Position, OrganizationalStructure, OrganizationalStructureRelation, Asset, StockItem, Consumable, AssetIsAssignedToPerson, StockItemIsAssignedToPerson, ConsumableIsAssignedToPerson, PersonReportsProblemOnAsset, PersonReportsProblemOnStockItem, PersonReportsProblemOnConsumable, MaintenanceTypicalStep, MaintenanceStep, Maintenance, AssetAttributeDefinition, AssetTypeAttribute, AssetModelAttributeValue, AssetAttributeValue, StockItemAttributeDefinition, StockItemTypeAttribute, StockItemModelAttributeValue, StockItemAttributeValue, ConsumableAttributeDefinition, ConsumableTypeAttribute, ConsumableModelAttributeValue, ConsumableAttributeValue, Warehouse, AttributionOrder, ReceiptReport, AdministrativeCertificate, StockItemConsumableDestructionCertificate, AssetDestructionCertificate, AssetDestructionCertificateAsset, AssetFailedExternalMaintenance, CompanyAssetRequest, MaintenanceStepItemRequest, ExternalMaintenanceProvider, ExternalMaintenance, ExternalMaintenanceStep, ExternalMaintenanceTypicalStep, ExternalMaintenanceDocument, AttributionOrderAssetStockItemAccessory, AttributionOrderAssetConsumableAccessory
+from .models import Person, UserAccount, Role, PhysicalCondition, AssetType, AssetBrand, AssetModel, AssetModelDefaultStockItem, AssetModelDefaultConsumable, StockItemType, StockItemBrand, StockItemModel, ConsumableType, ConsumableBrand, ConsumableModel, LocationType, Location, Position, OrganizationalStructure, OrganizationalStructureRelation, Asset, StockItem, Consumable, AssetIsAssignedToPerson, StockItemIsAssignedToPerson, ConsumableIsAssignedToPerson, PersonReportsProblemOnAsset, PersonReportsProblemOnStockItem, PersonReportsProblemOnConsumable, MaintenanceTypicalStep, MaintenanceStep, Maintenance, AssetAttributeDefinition, AssetTypeAttribute, AssetModelAttributeValue, AssetAttributeValue, StockItemAttributeDefinition, StockItemTypeAttribute, StockItemModelAttributeValue, StockItemAttributeValue, ConsumableAttributeDefinition, ConsumableTypeAttribute, ConsumableModelAttributeValue, ConsumableAttributeValue, Warehouse, AttributionOrder, ReceiptReport, AdministrativeCertificate, StockItemConsumableDestructionCertificate, AssetDestructionCertificate, AssetDestructionCertificateAsset, AssetFailedExternalMaintenance, CompanyAssetRequest, MaintenanceStepItemRequest, ExternalMaintenanceProvider, ExternalMaintenance, ExternalMaintenanceStep, ExternalMaintenanceTypicalStep, ExternalMaintenanceDocument, AttributionOrderAssetStockItemAccessory, AttributionOrderAssetConsumableAccessory, BackgroundJob
 
 
 class PersonSerializer(serializers.ModelSerializer):
@@ -272,8 +272,24 @@ class OrganizationalStructureRelationSerializer(serializers.ModelSerializer):
         return instance
 
 
+def requested_fields(request):
+    """Field names listed in ``?fields=a,b`` on a read request, or None when absent."""
+    if request is None or request.method not in ('GET', 'HEAD'):
+        return None
+    raw = request.query_params.get('fields')
+    if not raw:
+        return None
+    return {name.strip() for name in raw.split(',') if name.strip()}
+
+
 class AssetSerializer(serializers.ModelSerializer):
-    """Serializer for Asset model"""
+    """Serializer for Asset model
+
+    Composition is read from ``open_stock_item_composition`` /
+    ``open_consumable_composition`` when the queryset prefetched them
+    (see ``AssetViewSet.get_queryset``). ``fields`` limits the output; the
+    asset list/retrieve endpoints pass ``?fields=`` through it.
+    """
 
     failed_external_maintenance_id = serializers.IntegerField(read_only=True, required=False)
 
@@ -298,10 +314,19 @@ class AssetSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['asset_id']
 
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in list(self.fields):
+                if name not in fields and not self.fields[name].write_only:
+                    self.fields.pop(name)
+
     def get_stock_item_composition(self, obj):
         from .models import AssetIsComposedOfStockItemHistory
-        # Get current composition (where end_datetime is null)
-        current = AssetIsComposedOfStockItemHistory.objects.filter(asset=obj, end_datetime__isnull=True).select_related('stock_item')
+        # Get current composition (where end_datetime is null), prefetched on list/retrieve
+        current = getattr(obj, 'open_stock_item_composition', None)
+        if current is None:
+            current = AssetIsComposedOfStockItemHistory.objects.filter(asset=obj, end_datetime__isnull=True).select_related('stock_item')
         return [
             {
                 'stock_item_id': item.stock_item.stock_item_id,
@@ -312,8 +337,10 @@ class AssetSerializer(serializers.ModelSerializer):
 
     def get_consumable_composition(self, obj):
         from .models import AssetIsComposedOfConsumableHistory
-        # Get current composition (where end_datetime is null)
-        current = AssetIsComposedOfConsumableHistory.objects.filter(asset=obj, end_datetime__isnull=True).select_related('consumable')
+        # Get current composition (where end_datetime is null), prefetched on list/retrieve
+        current = getattr(obj, 'open_consumable_composition', None)
+        if current is None:
+            current = AssetIsComposedOfConsumableHistory.objects.filter(asset=obj, end_datetime__isnull=True).select_related('consumable')
         return [
             {
                 'consumable_id': item.consumable.consumable_id,
@@ -838,8 +865,12 @@ class MaintenanceSerializer(serializers.ModelSerializer):
 
     performed_by_person_name = serializers.SerializerMethodField()
     asset_name = serializers.SerializerMethodField()
-    has_steps = serializers.SerializerMethodField()
-    has_external_maintenances = serializers.SerializerMethodField()
+    # Annotated by _annotate_maintenance_flags (api/views.py); every queryset and
+    # single instance passed to this serializer is loaded through it.
+    has_steps = serializers.BooleanField(read_only=True)
+    has_external_maintenances = serializers.BooleanField(read_only=True)
+    step_count = serializers.IntegerField(read_only=True)
+    last_step_status = serializers.CharField(read_only=True, allow_null=True)
 
     class Meta:
         model = Maintenance
@@ -856,6 +887,8 @@ class MaintenanceSerializer(serializers.ModelSerializer):
             'asset_name',
             'has_steps',
             'has_external_maintenances',
+            'step_count',
+            'last_step_status',
         ]
         read_only_fields = ['maintenance_id']
 
@@ -874,13 +907,6 @@ class MaintenanceSerializer(serializers.ModelSerializer):
             return None
         return getattr(asset, 'asset_name', None) or None
 
-    def get_has_steps(self, obj):
-        return obj.steps.exists()
-
-    def get_has_external_maintenances(self, obj):
-        from .models import ExternalMaintenance
-        return ExternalMaintenance.objects.filter(maintenance=obj).exists()
-
 
 class WarehouseSerializer(serializers.ModelSerializer):
     """Serializer for Warehouse model"""
@@ -1098,3 +1124,27 @@ class ExternalMaintenanceSerializer(serializers.ModelSerializer):
             'item_sent_to_external_maintenance_datetime',
             'item_received_by_company_datetime',
         ]
+
+
+class BackgroundJobSerializer(serializers.ModelSerializer):
+    """Serializer for BackgroundJob model (read only; jobs are created by the endpoints that enqueue them)"""
+    created_by_user_id = serializers.IntegerField(source='created_by_id', read_only=True)
+
+    class Meta:
+        model = BackgroundJob
+        fields = [
+            'job_id',
+            'kind',
+            'status',
+            'payload',
+            'result',
+            'error',
+            'attempts',
+            'max_attempts',
+            'created_by_user_id',
+            'created_at',
+            'run_after',
+            'started_at',
+            'finished_at',
+        ]
+        read_only_fields = fields
@@ -1,3 +1,940 @@
-from django.test import TestCase
+import base64
+import datetime
+import hashlib
+import json
+import os
+import tempfile
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection
+from django.db.models import F
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed, NotFound, ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import auth_audit, jobs
+from .availability import available_items, reserve_random_item
+from .cascade import bulk_move_assets, cascade_asset_moves
+from .documents import InvalidDocument, document_path, serve_document, store_pdf
+from .ids import allocate_id, allocate_ids, allocate_inventory_numbers
+from .locations import current_location_id
+from .models import (
+    Asset,
+    AssetModelDefaultStockItem,
+    PersonRoleMapping,
+    PurchaseOrderSummary,
+    StockItem,
+    StockItemMovement,
+    UserAccount,
+)
+from .principal import load_principal
+from .pagination import KeysetPagination, decode_cursor, encode_cursor
+from .problem_reports import decode_feed_cursor, encode_feed_cursor, naive_utc
+from .purchasing import materialize_items, receive_quantities
+from .serializers import AssetSerializer
+from .tokens import ROLES_CLAIM, mint_tokens, principal_from_claims
+
+
+class CursorTokenTests(SimpleTestCase):
+    def test_round_trip_stringifies_values(self):
+        token = encode_cursor(["2024-01-02T03:04:05", 7, None])
+        self.assertEqual(decode_cursor(token, 3), ["2024-01-02T03:04:05", "7", None])
+
+    def test_token_is_url_safe_without_padding(self):
+        token = encode_cursor(["a" * 10, "?&/+"])
+        self.assertNotIn("=", token)
+        self.assertRegex(token, r"^[A-Za-z0-9_-]+$")
+
+    def test_wrong_length_is_rejected(self):
+        with self.assertRaises(NotFound):
+            decode_cursor(encode_cursor([1, 2]), 3)
+
+    def test_garbage_is_rejected(self):
+        for token in ("not-a-cursor", "", "e30", encode_cursor([])[:-1] + "!"):
+            with self.subTest(token=token), self.assertRaises(NotFound):
+                decode_cursor(token, 1)
+
+
+class KeysetOrderingTests(SimpleTestCase):
+    def setUp(self):
+        self.paginator = KeysetPagination()
+
+    def test_primary_key_is_appended_as_tie_breaker(self):
+        ordering = self.paginator._ordering(Asset.objects.order_by("-asset_name"))
+        self.assertEqual([(key, desc) for key, _, desc in ordering], [("asset_name", True), ("asset_id", True)])
+
+    def test_related_ordering_is_annotated(self):
+        queryset = AssetModelDefaultStockItem.objects.order_by("asset_model__model_name")
+        ordering = self.paginator._ordering(queryset)
+        self.assertEqual(ordering[0][0], "asset_model__model_name")
+        queryset, keyed = self.paginator._apply_ordering(queryset, ordering)
+        self.assertEqual([key for key, _, _ in keyed], ["_keyset_0", "id"])
+        self.assertEqual(queryset.query.order_by, ("_keyset_0", "id"))
+
+    def test_cursor_values_are_parsed_with_the_ordering_fields(self):
+        ordering = self.paginator._ordering(Asset.objects.order_by("asset_id"))
+        token = encode_cursor([41])
+        self.assertEqual(self.paginator._decode_cursor(token, ordering), [41])
+        with self.assertRaises(NotFound):
+            self.paginator._decode_cursor(encode_cursor(["forty-one"]), ordering)
+
+    def test_unsupported_orderings_refuse_to_paginate(self):
+        request = Request(APIRequestFactory().get("/api/assets/", {"page_size": 10}))
+        for queryset in (
+            Asset.objects.order_by(F("asset_id").desc()),
+            Asset.objects.order_by("?"),
+        ):
+            with self.subTest(ordering=queryset.query.order_by):
+                self.assertIsNone(self.paginator._ordering(queryset))
+                with self.assertRaises(ValidationError):
+                    self.paginator.paginate_queryset(queryset, request)
+
+    def test_lists_stay_unpaginated_without_parameters(self):
+        request = Request(APIRequestFactory().get("/api/assets/"))
+        self.assertIsNone(self.paginator.paginate_queryset(Asset.objects.order_by("?"), request))
+
+
+class AssetSerializerFieldsTests(SimpleTestCase):
+    def test_fields_argument_trims_readable_fields(self):
+        serializer = AssetSerializer([], many=True, fields={"asset_id", "asset_name"})
+        self.assertEqual(
+            set(serializer.child.fields),
+            {"asset_id", "asset_name", "included_stock_items", "included_consumables"},
+        )
+
+    def test_request_fields_parameter_alone_does_not_trim(self):
+        request = Request(APIRequestFactory().get("/api/my-items/", {"fields": "asset_id"}))
+        serializer = AssetSerializer(context={"request": request})
+        self.assertIn("asset_name", serializer.fields)
+
+
+class ProblemReportCursorTests(SimpleTestCase):
+    def test_round_trip(self):
+        row = {"report_datetime": datetime.datetime(2024, 5, 6, 7, 8, 9), "item_type": "stock_item", "report_id": 12}
+        self.assertEqual(
+            decode_feed_cursor(encode_feed_cursor(row)),
+            (datetime.datetime(2024, 5, 6, 7, 8, 9), "stock_item", 12),
+        )
+
+    def test_tampered_values_are_not_found(self):
+        for values in (
+            ["yesterday", "asset", "1"],
+            ["2024-05-06 07:08:09", "person", "1"],
+            ["2024-05-06 07:08:09", "asset", "1; DROP TABLE asset"],
+            [1, "asset", "1"],
+            ["2024-05-06 07:08:09", ["asset"], "1"],
+            ["2024-05-06 07:08:09", "asset", None],
+        ):
+            with self.subTest(values=values), self.assertRaises(NotFound):
+                decode_feed_cursor(encode_cursor(values))
+
+    def test_non_string_values_are_not_found(self):
+        token = base64.urlsafe_b64encode(json.dumps([20240506, {"x": 1}, 3.5]).encode()).decode()
+        with self.assertRaises(NotFound):
+            decode_feed_cursor(token)
+
+    def test_offsets_are_converted_to_utc(self):
+        parsed = datetime.datetime.fromisoformat("2024-05-06T10:00:00+02:00")
+        self.assertEqual(naive_utc(parsed), datetime.datetime(2024, 5, 6, 8, 0))
+        self.assertEqual(naive_utc(datetime.datetime(2024, 5, 6, 8, 0)), datetime.datetime(2024, 5, 6, 8, 0))
+
+
+@override_settings(LOGIN_THROTTLE_WINDOW=300, LOGIN_THROTTLE_USERNAME_FAILURES=3, LOGIN_THROTTLE_IP_FAILURES=5)
+class LoginThrottleTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(auth_audit, "_ensure_writer")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for buffer in (auth_audit._events, auth_audit._accounts, auth_audit._failures, auth_audit._attempts):
+            buffer.clear()
+            self.addCleanup(buffer.clear)
+
+    def record_failure(self, username, ip_address="10.0.0.1", **kwargs):
+        auth_audit.record_login(auth_audit.LOGIN_FAILURE, username, ip_address, failure_reason="Invalid Password", **kwargs)
+
+    def test_username_is_throttled_after_the_limit(self):
+        self.record_failure("alice")
+        self.record_failure("Alice")
+        self.assertEqual(auth_audit.throttle_delay("alice", "10.0.0.2"), 0)
+        self.record_failure("ALICE")
+        delay = auth_audit.throttle_delay("alice", "10.0.0.2")
+        self.assertGreater(delay, 0)
+        self.assertLessEqual(delay, 301)
+        self.assertEqual(auth_audit.throttle_delay("bob", "10.0.0.2"), 0)
+
+    def test_address_is_throttled_across_usernames(self):
+        for i in range(5):
+            self.record_failure(f"user{i}", "10.0.0.9")
+        self.assertGreater(auth_audit.throttle_delay("someone-else", "10.0.0.9"), 0)
+        self.assertEqual(auth_audit.throttle_delay("someone-else", "10.0.0.8"), 0)
+
+    def test_throttled_attempts_do_not_extend_the_window(self):
+        for _ in range(3):
+            self.record_failure("carol")
+        auth_audit.record_login(auth_audit.LOGIN_FAILURE, "carol", "10.0.0.1", failure_reason=auth_audit.THROTTLED)
+        self.assertEqual(len(auth_audit._failures[("username", "carol")]), 3)
+
+    def test_success_clears_the_username_window(self):
+        for _ in range(3):
+            self.record_failure("dave", user_id=7)
+        auth_audit.record_login(auth_audit.LOGIN_SUCCESS, "dave", "10.0.0.1", user_id=7)
+        self.assertEqual(auth_audit.throttle_delay("dave", None), 0)
+        self.assertEqual(auth_audit._accounts[7][:2], [0, True])
+
+    def test_failures_leave_the_window(self):
+        self.record_failure("erin")
+        with mock.patch.object(auth_audit.time, "monotonic", return_value=time.monotonic() + 301):
+            self.assertEqual(auth_audit.throttle_delay("erin", None), 0)
+        self.assertNotIn(("username", "erin"), auth_audit._failures)
+
+    def test_prune_drops_expired_keys_without_a_lookup(self):
+        for i in range(10):
+            self.record_failure(f"stuffed{i}", None)
+        self.assertEqual(auth_audit.prune_failures(), 0)
+        self.assertEqual(auth_audit.prune_failures(time.monotonic() + 301), 10)
+        self.assertFalse(auth_audit._failures)
+
+    @override_settings(LOGIN_THROTTLE_MAX_KEYS=4)
+    def test_table_is_capped(self):
+        for i in range(10):
+            self.record_failure(f"user{i}", None)
+        self.assertEqual(list(auth_audit._failures), [("username", f"user{i}") for i in range(6, 10)])
+
+    def test_failed_flush_restores_the_batch(self):
+        self.record_failure("frank", user_id=3)
+        self.record_failure("frank", user_id=3)
+        with mock.patch.object(auth_audit, "_write_events", side_effect=RuntimeError("database down")):
+            with mock.patch.object(auth_audit, "_write_accounts", side_effect=RuntimeError("database down")):
+                with self.assertRaises(RuntimeError):
+                    auth_audit.flush()
+        self.record_failure("frank", user_id=3)
+        self.assertEqual(len(auth_audit._events), 3)
+        self.assertEqual(auth_audit._accounts[3], [3, False, None])
+
+        with mock.patch.object(auth_audit, "_write_events") as write_events:
+            with mock.patch.object(auth_audit, "_write_accounts") as write_accounts:
+                self.assertEqual(auth_audit.flush(), 3)
+        self.assertEqual([event[1] for event in write_events.call_args.args[0]], ["frank"] * 3)
+        self.assertEqual(write_accounts.call_args.args[0], {3: [3, False, None]})
+        self.assertFalse(auth_audit._events)
+
+    def test_failed_events_do_not_hold_back_the_counters(self):
+        self.record_failure("gina", user_id=4)
+        with mock.patch.object(auth_audit, "_write_events", side_effect=RuntimeError("bad row")):
+            with mock.patch.object(auth_audit, "_write_accounts") as write_accounts:
+                with self.assertRaises(RuntimeError):
+                    auth_audit.flush()
+        self.assertEqual(write_accounts.call_args.args[0], {4: [1, False, None]})
+        self.assertFalse(auth_audit._accounts)
+        self.assertEqual(len(auth_audit._events), 1)
+
+    @override_settings(AUTH_LOG_MAX_ATTEMPTS=2)
+    def test_batch_is_discarded_after_max_attempts(self):
+        self.record_failure("hank")
+        with mock.patch.object(auth_audit, "_write_events", side_effect=RuntimeError("bad row")):
+            with self.assertRaises(RuntimeError):
+                auth_audit.flush()
+            self.assertEqual(len(auth_audit._events), 1)
+            with self.assertLogs("api.auth_audit", "ERROR"), self.assertRaises(RuntimeError):
+                auth_audit.flush()
+        self.assertFalse(auth_audit._events)
+
+    @override_settings(AUTH_LOG_BUFFER_SIZE=3)
+    def test_buffers_drop_the_oldest_entries(self):
+        dropped = auth_audit.dropped
+        for i in range(5):
+            self.record_failure(f"user{i}", user_id=i)
+        self.assertEqual([event[1] for event in auth_audit._events], ["user2", "user3", "user4"])
+        self.assertEqual(list(auth_audit._accounts), [2, 3, 4])
+        self.assertEqual(auth_audit.dropped - dropped, 4)
+
+
+@override_settings(BACKGROUND_JOB_STALE_AFTER=600, BACKGROUND_JOB_MAX_BACKOFF=3)
+class JobWorkerTests(SimpleTestCase):
+    def setUp(self):
+        for name in ("close_old_connections", "requeue_stale", "execute"):
+            patcher = mock.patch.object(jobs, name)
+            setattr(self, name, patcher.start())
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(jobs.time, "sleep")
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_worker_backs_off_while_the_database_is_down(self):
+        job = (1, "attributes.propagate_type", {}, 1, 3)
+        down = OperationalError("connection refused")
+        with mock.patch.object(jobs, "_claim", side_effect=[down, down, down, job]), self.assertLogs("api.jobs", "ERROR"):
+            self.assertEqual(jobs.run_worker(worker_id="test", poll_interval=1.0, max_jobs=1), 1)
+        self.assertEqual([c.args[0] for c in self.sleep.call_args_list], [2.0, 3, 3])
+        self.assertEqual(self.close_old_connections.call_count, 4)
+        self.execute.assert_called_once_with(*job)
+
+    def test_once_gives_up_when_the_database_is_down(self):
+        with mock.patch.object(jobs, "_claim", side_effect=OperationalError("connection refused")):
+            with self.assertRaises(OperationalError):
+                jobs.run_worker(worker_id="test", once=True)
+
+
+class TemporaryMediaRootMixin:
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.media_root = media_root.name
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root, DOCUMENT_STORAGE_DIR="documents", DOCUMENT_UPLOAD_CHUNK_SIZE=4
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), self.media_root)
+            for root, _, names in os.walk(self.media_root)
+            for name in names
+        )
+
+
+class StorePdfTests(TemporaryMediaRootMixin, SimpleTestCase):
+    content = b"%PDF-1.7\nhello document\n%%EOF"
+
+    def test_stores_under_the_content_hash(self):
+        rel_path = store_pdf(SimpleUploadedFile("a.pdf", self.content))
+        digest = hashlib.sha256(self.content).hexdigest()
+        self.assertEqual(rel_path, document_path(digest))
+        self.assertEqual(rel_path, os.path.join("documents", digest[:2], digest[2:4], f"{digest}.pdf"))
+        with open(os.path.join(self.media_root, rel_path), "rb") as f:
+            self.assertEqual(f.read(), self.content)
+
+    def test_identical_uploads_share_one_file(self):
+        first = store_pdf(SimpleUploadedFile("a.pdf", self.content))
+        second = store_pdf(SimpleUploadedFile("copy.pdf", self.content))
+        self.assertEqual(first, second)
+        self.assertEqual(self.stored_files(), [first])
+
+    def test_rejects_non_pdf_content_and_leaves_nothing_behind(self):
+        for content in (b"<html>not a pdf</html>", b"%PD", b""):
+            with self.subTest(content=content), self.assertRaises(InvalidDocument):
+                store_pdf(SimpleUploadedFile("a.pdf", content))
+        self.assertEqual(self.stored_files(), [])
+
+
+class ServeDocumentTests(TemporaryMediaRootMixin, SimpleTestCase):
+    content = b"%PDF-1.4\n" + bytes(range(256)) + b"\n%%EOF"
+
+    def setUp(self):
+        super().setUp()
+        self.rel_path = store_pdf(SimpleUploadedFile("a.pdf", self.content))
+        self.etag = f'"{hashlib.sha256(self.content).hexdigest()}"'
+        self.factory = RequestFactory()
+
+    def serve(self, **headers):
+        response = serve_document(self.factory.get("/download/", headers=headers), self.rel_path, "a.pdf")
+        self.addCleanup(response.close)
+        return response
+
+    def test_full_download_carries_validators(self):
+        response = self.serve()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.content)
+        self.assertEqual(response["ETag"], self.etag)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(response["Cache-Control"], "private, no-cache")
+        self.assertEqual(response["Content-Disposition"], 'inline; filename="a.pdf"')
+        self.assertIn("Last-Modified", response)
+
+    def test_matching_validators_answer_304(self):
+        self.assertEqual(self.serve(if_none_match=self.etag).status_code, 304)
+        last_modified = self.serve()["Last-Modified"]
+        self.assertEqual(self.serve(if_modified_since=last_modified).status_code, 304)
+        self.assertEqual(self.serve(if_none_match='"something-else"').status_code, 200)
+
+    def test_single_range_is_served_with_206(self):
+        size = len(self.content)
+        for header, start, end in (
+            ("bytes=0-3", 0, 3),
+            ("bytes=10-", 10, size - 1),
+            ("bytes=-5", size - 5, size - 1),
+            ("bytes=100-100000", 100, size - 1),
+        ):
+            with self.subTest(range=header):
+                response = self.serve(range=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(b"".join(response.streaming_content), self.content[start:end + 1])
+                self.assertEqual(response["Content-Range"], f"bytes {start}-{end}/{size}")
+                self.assertEqual(response["Content-Length"], str(end - start + 1))
+
+    def test_unsatisfiable_range_answers_416(self):
+        response = self.serve(range=f"bytes={len(self.content)}-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(self.content)}")
+
+    def test_multiple_or_stale_ranges_get_the_whole_file(self):
+        self.assertEqual(self.serve(range="bytes=0-1,5-6").status_code, 200)
+        self.assertEqual(self.serve(range="bytes=0-1", if_range='"stale"').status_code, 200)
+        self.assertEqual(self.serve(range="bytes=0-1", if_range=self.etag).status_code, 206)
+
+    @override_settings(DOCUMENT_SENDFILE="x-accel-redirect", DOCUMENT_ACCEL_REDIRECT_PREFIX="/protected-media/")
+    def test_accel_redirect_hands_the_file_to_the_web_server(self):
+        response = self.serve()
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["X-Accel-Redirect"], "/protected-media/" + self.rel_path.replace(os.sep, "/"))
+        self.assertEqual(response["ETag"], self.etag)
+
+    @override_settings(DOCUMENT_SENDFILE="x-sendfile")
+    def test_x_sendfile_points_at_the_absolute_path(self):
+        response = self.serve()
+        self.assertEqual(response["X-Sendfile"], os.path.join(self.media_root, self.rel_path))
+
+
+class DatabaseFixtures:
+    """Rows for tests that run against the PostgreSQL schema and its triggers.
+
+    The test database is a clone of the development database (see
+    ``DATABASES["default"]["TEST"]``), so rows are created with fresh ids and
+    assertions only look at them.
+    """
+
+    def insert(self, table, pk=None, **values):
+        if pk is not None:
+            values = {pk: allocate_id((table, pk)), **values}
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO public.{table} ({', '.join(values)}) VALUES ({', '.join(['%s'] * len(values))})",
+                list(values.values()),
+            )
+        return values.get(pk)
+
+    def fetch(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def location(self):
+        return self.insert("location", "location_id", location_name="Test room")
+
+    def person(self):
+        return self.insert(
+            "person",
+            "person_id",
+            first_name="Test",
+            last_name="Person",
+            sex="M",
+            birth_date=datetime.date(1990, 1, 1),
+            is_approved=True,
+        )
+
+    def role(self, role_code):
+        role_id = self.fetch("SELECT COALESCE(MAX(role_id), 0) + 1 FROM public.role")[0][0]
+        self.insert("role", role_id=role_id, role_code=role_code, role_label=role_code)
+        return role_id
+
+    def user_account(self, person_id=None):
+        now = timezone.now()
+        user_id = self.fetch("SELECT COALESCE(MAX(user_id), 0) + 1 FROM public.user_account")[0][0]
+        self.insert(
+            "user_account",
+            user_id=user_id,
+            person_id=person_id or self.person(),
+            username=f"test{user_id}",
+            password_hash="x",
+            created_at_datetime=now,
+            disabled_at_datetime=now,
+            last_login=now,
+            account_status="active",
+            failed_login_attempts=0,
+            password_last_changed_datetime=now,
+            modified_at_datetime=now,
+        )
+        return UserAccount.objects.get(pk=user_id)
+
+    def superuser_client(self):
+        user = self.user_account()
+        role_id = self.fetch("SELECT role_id FROM public.role WHERE role_code = 'superuser' LIMIT 1")
+        PersonRoleMapping.objects.create(
+            role_id=role_id[0][0] if role_id else self.role("superuser"), person_id=user.person_id
+        )
+        client = APIClient()
+        client.force_authenticate(UserAccount.objects.get(pk=user.pk))
+        return client
+
+    def item_model(self, kind):
+        type_id = self.insert(f"{kind}_type", f"{kind}_type_id", **{f"{kind}_type_label": "Test type"})
+        brand_id = self.insert(f"{kind}_brand", f"{kind}_brand_id", brand_name="Test brand")
+        return self.insert(
+            f"{kind}_model",
+            f"{kind}_model_id",
+            **{f"{kind}_type_id": type_id, f"{kind}_brand_id": brand_id},
+            model_name="Test model",
+        )
+
+    def item(self, kind, model_id=None, location_id=None, **values):
+        item_id = self.insert(
+            kind,
+            f"{kind}_id",
+            **{f"{kind}_model_id": model_id or self.item_model(kind), f"{kind}_status": "in_stock"},
+            **values,
+        )
+        if location_id is not None:
+            self.move(kind, item_id, location_id, location_id)
+        return item_id
+
+    def move(self, kind, item_id, source_location_id, destination_location_id, **values):
+        values.setdefault("movement_reason", "test")
+        return self.insert(
+            f"{kind}_movement",
+            f"{kind}_movement_id",
+            **{f"{kind}_id": item_id},
+            source_location_id=source_location_id,
+            destination_location_id=destination_location_id,
+            movement_datetime=timezone.now(),
+            status="accepted",
+            **values,
+        )
+
+    def mount(self, kind, asset_id, item_id, **values):
+        self.insert(
+            f"asset_is_composed_of_{kind}_history",
+            **{f"{kind}_id": item_id},
+            asset_id=asset_id,
+            start_datetime=timezone.now(),
+            **values,
+        )
+
+    def purchase_order(self, kind, lines):
+        """Create a purchase order with ``{model_id: (quantity_ordered, quantity_received)}`` lines."""
+
+        supplier_id = self.fetch("SELECT COALESCE(MAX(supplier_id), 0) + 1 FROM public.supplier")[0][0]
+        self.insert("supplier", supplier_id=supplier_id, supplier_name="Test supplier")
+        purchase_order_id = self.insert("purchase_order", "purchase_order_id", supplier_id=supplier_id)
+        for model_id, (ordered, received) in lines.items():
+            self.insert(
+                f"{kind}_model_is_found_in_purchase_order",
+                **{f"{kind}_model_id": model_id},
+                purchase_order_id=purchase_order_id,
+                quantity_ordered=ordered,
+                quantity_received=received,
+            )
+        return purchase_order_id
+
+
+class IdAllocationTests(DatabaseFixtures, TestCase):
+    def test_ids_come_from_the_sequence_past_existing_rows(self):
+        highest = self.fetch("SELECT COALESCE(MAX(location_id), 0) FROM public.location")[0][0]
+        ids = allocate_ids(("location", "location_id"), 3)
+        self.assertEqual(len(set(ids)), 3)
+        self.assertGreater(min(ids), highest)
+        self.assertGreater(allocate_id(("location", "location_id")), max(ids))
+
+
+class CascadeAssetMovesTests(DatabaseFixtures, TestCase):
+    def setUp(self):
+        self.source = self.location()
+        self.destination = self.location()
+        self.asset_id = self.item("asset", location_id=self.source)
+
+    def test_open_components_follow_the_asset(self):
+        mounted = self.item("stock_item", location_id=self.source)
+        self.mount("stock_item", self.asset_id, mounted)
+        never_moved = self.item("consumable")
+        self.mount("consumable", self.asset_id, never_moved)
+        removed = self.item("stock_item", location_id=self.source)
+        self.mount("stock_item", self.asset_id, removed, end_datetime=timezone.now())
+
+        result = cascade_asset_moves(
+            {self.asset_id: self.source},
+            destination_location_id=self.destination,
+            movement_reason="test",
+            movement_datetime=timezone.now(),
+        )
+
+        self.assertEqual(len(result["stock_item_movement_ids"]), 1)
+        self.assertEqual(len(result["consumable_movement_ids"]), 1)
+        movement = StockItemMovement.objects.get(pk=result["stock_item_movement_ids"][0])
+        self.assertEqual(
+            (movement.stock_item_id, movement.source_location_id, movement.destination_location_id),
+            (mounted, self.source, self.destination),
+        )
+        self.assertEqual(current_location_id("stock_item", mounted), self.destination)
+        # Components without history of their own leave from the asset's location.
+        self.assertEqual(
+            self.fetch(
+                "SELECT source_location_id FROM public.consumable_movement WHERE consumable_movement_id = %s",
+                result["consumable_movement_ids"],
+            ),
+            [(self.source,)],
+        )
+        self.assertEqual(current_location_id("stock_item", removed), self.source)
+
+    def test_components_already_at_the_destination_are_skipped(self):
+        there = self.item("stock_item", location_id=self.destination)
+        self.mount("stock_item", self.asset_id, there)
+        result = cascade_asset_moves(
+            {self.asset_id: self.source},
+            destination_location_id=self.destination,
+            movement_reason="test",
+            movement_datetime=timezone.now(),
+        )
+        self.assertEqual(result, {"stock_item_movement_ids": [], "consumable_movement_ids": []})
+
+    def test_bulk_move_moves_assets_and_their_components(self):
+        other_asset_id = self.item("asset", location_id=self.source)
+        already_there = self.item("asset", location_id=self.destination)
+        mounted = self.item("stock_item", location_id=self.source)
+        self.mount("stock_item", other_asset_id, mounted)
+
+        result = bulk_move_assets(
+            destination_location_id=self.destination,
+            movement_reason="test",
+            asset_ids=[self.asset_id, other_asset_id, already_there],
+        )
+
+        self.assertEqual((result["moved_count"], result["skipped_count"]), (2, 1))
+        self.assertEqual(len(result["stock_item_movement_ids"]), 1)
+        for item_kind, item_id in (("asset", self.asset_id), ("asset", other_asset_id), ("stock_item", mounted)):
+            self.assertEqual(current_location_id(item_kind, item_id), self.destination)
+
+    def test_move_endpoints_share_the_role_check(self):
+        client = APIClient()
+        client.force_authenticate(self.user_account())
+        payload = {"destination_location_id": self.destination, "asset_ids": [self.asset_id]}
+        for url in (f"/api/assets/{self.asset_id}/move/", "/api/assets/bulk-move/"):
+            with self.subTest(url=url):
+                self.assertEqual(client.post(url, payload, format="json").status_code, 403)
+
+        user = self.user_account()
+        PersonRoleMapping.objects.create(role_id=self.role("asset_responsible"), person_id=user.person_id)
+        client.force_authenticate(UserAccount.objects.get(pk=user.pk))
+        response = client.post("/api/assets/bulk-move/", payload, format="json")
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(current_location_id("asset", self.asset_id), self.destination)
+
+
+class MovementRequestLinkTests(DatabaseFixtures, TestCase):
+    def setUp(self):
+        self.location_id = self.location()
+        self.stock_item_id = self.item("stock_item")
+
+    def link(self, movement_id):
+        return StockItemMovement.objects.filter(pk=movement_id).values_list("request_kind", "maintenance_id").get()
+
+    def test_legacy_reasons_fill_the_typed_columns(self):
+        for reason, expected in (
+            ("maintenance_create_42", ("maintenance_create", 42)),
+            ("problem_report_include_7", ("problem_report_include", 7)),
+            ("problem_report_include", ("problem_report_include", None)),
+            ("return_to_owner", ("return_to_owner", None)),
+            ("manual transfer", (None, None)),
+        ):
+            with self.subTest(reason=reason):
+                movement_id = self.move(
+                    "stock_item", self.stock_item_id, self.location_id, self.location_id, movement_reason=reason
+                )
+                self.assertEqual(self.link(movement_id), expected)
+
+    def test_explicit_values_are_kept(self):
+        movement_id = self.move(
+            "stock_item",
+            self.stock_item_id,
+            self.location_id,
+            self.location_id,
+            movement_reason="maintenance_create_42",
+            request_kind="problem_report_include",
+            maintenance_id=9,
+        )
+        self.assertEqual(self.link(movement_id), ("problem_report_include", 9))
+
+
+class ReceiveQuantitiesTests(DatabaseFixtures, TestCase):
+    def setUp(self):
+        self.model_id = self.item_model("stock_item")
+        self.purchase_order_id = self.purchase_order("stock_item", {self.model_id: (5, 1)})
+
+    def received(self):
+        return self.fetch(
+            """
+            SELECT quantity_received FROM public.stock_item_model_is_found_in_purchase_order
+            WHERE purchase_order_id = %s AND stock_item_model_id = %s
+            """,
+            [self.purchase_order_id, self.model_id],
+        )[0][0]
+
+    def test_receipt_updates_the_line_and_the_summary(self):
+        self.assertEqual(receive_quantities(self.purchase_order_id, "stock_item", {self.model_id: 3}), [])
+        self.assertEqual(self.received(), 4)
+        summary = PurchaseOrderSummary.objects.get(pk=self.purchase_order_id)
+        self.assertEqual(
+            (summary.quantity_ordered, summary.quantity_received, summary.quantity_remaining, summary.has_remaining),
+            (5, 4, 1, True),
+        )
+
+    def test_over_receipt_and_unknown_lines_are_returned_untouched(self):
+        unknown_model_id = self.item_model("stock_item")
+        rejected = receive_quantities(self.purchase_order_id, "stock_item", {self.model_id: 5, unknown_model_id: 1})
+        self.assertEqual(
+            rejected,
+            [
+                {"model_id": self.model_id, "quantity_ordered": 5, "quantity_received": 1, "newly_received": 5},
+                {"model_id": unknown_model_id, "quantity_ordered": None, "quantity_received": 0, "newly_received": 1},
+            ],
+        )
+        self.assertEqual(self.received(), 1)
+
+
+class MaterializeItemsTests(DatabaseFixtures, TestCase):
+    def setUp(self):
+        self.location_id = self.location()
+        self.model_id = self.item_model("stock_item")
+        self.purchase_order_id = self.purchase_order("stock_item", {self.model_id: (3, 2)})
+
+    def materialize(self, **line):
+        return materialize_items(
+            self.purchase_order_id,
+            location_id=self.location_id,
+            lines={"stock_item": [{"model_id": self.model_id, **line}]},
+        )
+
+    def test_received_units_become_items_once(self):
+        definition_id = self.insert(
+            "stock_item_attribute_definition", "stock_item_attribute_definition_id", description="Capacity"
+        )
+        self.insert(
+            "stock_item_model_attribute_value",
+            stock_item_attribute_definition_id=definition_id,
+            stock_item_model_id=self.model_id,
+            value_string="512 GB",
+        )
+
+        result = self.materialize()["stock_item"]
+        self.assertEqual(result["created_count"], 2)
+        self.assertEqual(result["attribute_values_created"], 2)
+        items = StockItem.objects.filter(pk__in=result["stock_item_ids"])
+        for item in items:
+            self.assertEqual(item.stock_item_model_id, self.model_id)
+            self.assertEqual(len(item.stock_item_inventory_number), 6)
+            self.assertEqual(current_location_id("stock_item", item.pk), self.location_id)
+        self.assertEqual(
+            [row["stock_item_id"] for row in available_items("stock_item", self.model_id)],
+            sorted(result["stock_item_ids"]),
+        )
+
+        with self.assertRaises(ValidationError):
+            self.materialize()
+        self.assertEqual(StockItem.objects.filter(stock_item_model_id=self.model_id).count(), 2)
+
+    def test_malformed_or_taken_instances_are_refused(self):
+        taken = self.item("stock_item", stock_item_inventory_number="T00001")
+        for instances in (
+            ["not an object"],
+            [{"stock_item_name": 42}],
+            [{"stock_item_inventory_number": "1234567"}],
+            [{"stock_item_name": "x" * 49}],
+            [{"stock_item_inventory_number": "D00001"}, {"stock_item_inventory_number": "D00001"}],
+            [{"stock_item_inventory_number": "T00001"}],
+        ):
+            with self.subTest(instances=instances), self.assertRaises(ValidationError):
+                self.materialize(instances=instances)
+        self.assertEqual(StockItem.objects.filter(stock_item_model_id=self.model_id).count(), 0)
+        self.assertTrue(StockItem.objects.filter(pk=taken).exists())
+
+    def test_generated_numbers_skip_the_given_ones(self):
+        upcoming = str(int(allocate_inventory_numbers("stock_item", 1)[0]) + 1).zfill(6)
+        result = self.materialize(instances=[{"stock_item_inventory_number": upcoming}])["stock_item"]
+        numbers = sorted(
+            StockItem.objects.filter(pk__in=result["stock_item_ids"]).values_list("stock_item_inventory_number", flat=True)
+        )
+        self.assertEqual(len(set(numbers)), 2)
+        self.assertIn(upcoming, numbers)
+
+    def test_quantity_is_capped_by_unmaterialized_units(self):
+        self.assertEqual(self.materialize(quantity=1)["stock_item"]["created_count"], 1)
+        with self.assertRaises(ValidationError):
+            self.materialize(quantity=2)
+        self.assertEqual(self.materialize()["stock_item"]["created_count"], 1)
+
+
+class SpareAvailabilityTests(DatabaseFixtures, TestCase):
+    def setUp(self):
+        self.location_id = self.location()
+        self.model_id = self.item_model("stock_item")
+
+    def available(self):
+        return [row["stock_item_id"] for row in available_items("stock_item", self.model_id)]
+
+    def test_triggers_track_spares(self):
+        spare = self.item("stock_item", self.model_id)
+        self.assertEqual(self.available(), [])
+        self.move("stock_item", spare, self.location_id, self.location_id)
+        self.assertEqual(self.available(), [spare])
+
+        asset_id = self.item("asset", location_id=self.location_id)
+        self.mount("stock_item", asset_id, spare)
+        self.assertEqual(self.available(), [])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE public.asset_is_composed_of_stock_item_history SET end_datetime = now() WHERE stock_item_id = %s",
+                [spare],
+            )
+        self.assertEqual(self.available(), [spare])
+
+        StockItem.objects.filter(pk=spare).update(stock_item_status="destroyed")
+        self.assertEqual(self.available(), [])
+
+    def request(self):
+        person_id = self.person()
+        asset_id = self.item("asset", location_id=self.location_id)
+        maintenance_id = self.insert(
+            "maintenance", "maintenance_id", asset_id=asset_id,
+            performed_by_person_id=person_id, approved_by_maintenance_chief_id=person_id,
+        )
+        typical_step_id = self.fetch(
+            "SELECT COALESCE(MAX(maintenance_typical_step_id), 0) + 1 FROM public.maintenance_typical_step"
+        )[0][0]
+        self.insert("maintenance_typical_step", maintenance_typical_step_id=typical_step_id, maintenance_domain="it")
+        step_id = self.insert(
+            "maintenance_step", "maintenance_step_id", maintenance_id=maintenance_id,
+            maintenance_typical_step_id=typical_step_id, person_id=person_id,
+        )
+        return self.insert(
+            "maintenance_step_item_request", "maintenance_step_item_request_id",
+            maintenance_step_id=step_id, requested_by_person_id=person_id, request_type="stock_item",
+            status="pending", created_at=timezone.now(), requested_stock_item_model_id=self.model_id,
+        )
+
+    def test_reservations_hand_out_each_spare_once(self):
+        spares = {self.item("stock_item", self.model_id, self.location_id) for _ in range(2)}
+        first, second, third = self.request(), self.request(), self.request()
+
+        picked = {reserve_random_item("stock_item", self.model_id, request_id=r)["stock_item_id"] for r in (first, second)}
+        self.assertEqual(picked, spares)
+        self.assertIsNone(reserve_random_item("stock_item", self.model_id, request_id=third))
+        self.assertEqual(self.available(), [])
+        self.assertEqual(len(available_items("stock_item", self.model_id, request_id=first)), 1)
+
+        # Picking again for a request releases its earlier reservation first.
+        again = reserve_random_item("stock_item", self.model_id, request_id=first)
+        self.assertIn(again["stock_item_id"], spares)
+        self.assertEqual(self.fetch(
+            "SELECT count(*) FROM public.spare_reservation WHERE maintenance_step_item_request_id = %s", [first]
+        ), [(1,)])
+
+    def test_random_pick_wraps_around_the_id_range(self):
+        spares = []
+        for _ in range(3):
+            spare = self.item("stock_item", self.model_id)
+            self.move("stock_item", spare, self.location_id, self.location_id)
+            spares.append(spare)
+        first, second = self.request(), self.request()
+        with mock.patch("api.availability.random.randint", return_value=spares[-1]):
+            self.assertEqual(reserve_random_item("stock_item", self.model_id, request_id=first)["stock_item_id"], spares[-1])
+            self.assertEqual(reserve_random_item("stock_item", self.model_id, request_id=second)["stock_item_id"], spares[0])
+
+
+class TokenRefreshTests(DatabaseFixtures, TestCase):
+    def setUp(self):
+        self.user = self.user_account()
+        self.refresh = mint_tokens(load_principal(self.user))
+
+    def post_refresh(self):
+        return APIClient().post("/api/auth/refresh/", {"refresh": str(self.refresh)}, format="json")
+
+    def test_role_changes_re_mint_tokens_with_the_current_roles(self):
+        role_id = self.role("test_refresh_role")
+        PersonRoleMapping.objects.create(role_id=role_id, person_id=self.user.person_id)
+        with self.assertRaises(AuthenticationFailed):
+            principal_from_claims(self.refresh.access_token)
+
+        response = self.post_refresh()
+        self.assertEqual(response.status_code, 200)
+        access = RefreshToken(response.data["refresh"]).access_token
+        self.assertEqual(access[ROLES_CLAIM], ["test_refresh_role"])
+        self.assertEqual(principal_from_claims(access).role_codes, {"test_refresh_role"})
+
+    def test_password_and_status_changes_revoke_refresh_tokens(self):
+        for field, values in (("password_hash", ["y"]), ("account_status", ["disabled", "active"])):
+            with self.subTest(field=field):
+                for value in values:
+                    setattr(self.user, field, value)
+                    self.user.save(update_fields=[field])
+                response = self.post_refresh()
+                self.assertEqual(response.status_code, 401)
+                self.assertEqual(response.data["code"], "credentials_changed")
+                self.refresh = mint_tokens(load_principal(UserAccount.objects.get(pk=self.user.pk)))
+                self.assertEqual(self.post_refresh().status_code, 200)
+
+
+class BulkCreateItemsTests(DatabaseFixtures, TestCase):
+    def setUp(self):
+        self.client = self.superuser_client()
+        self.asset_model_id = self.item_model("asset")
+
+    def bulk_create(self, *rows):
+        return self.client.post("/api/assets/bulk-create/", {"items": list(rows)}, format="json")
+
+    def row(self, **values):
+        return {"asset_model": self.asset_model_id, "asset_name": "Bulk asset", **values}
+
+    def test_workflow_statuses_and_included_items_are_refused(self):
+        for bad_row in (
+            self.row(asset_status="Destroyed"),
+            self.row(asset_status="failed"),
+            self.row(included_stock_items=[{"stock_item_model": self.item_model("stock_item"), "quantity": 1}]),
+        ):
+            with self.subTest(row=bad_row):
+                response = self.bulk_create(self.row(), bad_row)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.data[0], {})
+                self.assertTrue(response.data[1])
+        self.assertFalse(Asset.objects.filter(asset_model_id=self.asset_model_id).exists())
+
+    def test_assets_of_an_attribution_order_get_the_default_composition(self):
+        stock_item_model_id = self.item_model("stock_item")
+        self.insert(
+            "asset_model_default_stock_item",
+            asset_model_id=self.asset_model_id,
+            stock_item_model_id=stock_item_model_id,
+            quantity=2,
+        )
+        warehouse_id = self.insert("warehouse", "warehouse_id", warehouse_name="Test warehouse")
+        attribution_order_id = self.insert("attribution_order", "attribution_order_id", warehouse_id=warehouse_id)
+
+        response = self.bulk_create(self.row(attribution_order=attribution_order_id), self.row())
+        self.assertEqual(response.status_code, 201)
+        ordered, loose = response.data["asset_ids"]
+        composed = StockItem.objects.filter(composition_history__asset_id=ordered, composition_history__end_datetime=None)
+        self.assertEqual(composed.count(), 2)
+        self.assertEqual({item.stock_item_model_id for item in composed}, {stock_item_model_id})
+        self.assertEqual({item.stock_item_status for item in composed}, {"Included with Asset"})
+        self.assertFalse(StockItem.objects.filter(composition_history__asset_id=loose).exists())
+
+
+class MaintenanceResponseTests(DatabaseFixtures, TestCase):
+    def setUp(self):
+        self.client = self.superuser_client()
+        type_id = self.fetch("SELECT COALESCE(MAX(location_type_id), 0) + 1 FROM public.location_type")[0][0]
+        self.insert(
+            "location_type", location_type_id=type_id, location_type_label="Maintenance room", location_type_code="MR"
+        )
+        location_id = self.insert("location", "location_id", location_name="Workshop", location_type_id=type_id)
+        self.asset_id = self.item("asset", location_id=location_id)
+
+    def test_single_maintenance_responses_carry_the_step_flags(self):
+        response = self.client.post(
+            "/api/maintenances/create-direct/",
+            {"asset_id": self.asset_id, "technician_person_id": self.person()},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data["step_count"], 0)
+        self.assertIs(response.data["has_steps"], False)
+        self.assertIsNone(response.data["last_step_status"])
+
+        response = self.client.post(f"/api/maintenances/{response.data['maintenance_id']}/end/", {}, format="json")
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data["step_count"], 0)
+        self.assertIsNotNone(response.data["end_datetime"])
@@ -0,0 +1,67 @@
+"""JWT minting with person and role claims.
+
+Tokens carry ``person_id``, ``roles`` and the account's ``roles_epoch`` and
+``credentials_epoch``. Database triggers (migrations 0028 and 0039) bump the
+roles epoch whenever the person's role mappings, the account status or the
+password change, so an access token minted before such a change is rejected
+with ``roles_changed`` and the client asks ``auth/refresh/`` for a new one,
+minted with the current roles. Status and password changes also bump the
+credentials epoch, which revokes every refresh token minted before them: the
+client has to log in again. ``auth/change-password/`` returns a fresh pair for
+the caller.
+"""
+
+from rest_framework import exceptions
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import UserAccount
+from .principal import Principal, current_roles_epoch
+
+ROLES_CLAIM = "roles"
+PERSON_CLAIM = "person_id"
+ROLES_EPOCH_CLAIM = "roles_epoch"
+CREDENTIALS_EPOCH_CLAIM = "credentials_epoch"
+
+
+def mint_tokens(principal: Principal) -> RefreshToken:
+    """Return a refresh token (and, through ``.access_token``, an access token) for ``principal``."""
+
+    user = principal.user
+    refresh = RefreshToken()
+    refresh["user_id"] = user.user_id
+    refresh["username"] = user.username
+    refresh["is_superuser"] = principal.is_superuser
+    refresh[PERSON_CLAIM] = user.person_id
+    refresh[ROLES_CLAIM] = sorted(principal.role_codes)
+    refresh[ROLES_EPOCH_CLAIM] = user.roles_epoch
+    refresh[CREDENTIALS_EPOCH_CLAIM] = user.credentials_epoch
+    return refresh
+
+
+def principal_from_claims(validated_token) -> Principal | None:
+    """Build a principal from token claims without touching the database.
+
+    Returns None for tokens minted without role claims. Raises
+    ``AuthenticationFailed`` when the account is gone or its roles epoch moved on.
+    """
+
+    if ROLES_CLAIM not in validated_token or ROLES_EPOCH_CLAIM not in validated_token:
+        return None
+
+    user_id = validated_token.get("user_id")
+    epoch = current_roles_epoch(user_id)
+    if epoch is None:
+        raise exceptions.AuthenticationFailed("User not found", code="user_not_found")
+    if epoch != validated_token[ROLES_EPOCH_CLAIM]:
+        raise exceptions.AuthenticationFailed("Roles changed, refresh the access token", code="roles_changed")
+
+    user = UserAccount(
+        user_id=user_id,
+        person_id=validated_token.get(PERSON_CLAIM),
+        username=validated_token.get("username") or "",
+        roles_epoch=epoch,
+    )
+    # Behave like a row loaded from the database (e.g. for lazy FK access).
+    user._state.adding = False
+    user._state.db = "default"
+    return Principal(user, validated_token[ROLES_CLAIM])
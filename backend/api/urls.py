@@ -1,6 +1,6 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
-from .views import LoginView, ChangePasswordView, AdminResetUserPasswordView, PersonViewSet, AssetTypeViewSet, AssetBrandViewSet, AssetModelViewSet, AssetModelDefaultStockItemViewSet, AssetModelDefaultConsumableViewSet, AssetViewSet, AssetIsAssignedToPersonViewSet, StockItemIsAssignedToPersonViewSet, ConsumableIsAssignedToPersonViewSet, StockItemTypeViewSet, StockItemBrandViewSet, StockItemModelViewSet, StockItemViewSet, ConsumableTypeViewSet, ConsumableBrandViewSet, ConsumableModelViewSet, ConsumableViewSet, AssetAttributeDefinitionViewSet, AssetTypeAttributeViewSet, AssetModelAttributeValueViewSet, AssetAttributeValueViewSet, StockItemAttributeDefinitionViewSet, StockItemTypeAttributeViewSet, StockItemModelAttributeValueViewSet, StockItemAttributeValueViewSet, ConsumableAttributeDefinitionViewSet, ConsumableTypeAttributeViewSet, ConsumableModelAttributeValueViewSet, ConsumableAttributeValueViewSet, MaintenanceViewSet, MaintenanceStepViewSet, MaintenanceTypicalStepViewSet, MaintenanceStepItemRequestViewSet, ProblemReportViewSet, MyItemsView, LocationTypeViewSet, LocationViewSet, PhysicalConditionViewSet, PositionViewSet, OrganizationalStructureViewSet, OrganizationalStructureRelationViewSet, WarehouseViewSet, AttributionOrderViewSet, AttributionOrderAssetStockItemAccessoryViewSet, AttributionOrderAssetConsumableAccessoryViewSet, ReceiptReportViewSet, AdministrativeCertificateViewSet, StockItemConsumableDestructionCertificateViewSet, AssetDestructionCertificateViewSet, CompanyAssetRequestViewSet, ExternalMaintenanceProviderViewSet, ExternalMaintenanceTypicalStepViewSet, ExternalMaintenanceViewSet, ExternalMaintenanceStepViewSet, AssetMaintenanceTimelineView, StockItemMovementApprovalViewSet, ConsumableMovementApprovalViewSet, AssetMovementApprovalViewSet, PurchaseOrderViewSet, BackorderReportViewSet
+from .views import LoginView, TokenRefreshView, ChangePasswordView, AdminResetUserPasswordView, PrincipalCacheStatsView, PersonViewSet, AssetTypeViewSet, AssetBrandViewSet, AssetModelViewSet, AssetModelDefaultStockItemViewSet, AssetModelDefaultConsumableViewSet, AssetViewSet, AssetIsAssignedToPersonViewSet, StockItemIsAssignedToPersonViewSet, ConsumableIsAssignedToPersonViewSet, StockItemTypeViewSet, StockItemBrandViewSet, StockItemModelViewSet, StockItemViewSet, ConsumableTypeViewSet, ConsumableBrandViewSet, ConsumableModelViewSet, ConsumableViewSet, AssetAttributeDefinitionViewSet, AssetTypeAttributeViewSet, AssetModelAttributeValueViewSet, AssetAttributeValueViewSet, StockItemAttributeDefinitionViewSet, StockItemTypeAttributeViewSet, StockItemModelAttributeValueViewSet, StockItemAttributeValueViewSet, ConsumableAttributeDefinitionViewSet, ConsumableTypeAttributeViewSet, ConsumableModelAttributeValueViewSet, ConsumableAttributeValueViewSet, MaintenanceViewSet, MaintenanceStepViewSet, MaintenanceTypicalStepViewSet, MaintenanceStepItemRequestViewSet, SpareAvailabilityViewSet, ProblemReportViewSet, MyItemsView, LocationTypeViewSet, LocationViewSet, PhysicalConditionViewSet, PositionViewSet, OrganizationalStructureViewSet, OrganizationalStructureRelationViewSet, WarehouseViewSet, AttributionOrderViewSet, AttributionOrderAssetStockItemAccessoryViewSet, AttributionOrderAssetConsumableAccessoryViewSet, ReceiptReportViewSet, AdministrativeCertificateViewSet, StockItemConsumableDestructionCertificateViewSet, AssetDestructionCertificateViewSet, CompanyAssetRequestViewSet, ExternalMaintenanceProviderViewSet, ExternalMaintenanceTypicalStepViewSet, ExternalMaintenanceViewSet, ExternalMaintenanceStepViewSet, AssetMaintenanceTimelineView, StockItemMovementApprovalViewSet, ConsumableMovementApprovalViewSet, AssetMovementApprovalViewSet, PurchaseOrderViewSet, BackorderReportViewSet, BackgroundJobViewSet
 
 router = DefaultRouter()
 router.register(r'persons', PersonViewSet, basename='person')
@@ -36,6 +36,7 @@ router.register(r'consumables', ConsumableViewSet, basename='consumable')
 router.register(r'maintenances', MaintenanceViewSet, basename='maintenance')
 router.register(r'maintenance-steps', MaintenanceStepViewSet, basename='maintenancestep')
 router.register(r'maintenance-step-item-requests', MaintenanceStepItemRequestViewSet, basename='maintenancestepitemrequest')
+router.register(r'spare-availability', SpareAvailabilityViewSet, basename='spareavailability')
 router.register(r'maintenance-typical-steps', MaintenanceTypicalStepViewSet, basename='maintenancetypicalstep')
 router.register(r'problem-reports', ProblemReportViewSet, basename='problemreport')
 router.register(r'location-types', LocationTypeViewSet, basename='locationtype')
@@ -62,14 +63,17 @@ router.register(r'consumable-movements-approval', ConsumableMovementApprovalView
 router.register(r'asset-movements-approval', AssetMovementApprovalViewSet, basename='assetmovementapproval')
 router.register(r'purchase-orders', PurchaseOrderViewSet, basename='purchaseorder')
 router.register(r'backorder-reports', BackorderReportViewSet, basename='backorderreport')
+router.register(r'jobs', BackgroundJobViewSet, basename='backgroundjob')
 
 urlpatterns = [
     path('auth/login/', LoginView.as_view(), name='login'),
+    path('auth/refresh/', TokenRefreshView.as_view(), name='token-refresh'),
     path('my-items/', MyItemsView.as_view(), name='my-items'),
     path('asset-maintenance-timeline/', AssetMaintenanceTimelineView.as_view(), name='asset-maintenance-timeline'),
     path('asset-maintenance-timeline/<int:asset_id>/', AssetMaintenanceTimelineView.as_view(), name='asset-maintenance-timeline-detail'),
     path('auth/change-password/', ChangePasswordView.as_view(), name='change-password'),
     path('auth/admin-reset-password/', AdminResetUserPasswordView.as_view(), name='admin-reset-password'),
+    path('auth/principal-cache-stats/', PrincipalCacheStatsView.as_view(), name='principal-cache-stats'),
     # All endpoints have been restored and are now available
     path('', include(router.urls)),
 ]
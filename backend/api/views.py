@@ -9,17 +9,19 @@ from decimal import Decimal
 from django.utils import timezone
 from django.db import connection
 from django.db import transaction
-from django.db.models import OuterRef, Subquery, Q
+from django.db.models import Count, Exists, OuterRef, Prefetch, Subquery, Q
+from django.db.models.functions import Coalesce
 from rest_framework import status, viewsets
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from django.http import FileResponse
 from django.conf import settings
 from django.db import IntegrityError
 from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.decorators import action
+from rest_framework.utils.urls import remove_query_param
 
 from .models import (
     Asset,
@@ -84,11 +86,13 @@ from .models import (
     AssetIsComposedOfConsumableHistory,
     AttributionOrderAssetStockItemAccessory,
     AttributionOrderAssetConsumableAccessory,
-    ConsumableIsUsedInStockItemHistory,
     StockItemMovement,
     ConsumableMovement,
     MaintenanceStepItemRequest,
     AssetMovement,
+    AssetCurrentLocation,
+    StockItemCurrentLocation,
+    ConsumableCurrentLocation,
     PhysicalCondition,
     AssetConditionHistory,
     ExternalMaintenanceProvider,
@@ -97,43 +101,42 @@ from .models import (
     ExternalMaintenanceTypicalStep,
     ExternalMaintenanceDocument,
     MaintenanceStepAttributeChange,
+    BackgroundJob,
 )
 
+from .attributes import propagate_model_attributes, propagate_type_attributes
+from .auth_audit import LOGIN_FAILURE, LOGIN_SUCCESS, THROTTLED, client_address, record_login, throttle_delay
+from .availability import (
+    SPARE_KINDS,
+    availability_counts,
+    available_items,
+    release_reservation,
+    reservation_conflict,
+    reserve_random_item,
+)
+from .cascade import bulk_move_assets, cascade_asset_moves, cascade_stock_item_moves
+from .documents import InvalidDocument, serve_document, store_pdf
+from .ids import allocate_id, allocate_ids
+from .jobs import enqueue
+from .locations import current_location, current_location_id, current_location_ids
+from .pagination import KeysetPagination, decode_cursor, encode_cursor, next_page_link, page_size_from
+from .principal import get_principal, load_principal, principal_cache_stats
+from .problem_reports import REPORT_TABLES, decode_feed_cursor, encode_feed_cursor, naive_utc, problem_report_feed
+from .purchasing import (
+    create_backorder_report,
+    lock_purchase_order,
+    materialize_items,
+    receive_quantities,
+    received_items,
+)
+from .tokens import CREDENTIALS_EPOCH_CLAIM, mint_tokens
 from .serializers import StockItemConsumableDestructionCertificateSerializer, AssetDestructionCertificateSerializer
 
 
-def _parse_default_value(data_type: str | None, default_value: str | None):
-    if default_value is None:
-        return {"value_bool": None, "value_string": None, "value_number": None, "value_date": None}
-
-    dt = (data_type or "").strip().lower()
-    raw = default_value.strip()
-
-    if dt in {"bool", "boolean"}:
-        if raw.lower() in {"true", "1", "yes", "y", "t"}:
-            return {"value_bool": True, "value_string": None, "value_number": None, "value_date": None}
-        if raw.lower() in {"false", "0", "no", "n", "f"}:
-            return {"value_bool": False, "value_string": None, "value_number": None, "value_date": None}
-        return {"value_bool": None, "value_string": raw, "value_number": None, "value_date": None}
-
-    if dt in {"number", "numeric", "decimal", "int", "integer", "float", "double"}:
-        try:
-            return {"value_bool": None, "value_string": None, "value_number": Decimal(raw), "value_date": None}
-        except Exception:
-            return {"value_bool": None, "value_string": raw, "value_number": None, "value_date": None}
-
-    if dt in {"date"}:
-        try:
-            return {
-                "value_bool": None,
-                "value_string": None,
-                "value_number": None,
-                "value_date": datetime.date.fromisoformat(raw),
-            }
-        except Exception:
-            return {"value_bool": None, "value_string": raw, "value_number": None, "value_date": None}
+def _can_move_assets(principal) -> bool:
+    """Asset responsibles, their chiefs and superusers may move assets (move and bulk-move)."""
 
-    return {"value_bool": None, "value_string": raw, "value_number": None, "value_date": None}
+    return principal.has_any_role("asset_responsible", "exploitation_chief", "it_bureau_chief")
 
 
 def _cascade_move_composed_items(
@@ -146,67 +149,15 @@ def _cascade_move_composed_items(
     maintenance_step_id=None,
     external_maintenance_step_id=None,
 ):
-    stock_item_ids = list(
-        AssetIsComposedOfStockItemHistory.objects.filter(asset_id=asset_id, end_datetime__isnull=True).values_list(
-            "stock_item_id", flat=True
-        )
-    )
-    consumable_ids = list(
-        AssetIsComposedOfConsumableHistory.objects.filter(asset_id=asset_id, end_datetime__isnull=True).values_list(
-            "consumable_id", flat=True
-        )
+    return cascade_asset_moves(
+        {asset_id: source_location_id},
+        destination_location_id=destination_location_id,
+        movement_reason=movement_reason,
+        movement_datetime=movement_datetime,
+        maintenance_step_id=maintenance_step_id,
+        external_maintenance_step_id=external_maintenance_step_id,
     )
 
-    last_stock_move = StockItemMovement.objects.order_by("-stock_item_movement_id").first()
-    next_stock_move_id = (last_stock_move.stock_item_movement_id + 1) if last_stock_move else 1
-
-    for stock_item_id in stock_item_ids:
-        last_move = (
-            StockItemMovement.objects.filter(stock_item_id=stock_item_id)
-            .order_by("-stock_item_movement_id")
-            .first()
-        )
-        current_location_id = last_move.destination_location_id if last_move else source_location_id
-        if current_location_id == destination_location_id:
-            continue
-
-        StockItemMovement.objects.create(
-            stock_item_movement_id=next_stock_move_id,
-            stock_item_id=stock_item_id,
-            source_location_id=current_location_id,
-            destination_location_id=destination_location_id,
-            maintenance_step_id=maintenance_step_id,
-            external_maintenance_step_id=external_maintenance_step_id,
-            movement_reason=movement_reason,
-            movement_datetime=movement_datetime,
-        )
-        next_stock_move_id += 1
-
-    last_consumable_move = ConsumableMovement.objects.order_by("-consumable_movement_id").first()
-    next_consumable_move_id = (last_consumable_move.consumable_movement_id + 1) if last_consumable_move else 1
-
-    for consumable_id in consumable_ids:
-        last_move = (
-            ConsumableMovement.objects.filter(consumable_id=consumable_id)
-            .order_by("-consumable_movement_id")
-            .first()
-        )
-        current_location_id = last_move.destination_location_id if last_move else source_location_id
-        if current_location_id == destination_location_id:
-            continue
-
-        ConsumableMovement.objects.create(
-            consumable_movement_id=next_consumable_move_id,
-            consumable_id=consumable_id,
-            source_location_id=current_location_id,
-            destination_location_id=destination_location_id,
-            maintenance_step_id=maintenance_step_id,
-            external_maintenance_step_id=external_maintenance_step_id,
-            movement_reason=movement_reason,
-            movement_datetime=movement_datetime,
-        )
-        next_consumable_move_id += 1
-
 
 def _cascade_move_stock_item_consumables(
     *,
@@ -218,271 +169,218 @@ def _cascade_move_stock_item_consumables(
     maintenance_step_id=None,
     external_maintenance_step_id=None,
 ):
-    consumable_ids = list(
-        ConsumableIsUsedInStockItemHistory.objects.filter(
-            stock_item_id=stock_item_id,
-            end_datetime__isnull=True,
-        ).values_list("consumable_id", flat=True)
+    return cascade_stock_item_moves(
+        {stock_item_id: source_location_id},
+        destination_location_id=destination_location_id,
+        movement_reason=movement_reason,
+        movement_datetime=movement_datetime,
+        maintenance_step_id=maintenance_step_id,
+        external_maintenance_step_id=external_maintenance_step_id,
     )
 
-    last_consumable_move = ConsumableMovement.objects.order_by("-consumable_movement_id").first()
-    next_consumable_move_id = (last_consumable_move.consumable_movement_id + 1) if last_consumable_move else 1
 
-    for consumable_id in consumable_ids:
-        last_move = (
-            ConsumableMovement.objects.filter(consumable_id=consumable_id)
-            .order_by("-consumable_movement_id")
-            .first()
-        )
-        current_location_id = last_move.destination_location_id if last_move else source_location_id
-        if current_location_id == destination_location_id:
-            continue
+def _annotate_maintenance_flags(queryset):
+    """Annotate the per-maintenance values MaintenanceSerializer would otherwise query row by row."""
 
-        ConsumableMovement.objects.create(
-            consumable_movement_id=next_consumable_move_id,
-            consumable_id=consumable_id,
-            source_location_id=current_location_id,
-            destination_location_id=destination_location_id,
-            maintenance_step_id=maintenance_step_id,
-            external_maintenance_step_id=external_maintenance_step_id,
-            movement_reason=movement_reason,
-            movement_datetime=movement_datetime,
-        )
-        next_consumable_move_id += 1
+    steps = MaintenanceStep.objects.filter(maintenance_id=OuterRef("pk"))
+    return queryset.annotate(
+        has_steps=Exists(steps),
+        has_external_maintenances=Exists(ExternalMaintenance.objects.filter(maintenance_id=OuterRef("pk"))),
+        step_count=Coalesce(
+            Subquery(steps.order_by().values("maintenance_id").annotate(c=Count("pk")).values("c")[:1]),
+            0,
+        ),
+        last_step_status=Subquery(steps.order_by("-maintenance_step_id").values("maintenance_step_status")[:1]),
+    )
+
+
+def _annotated_maintenance(maintenance_id: int) -> Maintenance:
+    """Reload one maintenance with the annotations MaintenanceSerializer reads."""
+
+    return _annotate_maintenance_flags(
+        Maintenance.objects.select_related("asset", "performed_by_person").filter(maintenance_id=maintenance_id)
+    ).get()
 
 
 def _sync_asset_model_attribute_values(asset_model: AssetModel) -> None:
-    type_attrs = list(
-        AssetTypeAttribute.objects.select_related("asset_attribute_definition")
-        .filter(asset_type_id=asset_model.asset_type_id)
-        .values(
-            "asset_attribute_definition_id",
-            "default_value",
-            "asset_attribute_definition__data_type",
-        )
-    )
-    type_def_ids = {row["asset_attribute_definition_id"] for row in type_attrs}
+    propagate_type_attributes("asset", model_ids=[asset_model.asset_model_id])
 
-    existing_qs = AssetModelAttributeValue.objects.filter(asset_model_id=asset_model.asset_model_id)
-    existing_def_ids = set(existing_qs.values_list("asset_attribute_definition_id", flat=True))
 
-    missing_ids = type_def_ids - existing_def_ids
-    extra_ids = existing_def_ids - type_def_ids
+def _sync_stock_item_model_attribute_values(stock_item_model: StockItemModel) -> None:
+    propagate_type_attributes("stock_item", model_ids=[stock_item_model.stock_item_model_id])
 
-    if extra_ids:
-        existing_qs.filter(asset_attribute_definition_id__in=extra_ids).delete()
 
-    if missing_ids:
-        type_map = {row["asset_attribute_definition_id"]: row for row in type_attrs}
-        for definition_id in missing_ids:
-            row = type_map.get(definition_id)
-            if not row:
-                continue
-            parsed = _parse_default_value(
-                row.get("asset_attribute_definition__data_type"),
-                row.get("default_value"),
-            )
-            instance = AssetModelAttributeValue()
-            instance.asset_model_id = asset_model.asset_model_id
-            instance.asset_attribute_definition_id = definition_id
-            instance.value_bool = parsed["value_bool"]
-            instance.value_string = parsed["value_string"]
-            instance.value_number = parsed["value_number"]
-            instance.value_date = parsed["value_date"]
-            instance.save(force_insert=True)
+def _sync_consumable_model_attribute_values(consumable_model: ConsumableModel) -> None:
+    propagate_type_attributes("consumable", model_ids=[consumable_model.consumable_model_id])
 
 
-def _sync_stock_item_model_attribute_values(stock_item_model: StockItemModel) -> None:
-    type_attrs = list(
-        StockItemTypeAttribute.objects.select_related("stock_item_attribute_definition")
-        .filter(stock_item_type_id=stock_item_model.stock_item_type_id)
-        .values(
-            "stock_item_attribute_definition_id",
-            "default_value",
-            "stock_item_attribute_definition__data_type",
-        )
-    )
-    type_def_ids = {row["stock_item_attribute_definition_id"] for row in type_attrs}
+def _request_flag(request, name: str) -> bool:
+    """Boolean option passed either as a query parameter or in the request body."""
 
-    existing_qs = StockItemModelAttributeValue.objects.filter(stock_item_model_id=stock_item_model.stock_item_model_id)
-    existing_def_ids = set(existing_qs.values_list("stock_item_attribute_definition_id", flat=True))
+    value = request.query_params.get(name)
+    if value is None and hasattr(request.data, "get"):
+        value = request.data.get(name)
+    return str(value).strip().lower() in {"1", "true", "yes"}
 
-    missing_ids = type_def_ids - existing_def_ids
-    extra_ids = existing_def_ids - type_def_ids
 
-    if extra_ids:
-        existing_qs.filter(stock_item_attribute_definition_id__in=extra_ids).delete()
+def _job_response(job, http_status=status.HTTP_202_ACCEPTED):
+    return Response({"job_id": job.job_id, "kind": job.kind, "status": job.status}, status=http_status)
 
-    if missing_ids:
-        type_map = {row["stock_item_attribute_definition_id"]: row for row in type_attrs}
-        for definition_id in missing_ids:
-            row = type_map.get(definition_id)
-            if not row:
-                continue
-            parsed = _parse_default_value(
-                row.get("stock_item_attribute_definition__data_type"),
-                row.get("default_value"),
-            )
-            instance = StockItemModelAttributeValue()
-            instance.stock_item_model_id = stock_item_model.stock_item_model_id
-            instance.stock_item_attribute_definition_id = definition_id
-            instance.value_bool = parsed["value_bool"]
-            instance.value_string = parsed["value_string"]
-            instance.value_number = parsed["value_number"]
-            instance.value_date = parsed["value_date"]
-            instance.save(force_insert=True)
 
+def _sync_asset_attribute_values(*assets: Asset) -> None:
+    propagate_model_attributes("asset", item_ids=[asset.asset_id for asset in assets])
 
-def _sync_consumable_model_attribute_values(consumable_model: ConsumableModel) -> None:
-    type_attrs = list(
-        ConsumableTypeAttribute.objects.select_related("consumable_attribute_definition")
-        .filter(consumable_type_id=consumable_model.consumable_type_id)
-        .values(
-            "consumable_attribute_definition_id",
-            "default_value",
-            "consumable_attribute_definition__data_type",
-        )
-    )
-    type_def_ids = {row["consumable_attribute_definition_id"] for row in type_attrs}
 
-    existing_qs = ConsumableModelAttributeValue.objects.filter(consumable_model_id=consumable_model.consumable_model_id)
-    existing_def_ids = set(existing_qs.values_list("consumable_attribute_definition_id", flat=True))
+def _sync_stock_item_attribute_values(*stock_items: StockItem) -> None:
+    propagate_model_attributes("stock_item", item_ids=[item.stock_item_id for item in stock_items])
 
-    missing_ids = type_def_ids - existing_def_ids
-    extra_ids = existing_def_ids - type_def_ids
 
-    if extra_ids:
-        existing_qs.filter(consumable_attribute_definition_id__in=extra_ids).delete()
+def _sync_consumable_attribute_values(*consumables: Consumable) -> None:
+    propagate_model_attributes("consumable", item_ids=[item.consumable_id for item in consumables])
 
-    if missing_ids:
-        type_map = {row["consumable_attribute_definition_id"]: row for row in type_attrs}
-        for definition_id in missing_ids:
-            row = type_map.get(definition_id)
-            if not row:
-                continue
-            parsed = _parse_default_value(
-                row.get("consumable_attribute_definition__data_type"),
-                row.get("default_value"),
-            )
-            instance = ConsumableModelAttributeValue()
-            instance.consumable_model_id = consumable_model.consumable_model_id
-            instance.consumable_attribute_definition_id = definition_id
-            instance.value_bool = parsed["value_bool"]
-            instance.value_string = parsed["value_string"]
-            instance.value_number = parsed["value_number"]
-            instance.value_date = parsed["value_date"]
-            instance.save(force_insert=True)
-
-
-def _sync_asset_attribute_values(asset: Asset) -> None:
-    model_defs = list(
-        AssetModelAttributeValue.objects.filter(asset_model_id=asset.asset_model_id).values(
-            "asset_attribute_definition_id",
-            "value_bool",
-            "value_string",
-            "value_number",
-            "value_date",
-        )
-    )
-    model_def_ids = {row["asset_attribute_definition_id"] for row in model_defs}
 
-    existing_qs = AssetAttributeValue.objects.filter(asset_id=asset.asset_id)
-    existing_def_ids = set(existing_qs.values_list("asset_attribute_definition_id", flat=True))
+BULK_CREATE_MAX_ITEMS = 1000
 
-    missing_ids = model_def_ids - existing_def_ids
-    extra_ids = existing_def_ids - model_def_ids
+# Statuses items only reach through their workflows, as enforced by the update endpoints.
+RESTRICTED_STATUS_ERRORS = {
+    "failed": "can only be set to failed during external maintenance",
+    "suggested_for_destruction": "can only be set to suggested_for_destruction by a maintenance chief",
+    "destroyed": "can only be set to destroyed by validating a destruction certificate",
+}
+RESTRICTED_STATUSES = {
+    "asset": ("failed", "suggested_for_destruction", "destroyed"),
+    "stock_item": ("suggested_for_destruction", "destroyed"),
+    "consumable": ("suggested_for_destruction", "destroyed"),
+}
 
-    if extra_ids:
-        existing_qs.filter(asset_attribute_definition_id__in=extra_ids).delete()
 
-    if missing_ids:
-        model_map = {row["asset_attribute_definition_id"]: row for row in model_defs}
-        for definition_id in missing_ids:
-            row = model_map.get(definition_id)
-            if not row:
-                continue
-            instance = AssetAttributeValue()
-            instance.asset_attribute_definition_id = definition_id
-            instance.asset_id = asset.asset_id
-            instance.value_bool = row.get("value_bool")
-            instance.value_string = row.get("value_string")
-            instance.value_number = row.get("value_number")
-            instance.value_date = row.get("value_date")
-            instance.save(force_insert=True)
-
-
-def _sync_stock_item_attribute_values(stock_item: StockItem) -> None:
-    model_defs = list(
-        StockItemModelAttributeValue.objects.filter(stock_item_model_id=stock_item.stock_item_model_id).values(
-            "stock_item_attribute_definition_id",
-            "value_bool",
-            "value_string",
-            "value_number",
-            "value_date",
+def _bulk_row_errors(family: str, rows) -> list[dict]:
+    """Per-row errors for fields the single create and update endpoints handle but bulk creation does not."""
+
+    status_field = f"{family}_status"
+    errors = []
+    for data in rows:
+        row_errors = {}
+        value = data.get(status_field)
+        if isinstance(value, str) and value.strip().lower() in RESTRICTED_STATUSES[family]:
+            label = family.replace("_", " ").capitalize()
+            row_errors[status_field] = [f"{label} status {RESTRICTED_STATUS_ERRORS[value.strip().lower()]}."]
+        for field in ("included_stock_items", "included_consumables"):
+            if data.get(field):
+                row_errors[field] = ["Assets with included items must be created one at a time."]
+        errors.append(row_errors)
+    return errors
+
+
+def _create_default_compositions(assets) -> None:
+    """Give each asset with an attribution order the default composition of its model.
+
+    Set-based counterpart of ``AssetViewSet._create_default_composition`` for
+    bulk creation: one query per component kind for the defaults, and one
+    INSERT each for the components and their composition history.
+    """
+
+    assets = [asset for asset in assets if asset.attribution_order_id and asset.asset_model_id]
+    if not assets:
+        return
+    model_ids = {asset.asset_model_id for asset in assets}
+    now = timezone.now()
+    for default_model, item_model, history_model, kind in (
+        (AssetModelDefaultStockItem, StockItem, AssetIsComposedOfStockItemHistory, "stock_item"),
+        (AssetModelDefaultConsumable, Consumable, AssetIsComposedOfConsumableHistory, "consumable"),
+    ):
+        defaults = {}
+        for default_item in default_model.objects.filter(asset_model_id__in=model_ids).select_related(f"{kind}_model"):
+            defaults.setdefault(default_item.asset_model_id, []).append(default_item)
+        units = [
+            (asset, default_item)
+            for asset in assets
+            for default_item in defaults.get(asset.asset_model_id, [])
+            for _ in range(default_item.quantity)
+        ]
+        if not units:
+            continue
+
+        item_ids = allocate_ids(item_model, len(units))
+        item_model.objects.bulk_create(
+            [
+                item_model(
+                    **{
+                        f"{kind}_id": item_id,
+                        f"{kind}_model_id": getattr(default_item, f"{kind}_model_id"),
+                        f"{kind}_name": f"{getattr(default_item, f'{kind}_model')} (included with {asset})",
+                        f"{kind}_status": "Included with Asset",
+                    }
+                )
+                for item_id, (asset, default_item) in zip(item_ids, units)
+            ]
+        )
+        history_model.objects.bulk_create(
+            [
+                history_model(
+                    **{f"{kind}_id": item_id},
+                    asset=asset,
+                    maintenance_step=None,
+                    attribution_order_id=asset.attribution_order_id,
+                    start_datetime=now,
+                    end_datetime=None,
+                )
+                for item_id, (asset, _) in zip(item_ids, units)
+            ]
         )
-    )
-    model_def_ids = {row["stock_item_attribute_definition_id"] for row in model_defs}
 
-    existing_qs = StockItemAttributeValue.objects.filter(stock_item_id=stock_item.stock_item_id)
-    existing_def_ids = set(existing_qs.values_list("stock_item_attribute_definition_id", flat=True))
 
-    missing_ids = model_def_ids - existing_def_ids
-    extra_ids = existing_def_ids - model_def_ids
+def _bulk_create_items(request, *, model, serializer_class, family: str, after_create=None):
+    """Create every entry of ``request.data["items"]`` with one INSERT and fill in their attribute values.
 
-    if extra_ids:
-        existing_qs.filter(stock_item_attribute_definition_id__in=extra_ids).delete()
+    Entries are validated with ``serializer_class``; statuses reserved for
+    maintenance and destruction workflows and included items are refused with
+    400. Ids are reserved in one round trip and attribute values are copied
+    from each item's model in a single statement (see ``api.attributes``).
+    ``after_create`` is called with the created instances in the same
+    transaction. Like the single create endpoints, no movement is recorded:
+    items get a location with their first movement.
+    """
 
-    if missing_ids:
-        model_map = {row["stock_item_attribute_definition_id"]: row for row in model_defs}
-        for definition_id in missing_ids:
-            row = model_map.get(definition_id)
-            if not row:
-                continue
-            instance = StockItemAttributeValue()
-            instance.stock_item_attribute_definition_id = definition_id
-            instance.stock_item_id = stock_item.stock_item_id
-            instance.value_bool = row.get("value_bool")
-            instance.value_string = row.get("value_string")
-            instance.value_number = row.get("value_number")
-            instance.value_date = row.get("value_date")
-            instance.save(force_insert=True)
-
-
-def _sync_consumable_attribute_values(consumable: Consumable) -> None:
-    model_defs = list(
-        ConsumableModelAttributeValue.objects.filter(consumable_model_id=consumable.consumable_model_id).values(
-            "consumable_attribute_definition_id",
-            "value_bool",
-            "value_string",
-            "value_number",
-            "value_date",
+    rows = request.data.get("items") if hasattr(request.data, "get") else None
+    if not isinstance(rows, list) or not rows:
+        return Response({"error": "items must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(rows) > BULK_CREATE_MAX_ITEMS:
+        return Response(
+            {"error": f"At most {BULK_CREATE_MAX_ITEMS} items can be created per request"},
+            status=status.HTTP_400_BAD_REQUEST,
         )
-    )
-    model_def_ids = {row["consumable_attribute_definition_id"] for row in model_defs}
 
-    existing_qs = ConsumableAttributeValue.objects.filter(consumable_id=consumable.consumable_id)
-    existing_def_ids = set(existing_qs.values_list("consumable_attribute_definition_id", flat=True))
+    serializer = serializer_class(data=rows, many=True, context={"request": request})
+    serializer.is_valid(raise_exception=True)
+    errors = _bulk_row_errors(family, serializer.validated_data)
+    if any(errors):
+        raise ValidationError(errors)
 
-    missing_ids = model_def_ids - existing_def_ids
-    extra_ids = existing_def_ids - model_def_ids
+    pk_name = model._meta.pk.attname
+    field_names = {field.name for field in model._meta.concrete_fields}
+    with transaction.atomic():
+        ids = allocate_ids(model, len(rows))
+        instances = model.objects.bulk_create(
+            [
+                model(**{pk_name: pk}, **{k: v for k, v in data.items() if k in field_names and k != pk_name})
+                for pk, data in zip(ids, serializer.validated_data)
+            ]
+        )
+        counts = propagate_model_attributes(family, item_ids=ids)
+        if after_create is not None:
+            after_create(instances)
+
+    return Response(
+        {
+            "created_count": len(ids),
+            f"{pk_name}s": ids,
+            "attribute_values_created": counts["item_values_inserted"],
+        },
+        status=status.HTTP_201_CREATED,
+    )
 
-    if extra_ids:
-        existing_qs.filter(consumable_attribute_definition_id__in=extra_ids).delete()
 
-    if missing_ids:
-        model_map = {row["consumable_attribute_definition_id"]: row for row in model_defs}
-        for definition_id in missing_ids:
-            row = model_map.get(definition_id)
-            if not row:
-                continue
-            instance = ConsumableAttributeValue()
-            instance.consumable_attribute_definition_id = definition_id
-            instance.consumable_id = consumable.consumable_id
-            instance.value_bool = row.get("value_bool")
-            instance.value_string = row.get("value_string")
-            instance.value_number = row.get("value_number")
-            instance.value_date = row.get("value_date")
-            instance.save(force_insert=True)
 from .serializers import (
     AssetAttributeDefinitionSerializer,
     AssetAttributeValueSerializer,
@@ -539,6 +437,8 @@ from .serializers import (
     ExternalMaintenanceSerializer,
     ExternalMaintenanceStepSerializer,
     ExternalMaintenanceTypicalStepSerializer,
+    requested_fields,
+    BackgroundJobSerializer,
 )
 
 
@@ -554,64 +454,8 @@ class SuperuserWriteMixin:
     permission_classes = [IsAuthenticated]
 
     def _get_user_account(self, request):
-        # If authentication already resolved our custom UserAccount, use it.
-        # Do not rely on is_authenticated always being present/true.
-        if hasattr(request, "user") and request.user and isinstance(request.user, UserAccount):
-            return request.user
-
-        # For tests using force_authenticate, request.user is set directly
-        if hasattr(request, "user") and request.user and getattr(request.user, "is_authenticated", False):
-
-            # Fallback: DRF may set request.user to a different user type.
-            # Try to resolve our UserAccount via username / id.
-            try:
-                username = getattr(request.user, "username", None)
-                if username:
-                    return UserAccount.objects.get(username=username)
-            except UserAccount.DoesNotExist:
-                pass
-            except Exception:
-                pass
-
-            try:
-                user_id = getattr(request.user, "user_id", None) or getattr(request.user, "id", None)
-                if user_id:
-                    return UserAccount.objects.get(user_id=user_id)
-            except UserAccount.DoesNotExist:
-                pass
-            except Exception:
-                pass
-
-        # Primary: resolve via JWT claims in request.auth (varies by authentication backend).
-        token_payload = None
-        try:
-            if hasattr(request, "auth") and request.auth is not None:
-                if isinstance(request.auth, dict):
-                    token_payload = request.auth
-                elif hasattr(request.auth, "payload") and isinstance(getattr(request.auth, "payload"), dict):
-                    token_payload = request.auth.payload
-                elif hasattr(request.auth, "get"):
-                    # Some token types implement dict-like .get
-                    token_payload = request.auth
-        except Exception:
-            token_payload = None
-
-        if token_payload is not None:
-            try:
-                user_id = token_payload.get("user_id")
-                if user_id:
-                    return UserAccount.objects.get(user_id=user_id)
-            except (UserAccount.DoesNotExist, AttributeError, KeyError, TypeError):
-                pass
-
-            try:
-                username = token_payload.get("username")
-                if username:
-                    return UserAccount.objects.get(username=username)
-            except (UserAccount.DoesNotExist, AttributeError, KeyError, TypeError):
-                pass
-
-        return None
+        principal = get_principal(request)
+        return principal.user if principal else None
 
     def _require_superuser(self, request, action_label: str):
         user_account = self._get_user_account(request)
@@ -640,6 +484,73 @@ class SuperuserWriteMixin:
         return super().destroy(request, *args, **kwargs)
 
 
+class TypeAttributePropagationMixin:
+    """Propagate attributes to the models of a type whenever one of its type attributes changes.
+
+    Propagation runs inside the request unless ``async`` is passed, in which
+    case it is queued and create/update responses carry the ``job_id`` (a
+    ``manage.py run_jobs`` worker has to be running). Pass ``cascade_to_items``
+    to push the change down to existing items too.
+    """
+
+    attribute_family = None
+    type_field = None
+
+    def _propagate(self, type_id):
+        """Propagate for ``type_id``; return the queued job when ``async`` was requested, else None."""
+
+        cascade_to_items = _request_flag(self.request, "cascade_to_items")
+        if not _request_flag(self.request, "async"):
+            propagate_type_attributes(
+                self.attribute_family,
+                type_ids=[int(type_id)],
+                cascade_to_items=cascade_to_items,
+            )
+            return None
+
+        principal = get_principal(self.request)
+        return enqueue(
+            "attributes.propagate_type",
+            {
+                "family": self.attribute_family,
+                "type_ids": [int(type_id)],
+                "cascade_to_items": cascade_to_items,
+            },
+            user=principal.user if principal else None,
+        )
+
+    def _destroyed_response(self, type_id):
+        job = self._propagate(type_id)
+        if job is not None:
+            return _job_response(job)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def perform_create(self, serializer):
+        instance = serializer.save()
+        self.propagation_job = self._propagate(getattr(instance, self.type_field))
+
+    def perform_update(self, serializer):
+        instance = serializer.save()
+        self.propagation_job = self._propagate(getattr(instance, self.type_field))
+
+    def perform_destroy(self, instance):
+        type_id = getattr(instance, self.type_field)
+        instance.delete()
+        self.propagation_job = self._propagate(type_id)
+
+    def _with_job_id(self, response):
+        job = getattr(self, "propagation_job", None)
+        if job is not None and isinstance(response.data, dict):
+            response.data["job_id"] = job.job_id
+        return response
+
+    def create(self, request, *args, **kwargs):
+        return self._with_job_id(super().create(request, *args, **kwargs))
+
+    def update(self, request, *args, **kwargs):
+        return self._with_job_id(super().update(request, *args, **kwargs))
+
+
 class MaintenanceTypicalStepViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = MaintenanceTypicalStep.objects.all().order_by("maintenance_typical_step_id")
     serializer_class = MaintenanceTypicalStepSerializer
@@ -652,9 +563,11 @@ class MaintenanceViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
 
     def get_queryset(self):
         qs = (
-            Maintenance.objects.select_related(
-                "asset",
-                "performed_by_person",
+            _annotate_maintenance_flags(
+                Maintenance.objects.select_related(
+                    "asset",
+                    "performed_by_person",
+                )
             )
             .all()
             .order_by("-start_datetime", "-maintenance_id")
@@ -671,43 +584,24 @@ class MaintenanceViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
         if not person:
             return Maintenance.objects.none()
 
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
         if "maintenance_chief" in role_codes or "exploitation_chief" in role_codes or "it_bureau_chief" in role_codes:
             return qs
 
         if "asset_responsible" in role_codes:
             # Asset responsible should be able to see maintenances that are awaiting their approval
             # via a pending maintenance-create asset movement request.
-            pending_moves = list(
-                AssetMovement.objects.filter(Q(status="pending") | Q(status__isnull=True))
-                .filter(
-                    Q(movement_reason="maintenance_create")
-                    | Q(movement_reason__startswith="maintenance_create_")
-                    | Q(movement_reason="Maintenance")
+            pending_moves = AssetMovement.objects.filter(status="pending", request_kind="maintenance_create")
+            # Requests written before maintenance ids were recorded only know the asset.
+            return qs.filter(
+                Q(maintenance_id__in=pending_moves.filter(maintenance_id__isnull=False).values("maintenance_id"))
+                | Q(
+                    asset_id__in=pending_moves.filter(maintenance_id__isnull=True).values("asset_id"),
+                    start_datetime__isnull=True,
+                    end_datetime__isnull=True,
                 )
-                .values("movement_reason", "asset_id")
             )
 
-            maintenance_ids = []
-            asset_ids = []
-            for row in pending_moves:
-                try:
-                    s = str(row.get("movement_reason"))
-                    if s.startswith("maintenance_create_"):
-                        maintenance_ids.append(int(s.split("maintenance_create_", 1)[1]))
-                    else:
-                        asset_ids.append(int(row.get("asset_id")))
-                except Exception:
-                    continue
-
-            if maintenance_ids:
-                return qs.filter(maintenance_id__in=maintenance_ids)
-            if asset_ids:
-                return qs.filter(asset_id__in=asset_ids, start_datetime__isnull=True, end_datetime__isnull=True)
-            return Maintenance.objects.none()
-
         if "it_maintenance_technician" in role_codes or "network_maintenance_technician" in role_codes:
             return qs.filter(performed_by_person=person)
 
@@ -718,8 +612,7 @@ class MaintenanceViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
         if denial:
             return denial
 
-        last_item = Maintenance.objects.order_by("-maintenance_id").first()
-        next_id = (last_item.maintenance_id + 1) if last_item else 1
+        next_id = allocate_id(Maintenance)
         data = request.data.copy()
         if 'digital_copy' in request.FILES:
             data.pop('digital_copy', None)
@@ -727,8 +620,8 @@ class MaintenanceViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         data = dict(serializer.validated_data)
         data["start_datetime"] = None
-        maintenance = Maintenance.objects.create(maintenance_id=next_id, **data)
-        return Response(self.get_serializer(maintenance).data, status=status.HTTP_201_CREATED)
+        Maintenance.objects.create(maintenance_id=next_id, **data)
+        return Response(self.get_serializer(_annotated_maintenance(next_id)).data, status=status.HTTP_201_CREATED)
 
 
     def destroy(self, request, *args, **kwargs):
@@ -743,9 +636,7 @@ class MaintenanceViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
         if user_account.is_superuser():
             is_allowed = True
         elif person:
-            role_codes = set(
-                PersonRoleMapping.objects.filter(person=person).values_list("role__role_code", flat=True)
-            )
+            role_codes = set(user_account.role_codes())
             if "maintenance_chief" in role_codes or "it_bureau_chief" in role_codes:
                 is_allowed = True
             elif maintenance.performed_by_person_id == person.person_id:
@@ -777,9 +668,7 @@ class MaintenanceViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
         if user_account and user_account.is_superuser():
             is_allowed = True
         else:
-            role_codes = set(
-                PersonRoleMapping.objects.filter(person=person).values_list("role__role_code", flat=True)
-            )
+            role_codes = set(user_account.role_codes())
             if "maintenance_chief" in role_codes or "exploitation_chief" in role_codes or "it_bureau_chief" in role_codes:
                 is_allowed = True
             elif getattr(maintenance, "performed_by_person_id", None) == getattr(person, "person_id", None):
@@ -828,7 +717,7 @@ class MaintenanceViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
             update_payload["is_successful"] = is_successful_value
 
         Maintenance.objects.filter(maintenance_id=maintenance.maintenance_id).update(**update_payload)
-        maintenance.refresh_from_db()
+        maintenance = _annotated_maintenance(maintenance.maintenance_id)
         return Response(self.get_serializer(maintenance).data, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=["post"], url_path="request-return-to-owner")
@@ -840,9 +729,7 @@ class MaintenanceViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
             return Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
         person = user_account.person
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
         is_technician = ("it_maintenance_technician" in role_codes) or ("network_maintenance_technician" in role_codes) or user_account.is_superuser()
         if not is_technician:
             return Response({"error": "Only maintenance technicians can request return"}, status=status.HTTP_403_FORBIDDEN)
@@ -866,21 +753,14 @@ class MaintenanceViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
         if not destination_location:
             return Response({"error": "Destination location not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        last_move = (
-            AssetMovement.objects.select_related("destination_location")
-            .filter(asset_id=asset.asset_id)
-            .order_by("-asset_movement_id")
-            .first()
-        )
-        if not last_move or not last_move.destination_location_id:
+        source_location = current_location("asset", asset.asset_id)
+        if not source_location:
             return Response({"error": "Cannot infer asset current location (no movement history)"}, status=status.HTTP_400_BAD_REQUEST)
 
-        source_location = last_move.destination_location
         if source_location.location_id == destination_location.location_id:
             return Response({"error": "Asset is already in this location"}, status=status.HTTP_400_BAD_REQUEST)
 
-        last_asset_move = AssetMovement.objects.order_by("-asset_movement_id").first()
-        next_asset_move_id = (last_asset_move.asset_movement_id + 1) if last_asset_move else 1
+        next_asset_move_id = allocate_id(AssetMovement)
 
         now_dt = timezone.now()
         AssetMovement.objects.create(
@@ -925,9 +805,7 @@ class MaintenanceViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
             return Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
         person = user_account.person
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
         is_technician = ("it_maintenance_technician" in role_codes) or ("network_maintenance_technician" in role_codes) or user_account.is_superuser()
         if not is_technician:
             return Response({"error": "Only maintenance technicians can access this"}, status=status.HTTP_403_FORBIDDEN)
@@ -956,9 +834,7 @@ class MaintenanceViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
             return Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
         person = user_account.person
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
         is_technician = ("it_maintenance_technician" in role_codes) or ("network_maintenance_technician" in role_codes) or user_account.is_superuser()
         if not is_technician:
             return Response({"error": "Only maintenance technicians can access this"}, status=status.HTTP_403_FORBIDDEN)
@@ -987,9 +863,7 @@ class MaintenanceViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
         if not user_account or not user_account.person:
             return Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=user_account.person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
         if (not user_account.is_superuser()) and ("maintenance_chief" not in role_codes) and ("it_bureau_chief" not in role_codes):
             return Response({"error": "Only maintenance chiefs can create maintenance"}, status=status.HTTP_403_FORBIDDEN)
 
@@ -1007,13 +881,7 @@ class MaintenanceViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
         if not asset:
             return Response({"error": "Asset not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        last_move = (
-            AssetMovement.objects.select_related("destination_location", "destination_location__location_type")
-            .filter(asset_id=asset.asset_id)
-            .order_by("-asset_movement_id")
-            .first()
-        )
-        current_location = last_move.destination_location if last_move else None
+        asset_location = current_location("asset", asset.asset_id, "location_type")
 
         def _is_maintenance_location(location: Location | None) -> bool:
             if not location or not getattr(location, "location_type", None):
@@ -1024,12 +892,15 @@ class MaintenanceViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
                 return True
             return "maintenance" in label
 
-        if not current_location or not _is_maintenance_location(current_location):
+        # Allocated up front so the asset movement request can record the maintenance it belongs to.
+        next_id = allocate_id(Maintenance)
+
+        if not asset_location or not _is_maintenance_location(asset_location):
             if not destination_location_id:
                 return Response(
                     {
                         "error": "Asset is not in a maintenance location. destination_location_id is required to move the asset before creating maintenance.",
-                        "current_location": LocationSerializer(current_location).data if current_location else None,
+                        "current_location": LocationSerializer(asset_location).data if asset_location else None,
                     },
                     status=status.HTTP_400_BAD_REQUEST,
                 )
@@ -1039,24 +910,25 @@ class MaintenanceViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
                 return Response({"error": "Invalid destination_location_id"}, status=status.HTTP_400_BAD_REQUEST)
             if not _is_maintenance_location(destination_location):
                 return Response({"error": "destination_location_id must be a maintenance location"}, status=status.HTTP_400_BAD_REQUEST)
-            if not current_location:
+            if not asset_location:
                 return Response({"error": "Cannot infer asset current location (no movement history)"}, status=status.HTTP_400_BAD_REQUEST)
 
-            last_asset_move = AssetMovement.objects.order_by("-asset_movement_id").first()
-            next_asset_move_id = (last_asset_move.asset_movement_id + 1) if last_asset_move else 1
+            next_asset_move_id = allocate_id(AssetMovement)
             AssetMovement.objects.create(
                 asset_movement_id=next_asset_move_id,
                 asset=asset,
-                source_location=current_location,
+                source_location=asset_location,
                 destination_location=destination_location,
                 maintenance_step=None,
                 external_maintenance_step_id=None,
                 movement_reason="maintenance_create",
                 movement_datetime=timezone.now(),
+                request_kind="maintenance_create",
+                maintenance_id=next_id,
             )
             _cascade_move_composed_items(
                 asset_id=asset.asset_id,
-                source_location_id=current_location.location_id,
+                source_location_id=asset_location.location_id,
                 destination_location_id=destination_location.location_id,
                 movement_reason="maintenance_create",
                 movement_datetime=timezone.now(),
@@ -1068,9 +940,6 @@ class MaintenanceViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
         if not technician:
             return Response({"error": "Technician not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        last_item = Maintenance.objects.order_by("-maintenance_id").first()
-        next_id = (last_item.maintenance_id + 1) if last_item else 1
-
         try:
             maintenance = Maintenance.objects.create(
                 maintenance_id=next_id,
@@ -1091,6 +960,7 @@ class MaintenanceViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        maintenance = _annotated_maintenance(maintenance.maintenance_id)
         return Response(self.get_serializer(maintenance).data, status=status.HTTP_201_CREATED)
 
 
@@ -1099,14 +969,8 @@ class AssetMaintenanceTimelineView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, asset_id=None):
-        user_account = None
-        try:
-            if hasattr(request, "auth") and request.auth is not None:
-                user_id = request.auth.get("user_id")
-                if user_id:
-                    user_account = UserAccount.objects.select_related("person").get(user_id=user_id)
-        except (UserAccount.DoesNotExist, AttributeError, KeyError):
-            user_account = None
+        principal = get_principal(request)
+        user_account = principal.user if principal else None
 
         if not user_account or not user_account.person:
             return Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
@@ -1138,6 +1002,7 @@ class AssetMaintenanceTimelineView(APIView):
         )
 
         maintenance_ids = list(maintenances.values_list("maintenance_id", flat=True))
+        maintenances = _annotate_maintenance_flags(maintenances)
 
         # Get all maintenance steps for these maintenances
         steps = (
@@ -1196,14 +1061,24 @@ class ChangePasswordView(APIView):
         user.password_last_changed_datetime = timezone.now()
         user.save(update_fields=["password_hash", "password_last_changed_datetime"])
 
-        return Response({"message": "Password changed successfully"})
+        # The save bumped both epochs, revoking the caller's tokens too; hand out new ones.
+        user.refresh_from_db(fields=["roles_epoch", "credentials_epoch"])
+        refresh = mint_tokens(load_principal(user))
+        return Response(
+            {
+                "message": "Password changed successfully",
+                "access": str(refresh.access_token),
+                "refresh": str(refresh),
+            }
+        )
 
 
 class AdminResetUserPasswordView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        user_account = SuperuserWriteMixin()._get_user_account(request)
+        principal = get_principal(request)
+        user_account = principal.user if principal else None
         if not user_account:
             return Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -1231,6 +1106,43 @@ class AdminResetUserPasswordView(APIView):
         return Response({"message": "Password reset successfully", "username": username}, status=status.HTTP_200_OK)
 
 
+class PrincipalCacheStatsView(APIView):
+    """Hit/miss counters of the principal cache in this process (superuser only)."""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        principal = get_principal(request)
+        if not principal:
+            return Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
+        if not principal.is_superuser:
+            return Response({"error": "Only superuser can view cache statistics"}, status=status.HTTP_403_FORBIDDEN)
+        return Response(principal_cache_stats(), status=status.HTTP_200_OK)
+
+
+class BackgroundJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Status of background jobs; users see the jobs they enqueued, superusers see all of them."""
+
+    serializer_class = BackgroundJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = BackgroundJob.objects.all().order_by("-job_id")
+        principal = get_principal(self.request)
+        if principal is None:
+            return queryset.none()
+        if not principal.is_superuser:
+            queryset = queryset.filter(created_by_id=principal.user.user_id)
+
+        job_status = self.request.query_params.get("status")
+        if job_status:
+            queryset = queryset.filter(status=job_status)
+        kind = self.request.query_params.get("kind")
+        if kind:
+            queryset = queryset.filter(kind=kind)
+        return queryset
+
+
 class MaintenanceStepViewSet(viewsets.ModelViewSet):
     queryset = MaintenanceStep.objects.all().order_by("maintenance_step_id")
     serializer_class = MaintenanceStepSerializer
@@ -1649,8 +1561,7 @@ class MaintenanceStepViewSet(viewsets.ModelViewSet):
         return super().partial_update(request, *args, **kwargs)
 
     def create(self, request, *args, **kwargs):
-        last_item = MaintenanceStep.objects.order_by("-maintenance_step_id").first()
-        next_id = (last_item.maintenance_step_id + 1) if last_item else 1
+        next_id = allocate_id(MaintenanceStep)
 
         data = request.data.copy()
         if 'digital_copy' in request.FILES:
@@ -1668,15 +1579,18 @@ class MaintenanceStepViewSet(viewsets.ModelViewSet):
             try:
                 pending_asset_move = AssetMovement.objects.filter(
                     status="pending",
-                    movement_reason=f"maintenance_create_{maintenance.maintenance_id}",
+                    maintenance_id=maintenance.maintenance_id,
+                    request_kind="maintenance_create",
                 ).exists()
                 pending_stock_moves = StockItemMovement.objects.filter(
                     status="pending",
-                    movement_reason=f"problem_report_include_{maintenance.maintenance_id}",
+                    maintenance_id=maintenance.maintenance_id,
+                    request_kind="problem_report_include",
                 ).exists()
                 pending_consumable_moves = ConsumableMovement.objects.filter(
                     status="pending",
-                    movement_reason=f"problem_report_include_{maintenance.maintenance_id}",
+                    maintenance_id=maintenance.maintenance_id,
+                    request_kind="problem_report_include",
                 ).exists()
 
                 if pending_asset_move or pending_stock_moves or pending_consumable_moves:
@@ -1777,18 +1691,8 @@ class MaintenanceStepViewSet(viewsets.ModelViewSet):
         return qs
 
     def _get_user_person(self, request):
-        user_account = None
-        try:
-            if hasattr(request, "auth") and request.auth is not None:
-                user_id = request.auth.get("user_id")
-                if user_id:
-                    user_account = UserAccount.objects.select_related("person").get(user_id=user_id)
-        except (UserAccount.DoesNotExist, AttributeError, KeyError):
-            user_account = None
-
-        if user_account and user_account.person:
-            return user_account.person
-        return None
+        principal = get_principal(request)
+        return principal.person if principal else None
 
     def _validate_assignment_permission(self, request, target_person_id: int | None):
         """
@@ -1800,14 +1704,13 @@ class MaintenanceStepViewSet(viewsets.ModelViewSet):
         if target_person_id is None:
             return True, None
 
-        person = self._get_user_person(request)
+        principal = get_principal(request)
+        person = principal.person if principal else None
         if not person:
             return False, Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
         # Get current user's roles
-        user_role_codes = set(
-            PersonRoleMapping.objects.filter(person=person).values_list("role__role_code", flat=True)
-        )
+        user_role_codes = set(principal.role_codes)
 
         # Superusers and maintenance_chiefs can assign to anyone
         if "superuser" in user_role_codes or "maintenance_chief" in user_role_codes or "it_bureau_chief" in user_role_codes:
@@ -1833,13 +1736,12 @@ class MaintenanceStepViewSet(viewsets.ModelViewSet):
         return True, None
 
     def _require_can_request_for_step(self, request, step: MaintenanceStep):
-        person = self._get_user_person(request)
+        principal = get_principal(request)
+        person = principal.person if principal else None
         if not person:
             return None, Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(principal.role_codes)
 
         if (step.person_id == person.person_id) or ("maintenance_chief" in role_codes) or ("it_bureau_chief" in role_codes) or ("superuser" in role_codes):
             return person, None
@@ -1885,8 +1787,7 @@ class MaintenanceStepViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        last_item = AssetConditionHistory.objects.order_by("-asset_condition_history_id").first()
-        next_id = (last_item.asset_condition_history_id + 1) if last_item else 1
+        next_id = allocate_id(AssetConditionHistory)
 
         AssetConditionHistory.objects.create(
             asset_condition_history_id=next_id,
@@ -2027,17 +1928,11 @@ class MaintenanceStepViewSet(viewsets.ModelViewSet):
             return Response({"error": "Component not found on asset (or already removed)"}, status=status.HTTP_404_NOT_FOUND)
 
         if destination_location and component_type == "stock_item":
-            last_move = (
-                StockItemMovement.objects.filter(stock_item_id=component_id_int)
-                .order_by("-stock_item_movement_id")
-                .first()
-            )
-            if not last_move:
+            source_location = current_location("stock_item", component_id_int)
+            if not source_location:
                 return Response({"error": "Cannot infer stock item current location (no movement history)"}, status=status.HTTP_400_BAD_REQUEST)
 
-            source_location = last_move.destination_location
-            last_move_global = StockItemMovement.objects.order_by("-stock_item_movement_id").first()
-            next_move_id = (last_move_global.stock_item_movement_id + 1) if last_move_global else 1
+            next_move_id = allocate_id(StockItemMovement)
 
             StockItemMovement.objects.create(
                 stock_item_movement_id=next_move_id,
@@ -2058,17 +1953,11 @@ class MaintenanceStepViewSet(viewsets.ModelViewSet):
                 external_maintenance_step_id=None,
             )
         elif destination_location and component_type == "consumable":
-            last_move = (
-                ConsumableMovement.objects.filter(consumable_id=component_id_int)
-                .order_by("-consumable_movement_id")
-                .first()
-            )
-            if not last_move:
+            source_location = current_location("consumable", component_id_int)
+            if not source_location:
                 return Response({"error": "Cannot infer consumable current location (no movement history)"}, status=status.HTTP_400_BAD_REQUEST)
 
-            source_location = last_move.destination_location
-            last_move_global = ConsumableMovement.objects.order_by("-consumable_movement_id").first()
-            next_move_id = (last_move_global.consumable_movement_id + 1) if last_move_global else 1
+            next_move_id = allocate_id(ConsumableMovement)
 
             ConsumableMovement.objects.create(
                 consumable_movement_id=next_move_id,
@@ -2117,18 +2006,16 @@ class MaintenanceStepViewSet(viewsets.ModelViewSet):
         now_dt = timezone.now()
 
         if component_type == "stock_item":
-            last_move = StockItemMovement.objects.filter(stock_item_id=component_id_int).order_by("-stock_item_movement_id").first()
-            if not last_move:
+            source_location_id = current_location_id("stock_item", component_id_int)
+            if source_location_id is None:
                 return Response({"error": "No movement history for stock item"}, status=status.HTTP_400_BAD_REQUEST)
-            
-            source_location = last_move.destination_location
-            last_global = StockItemMovement.objects.order_by("-stock_item_movement_id").first()
-            next_move_id = (last_global.stock_item_movement_id + 1) if last_global else 1
+
+            next_move_id = allocate_id(StockItemMovement)
 
             StockItemMovement.objects.create(
                 stock_item_movement_id=next_move_id,
                 stock_item_id=component_id_int,
-                source_location=source_location,
+                source_location_id=source_location_id,
                 destination_location=destination_location,
                 maintenance_step=step,
                 movement_reason="maintenance_step_return_to_owner",
@@ -2136,18 +2023,16 @@ class MaintenanceStepViewSet(viewsets.ModelViewSet):
                 status="pending",
             )
         elif component_type == "consumable":
-            last_move = ConsumableMovement.objects.filter(consumable_id=component_id_int).order_by("-consumable_movement_id").first()
-            if not last_move:
+            source_location_id = current_location_id("consumable", component_id_int)
+            if source_location_id is None:
                 return Response({"error": "No movement history for consumable"}, status=status.HTTP_400_BAD_REQUEST)
 
-            source_location = last_move.destination_location
-            last_global = ConsumableMovement.objects.order_by("-consumable_movement_id").first()
-            next_id = (last_global.consumable_movement_id + 1) if last_global else 1
+            next_id = allocate_id(ConsumableMovement)
 
             ConsumableMovement.objects.create(
                 consumable_movement_id=next_id,
                 consumable_id=component_id_int,
-                source_location=source_location,
+                source_location_id=source_location_id,
                 destination_location=destination_location,
                 maintenance_step=step,
                 movement_reason="return_to_owner",
@@ -2205,8 +2090,7 @@ class MaintenanceStepViewSet(viewsets.ModelViewSet):
         if requested_stock_item_model_id_int not in set(compatible_model_ids):
             return Response({"error": "Requested stock item model is not compatible with this asset"}, status=status.HTTP_400_BAD_REQUEST)
 
-        last_req = MaintenanceStepItemRequest.objects.order_by("-maintenance_step_item_request_id").first()
-        next_req_id = (last_req.maintenance_step_item_request_id + 1) if last_req else 1
+        next_req_id = allocate_id(MaintenanceStepItemRequest)
 
         req = MaintenanceStepItemRequest.objects.create(
             maintenance_step_item_request_id=next_req_id,
@@ -2270,8 +2154,7 @@ class MaintenanceStepViewSet(viewsets.ModelViewSet):
         if requested_consumable_model_id_int not in set(compatible_model_ids):
             return Response({"error": "Requested consumable model is not compatible with this asset"}, status=status.HTTP_400_BAD_REQUEST)
 
-        last_req = MaintenanceStepItemRequest.objects.order_by("-maintenance_step_item_request_id").first()
-        next_req_id = (last_req.maintenance_step_item_request_id + 1) if last_req else 1
+        next_req_id = allocate_id(MaintenanceStepItemRequest)
 
         req = MaintenanceStepItemRequest.objects.create(
             maintenance_step_item_request_id=next_req_id,
@@ -2297,26 +2180,24 @@ class MaintenanceStepItemRequestViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         qs = MaintenanceStepItemRequest.objects.all().order_by("-created_at")
-        user_account = SuperuserWriteMixin()._get_user_account(self.request)
+        principal = get_principal(self.request)
+        user_account = principal.user if principal else None
         if not user_account or not user_account.person:
             return MaintenanceStepItemRequest.objects.none()
 
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=user_account.person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
         if user_account.is_superuser() or ("stock_consumable_responsible" in role_codes):
             return qs
 
         return MaintenanceStepItemRequest.objects.none()
 
     def _require_responsible(self, request):
-        user_account = SuperuserWriteMixin()._get_user_account(request)
+        principal = get_principal(request)
+        user_account = principal.user if principal else None
         if not user_account or not user_account.person:
             return None, Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=user_account.person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
         if user_account.is_superuser() or ("stock_consumable_responsible" in role_codes):
             return user_account.person, None
 
@@ -2375,8 +2256,13 @@ class MaintenanceStepItemRequestViewSet(viewsets.ModelViewSet):
             if is_in_use:
                 return Response({"error": "Stock item is currently assigned/in use"}, status=status.HTTP_400_BAD_REQUEST)
 
-            last_move = StockItemMovement.objects.order_by("-stock_item_movement_id").first()
-            next_move_id = (last_move.stock_item_movement_id + 1) if last_move else 1
+            if reservation_conflict("stock_item", stock_item.stock_item_id, req.maintenance_step_item_request_id):
+                return Response(
+                    {"error": "Stock item is reserved for another request"},
+                    status=status.HTTP_409_CONFLICT,
+                )
+
+            next_move_id = allocate_id(StockItemMovement)
 
             StockItemMovement.objects.create(
                 stock_item_movement_id=next_move_id,
@@ -2426,8 +2312,13 @@ class MaintenanceStepItemRequestViewSet(viewsets.ModelViewSet):
             if is_in_use:
                 return Response({"error": "Consumable is currently assigned/in use"}, status=status.HTTP_400_BAD_REQUEST)
 
-            last_move = ConsumableMovement.objects.order_by("-consumable_movement_id").first()
-            next_move_id = (last_move.consumable_movement_id + 1) if last_move else 1
+            if reservation_conflict("consumable", consumable.consumable_id, req.maintenance_step_item_request_id):
+                return Response(
+                    {"error": "Consumable is reserved for another request"},
+                    status=status.HTTP_409_CONFLICT,
+                )
+
+            next_move_id = allocate_id(ConsumableMovement)
 
             ConsumableMovement.objects.create(
                 consumable_movement_id=next_move_id,
@@ -2443,6 +2334,7 @@ class MaintenanceStepItemRequestViewSet(viewsets.ModelViewSet):
         else:
             return Response({"error": "Invalid request_type"}, status=status.HTTP_400_BAD_REQUEST)
 
+        release_reservation(req.maintenance_step_item_request_id)
         req.source_location = source_location
         req.destination_location = destination_location
         req.status = "fulfilled"
@@ -2469,6 +2361,7 @@ class MaintenanceStepItemRequestViewSet(viewsets.ModelViewSet):
 
         note = request.data.get("note")
 
+        release_reservation(req.maintenance_step_item_request_id)
         req.status = "rejected"
         req.rejected_at = timezone.now()
         req.rejected_by_person = person
@@ -2489,9 +2382,10 @@ class MaintenanceStepItemRequestViewSet(viewsets.ModelViewSet):
 
         return Response(self.get_serializer(req).data, status=status.HTTP_200_OK)
 
-    @action(detail=True, methods=["get"], url_path="select-random")
+    # POST: picking a spare writes a reservation and releases the previous one.
+    @action(detail=True, methods=["post"], url_path="select-random")
     def select_random(self, request, pk=None):
-        _, denial = self._require_responsible(request)
+        person, denial = self._require_responsible(request)
         if denial:
             return denial
 
@@ -2516,32 +2410,22 @@ class MaintenanceStepItemRequestViewSet(viewsets.ModelViewSet):
             if not is_compatible:
                 return Response({"error": "Requested stock item model is not compatible with this asset"}, status=status.HTTP_400_BAD_REQUEST)
 
-            used_stock_item_ids = AssetIsComposedOfStockItemHistory.objects.filter(
-                end_datetime__isnull=True
-            ).values_list("stock_item_id", flat=True)
-
-            last_dest_location_subq = Subquery(
-                StockItemMovement.objects.filter(stock_item_id=OuterRef("stock_item_id"))
-                .order_by("-stock_item_movement_id")
-                .values("destination_location_id")[:1]
-            )
-
-            candidates = (
-                StockItem.objects.filter(stock_item_model_id=req.requested_stock_item_model_id)
-                .exclude(stock_item_id__in=used_stock_item_ids)
-                .annotate(current_location_id=last_dest_location_subq)
-                .exclude(current_location_id__isnull=True)
+            chosen = reserve_random_item(
+                "stock_item",
+                req.requested_stock_item_model_id,
+                request_id=req.maintenance_step_item_request_id,
+                person_id=person.person_id,
             )
-
-            chosen = candidates.order_by("?").first()
             if not chosen:
                 return Response({"error": "No eligible stock items found"}, status=status.HTTP_404_NOT_FOUND)
 
             return Response(
                 {
                     "request_type": "stock_item",
-                    "stock_item_id": chosen.stock_item_id,
-                    "source_location_id": getattr(chosen, "current_location_id", None),
+                    "stock_item_id": chosen["stock_item_id"],
+                    "stock_item_inventory_number": chosen["stock_item_inventory_number"],
+                    "source_location_id": chosen["current_location_id"],
+                    "reserved_until": chosen["reserved_until"],
                 },
                 status=status.HTTP_200_OK,
             )
@@ -2557,32 +2441,22 @@ class MaintenanceStepItemRequestViewSet(viewsets.ModelViewSet):
             if not is_compatible:
                 return Response({"error": "Requested consumable model is not compatible with this asset"}, status=status.HTTP_400_BAD_REQUEST)
 
-            used_consumable_ids = AssetIsComposedOfConsumableHistory.objects.filter(
-                end_datetime__isnull=True
-            ).values_list("consumable_id", flat=True)
-
-            last_dest_location_subq = Subquery(
-                ConsumableMovement.objects.filter(consumable_id=OuterRef("consumable_id"))
-                .order_by("-consumable_movement_id")
-                .values("destination_location_id")[:1]
-            )
-
-            candidates = (
-                Consumable.objects.filter(consumable_model_id=req.requested_consumable_model_id)
-                .exclude(consumable_id__in=used_consumable_ids)
-                .annotate(current_location_id=last_dest_location_subq)
-                .exclude(current_location_id__isnull=True)
+            chosen = reserve_random_item(
+                "consumable",
+                req.requested_consumable_model_id,
+                request_id=req.maintenance_step_item_request_id,
+                person_id=person.person_id,
             )
-
-            chosen = candidates.order_by("?").first()
             if not chosen:
                 return Response({"error": "No eligible consumables found"}, status=status.HTTP_404_NOT_FOUND)
 
             return Response(
                 {
                     "request_type": "consumable",
-                    "consumable_id": chosen.consumable_id,
-                    "source_location_id": getattr(chosen, "current_location_id", None),
+                    "consumable_id": chosen["consumable_id"],
+                    "consumable_inventory_number": chosen["consumable_inventory_number"],
+                    "source_location_id": chosen["current_location_id"],
+                    "reserved_until": chosen["reserved_until"],
                 },
                 status=status.HTTP_200_OK,
             )
@@ -2616,23 +2490,8 @@ class MaintenanceStepItemRequestViewSet(viewsets.ModelViewSet):
             if not is_compatible:
                 return Response({"error": "Requested stock item model is not compatible with this asset"}, status=status.HTTP_400_BAD_REQUEST)
 
-            used_stock_item_ids = AssetIsComposedOfStockItemHistory.objects.filter(
-                end_datetime__isnull=True
-            ).values_list("stock_item_id", flat=True)
-
-            last_dest_location_subq = Subquery(
-                StockItemMovement.objects.filter(stock_item_id=OuterRef("stock_item_id"))
-                .order_by("-stock_item_movement_id")
-                .values("destination_location_id")[:1]
-            )
-
-            candidates = (
-                StockItem.objects.filter(stock_item_model_id=req.requested_stock_item_model_id)
-                .exclude(stock_item_id__in=used_stock_item_ids)
-                .annotate(current_location_id=last_dest_location_subq)
-                .exclude(current_location_id__isnull=True)
-                .values("stock_item_id", "stock_item_inventory_number", "current_location_id")
-                .order_by("stock_item_id")
+            candidates = available_items(
+                "stock_item", req.requested_stock_item_model_id, request_id=req.maintenance_step_item_request_id
             )
 
             return Response(
@@ -2654,23 +2513,8 @@ class MaintenanceStepItemRequestViewSet(viewsets.ModelViewSet):
             if not is_compatible:
                 return Response({"error": "Requested consumable model is not compatible with this asset"}, status=status.HTTP_400_BAD_REQUEST)
 
-            used_consumable_ids = AssetIsComposedOfConsumableHistory.objects.filter(
-                end_datetime__isnull=True
-            ).values_list("consumable_id", flat=True)
-
-            last_dest_location_subq = Subquery(
-                ConsumableMovement.objects.filter(consumable_id=OuterRef("consumable_id"))
-                .order_by("-consumable_movement_id")
-                .values("destination_location_id")[:1]
-            )
-
-            candidates = (
-                Consumable.objects.filter(consumable_model_id=req.requested_consumable_model_id)
-                .exclude(consumable_id__in=used_consumable_ids)
-                .annotate(current_location_id=last_dest_location_subq)
-                .exclude(current_location_id__isnull=True)
-                .values("consumable_id", "consumable_inventory_number", "current_location_id")
-                .order_by("consumable_id")
+            candidates = available_items(
+                "consumable", req.requested_consumable_model_id, request_id=req.maintenance_step_item_request_id
             )
 
             return Response(
@@ -2684,6 +2528,59 @@ class MaintenanceStepItemRequestViewSet(viewsets.ModelViewSet):
         return Response({"error": "Invalid request_type"}, status=status.HTTP_400_BAD_REQUEST)
 
 
+class SpareAvailabilityViewSet(viewsets.ViewSet):
+    """Available spare stock items / consumables, read from the availability index.
+
+    ``?kind=stock_item|consumable`` is required. Without ``model_id`` the
+    response counts available spares per model; with it, the spares themselves
+    are listed. ``location_id`` narrows both to one location.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        principal = get_principal(request)
+        if principal is None:
+            return Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
+        if not principal.has_any_role(
+            "stock_consumable_responsible",
+            "maintenance_chief",
+            "it_maintenance_technician",
+            "network_maintenance_technician",
+        ):
+            return Response({"error": "Not allowed"}, status=status.HTTP_403_FORBIDDEN)
+
+        kind = request.query_params.get("kind")
+        if kind not in SPARE_KINDS:
+            return Response({"error": "kind must be stock_item or consumable"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            model_id = request.query_params.get("model_id")
+            model_id = int(model_id) if model_id not in (None, "") else None
+            location_id = request.query_params.get("location_id")
+            location_id = int(location_id) if location_id not in (None, "") else None
+        except (TypeError, ValueError):
+            return Response({"error": "model_id and location_id must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if model_id is None:
+            counts = availability_counts(kind, location_id=location_id)
+            return Response(
+                {
+                    "kind": kind,
+                    "results": [
+                        {"model_id": row[f"{kind}_model_id"], "available_count": row["available_count"]} for row in counts
+                    ],
+                },
+                status=status.HTTP_200_OK,
+            )
+
+        items = list(available_items(kind, model_id, location_id=location_id))
+        return Response(
+            {"kind": kind, "model_id": model_id, "available_count": len(items), "results": items},
+            status=status.HTTP_200_OK,
+        )
+
+
 class ExternalMaintenanceProviderViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = ExternalMaintenanceProvider.objects.all().order_by("external_maintenance_provider_id")
     serializer_class = ExternalMaintenanceProviderSerializer
@@ -2735,15 +2632,18 @@ class ExternalMaintenanceViewSet(viewsets.ReadOnlyModelViewSet):
             try:
                 pending_asset_move = AssetMovement.objects.filter(
                     status="pending",
-                    movement_reason=f"maintenance_create_{maintenance.maintenance_id}",
+                    maintenance_id=maintenance.maintenance_id,
+                    request_kind="maintenance_create",
                 ).exists()
                 pending_stock_moves = StockItemMovement.objects.filter(
                     status="pending",
-                    movement_reason=f"problem_report_include_{maintenance.maintenance_id}",
+                    maintenance_id=maintenance.maintenance_id,
+                    request_kind="problem_report_include",
                 ).exists()
                 pending_consumable_moves = ConsumableMovement.objects.filter(
                     status="pending",
-                    movement_reason=f"problem_report_include_{maintenance.maintenance_id}",
+                    maintenance_id=maintenance.maintenance_id,
+                    request_kind="problem_report_include",
                 ).exists()
 
                 if pending_asset_move or pending_stock_moves or pending_consumable_moves:
@@ -2785,8 +2685,7 @@ class ExternalMaintenanceViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        last_em = ExternalMaintenance.objects.order_by("-external_maintenance_id").first()
-        next_em_id = (last_em.external_maintenance_id + 1) if last_em else 1
+        next_em_id = allocate_id(ExternalMaintenance)
 
         try:
             em = ExternalMaintenance.objects.create(
@@ -2812,13 +2711,12 @@ class ExternalMaintenanceViewSet(viewsets.ReadOnlyModelViewSet):
 
     @action(detail=True, methods=["post"], url_path="send-to-provider")
     def send_to_provider(self, request, pk=None):
-        user_account = SuperuserWriteMixin()._get_user_account(request)
+        principal = get_principal(request)
+        user_account = principal.user if principal else None
         if not user_account or not user_account.person:
             return Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=user_account.person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
         if (not user_account.is_superuser()) and ("asset_responsible" not in role_codes) and ("it_bureau_chief" not in role_codes):
             return Response(
                 {"error": "Only asset responsible can send to external maintenance provider"},
@@ -2875,27 +2773,21 @@ class ExternalMaintenanceViewSet(viewsets.ReadOnlyModelViewSet):
         if not asset_id:
             return Response({"error": "External maintenance has no associated asset"}, status=status.HTTP_400_BAD_REQUEST)
 
-        last_move = (
-            AssetMovement.objects.select_related("destination_location")
-            .filter(asset_id=asset_id)
-            .order_by("-asset_movement_id")
-            .first()
-        )
-        if not last_move or not last_move.destination_location_id:
+        source_location_id = current_location_id("asset", asset_id)
+        if not source_location_id:
             return Response(
                 {"error": "Cannot infer asset current location (no movement history)"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        last_asset_move = AssetMovement.objects.order_by("-asset_movement_id").first()
-        next_asset_move_id = (last_asset_move.asset_movement_id + 1) if last_asset_move else 1
+        next_asset_move_id = allocate_id(AssetMovement)
 
         now = timezone.now()
         try:
             AssetMovement.objects.create(
                 asset_movement_id=next_asset_move_id,
                 asset_id=asset_id,
-                source_location_id=last_move.destination_location_id,
+                source_location_id=source_location_id,
                 destination_location_id=destination_location_id_int,
                 maintenance_step_id=None,
                 external_maintenance_step_id=None,
@@ -2904,7 +2796,7 @@ class ExternalMaintenanceViewSet(viewsets.ReadOnlyModelViewSet):
             )
             _cascade_move_composed_items(
                 asset_id=asset_id,
-                source_location_id=last_move.destination_location_id,
+                source_location_id=source_location_id,
                 destination_location_id=destination_location_id_int,
                 movement_reason="Sent to external maintenance provider",
                 movement_datetime=now,
@@ -2932,13 +2824,12 @@ class ExternalMaintenanceViewSet(viewsets.ReadOnlyModelViewSet):
 
     @action(detail=True, methods=["post"], url_path="create-step")
     def create_step(self, request, pk=None):
-        user_account = SuperuserWriteMixin()._get_user_account(request)
+        principal = get_principal(request)
+        user_account = principal.user if principal else None
         if not user_account or not user_account.person:
             return Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=user_account.person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
         if (not user_account.is_superuser()) and ("it_maintenance_technician" not in role_codes) and ("network_maintenance_technician" not in role_codes):
             return Response(
                 {"error": "Only maintenance technician can create external maintenance steps"},
@@ -2996,8 +2887,7 @@ class ExternalMaintenanceViewSet(viewsets.ReadOnlyModelViewSet):
         except ExternalMaintenanceTypicalStep.DoesNotExist:
             return Response({"error": "Typical step not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        last_step = ExternalMaintenanceStep.objects.order_by("-external_maintenance_step_id").first()
-        next_step_id = (last_step.external_maintenance_step_id + 1) if last_step else 1
+        next_step_id = allocate_id(ExternalMaintenanceStep)
 
         now = timezone.now()
         try:
@@ -3018,13 +2908,12 @@ class ExternalMaintenanceViewSet(viewsets.ReadOnlyModelViewSet):
 
     @action(detail=True, methods=["post"], url_path="confirm-received-by-provider")
     def confirm_received_by_provider(self, request, pk=None):
-        user_account = SuperuserWriteMixin()._get_user_account(request)
+        principal = get_principal(request)
+        user_account = principal.user if principal else None
         if not user_account or not user_account.person:
             return Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=user_account.person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
         if (not user_account.is_superuser()) and ("asset_responsible" not in role_codes) and ("it_bureau_chief" not in role_codes):
             return Response(
                 {"error": "Only asset responsible can confirm receipt by maintenance provider"},
@@ -3063,13 +2952,12 @@ class ExternalMaintenanceViewSet(viewsets.ReadOnlyModelViewSet):
 
     @action(detail=True, methods=["post"], url_path="confirm-received-by-company")
     def confirm_received_by_company(self, request, pk=None):
-        user_account = SuperuserWriteMixin()._get_user_account(request)
+        principal = get_principal(request)
+        user_account = principal.user if principal else None
         if not user_account or not user_account.person:
             return Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=user_account.person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
         if (not user_account.is_superuser()) and ("asset_responsible" not in role_codes) and ("it_bureau_chief" not in role_codes):
             return Response(
                 {"error": "Only asset responsible can confirm asset received by company"},
@@ -3105,23 +2993,17 @@ class ExternalMaintenanceViewSet(viewsets.ReadOnlyModelViewSet):
         except Location.DoesNotExist:
             return Response({"error": "Destination location not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        last_move = (
-            AssetMovement.objects.select_related("destination_location")
-            .filter(asset_id=asset_id)
-            .order_by("-asset_movement_id")
-            .first()
-        )
-        if not last_move or not last_move.destination_location_id:
+        source_location_id = current_location_id("asset", asset_id)
+        if not source_location_id:
             return Response(
                 {"error": "Cannot infer asset current location (no movement history)"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        if last_move.destination_location_id == destination_location_id_int:
+        if source_location_id == destination_location_id_int:
             return Response({"error": "Asset is already in this location"}, status=status.HTTP_400_BAD_REQUEST)
 
-        last_asset_move = AssetMovement.objects.order_by("-asset_movement_id").first()
-        next_asset_move_id = (last_asset_move.asset_movement_id + 1) if last_asset_move else 1
+        next_asset_move_id = allocate_id(AssetMovement)
 
         last_external_step = (
             ExternalMaintenanceStep.objects.filter(external_maintenance=em)
@@ -3135,7 +3017,7 @@ class ExternalMaintenanceViewSet(viewsets.ReadOnlyModelViewSet):
             AssetMovement.objects.create(
                 asset_movement_id=next_asset_move_id,
                 asset_id=asset_id,
-                source_location_id=last_move.destination_location_id,
+                source_location_id=source_location_id,
                 destination_location_id=destination_location_id_int,
                 maintenance_step_id=None,
                 external_maintenance_step_id=external_step_id,
@@ -3144,7 +3026,7 @@ class ExternalMaintenanceViewSet(viewsets.ReadOnlyModelViewSet):
             )
             _cascade_move_composed_items(
                 asset_id=asset_id,
-                source_location_id=last_move.destination_location_id,
+                source_location_id=source_location_id,
                 destination_location_id=destination_location_id_int,
                 movement_reason="Received by company from external maintenance",
                 movement_datetime=now,
@@ -3166,13 +3048,12 @@ class ExternalMaintenanceViewSet(viewsets.ReadOnlyModelViewSet):
 
     @action(detail=True, methods=["post"], url_path="confirm-sent-to-company")
     def confirm_sent_to_company(self, request, pk=None):
-        user_account = SuperuserWriteMixin()._get_user_account(request)
+        principal = get_principal(request)
+        user_account = principal.user if principal else None
         if not user_account or not user_account.person:
             return Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=user_account.person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
         if (not user_account.is_superuser()) and ("asset_responsible" not in role_codes) and ("it_bureau_chief" not in role_codes):
             return Response(
                 {"error": "Only asset responsible can confirm asset sent to company"},
@@ -3209,13 +3090,12 @@ class ExternalMaintenanceViewSet(viewsets.ReadOnlyModelViewSet):
 
     @action(detail=True, methods=["post"], url_path="mark-failed")
     def mark_failed(self, request, pk=None):
-        user_account = SuperuserWriteMixin()._get_user_account(request)
+        principal = get_principal(request)
+        user_account = principal.user if principal else None
         if not user_account or not user_account.person:
             return Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=user_account.person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
 
         target_type = request.data.get("target_type") or "asset"
         target_id = request.data.get("target_id")
@@ -3368,14 +3248,8 @@ class MyItemsView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user_account = None
-        try:
-            if hasattr(request, "auth") and request.auth is not None:
-                user_id = request.auth.get("user_id")
-                if user_id:
-                    user_account = UserAccount.objects.select_related("person").get(user_id=user_id)
-        except (UserAccount.DoesNotExist, AttributeError, KeyError):
-            user_account = None
+        principal = get_principal(request)
+        user_account = principal.user if principal else None
 
         if not user_account or not user_account.person:
             return Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
@@ -3436,7 +3310,8 @@ class ProblemReportViewSet(viewsets.ViewSet):
 
     @action(detail=False, methods=["get"], url_path="eligible-items")
     def eligible_items(self, request):
-        user_account = SuperuserWriteMixin()._get_user_account(request)
+        principal = get_principal(request)
+        user_account = principal.user if principal else None
         if not user_account or not user_account.person:
             return Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -3548,29 +3423,71 @@ class ProblemReportViewSet(viewsets.ViewSet):
         )
 
     def list(self, request):
-        asset_reports = PersonReportsProblemOnAsset.objects.all().order_by("-report_datetime")
-        stock_reports = PersonReportsProblemOnStockItem.objects.all().order_by("-report_datetime")
-        consumable_reports = PersonReportsProblemOnConsumable.objects.all().order_by("-report_datetime")
-
-        def normalize(item_type, report):
-            return {
-                "item_type": item_type,
-                "report_id": report.report_id,
-                "item_id": getattr(report, item_type).pk if getattr(report, item_type, None) else None,
-                "person_id": report.person_id if hasattr(report, "person_id") else report.person.person_id,
-                "person_name": f"{report.person.first_name} {report.person.last_name}",
-                "report_datetime": report.report_datetime,
-                "owner_observation": report.owner_observation,
-            }
+        params = request.query_params
 
-        data = [normalize("asset", r) for r in asset_reports] + [normalize("stock_item", r) for r in stock_reports] + [
-            normalize("consumable", r) for r in consumable_reports
-        ]
-        data.sort(key=lambda x: x.get("report_datetime") or timezone.now(), reverse=True)
-        return Response(data)
+        item_types = None
+        if params.get("item_type"):
+            item_types = {t.strip() for t in params["item_type"].split(",") if t.strip()}
+            if not item_types <= set(REPORT_TABLES):
+                return Response({"error": "Invalid item_type"}, status=status.HTTP_400_BAD_REQUEST)
+
+        person_id = None
+        if params.get("person_id"):
+            try:
+                person_id = int(params["person_id"])
+            except (TypeError, ValueError):
+                return Response({"error": "Invalid person_id"}, status=status.HTTP_400_BAD_REQUEST)
+
+        bounds = {}
+        for name in ("date_from", "date_to"):
+            value = params.get(name)
+            if not value:
+                continue
+            try:
+                parsed = datetime.datetime.fromisoformat(value)
+            except ValueError:
+                return Response({"error": f"Invalid {name}"}, status=status.HTTP_400_BAD_REQUEST)
+            if name == "date_to" and len(value) == 10:
+                # A bare date includes the whole day.
+                parsed = datetime.datetime.combine(parsed.date(), datetime.time.max)
+            bounds[name] = naive_utc(parsed)
+
+        has_maintenance = None
+        if params.get("has_maintenance") not in (None, ""):
+            has_maintenance = _request_flag(request, "has_maintenance")
+
+        # Unpaginated unless page_size or cursor is given, like KeysetPagination.
+        paginate = "page_size" in params or "cursor" in params
+        page_size = page_size_from(request) if paginate else None
+        after = decode_feed_cursor(params["cursor"]) if params.get("cursor") else None
+
+        rows = problem_report_feed(
+            item_types=item_types,
+            person_id=person_id,
+            date_from=bounds.get("date_from"),
+            date_to=bounds.get("date_to"),
+            has_maintenance=has_maintenance,
+            after=after,
+            limit=page_size + 1 if paginate else None,
+        )
+        if not paginate:
+            return Response(rows)
+
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = encode_feed_cursor(rows[-1])
+        return Response(
+            {
+                "next": next_page_link(request, page_size, next_cursor),
+                "first": remove_query_param(request.build_absolute_uri(), "cursor"),
+                "results": rows,
+            }
+        )
 
     def create(self, request):
-        user_account = SuperuserWriteMixin()._get_user_account(request)
+        principal = get_principal(request)
+        user_account = principal.user if principal else None
         if not user_account or not user_account.person:
             return Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -3652,8 +3569,7 @@ class ProblemReportViewSet(viewsets.ViewSet):
                 if not destination_location.location_type_id or int(destination_location.location_type_id) != 2:
                     return Response({"error": "Destination location must be a maintenance location"}, status=status.HTTP_400_BAD_REQUEST)
 
-            last = PersonReportsProblemOnAsset.objects.order_by("-report_id").first()
-            next_id = (last.report_id + 1) if last else 1
+            next_id = allocate_id(PersonReportsProblemOnAsset)
             now_dt = timezone.now()
 
             with transaction.atomic():
@@ -3742,8 +3658,7 @@ class ProblemReportViewSet(viewsets.ViewSet):
             return Response(PersonReportsProblemOnAssetSerializer(report).data, status=status.HTTP_201_CREATED)
 
         if item_type == "stock_item":
-            last = PersonReportsProblemOnStockItem.objects.order_by("-report_id").first()
-            next_id = (last.report_id + 1) if last else 1
+            next_id = allocate_id(PersonReportsProblemOnStockItem)
             report = PersonReportsProblemOnStockItem.objects.create(
                 report_id=next_id,
                 stock_item_id=item_id,
@@ -3752,8 +3667,7 @@ class ProblemReportViewSet(viewsets.ViewSet):
             )
             return Response(PersonReportsProblemOnStockItemSerializer(report).data, status=status.HTTP_201_CREATED)
 
-        last = PersonReportsProblemOnConsumable.objects.order_by("-report_id").first()
-        next_id = (last.report_id + 1) if last else 1
+        next_id = allocate_id(PersonReportsProblemOnConsumable)
         report = PersonReportsProblemOnConsumable.objects.create(
             report_id=next_id,
             consumable_id=item_id,
@@ -3764,13 +3678,12 @@ class ProblemReportViewSet(viewsets.ViewSet):
 
     @action(detail=False, methods=["post"], url_path="create-maintenance")
     def create_maintenance(self, request):
-        user_account = SuperuserWriteMixin()._get_user_account(request)
+        principal = get_principal(request)
+        user_account = principal.user if principal else None
         if not user_account or not user_account.person:
             return Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=user_account.person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
         if (not user_account.is_superuser()) and ("maintenance_chief" not in role_codes):
             return Response({"error": "Only maintenance chiefs can create maintenance"}, status=status.HTTP_403_FORBIDDEN)
 
@@ -3801,8 +3714,7 @@ class ProblemReportViewSet(viewsets.ViewSet):
         if not report:
             return Response({"error": "Report not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        last_item = Maintenance.objects.order_by("-maintenance_id").first()
-        next_maintenance_id = (last_item.maintenance_id + 1) if last_item else 1
+        next_maintenance_id = allocate_id(Maintenance)
 
         # Create included-item movements ONLY now (at maintenance creation time), using persisted selections.
         included_ctx = PersonReportsProblemOnAssetIncludedContext.objects.filter(report_id=report.report_id).first()
@@ -3832,9 +3744,6 @@ class ProblemReportViewSet(viewsets.ViewSet):
 
             now_dt = timezone.now()
 
-            last_stock_move = StockItemMovement.objects.order_by("-stock_item_movement_id").first()
-            next_stock_move_id = (last_stock_move.stock_item_movement_id + 1) if last_stock_move else 1
-
             for stock_item_id_int in stock_item_ids_to_include:
                 last_accepted_move = (
                     StockItemMovement.objects.filter(stock_item_id=stock_item_id_int, status="accepted")
@@ -3859,7 +3768,7 @@ class ProblemReportViewSet(viewsets.ViewSet):
                     )
 
                 StockItemMovement.objects.create(
-                    stock_item_movement_id=next_stock_move_id,
+                    stock_item_movement_id=allocate_id(StockItemMovement),
                     stock_item_id=stock_item_id_int,
                     source_location=source_location,
                     destination_location=destination_location,
@@ -3868,11 +3777,10 @@ class ProblemReportViewSet(viewsets.ViewSet):
                     movement_reason=f"problem_report_include_{next_maintenance_id}",
                     movement_datetime=now_dt,
                     status="pending",
+                    request_kind="problem_report_include",
+                    maintenance_id=next_maintenance_id,
+                    problem_report_id=report.report_id,
                 )
-                next_stock_move_id += 1
-
-            last_cons_move = ConsumableMovement.objects.order_by("-consumable_movement_id").first()
-            next_consumable_move_id = (last_cons_move.consumable_movement_id + 1) if last_cons_move else 1
 
             for consumable_id_int in consumable_ids_to_include:
                 last_accepted_move = (
@@ -3898,7 +3806,7 @@ class ProblemReportViewSet(viewsets.ViewSet):
                     )
 
                 ConsumableMovement.objects.create(
-                    consumable_movement_id=next_consumable_move_id,
+                    consumable_movement_id=allocate_id(ConsumableMovement),
                     consumable_id=consumable_id_int,
                     source_location=source_location,
                     destination_location=destination_location,
@@ -3907,8 +3815,10 @@ class ProblemReportViewSet(viewsets.ViewSet):
                     movement_reason=f"problem_report_include_{next_maintenance_id}",
                     movement_datetime=now_dt,
                     status="pending",
+                    request_kind="problem_report_include",
+                    maintenance_id=next_maintenance_id,
+                    problem_report_id=report.report_id,
                 )
-                next_consumable_move_id += 1
 
             # Clear persisted selections to prevent duplicates on repeated create-maintenance calls.
             try:
@@ -3922,13 +3832,7 @@ class ProblemReportViewSet(viewsets.ViewSet):
         # an asset movement request (pending) to be approved by the asset responsible.
         asset_id = getattr(report, "asset_id", None)
         if asset_id:
-            last_move = (
-                AssetMovement.objects.select_related("destination_location", "destination_location__location_type")
-                .filter(asset_id=asset_id)
-                .order_by("-asset_movement_id")
-                .first()
-            )
-            current_location = last_move.destination_location if last_move else None
+            asset_location = current_location("asset", asset_id, "location_type")
 
             def _is_maintenance_location(location: Location | None) -> bool:
                 if not location or not getattr(location, "location_type", None):
@@ -3943,21 +3847,25 @@ class ProblemReportViewSet(viewsets.ViewSet):
             # If the asset is already in a maintenance location, we create a no-op movement (source=destination=current)
             # purely to represent the approval requirement.
             movement_reason = f"maintenance_create_{next_maintenance_id}"
-            already_exists = AssetMovement.objects.filter(asset_id=asset_id, movement_reason=movement_reason).exists()
+            already_exists = AssetMovement.objects.filter(
+                asset_id=asset_id,
+                maintenance_id=next_maintenance_id,
+                request_kind="maintenance_create",
+            ).exists()
 
             if not already_exists:
-                if not current_location:
+                if not asset_location:
                     return Response(
                         {"error": "Cannot infer asset current location (no movement history)"},
                         status=status.HTTP_400_BAD_REQUEST,
                     )
 
-                if not _is_maintenance_location(current_location):
+                if not _is_maintenance_location(asset_location):
                     if not destination_location_id:
                         return Response(
                             {
                                 "error": "Asset is not in a maintenance location. destination_location_id is required to request moving the asset to a maintenance location.",
-                                "current_location": LocationSerializer(current_location).data if current_location else None,
+                                "current_location": LocationSerializer(asset_location).data if asset_location else None,
                             },
                             status=status.HTTP_400_BAD_REQUEST,
                         )
@@ -3976,20 +3884,22 @@ class ProblemReportViewSet(viewsets.ViewSet):
 
                     dest_location_id = destination_location.location_id
                 else:
-                    dest_location_id = current_location.location_id
+                    dest_location_id = asset_location.location_id
 
-                last_asset_move = AssetMovement.objects.order_by("-asset_movement_id").first()
-                next_asset_move_id = (last_asset_move.asset_movement_id + 1) if last_asset_move else 1
+                next_asset_move_id = allocate_id(AssetMovement)
                 AssetMovement.objects.create(
                     asset_movement_id=next_asset_move_id,
                     asset_id=asset_id,
-                    source_location_id=current_location.location_id,
+                    source_location_id=asset_location.location_id,
                     destination_location_id=dest_location_id,
                     maintenance_step_id=None,
                     external_maintenance_step_id=None,
                     movement_reason=movement_reason,
                     movement_datetime=timezone.now(),
                     status="pending",
+                    request_kind="maintenance_create",
+                    maintenance_id=next_maintenance_id,
+                    problem_report_id=report.report_id,
                 )
 
         next_id = next_maintenance_id
@@ -4015,6 +3925,7 @@ class ProblemReportViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        maintenance = _annotated_maintenance(maintenance.maintenance_id)
         return Response(MaintenanceSerializer(maintenance).data, status=status.HTTP_201_CREATED)
 class LoginView(APIView):
     """Handle user authentication."""
@@ -4028,36 +3939,39 @@ class LoginView(APIView):
 
         username = serializer.validated_data["username"]
         password = serializer.validated_data["password"]
+        ip_address = client_address(request)
 
-        with open("api_debug.log", "a") as f:
-            f.write(f"\n[{timezone.now()}] Login attempt for: {username}\n")
+        retry_after = throttle_delay(username, ip_address)
+        if retry_after:
+            record_login(LOGIN_FAILURE, username, ip_address, failure_reason=THROTTLED)
+            return Response(
+                {"error": "Too many failed login attempts. Try again later."},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={"Retry-After": str(retry_after)},
+            )
 
         try:
             user = UserAccount.objects.select_related("person").get(username=username)
         except UserAccount.DoesNotExist:
-            with open("api_debug.log", "a") as f:
-                f.write(f"User not found: {username}\n")
+            record_login(LOGIN_FAILURE, username, ip_address, failure_reason="Unknown user")
             return Response({"error": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
 
         password_hash = hash_password(password)
         if user.password_hash != password_hash:
-            with open("api_debug.log", "a") as f:
-                f.write(f"Password mismatch for user: {username}\n")
-            user.failed_login_attempts += 1
-            user.save(update_fields=["failed_login_attempts"])
+            # The account's failed_login_attempts is incremented by the audit writer.
+            record_login(LOGIN_FAILURE, username, ip_address, user_id=user.user_id, failure_reason="Invalid Password")
             return Response({"error": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
 
         if user.account_status != "active":
+            record_login(LOGIN_FAILURE, username, ip_address, user_id=user.user_id, failure_reason="User Disabled")
             return Response({"error": "Account is not active"}, status=status.HTTP_403_FORBIDDEN)
 
+        # last_login and the failed attempt reset are written by the audit writer.
+        record_login(LOGIN_SUCCESS, username, ip_address, user_id=user.user_id)
         user.last_login = timezone.now()
         user.failed_login_attempts = 0
-        user.save(update_fields=["last_login", "failed_login_attempts"])
 
-        refresh = RefreshToken()
-        refresh["user_id"] = user.user_id
-        refresh["username"] = user.username
-        refresh["is_superuser"] = user.is_superuser()
+        refresh = mint_tokens(load_principal(user))
 
         return Response(
             {
@@ -4068,6 +3982,46 @@ class LoginView(APIView):
         )
 
 
+class TokenRefreshView(APIView):
+    """Exchange a refresh token for new tokens carrying the current roles."""
+
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def post(self, request):
+        raw_refresh = request.data.get("refresh")
+        if not raw_refresh:
+            return Response({"error": "refresh is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            old_refresh = RefreshToken(raw_refresh)
+        except TokenError:
+            return Response({"error": "Invalid or expired refresh token"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        try:
+            user = UserAccount.objects.select_related("person").get(user_id=old_refresh.get("user_id"))
+        except UserAccount.DoesNotExist:
+            return Response({"error": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        if user.account_status != "active":
+            return Response({"error": "Account is not active"}, status=status.HTTP_403_FORBIDDEN)
+
+        # A password or status change revokes every refresh token minted before
+        # it; the client has to log in again.
+        if old_refresh.get(CREDENTIALS_EPOCH_CLAIM) != user.credentials_epoch:
+            return Response(
+                {"error": "Credentials changed, log in again", "code": "credentials_changed"},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        # Role changes only need new tokens: they are minted with the current roles and epoch.
+        refresh = mint_tokens(load_principal(user))
+        payload = {"access": str(refresh.access_token)}
+        if settings.SIMPLE_JWT.get("ROTATE_REFRESH_TOKENS"):
+            payload["refresh"] = str(refresh)
+        return Response(payload)
+
+
 class PersonViewSet(viewsets.ModelViewSet):
     queryset = Person.objects.all().order_by("person_id")
     serializer_class = PersonSerializer
@@ -4089,8 +4043,7 @@ class PersonViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        last_person = Person.objects.order_by("-person_id").first()
-        next_id = (last_person.person_id + 1) if last_person else 1
+        next_id = allocate_id(Person)
         person = Person.objects.create(person_id=next_id, **serializer.validated_data)
         return Response(PersonSerializer(person).data, status=status.HTTP_201_CREATED)
 
@@ -4107,8 +4060,7 @@ class AssetTypeViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        last_type = AssetType.objects.all().order_by("-asset_type_id").first()
-        next_id = (last_type.asset_type_id + 1) if last_type else 1
+        next_id = allocate_id(AssetType)
         
         asset_type = AssetType.objects.create(asset_type_id=next_id, **serializer.validated_data)
         return Response(AssetTypeSerializer(asset_type).data, status=status.HTTP_201_CREATED)
@@ -4126,8 +4078,7 @@ class AssetBrandViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        last_brand = AssetBrand.objects.all().order_by("-asset_brand_id").first()
-        next_id = (last_brand.asset_brand_id + 1) if last_brand else 1
+        next_id = allocate_id(AssetBrand)
 
         try:
             brand = AssetBrand.objects.create(
@@ -4305,8 +4256,7 @@ class AssetModelViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        last_model = AssetModel.objects.all().order_by("-asset_model_id").first()
-        next_id = (last_model.asset_model_id + 1) if last_model else 1
+        next_id = allocate_id(AssetModel)
         
         asset_model = AssetModel.objects.create(asset_model_id=next_id, **serializer.validated_data)
         _sync_asset_model_attribute_values(asset_model)
@@ -4420,9 +4370,7 @@ class AssetViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
         if not user_account or not user_account.person:
             return Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=user_account.person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
         if (not user_account.is_superuser()) and ("maintenance_chief" not in role_codes):
             return Response(
                 {"error": "Only maintenance chief can suggest for destruction"},
@@ -4469,12 +4417,10 @@ class AssetViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
                     mapping.save()
                     
                     # Create movement request
-                    last_move = StockItemMovement.objects.order_by("-stock_item_movement_id").first()
-                    next_id = (last_move.stock_item_movement_id + 1) if last_move else 1
+                    next_id = allocate_id(StockItemMovement)
                     
                     # Find current location (usually where the asset is)
-                    asset_last_move = AssetMovement.objects.filter(asset=asset).order_by("-asset_movement_id").first()
-                    source_loc_id = asset_last_move.destination_location_id if asset_last_move else None
+                    source_loc_id = current_location_id("asset", asset.asset_id)
                     
                     if source_loc_id:
                         StockItemMovement.objects.create(
@@ -4504,12 +4450,10 @@ class AssetViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
                     mapping.save()
                     
                     # Create movement request
-                    last_move = ConsumableMovement.objects.order_by("-consumable_movement_id").first()
-                    next_id = (last_move.consumable_movement_id + 1) if last_move else 1
+                    next_id = allocate_id(ConsumableMovement)
                     
                     # Find current location
-                    asset_last_move = AssetMovement.objects.filter(asset=asset).order_by("-asset_movement_id").first()
-                    source_loc_id = asset_last_move.destination_location_id if asset_last_move else None
+                    source_loc_id = current_location_id("asset", asset.asset_id)
                     
                     if source_loc_id:
                         ConsumableMovement.objects.create(
@@ -4544,8 +4488,7 @@ class AssetViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
         print(f"[AssetViewSet.create] asset_data keys: {list(asset_data.keys())}")
         
         # Get the last asset to determine next ID
-        last_asset = Asset.objects.order_by("-asset_id").first()
-        next_asset_id = (last_asset.asset_id + 1) if last_asset else 1
+        next_asset_id = allocate_id(Asset)
         
         # Create the asset with only model fields
         asset = Asset.objects.create(asset_id=next_asset_id, **asset_data)
@@ -4577,8 +4520,7 @@ class AssetViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
                 continue
 
             for _ in range(quantity):
-                last_si = StockItem.objects.order_by("-stock_item_id").first()
-                next_si_id = (last_si.stock_item_id + 1) if last_si else 1
+                next_si_id = allocate_id(StockItem)
 
                 inst_payload = None
                 if isinstance(instances, list) and len(instances) > 0:
@@ -4609,8 +4551,7 @@ class AssetViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
                 continue
 
             for _ in range(quantity):
-                last_cons = Consumable.objects.order_by("-consumable_id").first()
-                next_cons_id = (last_cons.consumable_id + 1) if last_cons else 1
+                next_cons_id = allocate_id(Consumable)
 
                 inst_payload = None
                 if isinstance(instances, list) and len(instances) > 0:
@@ -4646,8 +4587,7 @@ class AssetViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
         for default_item in default_stock_items:
             # Create StockItem records for each quantity
             for _ in range(default_item.quantity):
-                last_si = StockItem.objects.order_by("-stock_item_id").first()
-                next_si_id = (last_si.stock_item_id + 1) if last_si else 1
+                next_si_id = allocate_id(StockItem)
                 
                 stock_item = StockItem.objects.create(
                     stock_item_id=next_si_id,
@@ -4674,8 +4614,7 @@ class AssetViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
         for default_item in default_consumables:
             # Create Consumable records for each quantity
             for _ in range(default_item.quantity):
-                last_cons = Consumable.objects.order_by("-consumable_id").first()
-                next_cons_id = (last_cons.consumable_id + 1) if last_cons else 1
+                next_cons_id = allocate_id(Consumable)
                 
                 consumable = Consumable.objects.create(
                     consumable_id=next_cons_id,
@@ -4697,34 +4636,23 @@ class AssetViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
     @action(detail=True, methods=["get"], url_path="current-location")
     def current_location(self, request, pk=None):
         asset = self.get_object()
-        last_move = (
-            AssetMovement.objects.select_related("destination_location", "destination_location__location_type")
+        current = (
+            AssetCurrentLocation.objects.select_related("location", "location__location_type")
             .filter(asset_id=asset.asset_id)
-            .order_by("-asset_movement_id")
             .first()
         )
-        if not last_move or not last_move.destination_location_id:
+        if not current or not current.location_id:
             return Response({"location": None}, status=status.HTTP_200_OK)
-        return Response({"location": LocationSerializer(last_move.destination_location).data}, status=status.HTTP_200_OK)
+        return Response({"location": LocationSerializer(current.location).data}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=["post"], url_path="move")
     def move(self, request, pk=None):
-        user_account = SuperuserWriteMixin()._get_user_account(request)
-        if not user_account:
+        principal = get_principal(request)
+        if not principal:
             return Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
-
-        if user_account.is_superuser():
-            allowed = True
-        else:
-            person = getattr(user_account, "person", None)
-            if not person:
-                return Response({"error": "Person profile not found"}, status=status.HTTP_404_NOT_FOUND)
-            role_codes = set(
-                PersonRoleMapping.objects.filter(person=person).values_list("role__role_code", flat=True)
-            )
-            allowed = ("asset_responsible" in role_codes) or ("exploitation_chief" in role_codes) or ("it_bureau_chief" in role_codes)
-
-        if not allowed:
+        if not principal.is_superuser and not principal.person_id:
+            return Response({"error": "Person profile not found"}, status=status.HTTP_404_NOT_FOUND)
+        if not _can_move_assets(principal):
             return Response(
                 {"error": "Only Asset Responsible or superiors can move assets"},
                 status=status.HTTP_403_FORBIDDEN,
@@ -4745,15 +4673,9 @@ class AssetViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
         if not destination_location:
             return Response({"error": "Invalid destination_location_id"}, status=status.HTTP_400_BAD_REQUEST)
 
-        last_move = (
-            AssetMovement.objects.select_related("destination_location")
-            .filter(asset_id=asset.asset_id)
-            .order_by("-asset_movement_id")
-            .first()
-        )
-        if not last_move or not last_move.destination_location_id:
-            last_asset_move = AssetMovement.objects.order_by("-asset_movement_id").first()
-            next_asset_move_id = (last_asset_move.asset_movement_id + 1) if last_asset_move else 1
+        current = AssetCurrentLocation.objects.select_related("location").filter(asset_id=asset.asset_id).first()
+        if not current or not current.location_id:
+            next_asset_move_id = allocate_id(AssetMovement)
 
             AssetMovement.objects.create(
                 asset_movement_id=next_asset_move_id,
@@ -4775,43 +4697,128 @@ class AssetViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
                 status=status.HTTP_201_CREATED,
             )
 
-        source_location = last_move.destination_location
+        source_location = current.location
         if source_location.location_id == destination_location.location_id:
             return Response({"error": "Asset is already in this location"}, status=status.HTTP_400_BAD_REQUEST)
 
-        last_asset_move = AssetMovement.objects.order_by("-asset_movement_id").first()
-        next_asset_move_id = (last_asset_move.asset_movement_id + 1) if last_asset_move else 1
+        with transaction.atomic():
+            next_asset_move_id = allocate_id(AssetMovement)
 
-        AssetMovement.objects.create(
-            asset_movement_id=next_asset_move_id,
-            asset=asset,
-            source_location=source_location,
-            destination_location=destination_location,
-            maintenance_step=None,
-            external_maintenance_step_id=None,
-            movement_reason=movement_reason,
-            movement_datetime=timezone.now(),
-        )
+            AssetMovement.objects.create(
+                asset_movement_id=next_asset_move_id,
+                asset=asset,
+                source_location=source_location,
+                destination_location=destination_location,
+                maintenance_step=None,
+                external_maintenance_step_id=None,
+                movement_reason=movement_reason,
+                movement_datetime=timezone.now(),
+            )
 
-        _cascade_move_composed_items(
-            asset_id=asset.asset_id,
-            source_location_id=source_location.location_id,
-            destination_location_id=destination_location.location_id,
-            movement_reason=movement_reason,
-            movement_datetime=timezone.now(),
-            maintenance_step_id=None,
-            external_maintenance_step_id=None,
-        )
+            cascaded = _cascade_move_composed_items(
+                asset_id=asset.asset_id,
+                source_location_id=source_location.location_id,
+                destination_location_id=destination_location.location_id,
+                movement_reason=movement_reason,
+                movement_datetime=timezone.now(),
+                maintenance_step_id=None,
+                external_maintenance_step_id=None,
+            )
 
         return Response(
             {
                 "asset_movement_id": next_asset_move_id,
                 "source_location_id": source_location.location_id,
                 "destination_location_id": destination_location.location_id,
+                **cascaded,
             },
             status=status.HTTP_201_CREATED,
         )
 
+    def perform_create(self, serializer):
+        asset = serializer.save()
+        _sync_asset_attribute_values(asset)
+
+    @action(detail=False, methods=["post"], url_path="bulk-create")
+    def bulk_create(self, request):
+        denial = self._require_superuser(request, "create assets")
+        if denial:
+            return denial
+        return _bulk_create_items(
+            request,
+            model=Asset,
+            serializer_class=AssetSerializer,
+            family="asset",
+            after_create=_create_default_compositions,
+        )
+
+    @action(detail=False, methods=["post"], url_path="bulk-move")
+    def bulk_move(self, request):
+        principal = get_principal(request)
+        if not principal:
+            return Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
+        if not principal.is_superuser and not principal.person_id:
+            return Response({"error": "Person profile not found"}, status=status.HTTP_404_NOT_FOUND)
+        if not _can_move_assets(principal):
+            return Response(
+                {"error": "Only Asset Responsible or superiors can move assets"},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        destination_location_id = request.data.get("destination_location_id")
+        movement_reason = request.data.get("movement_reason") or "manual_move"
+        if not destination_location_id:
+            return Response({"error": "destination_location_id is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            destination_location_id_int = int(destination_location_id)
+        except (TypeError, ValueError):
+            return Response({"error": "Invalid destination_location_id"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not Location.objects.filter(location_id=destination_location_id_int).exists():
+            return Response({"error": "Invalid destination_location_id"}, status=status.HTTP_400_BAD_REQUEST)
+
+        raw_asset_ids = request.data.get("asset_ids")
+        attribution_order_id = request.data.get("attribution_order_id")
+        source_location_id = request.data.get("source_location_id")
+        if raw_asset_ids is None and attribution_order_id in (None, "") and source_location_id in (None, ""):
+            return Response(
+                {"error": "Provide asset_ids, attribution_order_id or source_location_id"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        filters = {}
+        try:
+            if raw_asset_ids is not None:
+                if not isinstance(raw_asset_ids, list):
+                    return Response({"error": "asset_ids must be a list"}, status=status.HTTP_400_BAD_REQUEST)
+                filters["asset_ids"] = list(dict.fromkeys(int(v) for v in raw_asset_ids))
+            if attribution_order_id not in (None, ""):
+                filters["attribution_order_id"] = int(attribution_order_id)
+            if source_location_id not in (None, ""):
+                filters["source_location_id"] = int(source_location_id)
+        except (TypeError, ValueError):
+            return Response({"error": "Invalid asset filter"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if _request_flag(request, "async"):
+            job = enqueue(
+                "assets.bulk_move",
+                {
+                    "destination_location_id": destination_location_id_int,
+                    "movement_reason": movement_reason,
+                    **filters,
+                },
+                user=user_account,
+            )
+            return _job_response(job)
+
+        result = bulk_move_assets(
+            destination_location_id=destination_location_id_int,
+            movement_reason=movement_reason,
+            **filters,
+        )
+        return Response(result, status=status.HTTP_200_OK)
+
     def get_queryset(self):
         queryset = Asset.objects.select_related("asset_model").order_by("asset_id")
         attribution_order_id = self.request.query_params.get("attribution_order")
@@ -4827,8 +4834,33 @@ class AssetViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
                 queryset = queryset.filter(asset_model_id=int(asset_model_id))
             except (ValueError, TypeError):
                 pass
+
+        if self.action in {"list", "retrieve"}:
+            requested = requested_fields(self.request)
+            if requested is None or "stock_item_composition" in requested:
+                queryset = queryset.prefetch_related(
+                    Prefetch(
+                        "stock_item_composition_history",
+                        queryset=AssetIsComposedOfStockItemHistory.objects.filter(end_datetime__isnull=True).select_related("stock_item"),
+                        to_attr="open_stock_item_composition",
+                    )
+                )
+            if requested is None or "consumable_composition" in requested:
+                queryset = queryset.prefetch_related(
+                    Prefetch(
+                        "consumable_composition_history",
+                        queryset=AssetIsComposedOfConsumableHistory.objects.filter(end_datetime__isnull=True).select_related("consumable"),
+                        to_attr="open_consumable_composition",
+                    )
+                )
         return queryset
 
+    def get_serializer(self, *args, **kwargs):
+        # ?fields= only trims this endpoint's own list/retrieve output.
+        if self.action in {"list", "retrieve"}:
+            kwargs.setdefault("fields", requested_fields(self.request))
+        return super().get_serializer(*args, **kwargs)
+
     def update(self, request, *args, **kwargs):
         response = super().update(request, *args, **kwargs)
         instance = self.get_object()
@@ -4854,15 +4886,16 @@ class AssetAttributeDefinitionViewSet(SuperuserWriteMixin, viewsets.ModelViewSet
 
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        last_def = AssetAttributeDefinition.objects.order_by("-asset_attribute_definition_id").first()
-        next_id = (last_def.asset_attribute_definition_id + 1) if last_def else 1
+        next_id = allocate_id(AssetAttributeDefinition)
         definition = AssetAttributeDefinition.objects.create(asset_attribute_definition_id=next_id, **serializer.validated_data)
         return Response(AssetAttributeDefinitionSerializer(definition).data, status=status.HTTP_201_CREATED)
 
 
-class AssetTypeAttributeViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
+class AssetTypeAttributeViewSet(TypeAttributePropagationMixin, SuperuserWriteMixin, viewsets.ModelViewSet):
     queryset = AssetTypeAttribute.objects.all().order_by("asset_type_id", "asset_attribute_definition_id")
     serializer_class = AssetTypeAttributeSerializer
+    attribute_family = "asset"
+    type_field = "asset_type_id"
 
     def get_queryset(self):
         queryset = AssetTypeAttribute.objects.select_related("asset_attribute_definition", "asset_type")
@@ -4889,21 +4922,9 @@ class AssetTypeAttributeViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
             if deleted == 0:
                 return Response({"error": "Mapping not found"}, status=status.HTTP_404_NOT_FOUND)
 
-            for model in AssetModel.objects.filter(asset_type_id=asset_type_id):
-                _sync_asset_model_attribute_values(model)
-            return Response(status=status.HTTP_204_NO_CONTENT)
+            return self._destroyed_response(asset_type_id)
 
-        return super().destroy(request, *args, **kwargs)
-
-    def perform_create(self, serializer):
-        instance = serializer.save()
-        for model in AssetModel.objects.filter(asset_type_id=instance.asset_type_id):
-            _sync_asset_model_attribute_values(model)
-
-    def perform_update(self, serializer):
-        instance = serializer.save()
-        for model in AssetModel.objects.filter(asset_type_id=instance.asset_type_id):
-            _sync_asset_model_attribute_values(model)
+        return super().destroy(request, *args, **kwargs)
 
 
 class AssetModelAttributeValueViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
@@ -4984,8 +5005,7 @@ class StockItemTypeViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        last_type = StockItemType.objects.all().order_by("-stock_item_type_id").first()
-        next_id = (last_type.stock_item_type_id + 1) if last_type else 1
+        next_id = allocate_id(StockItemType)
 
         try:
             stock_item_type = StockItemType.objects.create(
@@ -5016,8 +5036,7 @@ class StockItemBrandViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        last_brand = StockItemBrand.objects.all().order_by("-stock_item_brand_id").first()
-        next_id = (last_brand.stock_item_brand_id + 1) if last_brand else 1
+        next_id = allocate_id(StockItemBrand)
 
         try:
             brand = StockItemBrand.objects.create(
@@ -5133,8 +5152,7 @@ class StockItemModelViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        last_model = StockItemModel.objects.all().order_by("-stock_item_model_id").first()
-        next_id = (last_model.stock_item_model_id + 1) if last_model else 1
+        next_id = allocate_id(StockItemModel)
 
         stock_item_model = StockItemModel.objects.create(stock_item_model_id=next_id, **serializer.validated_data)
         _sync_stock_item_model_attribute_values(stock_item_model)
@@ -5188,7 +5206,8 @@ class StockItemViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
 
     @action(detail=True, methods=["post"], url_path="suggest-for-destruction")
     def suggest_for_destruction(self, request, pk=None):
-        user_account = SuperuserWriteMixin()._get_user_account(request)
+        principal = get_principal(request)
+        user_account = principal.user if principal else None
         if not user_account:
             return Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -5198,7 +5217,7 @@ class StockItemViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
             person = getattr(user_account, "person", None)
             if not person:
                 return Response({"error": "Person profile not found"}, status=status.HTTP_404_NOT_FOUND)
-            role_codes = set(PersonRoleMapping.objects.filter(person=person).values_list("role__role_code", flat=True))
+            role_codes = set(user_account.role_codes())
             allowed = "maintenance_chief" in role_codes
 
         if not allowed:
@@ -5225,7 +5244,8 @@ class StockItemViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
         return Response(self.get_serializer(item).data, status=status.HTTP_200_OK)
 
     def _require_responsible_or_superuser(self, request, action_desc):
-        user_account = SuperuserWriteMixin()._get_user_account(request)
+        principal = get_principal(request)
+        user_account = principal.user if principal else None
         if not user_account:
             return Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -5236,7 +5256,7 @@ class StockItemViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
         if not person:
             return Response({"error": "Person profile not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        role_codes = set(PersonRoleMapping.objects.filter(person=person).values_list("role__role_code", flat=True))
+        role_codes = set(user_account.role_codes())
         if "stock_consumable_responsible" in role_codes or "it_bureau_chief" in role_codes:
             return None
 
@@ -5252,12 +5272,18 @@ class StockItemViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
 
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        last_item = StockItem.objects.order_by("-stock_item_id").first()
-        next_id = (last_item.stock_item_id + 1) if last_item else 1
+        next_id = allocate_id(StockItem)
         item = StockItem.objects.create(stock_item_id=next_id, **serializer.validated_data)
         _sync_stock_item_attribute_values(item)
         return Response(StockItemSerializer(item).data, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=["post"], url_path="bulk-create")
+    def bulk_create(self, request):
+        denial = self._require_responsible_or_superuser(request, "create stock items")
+        if denial:
+            return denial
+        return _bulk_create_items(request, model=StockItem, serializer_class=StockItemSerializer, family="stock_item")
+
     def update(self, request, *args, **kwargs):
         stock_item_status = request.data.get("stock_item_status")
         if isinstance(stock_item_status, str) and stock_item_status.strip().lower() == "suggested_for_destruction":
@@ -5279,18 +5305,13 @@ class StockItemViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
     @action(detail=True, methods=["get"], url_path="current-location")
     def current_location(self, request, pk=None):
         stock_item = self.get_object()
-        last_move = (
-            StockItemMovement.objects.filter(stock_item_id=stock_item.stock_item_id)
-            .order_by("-stock_item_movement_id")
-            .first()
-        )
-        if not last_move or not last_move.destination_location_id:
-            return Response({"location_id": None}, status=status.HTTP_200_OK)
-        return Response({"location_id": last_move.destination_location_id}, status=status.HTTP_200_OK)
+        location_id = current_location_ids("stock_item", [stock_item.stock_item_id]).get(stock_item.stock_item_id)
+        return Response({"location_id": location_id}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=["post"], url_path="move")
     def move(self, request, pk=None):
-        user_account = SuperuserWriteMixin()._get_user_account(request)
+        principal = get_principal(request)
+        user_account = principal.user if principal else None
         if not user_account:
             return Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -5300,9 +5321,7 @@ class StockItemViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
             person = getattr(user_account, "person", None)
             if not person:
                 return Response({"error": "Person profile not found"}, status=status.HTTP_404_NOT_FOUND)
-            role_codes = set(
-                PersonRoleMapping.objects.filter(person=person).values_list("role__role_code", flat=True)
-            )
+            role_codes = set(user_account.role_codes())
             allowed = (
                 ("stock_consumable_responsible" in role_codes)
                 or ("asset_responsible" in role_codes)
@@ -5331,15 +5350,9 @@ class StockItemViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
         if not destination_location:
             return Response({"error": "Invalid destination_location_id"}, status=status.HTTP_400_BAD_REQUEST)
 
-        last_move = (
-            StockItemMovement.objects.select_related("destination_location")
-            .filter(stock_item_id=stock_item.stock_item_id)
-            .order_by("-stock_item_movement_id")
-            .first()
-        )
-        if not last_move or not last_move.destination_location_id:
-            last_global_move = StockItemMovement.objects.order_by("-stock_item_movement_id").first()
-            next_move_id = (last_global_move.stock_item_movement_id + 1) if last_global_move else 1
+        current = StockItemCurrentLocation.objects.select_related("location").filter(stock_item_id=stock_item.stock_item_id).first()
+        if not current or not current.location_id:
+            next_move_id = allocate_id(StockItemMovement)
 
             StockItemMovement.objects.create(
                 stock_item_movement_id=next_move_id,
@@ -5361,12 +5374,11 @@ class StockItemViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
                 status=status.HTTP_201_CREATED,
             )
 
-        source_location = last_move.destination_location
+        source_location = current.location
         if source_location.location_id == destination_location.location_id:
             return Response({"error": "Stock item is already in this location"}, status=status.HTTP_400_BAD_REQUEST)
 
-        last_global_move = StockItemMovement.objects.order_by("-stock_item_movement_id").first()
-        next_move_id = (last_global_move.stock_item_movement_id + 1) if last_global_move else 1
+        next_move_id = allocate_id(StockItemMovement)
 
         StockItemMovement.objects.create(
             stock_item_movement_id=next_move_id,
@@ -5379,7 +5391,7 @@ class StockItemViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
             movement_datetime=timezone.now(),
         )
 
-        _cascade_move_stock_item_consumables(
+        cascaded = _cascade_move_stock_item_consumables(
             stock_item_id=stock_item.stock_item_id,
             source_location_id=source_location.location_id,
             destination_location_id=destination_location.location_id,
@@ -5394,6 +5406,7 @@ class StockItemViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
                 "stock_item_movement_id": next_move_id,
                 "source_location_id": source_location.location_id,
                 "destination_location_id": destination_location.location_id,
+                **cascaded,
             },
             status=status.HTTP_201_CREATED,
         )
@@ -5417,17 +5430,18 @@ class StockItemAttributeDefinitionViewSet(SuperuserWriteMixin, viewsets.ModelVie
 
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        last_def = StockItemAttributeDefinition.objects.order_by("-stock_item_attribute_definition_id").first()
-        next_id = (last_def.stock_item_attribute_definition_id + 1) if last_def else 1
+        next_id = allocate_id(StockItemAttributeDefinition)
         definition = StockItemAttributeDefinition.objects.create(
             stock_item_attribute_definition_id=next_id, **serializer.validated_data
         )
         return Response(StockItemAttributeDefinitionSerializer(definition).data, status=status.HTTP_201_CREATED)
 
 
-class StockItemTypeAttributeViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
+class StockItemTypeAttributeViewSet(TypeAttributePropagationMixin, SuperuserWriteMixin, viewsets.ModelViewSet):
     queryset = StockItemTypeAttribute.objects.all().order_by("stock_item_type_id", "stock_item_attribute_definition_id")
     serializer_class = StockItemTypeAttributeSerializer
+    attribute_family = "stock_item"
+    type_field = "stock_item_type_id"
 
     def get_queryset(self):
         queryset = StockItemTypeAttribute.objects.select_related("stock_item_attribute_definition", "stock_item_type")
@@ -5454,22 +5468,10 @@ class StockItemTypeAttributeViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
             if deleted == 0:
                 return Response({"error": "Mapping not found"}, status=status.HTTP_404_NOT_FOUND)
 
-            for model in StockItemModel.objects.filter(stock_item_type_id=stock_item_type_id):
-                _sync_stock_item_model_attribute_values(model)
-            return Response(status=status.HTTP_204_NO_CONTENT)
+            return self._destroyed_response(stock_item_type_id)
 
         return super().destroy(request, *args, **kwargs)
 
-    def perform_create(self, serializer):
-        instance = serializer.save()
-        for model in StockItemModel.objects.filter(stock_item_type_id=instance.stock_item_type_id):
-            _sync_stock_item_model_attribute_values(model)
-
-    def perform_update(self, serializer):
-        instance = serializer.save()
-        for model in StockItemModel.objects.filter(stock_item_type_id=instance.stock_item_type_id):
-            _sync_stock_item_model_attribute_values(model)
-
 
 class StockItemModelAttributeValueViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
     queryset = StockItemModelAttributeValue.objects.all().order_by(
@@ -5553,8 +5555,7 @@ class ConsumableTypeViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        last_type = ConsumableType.objects.all().order_by("-consumable_type_id").first()
-        next_id = (last_type.consumable_type_id + 1) if last_type else 1
+        next_id = allocate_id(ConsumableType)
 
         try:
             consumable_type = ConsumableType.objects.create(
@@ -5585,8 +5586,7 @@ class ConsumableBrandViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        last_brand = ConsumableBrand.objects.all().order_by("-consumable_brand_id").first()
-        next_id = (last_brand.consumable_brand_id + 1) if last_brand else 1
+        next_id = allocate_id(ConsumableBrand)
 
         try:
             brand = ConsumableBrand.objects.create(
@@ -5704,8 +5704,7 @@ class ConsumableModelViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        last_model = ConsumableModel.objects.all().order_by("-consumable_model_id").first()
-        next_id = (last_model.consumable_model_id + 1) if last_model else 1
+        next_id = allocate_id(ConsumableModel)
 
         consumable_model = ConsumableModel.objects.create(consumable_model_id=next_id, **serializer.validated_data)
         _sync_consumable_model_attribute_values(consumable_model)
@@ -5762,7 +5761,8 @@ class ConsumableViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
 
     @action(detail=True, methods=["post"], url_path="suggest-for-destruction")
     def suggest_for_destruction(self, request, pk=None):
-        user_account = SuperuserWriteMixin()._get_user_account(request)
+        principal = get_principal(request)
+        user_account = principal.user if principal else None
         if not user_account:
             return Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -5772,7 +5772,7 @@ class ConsumableViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
             person = getattr(user_account, "person", None)
             if not person:
                 return Response({"error": "Person profile not found"}, status=status.HTTP_404_NOT_FOUND)
-            role_codes = set(PersonRoleMapping.objects.filter(person=person).values_list("role__role_code", flat=True))
+            role_codes = set(user_account.role_codes())
             allowed = "maintenance_chief" in role_codes
 
         if not allowed:
@@ -5799,7 +5799,8 @@ class ConsumableViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
         return Response(self.get_serializer(item).data, status=status.HTTP_200_OK)
 
     def _require_responsible_or_superuser(self, request, action_desc):
-        user_account = SuperuserWriteMixin()._get_user_account(request)
+        principal = get_principal(request)
+        user_account = principal.user if principal else None
         if not user_account:
             return Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -5810,7 +5811,7 @@ class ConsumableViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
         if not person:
             return Response({"error": "Person profile not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        role_codes = set(PersonRoleMapping.objects.filter(person=person).values_list("role__role_code", flat=True))
+        role_codes = set(user_account.role_codes())
         if "stock_consumable_responsible" in role_codes or "it_bureau_chief" in role_codes:
             return None
 
@@ -5826,12 +5827,18 @@ class ConsumableViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
 
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        last_item = Consumable.objects.order_by("-consumable_id").first()
-        next_id = (last_item.consumable_id + 1) if last_item else 1
+        next_id = allocate_id(Consumable)
         item = Consumable.objects.create(consumable_id=next_id, **serializer.validated_data)
         _sync_consumable_attribute_values(item)
         return Response(ConsumableSerializer(item).data, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=["post"], url_path="bulk-create")
+    def bulk_create(self, request):
+        denial = self._require_responsible_or_superuser(request, "create consumables")
+        if denial:
+            return denial
+        return _bulk_create_items(request, model=Consumable, serializer_class=ConsumableSerializer, family="consumable")
+
     def update(self, request, *args, **kwargs):
         consumable_status = request.data.get("consumable_status")
         if isinstance(consumable_status, str) and consumable_status.strip().lower() == "suggested_for_destruction":
@@ -5853,18 +5860,13 @@ class ConsumableViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
     @action(detail=True, methods=["get"], url_path="current-location")
     def current_location(self, request, pk=None):
         consumable = self.get_object()
-        last_move = (
-            ConsumableMovement.objects.filter(consumable_id=consumable.consumable_id)
-            .order_by("-consumable_movement_id")
-            .first()
-        )
-        if not last_move or not last_move.destination_location_id:
-            return Response({"location_id": None}, status=status.HTTP_200_OK)
-        return Response({"location_id": last_move.destination_location_id}, status=status.HTTP_200_OK)
+        location_id = current_location_ids("consumable", [consumable.consumable_id]).get(consumable.consumable_id)
+        return Response({"location_id": location_id}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=["post"], url_path="move")
     def move(self, request, pk=None):
-        user_account = SuperuserWriteMixin()._get_user_account(request)
+        principal = get_principal(request)
+        user_account = principal.user if principal else None
         if not user_account:
             return Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -5874,9 +5876,7 @@ class ConsumableViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
             person = getattr(user_account, "person", None)
             if not person:
                 return Response({"error": "Person profile not found"}, status=status.HTTP_404_NOT_FOUND)
-            role_codes = set(
-                PersonRoleMapping.objects.filter(person=person).values_list("role__role_code", flat=True)
-            )
+            role_codes = set(user_account.role_codes())
             allowed = (
                 ("stock_consumable_responsible" in role_codes)
                 or ("asset_responsible" in role_codes)
@@ -5905,15 +5905,9 @@ class ConsumableViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
         if not destination_location:
             return Response({"error": "Invalid destination_location_id"}, status=status.HTTP_400_BAD_REQUEST)
 
-        last_move = (
-            ConsumableMovement.objects.select_related("destination_location")
-            .filter(consumable_id=consumable.consumable_id)
-            .order_by("-consumable_movement_id")
-            .first()
-        )
-        if not last_move or not last_move.destination_location_id:
-            last_global_move = ConsumableMovement.objects.order_by("-consumable_movement_id").first()
-            next_move_id = (last_global_move.consumable_movement_id + 1) if last_global_move else 1
+        current = ConsumableCurrentLocation.objects.select_related("location").filter(consumable_id=consumable.consumable_id).first()
+        if not current or not current.location_id:
+            next_move_id = allocate_id(ConsumableMovement)
 
             ConsumableMovement.objects.create(
                 consumable_movement_id=next_move_id,
@@ -5935,12 +5929,11 @@ class ConsumableViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
                 status=status.HTTP_201_CREATED,
             )
 
-        source_location = last_move.destination_location
+        source_location = current.location
         if source_location.location_id == destination_location.location_id:
             return Response({"error": "Consumable is already in this location"}, status=status.HTTP_400_BAD_REQUEST)
 
-        last_global_move = ConsumableMovement.objects.order_by("-consumable_movement_id").first()
-        next_move_id = (last_global_move.consumable_movement_id + 1) if last_global_move else 1
+        next_move_id = allocate_id(ConsumableMovement)
 
         ConsumableMovement.objects.create(
             consumable_movement_id=next_move_id,
@@ -5976,7 +5969,7 @@ class StockItemConsumableDestructionCertificateViewSet(viewsets.ModelViewSet):
         person = getattr(user_account, "person", None)
         if not person:
             return set()
-        return set(PersonRoleMapping.objects.filter(person=person).values_list("role__role_code", flat=True))
+        return set(user_account.role_codes())
 
     def create(self, request, *args, **kwargs):
         user_account = getattr(request, "user", None)
@@ -6022,8 +6015,7 @@ class StockItemConsumableDestructionCertificateViewSet(viewsets.ModelViewSet):
             return Response({"error": "At least one item must be included"}, status=status.HTTP_400_BAD_REQUEST)
 
         with transaction.atomic():
-            last_item = StockItemConsumableDestructionCertificate.objects.order_by("-destruction_certificate_id").first()
-            next_id = (last_item.destruction_certificate_id + 1) if last_item else 1
+            next_id = allocate_id(StockItemConsumableDestructionCertificate)
 
             cert = StockItemConsumableDestructionCertificate.objects.create(
                 destruction_certificate_id=next_id,
@@ -6104,9 +6096,7 @@ class StockItemConsumableDestructionCertificateViewSet(viewsets.ModelViewSet):
         if not os.path.isfile(abs_path):
             return Response({"error": "Digital copy file missing on server"}, status=status.HTTP_404_NOT_FOUND)
 
-        resp = FileResponse(open(abs_path, "rb"), content_type="application/pdf")
-        resp["Content-Disposition"] = f'inline; filename="destruction_certificate_{cert.destruction_certificate_id}.pdf"'
-        return resp
+        return serve_document(request, rel_path, f"destruction_certificate_{cert.destruction_certificate_id}.pdf")
 
     @action(detail=True, methods=["post"], url_path="upload-digital-copy")
     def upload_digital_copy(self, request, pk=None):
@@ -6132,14 +6122,10 @@ class StockItemConsumableDestructionCertificateViewSet(viewsets.ModelViewSet):
         if "pdf" not in content_type.lower():
             return Response({"error": "digital_copy must be a valid PDF"}, status=status.HTTP_400_BAD_REQUEST)
 
-        rel_dir = os.path.join("destruction_certificates")
-        base_dir = os.path.join(str(settings.MEDIA_ROOT), rel_dir)
-        os.makedirs(base_dir, exist_ok=True)
-
-        rel_path = os.path.join(rel_dir, f"destruction_certificate_{cert.destruction_certificate_id}.pdf")
-        abs_path = os.path.join(str(settings.MEDIA_ROOT), rel_path)
-        with open(abs_path, "wb") as f:
-            f.write(digital_copy.read())
+        try:
+            rel_path = store_pdf(digital_copy)
+        except InvalidDocument as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
         StockItemConsumableDestructionCertificate.objects.filter(destruction_certificate_id=cert.destruction_certificate_id).update(
             digital_copy=rel_path
@@ -6161,7 +6147,7 @@ class AssetDestructionCertificateViewSet(viewsets.ModelViewSet):
         person = getattr(user_account, "person", None)
         if not person:
             return set()
-        return set(PersonRoleMapping.objects.filter(person=person).values_list("role__role_code", flat=True))
+        return set(user_account.role_codes())
 
     def create(self, request, *args, **kwargs):
         user_account = getattr(request, "user", None)
@@ -6198,8 +6184,7 @@ class AssetDestructionCertificateViewSet(viewsets.ModelViewSet):
             return Response({"error": "At least one asset must be included"}, status=status.HTTP_400_BAD_REQUEST)
 
         with transaction.atomic():
-            last_item = AssetDestructionCertificate.objects.order_by("-asset_destruction_certificate_id").first()
-            next_id = (last_item.asset_destruction_certificate_id + 1) if last_item else 1
+            next_id = allocate_id(AssetDestructionCertificate)
 
             cert = AssetDestructionCertificate.objects.create(
                 asset_destruction_certificate_id=next_id,
@@ -6283,9 +6268,7 @@ class AssetDestructionCertificateViewSet(viewsets.ModelViewSet):
         if not os.path.isfile(abs_path):
             return Response({"error": "Digital copy file missing on server"}, status=status.HTTP_404_NOT_FOUND)
 
-        resp = FileResponse(open(abs_path, "rb"), content_type="application/pdf")
-        resp["Content-Disposition"] = f'inline; filename="asset_destruction_certificate_{cert.asset_destruction_certificate_id}.pdf"'
-        return resp
+        return serve_document(request, rel_path, f"asset_destruction_certificate_{cert.asset_destruction_certificate_id}.pdf")
 
     @action(detail=True, methods=["post"], url_path="upload-digital-copy")
     def upload_digital_copy(self, request, pk=None):
@@ -6311,14 +6294,10 @@ class AssetDestructionCertificateViewSet(viewsets.ModelViewSet):
         if "pdf" not in content_type.lower():
             return Response({"error": "digital_copy must be a valid PDF"}, status=status.HTTP_400_BAD_REQUEST)
 
-        rel_dir = os.path.join("asset_destruction_certificates")
-        base_dir = os.path.join(str(settings.MEDIA_ROOT), rel_dir)
-        os.makedirs(base_dir, exist_ok=True)
-
-        rel_path = os.path.join(rel_dir, f"asset_destruction_certificate_{cert.asset_destruction_certificate_id}.pdf")
-        abs_path = os.path.join(str(settings.MEDIA_ROOT), rel_path)
-        with open(abs_path, "wb") as f:
-            f.write(digital_copy.read())
+        try:
+            rel_path = store_pdf(digital_copy)
+        except InvalidDocument as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
         AssetDestructionCertificate.objects.filter(asset_destruction_certificate_id=cert.asset_destruction_certificate_id).update(
             digital_copy=rel_path
@@ -6344,17 +6323,18 @@ class ConsumableAttributeDefinitionViewSet(SuperuserWriteMixin, viewsets.ModelVi
 
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        last_def = ConsumableAttributeDefinition.objects.order_by("-consumable_attribute_definition_id").first()
-        next_id = (last_def.consumable_attribute_definition_id + 1) if last_def else 1
+        next_id = allocate_id(ConsumableAttributeDefinition)
         definition = ConsumableAttributeDefinition.objects.create(
             consumable_attribute_definition_id=next_id, **serializer.validated_data
         )
         return Response(ConsumableAttributeDefinitionSerializer(definition).data, status=status.HTTP_201_CREATED)
 
 
-class ConsumableTypeAttributeViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
+class ConsumableTypeAttributeViewSet(TypeAttributePropagationMixin, SuperuserWriteMixin, viewsets.ModelViewSet):
     queryset = ConsumableTypeAttribute.objects.all().order_by("consumable_type_id", "consumable_attribute_definition_id")
     serializer_class = ConsumableTypeAttributeSerializer
+    attribute_family = "consumable"
+    type_field = "consumable_type_id"
 
     def get_queryset(self):
         queryset = ConsumableTypeAttribute.objects.select_related("consumable_attribute_definition", "consumable_type")
@@ -6381,22 +6361,10 @@ class ConsumableTypeAttributeViewSet(SuperuserWriteMixin, viewsets.ModelViewSet)
             if deleted == 0:
                 return Response({"error": "Mapping not found"}, status=status.HTTP_404_NOT_FOUND)
 
-            for model in ConsumableModel.objects.filter(consumable_type_id=consumable_type_id):
-                _sync_consumable_model_attribute_values(model)
-            return Response(status=status.HTTP_204_NO_CONTENT)
+            return self._destroyed_response(consumable_type_id)
 
         return super().destroy(request, *args, **kwargs)
 
-    def perform_create(self, serializer):
-        instance = serializer.save()
-        for model in ConsumableModel.objects.filter(consumable_type_id=instance.consumable_type_id):
-            _sync_consumable_model_attribute_values(model)
-
-    def perform_update(self, serializer):
-        instance = serializer.save()
-        for model in ConsumableModel.objects.filter(consumable_type_id=instance.consumable_type_id):
-            _sync_consumable_model_attribute_values(model)
-
 
 class ConsumableModelAttributeValueViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
     queryset = ConsumableModelAttributeValue.objects.all().order_by("consumable_model_id", "consumable_attribute_definition_id")
@@ -6490,8 +6458,7 @@ class LocationViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
 
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        last_item = Location.objects.order_by("-location_id").first()
-        next_id = (last_item.location_id + 1) if last_item else 1
+        next_id = allocate_id(Location)
         item = Location.objects.create(location_id=next_id, **serializer.validated_data)
         return Response(LocationSerializer(item).data, status=status.HTTP_201_CREATED)
 
@@ -6514,8 +6481,7 @@ class PositionViewSet(SuperuserWriteMixin, viewsets.ModelViewSet):
 
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        last_position = Position.objects.order_by("-position_id").first()
-        next_id = (last_position.position_id + 1) if last_position else 1
+        next_id = allocate_id(Position)
         position = Position.objects.create(position_id=next_id, **serializer.validated_data)
         return Response(PositionSerializer(position).data, status=status.HTTP_201_CREATED)
 
@@ -6532,8 +6498,7 @@ class OrganizationalStructureViewSet(SuperuserWriteMixin, viewsets.ModelViewSet)
 
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        last_org = OrganizationalStructure.objects.order_by("-organizational_structure_id").first()
-        next_id = (last_org.organizational_structure_id + 1) if last_org else 1
+        next_id = allocate_id(OrganizationalStructure)
         org_structure = OrganizationalStructure.objects.create(organizational_structure_id=next_id, **serializer.validated_data)
         return Response(OrganizationalStructureSerializer(org_structure).data, status=status.HTTP_201_CREATED)
 
@@ -6571,17 +6536,8 @@ class AssetIsAssignedToPersonViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def _get_user_account(self, request):
-        if hasattr(request, "user") and request.user and getattr(request.user, "is_authenticated", False):
-            if isinstance(request.user, UserAccount):
-                return request.user
-        try:
-            if hasattr(request, "auth") and request.auth is not None:
-                user_id = request.auth.get("user_id")
-                if user_id:
-                    return UserAccount.objects.get(user_id=user_id)
-        except:
-            pass
-        return None
+        principal = get_principal(request)
+        return principal.user if principal else None
 
     def create(self, request, *args, **kwargs):
         user_account = self._get_user_account(request)
@@ -6592,9 +6548,7 @@ class AssetIsAssignedToPersonViewSet(viewsets.ModelViewSet):
         if not person:
             return Response({"error": "Person profile not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
 
         is_asset_responsible = "asset_responsible" in role_codes
         is_superuser = user_account.is_superuser()
@@ -6613,8 +6567,7 @@ class AssetIsAssignedToPersonViewSet(viewsets.ModelViewSet):
         if active_assignment:
             return Response({"error": "This asset is already assigned and active."}, status=status.HTTP_400_BAD_REQUEST)
 
-        last_item = AssetIsAssignedToPerson.objects.order_by("-assignment_id").first()
-        next_id = (last_item.assignment_id + 1) if last_item else 1
+        next_id = allocate_id(AssetIsAssignedToPerson)
 
         serializer = self.get_serializer(data=request.data)
         if not serializer.is_valid():
@@ -6626,8 +6579,7 @@ class AssetIsAssignedToPersonViewSet(viewsets.ModelViewSet):
         print(f"--- Asset Assignment Validated Data: {data}")
 
         try:
-            last_item = AssetIsAssignedToPerson.objects.all().order_by("-assignment_id").first()
-            next_id = (last_item.assignment_id + 1) if last_item else 1
+            next_id = allocate_id(AssetIsAssignedToPerson)
             
             # Explicitly add asset and person if they came as IDs but weren't in validated_data 
             # (though they should be if they are properly configured in serializer)
@@ -6652,9 +6604,7 @@ class AssetIsAssignedToPersonViewSet(viewsets.ModelViewSet):
         if not person:
             return Response({"error": "Person profile not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
 
         if ("exploitation_chief" not in role_codes) and ("it_bureau_chief" not in role_codes) and (not user_account.is_superuser()):
             return Response({"error": "Only Exploitation Chief can confirm assignments"}, status=status.HTTP_403_FORBIDDEN)
@@ -6674,9 +6624,7 @@ class AssetIsAssignedToPersonViewSet(viewsets.ModelViewSet):
         if not person:
             return Response({"error": "Person profile not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
 
         is_asset_responsible = "asset_responsible" in role_codes
         is_superuser = user_account.is_superuser()
@@ -6737,9 +6685,7 @@ class StockItemIsAssignedToPersonViewSet(viewsets.ModelViewSet):
         if not person:
             return Response({"error": "Person profile not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
 
         is_responsible = "stock_consumable_responsible" in role_codes
         is_superuser = user_account.is_superuser()
@@ -6763,8 +6709,7 @@ class StockItemIsAssignedToPersonViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data.copy()
 
-        last_item = StockItemIsAssignedToPerson.objects.order_by("-assignment_id").first()
-        next_id = (last_item.assignment_id + 1) if last_item else 1
+        next_id = allocate_id(StockItemIsAssignedToPerson)
 
         assignment = StockItemIsAssignedToPerson.objects.create(
             assignment_id=next_id,
@@ -6783,9 +6728,7 @@ class StockItemIsAssignedToPersonViewSet(viewsets.ModelViewSet):
         if not person:
             return Response({"error": "Person profile not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
 
         is_responsible = "stock_consumable_responsible" in role_codes
         is_superuser = user_account.is_superuser()
@@ -6845,9 +6788,7 @@ class ConsumableIsAssignedToPersonViewSet(viewsets.ModelViewSet):
         if not person:
             return Response({"error": "Person profile not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
 
         is_responsible = "stock_consumable_responsible" in role_codes
         is_superuser = user_account.is_superuser()
@@ -6871,8 +6812,7 @@ class ConsumableIsAssignedToPersonViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data.copy()
 
-        last_item = ConsumableIsAssignedToPerson.objects.order_by("-assignment_id").first()
-        next_id = (last_item.assignment_id + 1) if last_item else 1
+        next_id = allocate_id(ConsumableIsAssignedToPerson)
 
         assignment = ConsumableIsAssignedToPerson.objects.create(
             assignment_id=next_id,
@@ -6891,9 +6831,7 @@ class ConsumableIsAssignedToPersonViewSet(viewsets.ModelViewSet):
         if not person:
             return Response({"error": "Person profile not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
 
         is_responsible = "stock_consumable_responsible" in role_codes
         is_superuser = user_account.is_superuser()
@@ -6920,13 +6858,12 @@ class StockItemMovementApprovalViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
 
     def _require_responsible(self, request):
-        user_account = SuperuserWriteMixin()._get_user_account(request)
+        principal = get_principal(request)
+        user_account = principal.user if principal else None
         if not user_account or not user_account.person:
             return None, Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=user_account.person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
         if user_account.is_superuser() or ("stock_consumable_responsible" in role_codes):
             return user_account, None
 
@@ -6939,15 +6876,12 @@ class StockItemMovementApprovalViewSet(viewsets.ViewSet):
             return denial
 
         qs = (
-            StockItemMovement.objects.filter(status="pending")
-            .filter(
-                Q(movement_reason="return_to_owner")
-                | Q(movement_reason="problem_report_include")
-                | Q(movement_reason__startswith="problem_report_include_")
-            )
+            StockItemMovement.objects.filter(status="pending", request_kind__in=["return_to_owner", "problem_report_include"])
             .order_by("-movement_datetime", "-stock_item_movement_id")
         )
 
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(qs, request, view=self)
         data = [
             {
                 "stock_item_movement_id": m.stock_item_movement_id,
@@ -6958,8 +6892,10 @@ class StockItemMovementApprovalViewSet(viewsets.ViewSet):
                 "movement_datetime": m.movement_datetime,
                 "status": m.status,
             }
-            for m in qs
+            for m in (qs if page is None else page)
         ]
+        if page is not None:
+            return paginator.get_paginated_response(data)
         return Response(data, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=["post"], url_path="decide")
@@ -6981,10 +6917,7 @@ class StockItemMovementApprovalViewSet(viewsets.ViewSet):
         if not movement:
             return Response({"error": "Movement not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        if not (
-            movement.movement_reason in {"problem_report_include", "return_to_owner"}
-            or str(movement.movement_reason).startswith("problem_report_include_")
-        ):
+        if movement.request_kind not in {"problem_report_include", "return_to_owner"}:
             return Response({"error": "Only problem_report_include or return_to_owner movements can be decided"}, status=status.HTTP_400_BAD_REQUEST)
 
         if movement.status != "pending":
@@ -7010,13 +6943,12 @@ class ConsumableMovementApprovalViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
 
     def _require_responsible(self, request):
-        user_account = SuperuserWriteMixin()._get_user_account(request)
+        principal = get_principal(request)
+        user_account = principal.user if principal else None
         if not user_account or not user_account.person:
             return None, Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=user_account.person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
         if user_account.is_superuser() or ("stock_consumable_responsible" in role_codes):
             return user_account, None
 
@@ -7029,15 +6961,12 @@ class ConsumableMovementApprovalViewSet(viewsets.ViewSet):
             return denial
 
         qs = (
-            ConsumableMovement.objects.filter(status="pending")
-            .filter(
-                Q(movement_reason="return_to_owner")
-                | Q(movement_reason="problem_report_include")
-                | Q(movement_reason__startswith="problem_report_include_")
-            )
+            ConsumableMovement.objects.filter(status="pending", request_kind__in=["return_to_owner", "problem_report_include"])
             .order_by("-movement_datetime", "-consumable_movement_id")
         )
 
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(qs, request, view=self)
         data = [
             {
                 "consumable_movement_id": m.consumable_movement_id,
@@ -7048,8 +6977,10 @@ class ConsumableMovementApprovalViewSet(viewsets.ViewSet):
                 "movement_datetime": m.movement_datetime,
                 "status": m.status,
             }
-            for m in qs
+            for m in (qs if page is None else page)
         ]
+        if page is not None:
+            return paginator.get_paginated_response(data)
         return Response(data, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=["post"], url_path="decide")
@@ -7071,10 +7002,7 @@ class ConsumableMovementApprovalViewSet(viewsets.ViewSet):
         if not movement:
             return Response({"error": "Movement not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        if not (
-            movement.movement_reason in {"problem_report_include", "return_to_owner"}
-            or str(movement.movement_reason).startswith("problem_report_include_")
-        ):
+        if movement.request_kind not in {"problem_report_include", "return_to_owner"}:
             return Response(
                 {"error": "Only problem_report_include or return_to_owner movements can be decided"},
                 status=status.HTTP_400_BAD_REQUEST,
@@ -7103,13 +7031,12 @@ class AssetMovementApprovalViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
 
     def _require_asset_responsible(self, request):
-        user_account = SuperuserWriteMixin()._get_user_account(request)
+        principal = get_principal(request)
+        user_account = principal.user if principal else None
         if not user_account or not user_account.person:
             return None, Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=user_account.person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
         if user_account.is_superuser() or ("asset_responsible" in role_codes) or ("it_bureau_chief" in role_codes):
             return user_account, None
 
@@ -7122,16 +7049,12 @@ class AssetMovementApprovalViewSet(viewsets.ViewSet):
             return denial
 
         qs = (
-            AssetMovement.objects.filter(Q(status="pending") | Q(status__isnull=True))
-            .filter(
-                Q(movement_reason="return_to_owner")
-                | Q(movement_reason="maintenance_create")
-                | Q(movement_reason__startswith="maintenance_create_")
-                | Q(movement_reason="Maintenance")
-            )
+            AssetMovement.objects.filter(status="pending", request_kind__in=["return_to_owner", "maintenance_create"])
             .order_by("-movement_datetime", "-asset_movement_id")
         )
 
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(qs, request, view=self)
         data = [
             {
                 "asset_movement_id": m.asset_movement_id,
@@ -7142,8 +7065,10 @@ class AssetMovementApprovalViewSet(viewsets.ViewSet):
                 "movement_datetime": m.movement_datetime,
                 "status": m.status,
             }
-            for m in qs
+            for m in (qs if page is None else page)
         ]
+        if page is not None:
+            return paginator.get_paginated_response(data)
         return Response(data, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=["post"], url_path="decide")
@@ -7165,10 +7090,7 @@ class AssetMovementApprovalViewSet(viewsets.ViewSet):
         if not movement:
             return Response({"error": "Movement not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        if not (
-            movement.movement_reason in {"return_to_owner", "maintenance_create", "Maintenance"}
-            or str(movement.movement_reason).startswith("maintenance_create_")
-        ):
+        if movement.request_kind not in {"return_to_owner", "maintenance_create"}:
             return Response(
                 {"error": "Only return_to_owner or maintenance_create movements can be decided"},
                 status=status.HTTP_400_BAD_REQUEST,
@@ -7197,13 +7119,12 @@ class PurchaseOrderViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
 
     def _require_purchase_order_consult(self, request):
-        user_account = SuperuserWriteMixin()._get_user_account(request)
+        principal = get_principal(request)
+        user_account = principal.user if principal else None
         if not user_account or not getattr(user_account, "person", None):
             return None, set(), Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=user_account.person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
         allowed = {
             "stock_consumable_responsible",
             "director_admin_support",
@@ -7217,26 +7138,24 @@ class PurchaseOrderViewSet(viewsets.ViewSet):
         return None, set(), Response({"error": "Not allowed"}, status=status.HTTP_403_FORBIDDEN)
 
     def _require_responsible(self, request):
-        user_account = SuperuserWriteMixin()._get_user_account(request)
+        principal = get_principal(request)
+        user_account = principal.user if principal else None
         if not user_account or not getattr(user_account, "person", None):
             return None, Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=user_account.person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
         if user_account.is_superuser() or ("stock_consumable_responsible" in role_codes):
             return user_account, None
 
         return None, Response({"error": "Not allowed"}, status=status.HTTP_403_FORBIDDEN)
 
     def _require_acceptance_report_consult(self, request):
-        user_account = SuperuserWriteMixin()._get_user_account(request)
+        principal = get_principal(request)
+        user_account = principal.user if principal else None
         if not user_account or not getattr(user_account, "person", None):
             return None, set(), Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=user_account.person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
         allowed = {
             "stock_consumable_responsible",
             "director_admin_support",
@@ -7254,47 +7173,100 @@ class PurchaseOrderViewSet(viewsets.ViewSet):
         if denial:
             return denial
 
+        # Totals and latest documents come from purchase_order_summary, kept
+        # current by triggers on the order lines and documents (migration 0031).
+        # Filters and the keyset boundary apply to the summary so its
+        # (has_remaining, id) and (supplier_id, id) indexes drive the scan.
+        params = request.query_params
+        filters, sql_params = [], []
+        has_remaining = params.get("has_remaining")
+        if has_remaining not in (None, ""):
+            filters.append("ps.has_remaining = %s")
+            sql_params.append(str(has_remaining).strip().lower() in {"1", "true", "yes"})
+        supplier_id = params.get("supplier_id")
+        if supplier_id not in (None, ""):
+            try:
+                sql_params.append(int(supplier_id))
+            except (TypeError, ValueError):
+                return Response({"error": "supplier_id must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+            filters.append("ps.supplier_id = %s")
+
+        # Unpaginated unless page_size or cursor is given, like KeysetPagination.
+        paginate = "page_size" in params or "cursor" in params
+        page_size = page_size_from(request) if paginate else None
+        if params.get("cursor"):
+            (after_id,) = decode_cursor(params["cursor"], 1)
+            try:
+                sql_params.append(int(after_id))
+            except (TypeError, ValueError):
+                raise NotFound("Invalid cursor")
+            filters.append("ps.purchase_order_id < %s")
+        where = f"WHERE {' AND '.join(filters)}" if filters else ""
+        limit = ""
+        if paginate:
+            limit = "LIMIT %s"
+            sql_params.append(page_size + 1)
+
         with connection.cursor() as cursor:
             cursor.execute(
-                """
+                f"""
                 SELECT po.purchase_order_id,
                        po.supplier_id,
                        s.supplier_name,
                        po.is_signed_by_finance,
                        po.purchase_order_code,
-                       (
-                           EXISTS (
-                               SELECT 1
-                               FROM public.stock_item_model_is_found_in_purchase_order l
-                               WHERE l.purchase_order_id = po.purchase_order_id
-                                 AND COALESCE(l.quantity_ordered, 0) > COALESCE(l.quantity_received, 0)
-                           )
-                           OR EXISTS (
-                               SELECT 1
-                               FROM public.consumable_model_is_found_in_purchase_order l
-                               WHERE l.purchase_order_id = po.purchase_order_id
-                                 AND COALESCE(l.quantity_ordered, 0) > COALESCE(l.quantity_received, 0)
-                           )
-                       ) AS has_remaining
-                FROM public.purchase_order po
+                       ps.has_remaining,
+                       ps.stock_item_line_count,
+                       ps.consumable_line_count,
+                       ps.quantity_ordered,
+                       ps.quantity_received,
+                       ps.quantity_remaining,
+                       ps.latest_delivery_note_id,
+                       ps.latest_invoice_id,
+                       ps.latest_acceptance_report_id
+                FROM public.purchase_order_summary ps
+                JOIN public.purchase_order po ON po.purchase_order_id = ps.purchase_order_id
                 LEFT JOIN public.supplier s ON s.supplier_id = po.supplier_id
-                ORDER BY po.purchase_order_id DESC
-                """
+                {where}
+                ORDER BY ps.purchase_order_id DESC
+                {limit}
+                """,
+                sql_params,
             )
             rows = cursor.fetchall()
 
+        next_cursor = None
+        if paginate and len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = encode_cursor([rows[-1][0]])
+
+        results = [
+            {
+                "purchase_order_id": r[0],
+                "supplier_id": r[1],
+                "supplier_name": r[2],
+                "is_signed_by_finance": r[3],
+                "purchase_order_code": r[4],
+                "has_remaining": bool(r[5]),
+                "stock_item_line_count": r[6],
+                "consumable_line_count": r[7],
+                "quantity_ordered": r[8],
+                "quantity_received": r[9],
+                "quantity_remaining": r[10],
+                "latest_delivery_note_id": r[11],
+                "latest_invoice_id": r[12],
+                "latest_acceptance_report_id": r[13],
+            }
+            for r in rows
+        ]
+        if not paginate:
+            return Response(results, status=status.HTTP_200_OK)
         return Response(
-            [
-                {
-                    "purchase_order_id": r[0],
-                    "supplier_id": r[1],
-                    "supplier_name": r[2],
-                    "is_signed_by_finance": r[3],
-                    "purchase_order_code": r[4],
-                    "has_remaining": bool(r[5]),
-                }
-                for r in rows
-            ],
+            {
+                "next": next_page_link(request, page_size, next_cursor),
+                "first": remove_query_param(request.build_absolute_uri(), "cursor"),
+                "results": results,
+            },
             status=status.HTTP_200_OK,
         )
 
@@ -7345,67 +7317,8 @@ class PurchaseOrderViewSet(viewsets.ViewSet):
             if cursor.fetchone() is None:
                 return Response({"error": "Purchase order not found"}, status=status.HTTP_404_NOT_FOUND)
 
-            cursor.execute(
-                """
-                SELECT stock_item_model_id, COALESCE(quantity_received, 0)
-                FROM public.stock_item_model_is_found_in_purchase_order
-                WHERE purchase_order_id = %s
-                """,
-                [purchase_order_id],
-            )
-            stock_lines = cursor.fetchall()
-
-            cursor.execute(
-                """
-                SELECT consumable_model_id, COALESCE(quantity_received, 0)
-                FROM public.consumable_model_is_found_in_purchase_order
-                WHERE purchase_order_id = %s
-                """,
-                [purchase_order_id],
-            )
-            cons_lines = cursor.fetchall()
-
-        stock_items = []
-        for model_id, qty in stock_lines:
-            try:
-                qty_int = int(qty or 0)
-            except (TypeError, ValueError):
-                qty_int = 0
-            if qty_int <= 0:
-                continue
-            qs = (
-                StockItem.objects.filter(stock_item_model_id=model_id)
-                .order_by("-stock_item_id")
-                .values(
-                    "stock_item_id",
-                    "stock_item_model_id",
-                    "stock_item_name",
-                    "stock_item_inventory_number",
-                    "stock_item_status",
-                )[:qty_int]
-            )
-            stock_items.extend(list(qs))
-
-        consumables = []
-        for model_id, qty in cons_lines:
-            try:
-                qty_int = int(qty or 0)
-            except (TypeError, ValueError):
-                qty_int = 0
-            if qty_int <= 0:
-                continue
-            qs = (
-                Consumable.objects.filter(consumable_model_id=model_id)
-                .order_by("-consumable_id")
-                .values(
-                    "consumable_id",
-                    "consumable_model_id",
-                    "consumable_name",
-                    "consumable_inventory_number",
-                    "consumable_status",
-                )[:qty_int]
-            )
-            consumables.extend(list(qs))
+        stock_items = received_items(purchase_order_id, "stock_item")
+        consumables = received_items(purchase_order_id, "consumable")
 
         return Response(
             {
@@ -7465,8 +7378,7 @@ class PurchaseOrderViewSet(viewsets.ViewSet):
                 if cursor.fetchone() is None:
                     return Response({"error": "Supplier not found"}, status=status.HTTP_400_BAD_REQUEST)
 
-                cursor.execute("SELECT COALESCE(MAX(purchase_order_id), 0) + 1 FROM public.purchase_order")
-                next_id = cursor.fetchone()[0]
+                next_id = allocate_id(("purchase_order", "purchase_order_id"))
 
                 cursor.execute(
                     """
@@ -7575,7 +7487,7 @@ class PurchaseOrderViewSet(viewsets.ViewSet):
 
     @action(detail=True, methods=["post"], url_path="receive")
     def receive(self, request, pk=None):
-        _, denial = self._require_responsible(request)
+        user_account, denial = self._require_responsible(request)
         if denial:
             return denial
 
@@ -7599,188 +7511,132 @@ class PurchaseOrderViewSet(viewsets.ViewSet):
                 return None
             return int(v)
 
-        with transaction.atomic():
-            with connection.cursor() as cursor:
-                cursor.execute(
-                    "SELECT 1 FROM public.purchase_order WHERE purchase_order_id = %s",
-                    [purchase_order_id],
-                )
-                if cursor.fetchone() is None:
-                    return Response({"error": "Purchase order not found"}, status=status.HTTP_404_NOT_FOUND)
-
-                for raw in stock_item_models:
-                    if not isinstance(raw, dict):
-                        return Response({"error": "Each stock_item_models entry must be an object"}, status=status.HTTP_400_BAD_REQUEST)
-                    stock_item_model_id = _as_int(raw.get("stock_item_model_id"))
+        # Validate the payload up front and sum repeated models, so each line table
+        # is updated by a single statement.
+        received = {"stock_item": {}, "consumable": {}}
+        for kind, raw_lines in (("stock_item", stock_item_models), ("consumable", consumable_models)):
+            for raw in raw_lines:
+                if not isinstance(raw, dict):
+                    return Response({"error": f"Each {kind}_models entry must be an object"}, status=status.HTTP_400_BAD_REQUEST)
+                try:
+                    model_id = _as_int(raw.get(f"{kind}_model_id"))
                     newly_received = _as_int(raw.get("quantity_received"))
-                    if stock_item_model_id is None or newly_received is None:
-                        return Response(
-                            {"error": "stock_item_model_id and quantity_received are required for stock_item_models"},
-                            status=status.HTTP_400_BAD_REQUEST,
-                        )
-                    if newly_received < 0:
-                        return Response({"error": "quantity_received cannot be negative"}, status=status.HTTP_400_BAD_REQUEST)
-
-                    cursor.execute(
-                        """
-                        SELECT COALESCE(quantity_ordered, 0), COALESCE(quantity_received, 0)
-                        FROM public.stock_item_model_is_found_in_purchase_order
-                        WHERE purchase_order_id = %s AND stock_item_model_id = %s
-                        """,
-                        [purchase_order_id, stock_item_model_id],
+                except (TypeError, ValueError):
+                    return Response(
+                        {"error": f"{kind}_model_id and quantity_received must be integers"},
+                        status=status.HTTP_400_BAD_REQUEST,
                     )
-                    row = cursor.fetchone()
-                    if row is None:
-                        return Response(
-                            {"error": f"Stock item model line not found (stock_item_model_id={stock_item_model_id})"},
-                            status=status.HTTP_400_BAD_REQUEST,
-                        )
-                    qty_ordered, qty_received_current = row
-                    qty_received_new = int(qty_received_current) + int(newly_received)
-                    if qty_received_new > int(qty_ordered):
-                        return Response(
-                            {
-                                "error": (
-                                    f"Received quantity exceeds ordered for stock_item_model_id={stock_item_model_id} "
-                                    f"(ordered={qty_ordered}, current_received={qty_received_current}, newly_received={newly_received})"
-                                )
-                            },
-                            status=status.HTTP_400_BAD_REQUEST,
-                        )
-
-                    cursor.execute(
-                        """
-                        UPDATE public.stock_item_model_is_found_in_purchase_order
-                        SET quantity_received = %s
-                        WHERE purchase_order_id = %s AND stock_item_model_id = %s
-                        """,
-                        [qty_received_new, purchase_order_id, stock_item_model_id],
+                if model_id is None or newly_received is None:
+                    return Response(
+                        {"error": f"{kind}_model_id and quantity_received are required for {kind}_models"},
+                        status=status.HTTP_400_BAD_REQUEST,
                     )
+                if newly_received < 0:
+                    return Response({"error": "quantity_received cannot be negative"}, status=status.HTTP_400_BAD_REQUEST)
+                received[kind][model_id] = received[kind].get(model_id, 0) + newly_received
 
-                for raw in consumable_models:
-                    if not isinstance(raw, dict):
-                        return Response({"error": "Each consumable_models entry must be an object"}, status=status.HTTP_400_BAD_REQUEST)
-                    consumable_model_id = _as_int(raw.get("consumable_model_id"))
-                    newly_received = _as_int(raw.get("quantity_received"))
-                    if consumable_model_id is None or newly_received is None:
-                        return Response(
-                            {"error": "consumable_model_id and quantity_received are required for consumable_models"},
-                            status=status.HTTP_400_BAD_REQUEST,
-                        )
-                    if newly_received < 0:
-                        return Response({"error": "quantity_received cannot be negative"}, status=status.HTTP_400_BAD_REQUEST)
-
-                    cursor.execute(
-                        """
-                        SELECT COALESCE(quantity_ordered, 0), COALESCE(quantity_received, 0)
-                        FROM public.consumable_model_is_found_in_purchase_order
-                        WHERE purchase_order_id = %s AND consumable_model_id = %s
-                        """,
-                        [purchase_order_id, consumable_model_id],
-                    )
-                    row = cursor.fetchone()
-                    if row is None:
-                        return Response(
-                            {"error": f"Consumable model line not found (consumable_model_id={consumable_model_id})"},
-                            status=status.HTTP_400_BAD_REQUEST,
-                        )
-                    qty_ordered, qty_received_current = row
-                    qty_received_new = int(qty_received_current) + int(newly_received)
-                    if qty_received_new > int(qty_ordered):
-                        return Response(
-                            {
-                                "error": (
-                                    f"Received quantity exceeds ordered for consumable_model_id={consumable_model_id} "
-                                    f"(ordered={qty_ordered}, current_received={qty_received_current}, newly_received={newly_received})"
-                                )
-                            },
-                            status=status.HTTP_400_BAD_REQUEST,
-                        )
+        with transaction.atomic():
+            if not lock_purchase_order(purchase_order_id):
+                return Response({"error": "Purchase order not found"}, status=status.HTTP_404_NOT_FOUND)
 
-                    cursor.execute(
-                        """
-                        UPDATE public.consumable_model_is_found_in_purchase_order
-                        SET quantity_received = %s
-                        WHERE purchase_order_id = %s AND consumable_model_id = %s
-                        """,
-                        [qty_received_new, purchase_order_id, consumable_model_id],
+            for kind, quantities in received.items():
+                rejected = receive_quantities(purchase_order_id, kind, quantities)
+                if not rejected:
+                    continue
+                transaction.set_rollback(True)
+                label = kind.replace("_", " ").capitalize()
+                first = rejected[0]
+                if first["quantity_ordered"] is None:
+                    error = f"{label} model line not found ({kind}_model_id={first['model_id']})"
+                else:
+                    error = (
+                        f"Received quantity exceeds ordered for {kind}_model_id={first['model_id']} "
+                        f"(ordered={first['quantity_ordered']}, current_received={first['quantity_received']}, "
+                        f"newly_received={first['newly_received']})"
                     )
-
-                cursor.execute(
-                    """
-                    SELECT
-                        EXISTS (
-                            SELECT 1
-                            FROM public.stock_item_model_is_found_in_purchase_order l
-                            WHERE l.purchase_order_id = %s
-                              AND COALESCE(l.quantity_ordered, 0) > COALESCE(l.quantity_received, 0)
-                        )
-                        OR EXISTS (
-                            SELECT 1
-                            FROM public.consumable_model_is_found_in_purchase_order l
-                            WHERE l.purchase_order_id = %s
-                              AND COALESCE(l.quantity_ordered, 0) > COALESCE(l.quantity_received, 0)
-                        )
-                    """,
-                    [purchase_order_id, purchase_order_id],
+                return Response(
+                    {"error": error, f"rejected_{kind}_models": rejected},
+                    status=status.HTTP_400_BAD_REQUEST,
                 )
-                has_remaining = cursor.fetchone()[0]
-
-                backorder_report_id = None
-                if has_remaining:
-                    cursor.execute("SELECT COALESCE(MAX(backorder_report_id), 0) + 1 FROM public.backorder_report")
-                    next_id = cursor.fetchone()[0]
-                    cursor.execute(
-                        """
-                        INSERT INTO public.backorder_report
-                            (backorder_report_id, purchase_order_id, backorder_report_date, digital_copy)
-                        VALUES (%s, %s, %s, NULL)
-                        """,
-                        [next_id, purchase_order_id, datetime.date.today()],
-                    )
-                    backorder_report_id = next_id
 
-                    cursor.execute(
-                        """
-                        INSERT INTO public.backorder_report_stock_item_model_line
-                            (backorder_report_id, stock_item_model_id, quantity_ordered, quantity_received, quantity_remaining)
-                        SELECT %s,
-                               l.stock_item_model_id,
-                               COALESCE(l.quantity_ordered, 0),
-                               COALESCE(l.quantity_received, 0),
-                               (COALESCE(l.quantity_ordered, 0) - COALESCE(l.quantity_received, 0))
-                        FROM public.stock_item_model_is_found_in_purchase_order l
-                        WHERE l.purchase_order_id = %s
-                          AND COALESCE(l.quantity_ordered, 0) > COALESCE(l.quantity_received, 0)
-                        """,
-                        [backorder_report_id, purchase_order_id],
-                    )
+            if _request_flag(request, "async"):
+                job = enqueue("purchase_orders.backorder", {"purchase_order_id": purchase_order_id}, user=user_account)
+                return Response(
+                    {"purchase_order_id": purchase_order_id, "job_id": job.job_id, "status": job.status},
+                    status=status.HTTP_202_ACCEPTED,
+                )
 
-                    cursor.execute(
-                        """
-                        INSERT INTO public.backorder_report_consumable_model_line
-                            (backorder_report_id, consumable_model_id, quantity_ordered, quantity_received, quantity_remaining)
-                        SELECT %s,
-                               l.consumable_model_id,
-                               COALESCE(l.quantity_ordered, 0),
-                               COALESCE(l.quantity_received, 0),
-                               (COALESCE(l.quantity_ordered, 0) - COALESCE(l.quantity_received, 0))
-                        FROM public.consumable_model_is_found_in_purchase_order l
-                        WHERE l.purchase_order_id = %s
-                          AND COALESCE(l.quantity_ordered, 0) > COALESCE(l.quantity_received, 0)
-                        """,
-                        [backorder_report_id, purchase_order_id],
-                    )
+            backorder_report_id = create_backorder_report(purchase_order_id)
 
         return Response(
             {
                 "purchase_order_id": purchase_order_id,
-                "has_remaining": bool(has_remaining),
+                "has_remaining": backorder_report_id is not None,
                 "backorder_report_id": backorder_report_id,
             },
             status=status.HTTP_200_OK,
         )
 
+    @action(detail=True, methods=["post"], url_path="materialize-items")
+    def materialize_items(self, request, pk=None):
+        _, denial = self._require_responsible(request)
+        if denial:
+            return denial
+
+        try:
+            purchase_order_id = int(pk)
+        except (TypeError, ValueError):
+            return Response({"error": "Invalid purchase order id"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            location_id = int(request.data.get("location_id"))
+        except (TypeError, ValueError):
+            return Response({"error": "location_id is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if not Location.objects.filter(location_id=location_id).exists():
+            return Response({"error": "Invalid location_id"}, status=status.HTTP_400_BAD_REQUEST)
+
+        lines = {}
+        for kind in ("stock_item", "consumable"):
+            raw_lines = request.data.get(f"{kind}_models") or []
+            if not isinstance(raw_lines, list):
+                return Response({"error": f"{kind}_models must be a list"}, status=status.HTTP_400_BAD_REQUEST)
+            entries = []
+            for raw in raw_lines:
+                if not isinstance(raw, dict):
+                    return Response({"error": f"Each {kind}_models entry must be an object"}, status=status.HTTP_400_BAD_REQUEST)
+                instances = raw.get("instances") or []
+                if not isinstance(instances, list) or not all(isinstance(i, dict) for i in instances):
+                    return Response({"error": "instances must be a list of objects"}, status=status.HTTP_400_BAD_REQUEST)
+                try:
+                    entries.append(
+                        {
+                            "model_id": int(raw.get(f"{kind}_model_id")),
+                            "quantity": None if raw.get("quantity") in (None, "") else int(raw.get("quantity")),
+                            "instances": instances,
+                        }
+                    )
+                except (TypeError, ValueError):
+                    return Response(
+                        {"error": f"{kind}_model_id and quantity must be integers"},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+            if entries:
+                lines[kind] = entries
+        if not lines:
+            return Response(
+                {"error": "Provide stock_item_models and/or consumable_models"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        result = materialize_items(
+            purchase_order_id,
+            location_id=location_id,
+            lines=lines,
+            movement_reason=request.data.get("movement_reason") or "received_on_purchase_order",
+            item_status=request.data.get("item_status") or "in_stock",
+        )
+        return Response({"purchase_order_id": purchase_order_id, **result}, status=status.HTTP_201_CREATED)
+
     @action(detail=True, methods=["get", "post"], url_path="delivery-note")
     def delivery_note(self, request, pk=None):
         _, denial = self._require_responsible(request)
@@ -7872,22 +7728,14 @@ class PurchaseOrderViewSet(viewsets.ViewSet):
         if content_type != "application/pdf" and not filename.lower().endswith(".pdf"):
             return Response({"error": "digital_copy must be a PDF"}, status=status.HTTP_400_BAD_REQUEST)
 
-        digital_copy_bytes = digital_copy_file.read()
-        if not digital_copy_bytes.startswith(b"%PDF"):
-            return Response({"error": "digital_copy must be a valid PDF"}, status=status.HTTP_400_BAD_REQUEST)
-
         safe_code = "".join([c for c in str(delivery_note_code) if c.isalnum() or c in {"-", "_"}])
         if not safe_code:
             return Response({"error": "delivery_note_code is invalid"}, status=status.HTTP_400_BAD_REQUEST)
 
-        rel_dir = os.path.join("delivery_notes", f"purchase_order_{purchase_order_id}")
-        base_dir = os.path.join(str(settings.MEDIA_ROOT), rel_dir)
-        os.makedirs(base_dir, exist_ok=True)
-
-        rel_path = os.path.join(rel_dir, f"delivery_note_{safe_code}.pdf")
-        abs_path = os.path.join(str(settings.MEDIA_ROOT), rel_path)
-        with open(abs_path, "wb") as f:
-            f.write(digital_copy_bytes)
+        try:
+            rel_path = store_pdf(digital_copy_file)
+        except InvalidDocument as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
         with transaction.atomic():
             with connection.cursor() as cursor:
@@ -7928,8 +7776,7 @@ class PurchaseOrderViewSet(viewsets.ViewSet):
                         status=status.HTTP_400_BAD_REQUEST,
                     )
 
-                cursor.execute("SELECT COALESCE(MAX(delivery_note_id), 0) + 1 FROM public.delivery_note")
-                next_id = cursor.fetchone()[0]
+                next_id = allocate_id(("delivery_note", "delivery_note_id"))
                 cursor.execute(
                     """
                     INSERT INTO public.delivery_note
@@ -7981,9 +7828,7 @@ class PurchaseOrderViewSet(viewsets.ViewSet):
             return Response({"error": "Digital copy file missing on server"}, status=status.HTTP_404_NOT_FOUND)
 
         code = delivery_note_code or str(delivery_note_id)
-        resp = FileResponse(open(abs_path, "rb"), content_type="application/pdf")
-        resp["Content-Disposition"] = f'attachment; filename="delivery_note_{code}.pdf"'
-        return resp
+        return serve_document(request, rel_path, f"delivery_note_{code}.pdf", as_attachment=True)
 
     @action(detail=True, methods=["get", "post"], url_path="invoice")
     def invoice(self, request, pk=None):
@@ -8081,18 +7926,10 @@ class PurchaseOrderViewSet(viewsets.ViewSet):
         if content_type != "application/pdf" and not filename.lower().endswith(".pdf"):
             return Response({"error": "digital_copy must be a PDF"}, status=status.HTTP_400_BAD_REQUEST)
 
-        digital_copy_bytes = digital_copy_file.read()
-        if not digital_copy_bytes.startswith(b"%PDF"):
-            return Response({"error": "digital_copy must be a valid PDF"}, status=status.HTTP_400_BAD_REQUEST)
-
-        rel_dir = os.path.join("invoices", f"delivery_note_{delivery_note_id}")
-        base_dir = os.path.join(str(settings.MEDIA_ROOT), rel_dir)
-        os.makedirs(base_dir, exist_ok=True)
-
-        rel_path = os.path.join(rel_dir, f"invoice_{delivery_note_id}.pdf")
-        abs_path = os.path.join(str(settings.MEDIA_ROOT), rel_path)
-        with open(abs_path, "wb") as f:
-            f.write(digital_copy_bytes)
+        try:
+            rel_path = store_pdf(digital_copy_file)
+        except InvalidDocument as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
         with transaction.atomic():
             with connection.cursor() as cursor:
@@ -8107,8 +7944,7 @@ class PurchaseOrderViewSet(viewsets.ViewSet):
                         status=status.HTTP_400_BAD_REQUEST,
                     )
 
-                cursor.execute("SELECT COALESCE(MAX(invoice_id), 0) + 1 FROM public.invoice")
-                next_id = cursor.fetchone()[0]
+                next_id = allocate_id(("invoice", "invoice_id"))
                 cursor.execute(
                     """
                     INSERT INTO public.invoice (invoice_id, delivery_note_id, digital_copy)
@@ -8182,9 +8018,7 @@ class PurchaseOrderViewSet(viewsets.ViewSet):
         if not os.path.isfile(abs_path):
             return Response({"error": "Digital copy file missing on server"}, status=status.HTTP_404_NOT_FOUND)
 
-        resp = FileResponse(open(abs_path, "rb"), content_type="application/pdf")
-        resp["Content-Disposition"] = f'inline; filename="invoice_{invoice_id}.pdf"'
-        return resp
+        return serve_document(request, rel_path, f"invoice_{invoice_id}.pdf")
 
     @action(detail=True, methods=["get", "post"], url_path="acceptance-report")
     def acceptance_report(self, request, pk=None):
@@ -8280,13 +8114,10 @@ class PurchaseOrderViewSet(viewsets.ViewSet):
         if content_type != "application/pdf" and not filename.lower().endswith(".pdf"):
             return Response({"error": "digital_copy must be a PDF"}, status=status.HTTP_400_BAD_REQUEST)
 
-        digital_copy_bytes = digital_copy_file.read()
-        if not digital_copy_bytes.startswith(b"%PDF"):
-            return Response({"error": "digital_copy must be a valid PDF"}, status=status.HTTP_400_BAD_REQUEST)
-
-        rel_dir = os.path.join("acceptance_reports", f"delivery_note_{delivery_note_id}")
-        base_dir = os.path.join(str(settings.MEDIA_ROOT), rel_dir)
-        os.makedirs(base_dir, exist_ok=True)
+        try:
+            rel_path = store_pdf(digital_copy_file)
+        except InvalidDocument as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
         with transaction.atomic():
             with connection.cursor() as cursor:
@@ -8301,13 +8132,7 @@ class PurchaseOrderViewSet(viewsets.ViewSet):
                         status=status.HTTP_400_BAD_REQUEST,
                     )
 
-                cursor.execute("SELECT COALESCE(MAX(acceptance_report_id), 0) + 1 FROM public.acceptance_report")
-                next_id = cursor.fetchone()[0]
-
-                rel_path = os.path.join(rel_dir, f"acceptance_report_{next_id}.pdf")
-                abs_path = os.path.join(str(settings.MEDIA_ROOT), rel_path)
-                with open(abs_path, "wb") as f:
-                    f.write(digital_copy_bytes)
+                next_id = allocate_id(("acceptance_report", "acceptance_report_id"))
 
                 cursor.execute(
                     """
@@ -8486,9 +8311,7 @@ class PurchaseOrderViewSet(viewsets.ViewSet):
         if not os.path.isfile(abs_path):
             return Response({"error": "Digital copy file missing on server"}, status=status.HTTP_404_NOT_FOUND)
 
-        resp = FileResponse(open(abs_path, "rb"), content_type="application/pdf")
-        resp["Content-Disposition"] = f'inline; filename="acceptance_report_{acceptance_report_id}.pdf"'
-        return resp
+        return serve_document(request, digital_copy, f"acceptance_report_{acceptance_report_id}.pdf")
 
     def retrieve(self, request, pk=None):
         _, _, denial = self._require_purchase_order_consult(request)
@@ -8587,13 +8410,12 @@ class BackorderReportViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
 
     def _require_responsible(self, request):
-        user_account = SuperuserWriteMixin()._get_user_account(request)
+        principal = get_principal(request)
+        user_account = principal.user if principal else None
         if not user_account or not getattr(user_account, "person", None):
             return None, Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=user_account.person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
         if user_account.is_superuser() or ("stock_consumable_responsible" in role_codes):
             return user_account, None
 
@@ -8723,8 +8545,7 @@ class BackorderReportViewSet(viewsets.ViewSet):
                         status=status.HTTP_400_BAD_REQUEST,
                     )
 
-                cursor.execute("SELECT COALESCE(MAX(backorder_report_id), 0) + 1 FROM public.backorder_report")
-                next_id = cursor.fetchone()[0]
+                next_id = allocate_id(("backorder_report", "backorder_report_id"))
 
                 cursor.execute(
                     """
@@ -8957,8 +8778,7 @@ class WarehouseViewSet(viewsets.ModelViewSet):
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        last_item = Warehouse.objects.order_by("-warehouse_id").first()
-        next_id = (last_item.warehouse_id + 1) if last_item else 1
+        next_id = allocate_id(Warehouse)
         item = Warehouse.objects.create(warehouse_id=next_id, **serializer.validated_data)
         return Response(self.get_serializer(item).data, status=status.HTTP_201_CREATED)
 
@@ -8971,8 +8791,7 @@ class AttributionOrderViewSet(viewsets.ModelViewSet):
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        last_item = AttributionOrder.objects.order_by("-attribution_order_id").first()
-        next_id = (last_item.attribution_order_id + 1) if last_item else 1
+        next_id = allocate_id(AttributionOrder)
         item = AttributionOrder.objects.create(attribution_order_id=next_id, **serializer.validated_data)
         return Response(self.get_serializer(item).data, status=status.HTTP_201_CREATED)
 
@@ -9115,8 +8934,7 @@ class AttributionOrderAssetStockItemAccessoryViewSet(viewsets.ModelViewSet):
                 })
                 serializer_item.is_valid(raise_exception=True)
 
-                last_item = StockItem.objects.order_by('-stock_item_id').first()
-                next_id = (last_item.stock_item_id + 1) if last_item else 1
+                next_id = allocate_id(StockItem)
                 item = StockItem.objects.create(stock_item_id=next_id, **serializer_item.validated_data)
                 _sync_stock_item_attribute_values(item)
                 data['stock_item'] = item.stock_item_id
@@ -9189,8 +9007,7 @@ class AttributionOrderAssetConsumableAccessoryViewSet(viewsets.ModelViewSet):
                 })
                 serializer_item.is_valid(raise_exception=True)
 
-                last_item = Consumable.objects.order_by('-consumable_id').first()
-                next_id = (last_item.consumable_id + 1) if last_item else 1
+                next_id = allocate_id(Consumable)
                 item = Consumable.objects.create(consumable_id=next_id, **serializer_item.validated_data)
                 _sync_consumable_attribute_values(item)
                 data['consumable'] = item.consumable_id
@@ -9220,22 +9037,16 @@ class ReceiptReportViewSet(viewsets.ModelViewSet):
             data.pop('digital_copy', None)
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
-        last_item = ReceiptReport.objects.order_by("-receipt_report_id").first()
-        next_id = (last_item.receipt_report_id + 1) if last_item else 1
+        next_id = allocate_id(ReceiptReport)
         
         # Handle file upload if present
         digital_copy = request.FILES.get('digital_copy')
         validated_data = serializer.validated_data
         if digital_copy:
-            rel_dir = os.path.join("receipt_reports")
-            base_dir = os.path.join(str(settings.MEDIA_ROOT), rel_dir)
-            os.makedirs(base_dir, exist_ok=True)
-
-            rel_path = os.path.join(rel_dir, f"receipt_report_{next_id}.pdf")
-            abs_path = os.path.join(str(settings.MEDIA_ROOT), rel_path)
-            with open(abs_path, "wb") as f:
-                f.write(digital_copy.read())
-            validated_data['digital_copy'] = rel_path
+            try:
+                validated_data['digital_copy'] = store_pdf(digital_copy)
+            except InvalidDocument as exc:
+                return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
         item = ReceiptReport.objects.create(receipt_report_id=next_id, **validated_data)
         return Response(self.get_serializer(item).data, status=status.HTTP_201_CREATED)
@@ -9258,9 +9069,7 @@ class AdministrativeCertificateViewSet(viewsets.ModelViewSet):
             if not person:
                 return AdministrativeCertificate.objects.none()
 
-            role_codes = set(
-                PersonRoleMapping.objects.filter(person=person).values_list("role__role_code", flat=True)
-            )
+            role_codes = set(user_account.role_codes())
             if ("asset_responsible" not in role_codes) and ("it_bureau_chief" not in role_codes):
                 return AdministrativeCertificate.objects.none()
 
@@ -9331,9 +9140,7 @@ class AdministrativeCertificateViewSet(viewsets.ModelViewSet):
             if not person:
                 return Response({"error": "Person profile not found"}, status=status.HTTP_404_NOT_FOUND)
 
-            role_codes = set(
-                PersonRoleMapping.objects.filter(person=person).values_list("role__role_code", flat=True)
-            )
+            role_codes = set(user_account.role_codes())
             allowed = ("asset_responsible" in role_codes) or ("it_bureau_chief" in role_codes)
 
         if not allowed:
@@ -9347,21 +9154,15 @@ class AdministrativeCertificateViewSet(viewsets.ModelViewSet):
             data.pop('digital_copy', None)
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
-        last_item = AdministrativeCertificate.objects.order_by("-administrative_certificate_id").first()
-        next_id = (last_item.administrative_certificate_id + 1) if last_item else 1
+        next_id = allocate_id(AdministrativeCertificate)
         
         digital_copy = request.FILES.get('digital_copy')
         validated_data = serializer.validated_data
         if digital_copy:
-            rel_dir = os.path.join("administrative_certificates")
-            base_dir = os.path.join(str(settings.MEDIA_ROOT), rel_dir)
-            os.makedirs(base_dir, exist_ok=True)
-
-            rel_path = os.path.join(rel_dir, f"administrative_certificate_{next_id}.pdf")
-            abs_path = os.path.join(str(settings.MEDIA_ROOT), rel_path)
-            with open(abs_path, "wb") as f:
-                f.write(digital_copy.read())
-            validated_data['digital_copy'] = rel_path
+            try:
+                validated_data['digital_copy'] = store_pdf(digital_copy)
+            except InvalidDocument as exc:
+                return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
         with transaction.atomic():
             item = AdministrativeCertificate.objects.create(administrative_certificate_id=next_id, **validated_data)
@@ -9389,16 +9190,15 @@ class CompanyAssetRequestViewSet(viewsets.ModelViewSet):
         if not person:
             return CompanyAssetRequest.objects.none()
 
-        role_codes = set(
-            PersonRoleMapping.objects.filter(person=person).values_list("role__role_code", flat=True)
-        )
+        role_codes = set(user_account.role_codes())
         if ("asset_responsible" not in role_codes) and ("it_bureau_chief" not in role_codes):
             return CompanyAssetRequest.objects.none()
 
         return self.queryset
 
     def create(self, request, *args, **kwargs):
-        user_account = SuperuserWriteMixin()._get_user_account(request)
+        principal = get_principal(request)
+        user_account = principal.user if principal else None
         if not user_account:
             return Response({"error": "User account not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -9408,9 +9208,7 @@ class CompanyAssetRequestViewSet(viewsets.ModelViewSet):
             person = getattr(user_account, "person", None)
             if not person:
                 return Response({"error": "Person profile not found"}, status=status.HTTP_404_NOT_FOUND)
-            role_codes = set(
-                PersonRoleMapping.objects.filter(person=person).values_list("role__role_code", flat=True)
-            )
+            role_codes = set(user_account.role_codes())
             allowed = ("asset_responsible" in role_codes) or ("it_bureau_chief" in role_codes)
 
         if not allowed:
@@ -9425,23 +9223,17 @@ class CompanyAssetRequestViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
 
-        last_item = CompanyAssetRequest.objects.order_by("-company_asset_request_id").first()
-        next_id = (last_item.company_asset_request_id + 1) if last_item else 1
+        next_id = allocate_id(CompanyAssetRequest)
 
         validated_data = serializer.validated_data
         digital_copy = request.FILES.get('digital_copy')
         if digital_copy:
             validated_data = dict(validated_data)
 
-            rel_dir = os.path.join("company_asset_requests")
-            base_dir = os.path.join(str(settings.MEDIA_ROOT), rel_dir)
-            os.makedirs(base_dir, exist_ok=True)
-
-            rel_path = os.path.join(rel_dir, f"company_asset_request_{next_id}.pdf")
-            abs_path = os.path.join(str(settings.MEDIA_ROOT), rel_path)
-            with open(abs_path, "wb") as f:
-                f.write(digital_copy.read())
-            validated_data['digital_copy'] = rel_path
+            try:
+                validated_data['digital_copy'] = store_pdf(digital_copy)
+            except InvalidDocument as exc:
+                return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
         item = CompanyAssetRequest.objects.create(company_asset_request_id=next_id, **validated_data)
         return Response(self.get_serializer(item).data, status=status.HTTP_201_CREATED)
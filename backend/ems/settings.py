@@ -29,7 +29,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
-    'api.middleware.DebugMiddleware',
+    'api.middleware.RequestLogMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -69,6 +69,12 @@ DATABASES = {
         'PASSWORD': '08212001',
         'HOST': 'localhost',
         'PORT': '5432',
+        # The tables are not managed by Django (see project_iguana_*.sql), so the
+        # test database is cloned from the development database and migrated.
+        # Nothing else may be connected to it while the test database is created.
+        'TEST': {
+            'TEMPLATE': 'project_iguana',
+        },
     }
 }
 
@@ -92,6 +98,16 @@ STATIC_URL = 'static/'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploaded PDFs are stored once per SHA-256 under MEDIA_ROOT/DOCUMENT_STORAGE_DIR
+# (see api/documents.py), streamed in chunks of DOCUMENT_UPLOAD_CHUNK_SIZE bytes.
+DOCUMENT_STORAGE_DIR = 'documents'
+DOCUMENT_UPLOAD_CHUNK_SIZE = 64 * 1024
+# PDF downloads can be handed to the front web server: 'x-accel-redirect' (nginx,
+# with an internal location mapping DOCUMENT_ACCEL_REDIRECT_PREFIX to MEDIA_ROOT)
+# or 'x-sendfile' (Apache mod_xsendfile, lighttpd). None streams from Django.
+DOCUMENT_SENDFILE = None
+DOCUMENT_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # CORS settings
@@ -106,8 +122,68 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # Opt-in: lists are only paginated when ?page_size= or ?cursor= is given.
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetPagination',
+}
+
+# Caches. 'principals' holds authenticated user accounts and their role codes
+# (see api/principal.py); point it at a shared backend such as Redis when
+# running several worker processes.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'principals': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'principals',
+    },
 }
 
+# Seconds a cached principal is trusted before it is reloaded from the database.
+PRINCIPAL_CACHE_TTL = 300
+
+# Seconds a user's roles epoch is cached; bounds how long an access token stays
+# usable after its roles were changed with raw SQL outside the API.
+ROLES_EPOCH_CACHE_TTL = 60
+
+# Background jobs (see api/jobs.py), used when a request passes async=true.
+# Workers run with `manage.py run_jobs` (see how_to_run_the_app.txt); with
+# BACKGROUND_JOBS_EAGER jobs run inside the request that enqueued them.
+BACKGROUND_JOBS_EAGER = False
+BACKGROUND_JOB_MAX_ATTEMPTS = 3
+# Seconds after which a running job whose worker went away is queued again.
+BACKGROUND_JOB_STALE_AFTER = 600
+# Longest wait, in seconds, between polls while the database is unreachable.
+BACKGROUND_JOB_MAX_BACKOFF = 60
+
+# Seconds a spare picked by select-random stays reserved for its maintenance
+# item request before another request may take it (see api/availability.py).
+SPARE_RESERVATION_TTL = 900
+
+# Request log (api/request_log.py): JSON lines written by a background thread
+# from a bounded in-memory buffer into a size-rotated file.
+REQUEST_LOG_FILE = BASE_DIR / 'logs' / 'requests.log'
+REQUEST_LOG_MAX_BYTES = 10 * 1024 * 1024
+REQUEST_LOG_BACKUP_COUNT = 5
+REQUEST_LOG_BUFFER_SIZE = 10000
+# Fraction of successful requests logged; error responses and crashes always are.
+REQUEST_LOG_SAMPLE_RATE = 1.0
+
+# Login audit (api/auth_audit.py): authentication_log rows and failed-attempt
+# counters are buffered in memory and written every AUTH_LOG_FLUSH_INTERVAL seconds.
+AUTH_LOG_FLUSH_INTERVAL = 2.0
+AUTH_LOG_BATCH_SIZE = 500
+# Events / account entries buffered at most (the oldest are dropped beyond it), and
+# consecutive failed writes after which a batch is logged and discarded.
+AUTH_LOG_BUFFER_SIZE = 10000
+AUTH_LOG_MAX_ATTEMPTS = 5
+# Failed logins allowed per username / client address within the window (seconds).
+LOGIN_THROTTLE_WINDOW = 300
+LOGIN_THROTTLE_USERNAME_FAILURES = 5
+LOGIN_THROTTLE_IP_FAILURES = 50
+# Usernames / addresses tracked at once; the least recently failing are dropped beyond it.
+LOGIN_THROTTLE_MAX_KEYS = 100000
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=8),
@@ -31,21 +31,69 @@ api.interceptors.request.use(
     (error) => Promise.reject(error)
 );
 
+const clearSession = () => {
+    localStorage.removeItem('access_token');
+    localStorage.removeItem('refresh_token');
+    localStorage.removeItem('user');
+};
+
+const storeTokens = ({ access, refresh }) => {
+    if (access) {
+        localStorage.setItem('access_token', access);
+    }
+    if (refresh) {
+        localStorage.setItem('refresh_token', refresh);
+    }
+};
+
+// Requests failing with 401 at the same time share one refresh call.
+let refreshPromise = null;
+
+const refreshAccessToken = () => {
+    if (!refreshPromise) {
+        const refresh = localStorage.getItem('refresh_token');
+        refreshPromise = (refresh
+            ? axios.post(`${API_URL}auth/refresh/`, { refresh })
+            : Promise.reject(new Error('No refresh token'))
+        )
+            .then((response) => {
+                storeTokens(response.data);
+                return response.data.access;
+            })
+            .finally(() => {
+                refreshPromise = null;
+            });
+    }
+    return refreshPromise;
+};
+
 // Handle token refresh on 401
 api.interceptors.response.use(
     (response) => response,
     async (error) => {
-        if (error.response?.status === 401) {
-            const requestUrl = error?.config?.url || '';
+        const originalRequest = error?.config;
+        if (error.response?.status === 401 && originalRequest) {
+            const requestUrl = originalRequest.url || '';
 
             if (requestUrl.includes('auth/login/')) {
                 return Promise.reject(error);
             }
 
+            // Expired or outdated access token: get a new one and replay the request once.
+            if (!originalRequest._retried) {
+                originalRequest._retried = true;
+                try {
+                    const access = await refreshAccessToken();
+                    originalRequest.headers = originalRequest.headers || {};
+                    originalRequest.headers.Authorization = `Bearer ${access}`;
+                    return api(originalRequest);
+                } catch (refreshError) {
+                    // Refresh token expired or revoked; fall through to the login page.
+                }
+            }
+
             // Clear tokens and redirect to login
-            localStorage.removeItem('access_token');
-            localStorage.removeItem('refresh_token');
-            localStorage.removeItem('user');
+            clearSession();
             window.location.href = '/login';
         }
         return Promise.reject(error);
@@ -66,9 +114,7 @@ export const authService = {
     },
 
     logout: () => {
-        localStorage.removeItem('access_token');
-        localStorage.removeItem('refresh_token');
-        localStorage.removeItem('user');
+        clearSession();
     },
 
     getUser: () => {
@@ -90,6 +136,8 @@ export const authService = {
             old_password: oldPassword,
             new_password: newPassword,
         });
+        // The password change revokes the previous tokens; keep the new pair.
+        storeTokens(response.data);
         return response.data;
     },
 };
@@ -1567,7 +1615,7 @@ export const maintenanceStepItemRequestService = {
     },
 
     selectRandom: async (id) => {
-        const response = await api.get(`maintenance-step-item-requests/${id}/select-random/`);
+        const response = await api.post(`maintenance-step-item-requests/${id}/select-random/`);
         return response.data;
     },
 